@@ -16,6 +16,7 @@ def metrics_endpoint(db: Session = Depends(get_db)):
         update_active_users_detail_gauge,
         update_active_subscriptions_gauge,
         update_scheduled_uploads_detail_gauge,
+        update_task_queue_gauges,
         update_upload_status_gauges
     )
     from app.db.redis import get_active_users_with_timestamps
@@ -37,6 +38,9 @@ def metrics_endpoint(db: Session = Depends(get_db)):
     # Update upload status gauges (queued, scheduled, current, failed)
     update_upload_status_gauges(db)
     
+    # Update task queue depth gauge (ready/delayed upload tasks)
+    update_task_queue_gauges()
+    
     return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
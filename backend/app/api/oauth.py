@@ -197,14 +197,14 @@ async def disconnect_tiktok(user_id: int = Depends(require_csrf_new), db: Sessio
 
 
 @router.get("/tiktok/account")
-def get_tiktok_account(
+async def get_tiktok_account(
     user_id: int = Depends(require_auth),
     db: Session = Depends(get_db),
     background_tasks: BackgroundTasks = BackgroundTasks(),
     force_refresh: bool = False
 ):
     """Get TikTok account information with stale-while-revalidate pattern"""
-    result = get_tiktok_account_info(user_id, db, force_refresh=force_refresh)
+    result = await get_tiktok_account_info(user_id, db, force_refresh=force_refresh)
     
     # Schedule background refresh to update cache (stale-while-revalidate)
     if not force_refresh and result.get("has_cache"):
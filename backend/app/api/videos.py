@@ -18,7 +18,7 @@ from app.db.helpers import (
 )
 from app.db.redis import set_upload_progress
 from app.db.session import get_db
-from app.db.task_queue import enqueue_task
+from app.db.task_queue import async_enqueue_task
 from app.models.video import Video
 from app.services.token_service import calculate_tokens_from_bytes
 from app.services.video import (
@@ -747,7 +747,7 @@ async def upload_videos(user_id: int = Depends(require_csrf_new), db: Session =
     """
     # Quick validation before enqueueing
     upload_context = build_upload_context(user_id, db)
-    enabled_destinations = upload_context["enabled_destinations"]
+    enabled_destinations = upload_context.enabled_destinations
     
     if not enabled_destinations:
         raise HTTPException(
@@ -778,12 +778,13 @@ async def upload_videos(user_id: int = Depends(require_csrf_new), db: Session =
             detail=f"No videos ready to upload. Add videos first. Current video statuses: {statuses}"
         )
     
-    # Enqueue task
-    task_id = enqueue_task(
+    # Enqueue task - repeated clicks merge into the user's already-queued task
+    task_id = await async_enqueue_task(
         task_type="upload_videos",
         payload={"user_id": user_id},
         retry_count=0,
-        max_retries=3
+        max_retries=3,
+        dedup_key=str(user_id)
     )
     
     # Return 202 Accepted immediately
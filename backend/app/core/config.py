@@ -84,6 +84,7 @@ class Settings(BaseSettings):
     TIKTOK_API_BASE: str = "https://open.tiktokapis.com/v2"
     TIKTOK_RATE_LIMIT_REQUESTS: int = 6
     TIKTOK_RATE_LIMIT_WINDOW: int = 60  # seconds
+    TIKTOK_STATUS_FETCH_CONCURRENCY: int = 10  # publish status requests in flight at once per batch
     
     # Instagram API Configuration (Instagram Login)
     INSTAGRAM_AUTH_URL: str = "https://www.instagram.com/oauth/authorize"
@@ -93,6 +94,72 @@ class Settings(BaseSettings):
     # Redis locking
     TOKEN_REFRESH_LOCK_TIMEOUT: int = 10  # seconds
     DATA_REFRESH_COOLDOWN: int = 60  # seconds
+    
+    # Task queue (reliable delivery, delayed retries)
+    TASK_QUEUE_WORKER_LEASE_SECONDS: int = 30  # Worker considered dead if no heartbeat within this window
+    TASK_QUEUE_HEARTBEAT_INTERVAL: int = 10  # seconds between worker heartbeats
+    TASK_QUEUE_REAPER_INTERVAL: int = 5  # seconds between expired-lease sweeps
+    TASK_QUEUE_PROMOTER_INTERVAL: float = 1.0  # seconds between delayed-task promotion sweeps
+    TASK_QUEUE_PROMOTE_BATCH_SIZE: int = 100  # delayed tasks moved per Lua call
+    TASK_QUEUE_STALE_TASK_TIMEOUT: int = 3600  # seconds a task may stay in processing before it is failed
+    TASK_QUEUE_STALE_CHECK_INTERVAL: int = 60  # seconds between stale-task sweeps
+    
+    # Upload worker concurrency
+    UPLOAD_WORKER_MAX_CONCURRENCY: int = 20  # Max upload tasks in flight per worker process
+    UPLOAD_WORKER_MAX_PER_USER: int = 1  # Max upload tasks in flight per user per worker process
+    UPLOAD_WORKER_DEFER_SECONDS: int = 5  # Delay before retrying a task deferred by the per-user limit
+    UPLOAD_WORKER_DRAIN_TIMEOUT: int = 30  # seconds to wait for in-flight uploads on shutdown
+    WORKER_METRICS_PORT: int = 9100  # Prometheus /metrics port of an app.worker process (0 disables)
+    
+    # Fair-share video uploads (per process): waiting uploads of different users are interleaved
+    # by weighted deficit round-robin, so one user's large batch cannot take every slot
+    UPLOAD_MAX_CONCURRENT_VIDEOS: int = 10  # video uploads running at once across all users
+    UPLOAD_MAX_IN_FLIGHT_PER_USER: int = 3  # video uploads running at once per user
+    UPLOAD_PLAN_WEIGHTS: str = "free:1,free_daily:1,starter:2,creator:3,unlimited:4"  # share of slots per Subscription.plan_type (others: 1)
+    
+    # YouTube resumable uploads (googleapiclient is blocking - chunk transfers run in a thread pool)
+    YOUTUBE_UPLOAD_CHUNK_SIZE: int = 16 * 1024 * 1024  # bytes per resumable request, multiple of 256 KiB
+    YOUTUBE_UPLOAD_THREADS: int = 8  # chunk transfers running at once per process
+    YOUTUBE_DAILY_QUOTA_UNITS: int = 10000  # YouTube Data API units per day granted to our project
+    
+    # Platform API HTTP clients (one pooled keep-alive client per platform per process)
+    PLATFORM_HTTP2: bool = True  # negotiate HTTP/2 when h2 is installed
+    PLATFORM_HTTP_MAX_CONNECTIONS: int = 50  # open connections per platform client
+    PLATFORM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20  # idle connections kept for reuse
+    PLATFORM_HTTP_KEEPALIVE_EXPIRY: float = 60.0  # seconds an idle connection is kept
+    
+    # In-process (L1) cache in front of the Redis settings / OAuth token caches, invalidated across
+    # processes via Redis pub/sub. The TTL bounds staleness if an invalidation message is missed.
+    LOCAL_CACHE_TTL: float = 30.0  # seconds an entry is served from process memory
+    LOCAL_CACHE_MAX_ENTRIES: int = 4096  # entries per cache, least recently used evicted first
+    DECRYPTED_TOKEN_CACHE_TTL: float = 60.0  # seconds decrypted OAuth tokens stay in process memory (never in Redis)
+    
+    # Realtime (WebSocket) events: a user's video status/progress events are merged over short windows
+    # and published in one Redis pipeline (video snapshots are always sent in full)
+    EVENT_COALESCE_WINDOW: float = 0.1  # seconds without new events before a user's batch is published (0 disables coalescing)
+    EVENT_COALESCE_MAX_DELAY: float = 0.5  # longest an event is held back while events keep arriving
+    
+    # Background roles run inside the API process (comma-separated: upload-worker,scheduler,status-checker).
+    # Set to "" on API replicas when roles run in dedicated processes (python -m app.worker --role ...).
+    IN_PROCESS_WORKER_ROLES: str = "upload-worker,scheduler,status-checker"
+    
+    # Scheduler (due-time driven - sleeps until the next scheduled video or a wake-up)
+    SCHEDULER_MAX_SLEEP: int = 30  # seconds between passes when nothing is due
+    SCHEDULER_MIN_SLEEP: int = 1  # floor between passes, guards against tight loops
+    SCHEDULER_BATCH_SIZE: int = 100  # due videos loaded per query
+    
+    # Status checker (polls in-flight TikTok publishes / Instagram containers, each on its own backoff)
+    STATUS_CHECKER_MIN_INTERVAL: float = 5.0  # seconds before a new job's first poll (and its second)
+    STATUS_CHECKER_MAX_INTERVAL: float = 300.0  # cap on the interval between polls of one job
+    STATUS_CHECKER_BACKOFF: float = 1.5  # interval growth per poll
+    STATUS_CHECKER_BATCH_SIZE: int = 200  # due jobs handled per pass
+    STATUS_CHECKER_CONCURRENCY: int = 10  # users whose jobs are checked at once
+    STATUS_CHECKER_RECONCILE_INTERVAL: int = 600  # seconds between full scans for jobs missing from the index
+    
+    # Leader election for singleton periodic tasks (scheduler, token reset, cleanup, status checker)
+    LEADER_LEASE_SECONDS: int = 15  # Leader considered dead if its lease isn't renewed within this window
+    LEADER_RENEW_INTERVAL: int = 5  # seconds between lease renewals (must be well below the lease)
+    LEADER_RETRY_INTERVAL: int = 5  # seconds between attempts to take over a job's lease
 
     # Pydantic V2 Config
     model_config = SettingsConfigDict(
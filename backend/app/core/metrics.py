@@ -1,6 +1,6 @@
 """Prometheus metrics for the application"""
 try:
-    from prometheus_client import Counter, Gauge, REGISTRY
+    from prometheus_client import Counter, Gauge, Histogram, REGISTRY
     
     # Upload metrics
     try:
@@ -151,6 +151,69 @@ try:
     except ValueError:
         user_uploads_gauge = REGISTRY._names_to_collectors.get('hopper_user_uploads')
     
+    # Task queue / upload worker metrics
+    try:
+        upload_queue_depth_gauge = Gauge(
+            'hopper_upload_queue_depth',
+            'Number of upload tasks waiting in the task queue',
+            ['state']
+        )
+    except ValueError:
+        upload_queue_depth_gauge = REGISTRY._names_to_collectors.get('hopper_upload_queue_depth')
+    
+    try:
+        upload_worker_in_flight_gauge = Gauge(
+            'hopper_upload_worker_in_flight',
+            'Number of upload tasks currently being processed by this worker'
+        )
+    except ValueError:
+        upload_worker_in_flight_gauge = REGISTRY._names_to_collectors.get('hopper_upload_worker_in_flight')
+    
+    try:
+        stale_tasks_reaped_counter = Counter(
+            'hopper_stale_tasks_reaped_total',
+            'Total number of tasks failed for exceeding the processing timeout'
+        )
+    except ValueError:
+        stale_tasks_reaped_counter = REGISTRY._names_to_collectors.get('hopper_stale_tasks_reaped_total')
+    
+    try:
+        leader_gauge = Gauge(
+            'hopper_leader',
+            'Whether this process is leader for a singleton periodic job (1) or not (0)',
+            ['job']
+        )
+    except ValueError:
+        leader_gauge = REGISTRY._names_to_collectors.get('hopper_leader')
+    
+    try:
+        platform_rate_limit_wait_histogram = Histogram(
+            'hopper_platform_rate_limit_wait_seconds',
+            'Time platform API calls waited for a rate limit token',
+            ['platform', 'endpoint'],
+            buckets=(0, 0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 3600)
+        )
+    except ValueError:
+        platform_rate_limit_wait_histogram = REGISTRY._names_to_collectors.get('hopper_platform_rate_limit_wait_seconds')
+    
+    try:
+        cache_lookups_counter = Counter(
+            'hopper_cache_lookups_total',
+            'Settings / OAuth token cache lookups by tier (l1 in-process, l2 Redis) and result',
+            ['cache', 'tier', 'result']
+        )
+    except ValueError:
+        cache_lookups_counter = REGISTRY._names_to_collectors.get('hopper_cache_lookups_total')
+    
+    try:
+        realtime_events_counter = Counter(
+            'hopper_realtime_events_total',
+            'Realtime events by type and outcome (published, coalesced into a later event)',
+            ['event_type', 'result']
+        )
+    except ValueError:
+        realtime_events_counter = REGISTRY._names_to_collectors.get('hopper_realtime_events_total')
+    
     # Subscription metrics
     try:
         active_subscriptions_gauge = Gauge(
@@ -177,6 +240,12 @@ except ImportError:
         def set(self, value):
             pass
     
+    class NoOpHistogram:
+        def labels(self, **kwargs):
+            return self
+        def observe(self, value):
+            pass
+    
     successful_uploads_counter = NoOpCounter()
     failed_uploads_gauge = NoOpGauge()
     cancelled_uploads_gauge = NoOpGauge()
@@ -194,6 +263,13 @@ except ImportError:
     scheduled_uploads_gauge = NoOpGauge()
     scheduled_uploads_detail_gauge = NoOpGauge()
     user_uploads_gauge = NoOpGauge()
+    upload_queue_depth_gauge = NoOpGauge()
+    upload_worker_in_flight_gauge = NoOpGauge()
+    stale_tasks_reaped_counter = NoOpCounter()
+    leader_gauge = NoOpGauge()
+    platform_rate_limit_wait_histogram = NoOpHistogram()
+    cache_lookups_counter = NoOpCounter()
+    realtime_events_counter = NoOpCounter()
     active_subscriptions_gauge = NoOpGauge()
 
 
@@ -201,7 +277,7 @@ def update_active_users_gauge_from_sessions() -> int:
     """
     Recalculate and update the active users gauge based on recent activity.
     
-    Uses activity heartbeat keys (activity:{user_id}) which have a 1-hour TTL.
+    Uses the active users sorted set (scored by last activity, pruned after 1 hour).
     This tracks users who have made requests within the last hour, not just
     users with valid sessions (which can last 30 days).
     """
@@ -211,7 +287,7 @@ def update_active_users_gauge_from_sessions() -> int:
         # Fallback if import fails
         return 0
     
-    # Get active user IDs from activity keys (simple and extensible)
+    # Get active user IDs from the active users set (simple and extensible)
     active_user_ids = get_active_user_ids()
     active_users = len(active_user_ids)
     
@@ -400,6 +476,28 @@ def update_active_subscriptions_gauge(db) -> None:
         logger.error(f"Failed to update active_subscriptions_gauge: {e}", exc_info=True)
 
 
+def update_task_queue_gauges() -> None:
+    """
+    Update the upload queue depth gauge from Redis (ready and delayed tasks).
+    
+    Called by the API's /metrics scrape: the depth is global Redis state, so any
+    API replica reports it. Per-process worker series (e.g.
+    hopper_upload_worker_in_flight) are exported by each app.worker process on
+    its own metrics port instead.
+    """
+    try:
+        from app.db.task_queue import get_queue_depth
+        
+        depth = get_queue_depth("upload_videos")
+        for state, count in depth.items():
+            upload_queue_depth_gauge.labels(state=state).set(count)
+    except Exception as e:
+        # Never let metric updates break the metrics endpoint
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Failed to update upload_queue_depth_gauge: {e}", exc_info=True)
+
+
 def update_upload_status_gauges(db) -> None:
     """
     Update upload status gauges by querying database for video counts by status.
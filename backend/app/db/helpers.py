@@ -14,9 +14,9 @@ from app.models.oauth_token import OAuthToken
 from app.models.wordbank_word import WordbankWord
 from app.db.session import SessionLocal
 from app.utils.encryption import encrypt, decrypt
-from app.db.redis import (
-    get_cached_settings, set_cached_settings, invalidate_settings_cache,
-    get_cached_oauth_token, set_cached_oauth_token, invalidate_oauth_token_cache
+from app.db.redis import invalidate_settings_cache, invalidate_oauth_token_cache
+from app.db.local_cache import (
+    get_settings, store_settings, get_oauth_token_data, store_oauth_token_data, get_decrypted_tokens
 )
 from app.core.config import settings
 
@@ -25,7 +25,7 @@ logger = logging.getLogger(__name__)
 
 def get_user_settings(user_id: int, category: str = "global", db: Session = None) -> Dict[str, Any]:
     """Get user settings by category (global, youtube, tiktok, instagram)
-    Uses Redis caching with 5 minute TTL.
+    Uses the in-process cache over Redis caching with 5 minute TTL.
     
     Args:
         user_id: User ID
@@ -33,7 +33,7 @@ def get_user_settings(user_id: int, category: str = "global", db: Session = None
         db: Database session (if None, creates its own - for backward compatibility)
     """
     # Try to get from cache first
-    cached = get_cached_settings(user_id, category)
+    cached = get_settings(user_id, category)
     if cached is not None:
         return cached
     
@@ -91,7 +91,7 @@ def get_user_settings(user_id: int, category: str = "global", db: Session = None
                     set_user_setting(user_id, "global", key, settings_dict[key], db=db)
         
         # Cache the result
-        set_cached_settings(user_id, category, settings_dict)
+        store_settings(user_id, category, settings_dict)
         
         return settings_dict
     finally:
@@ -166,14 +166,14 @@ def get_user_videos(user_id: int, db: Session = None) -> List[Video]:
 
 def get_all_user_settings(user_id: int, db: Session = None) -> Dict[str, Dict[str, Any]]:
     """Get all user settings for all categories in a single query - optimized to prevent N+1
-    Uses Redis caching with 5 minute TTL.
+    Uses the in-process cache over Redis caching with 5 minute TTL.
     
     Args:
         user_id: User ID
         db: Database session (if None, creates its own - for backward compatibility)
     """
     # Try to get from cache first
-    cached = get_cached_settings(user_id, "all")
+    cached = get_settings(user_id, "all")
     if cached is not None:
         return cached
     
@@ -268,7 +268,7 @@ def get_all_user_settings(user_id: int, db: Session = None) -> Dict[str, Dict[st
         result["destinations"] = settings_by_category.get("destinations", {})
         
         # Cache the result
-        set_cached_settings(user_id, "all", result)
+        store_settings(user_id, "all", result)
         return result
     finally:
         if should_close:
@@ -277,7 +277,8 @@ def get_all_user_settings(user_id: int, db: Session = None) -> Dict[str, Dict[st
 
 def get_all_oauth_tokens(user_id: int, db: Session = None) -> Dict[str, Optional[OAuthToken]]:
     """Get all OAuth tokens for a user, decrypted
-    Optimized to prevent N+1 queries.
+    Optimized to prevent N+1 queries. Decryption is skipped for tokens unchanged since the
+    last call (short-lived in-process cache, invalidated by save_oauth_token/delete_oauth_token).
     
     Returns:
         Dict mapping platform name to OAuthToken object (or None if not connected)
@@ -305,8 +306,9 @@ def get_all_oauth_tokens(user_id: int, db: Session = None) -> Dict[str, Optional
             
             # Decrypt tokens (now safe since object is not in session)
             try:
-                token.access_token = decrypt(original_access_token) if original_access_token else None
-                token.refresh_token = decrypt(original_refresh_token) if original_refresh_token else None
+                token.access_token, token.refresh_token = get_decrypted_tokens(
+                    user_id, token.platform, original_access_token, original_refresh_token, decrypt
+                )
             except ValueError as e:
                 # ROOT CAUSE FIX: decrypt() now raises ValueError on failure
                 logger.warning(f"Failed to decrypt token for user {user_id}, platform {token.platform}: {e}")
@@ -329,28 +331,54 @@ def get_all_oauth_tokens(user_id: int, db: Session = None) -> Dict[str, Optional
             db.close()
 
 
+def _oauth_token_to_cache_data(token: OAuthToken) -> Dict[str, Any]:
+    """Serialize an OAuthToken for the cache (access/refresh tokens stay ENCRYPTED)"""
+    return {
+        "id": token.id,
+        "user_id": token.user_id,
+        "platform": token.platform,
+        "access_token": token.access_token,
+        "refresh_token": token.refresh_token,
+        "expires_at": token.expires_at.isoformat() if token.expires_at else None,
+        "extra_data": token.extra_data,
+        "updated_at": token.updated_at.isoformat() if token.updated_at else None
+    }
+
+
+def _oauth_token_from_cache_data(data: Dict[str, Any]) -> OAuthToken:
+    """Rebuild a detached OAuthToken from cached (encrypted) fields"""
+    return OAuthToken(
+        id=data["id"],
+        user_id=data["user_id"],
+        platform=data["platform"],
+        access_token=data["access_token"],
+        refresh_token=data["refresh_token"],
+        expires_at=datetime.fromisoformat(data["expires_at"]) if data.get("expires_at") else None,
+        extra_data=data.get("extra_data"),
+        updated_at=datetime.fromisoformat(data["updated_at"]) if data.get("updated_at") else None
+    )
+
+
 def get_oauth_token(user_id: int, platform: str, db: Session = None) -> Optional[OAuthToken]:
     """Get OAuth token for a platform
-    Uses Redis caching with 1 minute TTL.
+    Uses the in-process cache over Redis caching with 1 minute TTL.
     
     Args:
         user_id: User ID
         platform: Platform name (youtube, tiktok, instagram)
         db: Database session (if None, creates its own - for backward compatibility)
     
+    Returns:
+        Detached OAuthToken with ENCRYPTED access/refresh tokens (decrypt before use)
+    
     Security Note:
-        If Redis cache is implemented, ensure cached data is ENCRYPTED.
-        Storing decrypted tokens in Redis would move the security vulnerability
-        from Postgres to Redis. Always cache encrypted token values.
+        Cached data holds the ENCRYPTED token values exactly as stored in Postgres.
+        Decrypted tokens are never cached, so Redis exposes no more than the database.
     """
     # Try to get from cache first
-    cached = get_cached_oauth_token(user_id, platform)
+    cached = get_oauth_token_data(user_id, platform)
     if cached is not None:
-        # SECURITY WARNING: If implementing cache reconstruction, ensure cached data contains
-        # ENCRYPTED tokens only. Decrypted tokens should NEVER be cached.
-        # Reconstruct OAuthToken object from cached data (encrypted values only)
-        # This is a simplified version - full implementation would properly deserialize
-        pass
+        return _oauth_token_from_cache_data(cached)
     
     should_close = False
     if db is None:
@@ -368,6 +396,7 @@ def get_oauth_token(user_id: int, platform: str, db: Session = None) -> Optional
             # Do NOT decrypt here - let oauth_token_to_credentials handle decryption
             # This prevents double decryption errors
             db.expunge(token)
+            store_oauth_token_data(user_id, platform, _oauth_token_to_cache_data(token))
         
         return token
     finally:
@@ -785,6 +814,27 @@ def add_user_video(user_id: int, filename: str, path: str, generated_title: str
             db.close()
 
 
+def get_video_for_update(video_id: int, user_id: int, db: Session) -> Optional[Video]:
+    """Re-read a video row and lock it until the next commit, for read-modify-write of custom_settings
+    
+    A video's destinations upload concurrently (and the status checker runs in
+    other processes), so the copy already loaded in a session can be minutes old.
+    Merging into it would drop keys written meanwhile (IDs, platform statuses).
+    
+    Args:
+        video_id: Video ID
+        user_id: User ID
+        db: Database session
+    
+    Returns:
+        Video with current column values, or None if not found
+    """
+    return db.query(Video).filter(
+        Video.id == video_id,
+        Video.user_id == user_id
+    ).populate_existing().with_for_update().first()
+
+
 def update_video(video_id: int, user_id: int, db: Session = None, **kwargs) -> Optional[Video]:
     """Update a video
     
@@ -792,7 +842,8 @@ def update_video(video_id: int, user_id: int, db: Session = None, **kwargs) -> O
         video_id: Video ID
         user_id: User ID
         db: Database session (if None, creates its own - for backward compatibility)
-        **kwargs: Fields to update (IDs like youtube_id, tiktok_id, instagram_id are stored in custom_settings)
+        **kwargs: Fields to update (IDs like youtube_id, tiktok_id, instagram_id are merged into
+            custom_settings, keeping the other keys; custom_settings= replaces the whole dict)
     """
     should_close = False
     if db is None:
@@ -800,10 +851,7 @@ def update_video(video_id: int, user_id: int, db: Session = None, **kwargs) -> O
         should_close = True
     
     try:
-        video = db.query(Video).filter(
-            Video.id == video_id,
-            Video.user_id == user_id
-        ).first()
+        video = get_video_for_update(video_id, user_id, db)
         
         if not video:
             return None
@@ -916,6 +964,154 @@ def get_all_scheduled_videos(db: Session = None) -> Dict[int, List[Video]]:
             db.close()
 
 
+def get_due_scheduled_videos(
+    now: datetime,
+    limit: int,
+    after: Optional[tuple] = None,
+    db: Session = None
+) -> List[Video]:
+    """Get one batch of scheduled videos whose scheduled_time has passed
+    
+    Range scan on ix_videos_status_scheduled_time, so cost depends on the number
+    of due videos rather than everything scheduled. Pages with a keyset cursor.
+    Videos already claimed for upload ("uploading") are not returned - their
+    upload jobs are re-delivered by the task queue if a worker dies, and the
+    scheduler re-dispatches claims whose job was lost altogether.
+    
+    Args:
+        now: Videos scheduled at or before this time are due
+        limit: Maximum number of videos to return
+        after: (scheduled_time, id) of the last video of the previous batch
+        db: Database session (if None, creates its own)
+    
+    Returns:
+        Due videos ordered by (scheduled_time, id)
+    """
+    from sqlalchemy import and_, or_
+    
+    should_close = False
+    if db is None:
+        db = SessionLocal()
+        should_close = True
+    
+    try:
+        query = db.query(Video).filter(
+            Video.status == 'scheduled',
+            Video.scheduled_time.isnot(None),
+            Video.scheduled_time <= now
+        )
+        if after is not None:
+            last_time, last_id = after
+            query = query.filter(or_(
+                Video.scheduled_time > last_time,
+                and_(Video.scheduled_time == last_time, Video.id > last_id)
+            ))
+        return query.order_by(Video.scheduled_time, Video.id).limit(limit).all()
+    finally:
+        if should_close:
+            db.close()
+
+
+def claim_scheduled_videos(video_ids: List[int], db: Session = None) -> List[int]:
+    """Atomically claim scheduled videos for upload (status scheduled -> uploading)
+    
+    Rows are locked with SKIP LOCKED, so concurrent claimers never get the same
+    video and a video whose status changed meanwhile (cancelled, rescheduled
+    to pending) is not claimed.
+    
+    Args:
+        video_ids: IDs of due videos to claim
+        db: Database session (if None, creates its own)
+    
+    Returns:
+        IDs of the videos claimed by this call
+    """
+    if not video_ids:
+        return []
+    
+    should_close = False
+    if db is None:
+        db = SessionLocal()
+        should_close = True
+    
+    try:
+        claimed = [
+            row.id for row in db.query(Video.id).filter(
+                Video.id.in_(video_ids),
+                Video.status == 'scheduled'
+            ).with_for_update(skip_locked=True).all()
+        ]
+        if claimed:
+            db.query(Video).filter(Video.id.in_(claimed)).update(
+                {Video.status: 'uploading'}, synchronize_session='fetch'
+            )
+        db.commit()
+        return claimed
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if should_close:
+            db.close()
+
+
+def get_uploading_scheduled_video_ids(db: Session = None) -> List[int]:
+    """Get IDs of scheduled videos currently claimed for upload (status "uploading")
+    
+    Args:
+        db: Database session (if None, creates its own)
+    
+    Returns:
+        Video IDs
+    """
+    should_close = False
+    if db is None:
+        db = SessionLocal()
+        should_close = True
+    
+    try:
+        return [
+            row.id for row in db.query(Video.id).filter(
+                Video.status == 'uploading',
+                Video.scheduled_time.isnot(None)
+            ).all()
+        ]
+    finally:
+        if should_close:
+            db.close()
+
+
+def get_next_scheduled_time(after: datetime, db: Session = None) -> Optional[datetime]:
+    """Get the earliest scheduled_time after a point in time
+    
+    Args:
+        after: Only consider videos scheduled later than this
+        db: Database session (if None, creates its own)
+    
+    Returns:
+        Earliest future scheduled_time, or None if nothing is scheduled
+    """
+    from sqlalchemy import func
+    
+    should_close = False
+    if db is None:
+        db = SessionLocal()
+        should_close = True
+    
+    try:
+        next_time = db.query(func.min(Video.scheduled_time)).filter(
+            Video.status == 'scheduled',
+            Video.scheduled_time > after
+        ).scalar()
+        if next_time is not None and next_time.tzinfo is None:
+            # SQLite drops tzinfo - stored values are UTC
+            next_time = next_time.replace(tzinfo=timezone.utc)
+        return next_time
+    finally:
+        if should_close:
+            db.close()
+
+
 # ============================================================================
 # WORDBANK HELPER FUNCTIONS
 # ============================================================================
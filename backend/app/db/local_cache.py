@@ -0,0 +1,304 @@
+"""In-process (L1) cache layered over the Redis (L2) settings and OAuth token caches
+
+get_user_settings, get_all_user_settings and get_oauth_token are called many
+times per video while building responses or running an upload. The L1 tier
+serves repeat lookups from process memory, skipping the Redis round trip and
+JSON decode; the Redis tier is shared by all replicas and backs L1 misses.
+
+Writes invalidate both tiers: the local entries are dropped immediately and an
+invalidation message is published on Redis pub/sub, so every other API/worker
+process drops its copy too. Entries also expire after LOCAL_CACHE_TTL, which
+bounds staleness if a message is missed (e.g. while the listener reconnects).
+
+Decrypted OAuth tokens are kept in a separate, memory-only cache (never in
+Redis) so get_all_oauth_tokens can skip the Fernet decryption of tokens that
+have not changed. Entries are keyed on the stored ciphertexts, so a token saved
+by another process is never served stale, even before its invalidation arrives.
+"""
+import asyncio
+import copy
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import cache_lookups_counter
+from app.db.redis import (
+    get_redis_client, get_async_redis_client,
+    get_cached_settings, set_cached_settings,
+    get_cached_oauth_token, set_cached_oauth_token
+)
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel carrying {"cache", "user_id", "key", "origin"} invalidation messages
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Identifies this process, so it can skip its own (already applied) invalidations
+_PROCESS_ID = f"{os.getpid()}:{uuid.uuid4().hex}"
+
+_MISSING = object()
+
+
+class LocalTTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed TTL"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value, or _MISSING if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id: int) -> None:
+        """Drop every entry keyed (user_id, ...)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Keyed (user_id, category) - category "all" holds get_all_user_settings
+_settings_cache = LocalTTLCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.LOCAL_CACHE_TTL)
+# Keyed (user_id, platform) - values hold ENCRYPTED token fields only
+_oauth_cache = LocalTTLCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.LOCAL_CACHE_TTL)
+# Keyed (user_id, platform) - values (ciphertexts, plaintexts); memory only, never written to Redis
+_decrypted_token_cache = LocalTTLCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.DECRYPTED_TOKEN_CACHE_TTL)
+
+_caches = {"settings": _settings_cache, "oauth": _oauth_cache}
+
+# Caches dropped by an invalidation of each name
+_invalidation_targets = {
+    "settings": (_settings_cache,),
+    "oauth": (_oauth_cache, _decrypted_token_cache)
+}
+
+# Bumped on every invalidation of a user's settings/tokens (and for everyone on a full clear),
+# so snapshots such as UploadContext can tell when to reload
+_user_generations: Dict[int, int] = {}
+_global_generation = 0
+
+
+def _lookup(cache_name: str, user_id: int, key: str, l2_get) -> Optional[Dict]:
+    """Read through L1 then L2, filling L1 on an L2 hit. Returns a copy the caller may mutate."""
+    cache = _caches[cache_name]
+    value = cache.get((user_id, key))
+    if value is not _MISSING:
+        cache_lookups_counter.labels(cache=cache_name, tier="l1", result="hit").inc()
+        return copy.deepcopy(value)
+    cache_lookups_counter.labels(cache=cache_name, tier="l1", result="miss").inc()
+
+    try:
+        value = l2_get(user_id, key)
+    except Exception as e:
+        # Redis being unavailable should only cost a database query
+        logger.warning(f"Redis {cache_name} cache read failed for user {user_id}: {e}")
+        value = None
+    cache_lookups_counter.labels(cache=cache_name, tier="l2", result="hit" if value is not None else "miss").inc()
+    if value is None:
+        return None
+    cache.set((user_id, key), value)
+    return copy.deepcopy(value)
+
+
+def _store(cache_name: str, user_id: int, key: str, value: Dict, l2_set) -> None:
+    """Write a value to both tiers"""
+    _caches[cache_name].set((user_id, key), copy.deepcopy(value))
+    try:
+        l2_set(user_id, key, value)
+    except Exception as e:
+        logger.warning(f"Redis {cache_name} cache write failed for user {user_id}: {e}")
+
+
+def get_settings(user_id: int, category: str) -> Optional[Dict]:
+    """Cached settings for a category ("all" for get_all_user_settings), or None"""
+    return _lookup("settings", user_id, category, get_cached_settings)
+
+
+def store_settings(user_id: int, category: str, value: Dict) -> None:
+    """Cache settings for a category in both tiers"""
+    _store("settings", user_id, category, value, set_cached_settings)
+
+
+def get_oauth_token_data(user_id: int, platform: str) -> Optional[Dict]:
+    """Cached (encrypted) OAuth token fields for a platform, or None"""
+    return _lookup("oauth", user_id, platform, get_cached_oauth_token)
+
+
+def store_oauth_token_data(user_id: int, platform: str, token_data: Dict) -> None:
+    """Cache (encrypted) OAuth token fields for a platform in both tiers"""
+    _store("oauth", user_id, platform, token_data, set_cached_oauth_token)
+
+
+def get_decrypted_tokens(
+    user_id: int,
+    platform: str,
+    access_ciphertext: Optional[str],
+    refresh_ciphertext: Optional[str],
+    decrypt: Callable[[str], Optional[str]]
+) -> Tuple[Optional[str], Optional[str]]:
+    """Decrypted (access, refresh) tokens, decrypting only when the stored ciphertexts changed
+
+    Fernet output is unique per encryption, so the ciphertexts identify the token
+    version. Decryption errors propagate and are not cached.
+
+    Args:
+        user_id: Token owner
+        platform: Platform name
+        access_ciphertext: Encrypted access token as stored
+        refresh_ciphertext: Encrypted refresh token as stored (may be None)
+        decrypt: Decryption function (app.utils.encryption.decrypt)
+
+    Returns:
+        Tuple of (access_token, refresh_token) in plaintext
+    """
+    version = (access_ciphertext, refresh_ciphertext)
+    entry = _decrypted_token_cache.get((user_id, platform))
+    if entry is not _MISSING and entry[0] == version:
+        cache_lookups_counter.labels(cache="oauth_decrypted", tier="l1", result="hit").inc()
+        return entry[1]
+    cache_lookups_counter.labels(cache="oauth_decrypted", tier="l1", result="miss").inc()
+
+    plaintexts = (
+        decrypt(access_ciphertext) if access_ciphertext else None,
+        decrypt(refresh_ciphertext) if refresh_ciphertext else None
+    )
+    _decrypted_token_cache.set((user_id, platform), (version, plaintexts))
+    return plaintexts
+
+
+def get_invalidation_generation(user_id: int) -> Tuple[int, int]:
+    """Opaque version of a user's settings/tokens in this process - changes on every invalidation"""
+    return (_global_generation, _user_generations.get(user_id, 0))
+
+
+def _drop_local(cache_name: str, user_id: int, key: Optional[str]) -> None:
+    """Drop L1 entries: one key plus the "all" aggregate, or every key of the user"""
+    _user_generations[user_id] = _user_generations.get(user_id, 0) + 1
+    for cache in _invalidation_targets.get(cache_name, ()):
+        if key:
+            cache.delete((user_id, key))
+            cache.delete((user_id, "all"))
+        else:
+            cache.delete_user(user_id)
+
+
+def invalidate_local_cache(cache_name: str, user_id: int, key: Optional[str] = None) -> None:
+    """Drop L1 entries in this process and tell every other process to drop theirs
+
+    Called by the Redis (L2) invalidation functions, so one call clears both tiers everywhere.
+
+    Args:
+        cache_name: "settings" or "oauth"
+        user_id: User whose entries changed
+        key: Category / platform that changed (None for all of the user's entries)
+    """
+    _drop_local(cache_name, user_id, key)
+    try:
+        get_redis_client().publish(CACHE_INVALIDATION_CHANNEL, json.dumps({
+            "cache": cache_name,
+            "user_id": user_id,
+            "key": key,
+            "origin": _PROCESS_ID
+        }))
+    except Exception as e:
+        # Other processes fall back to LOCAL_CACHE_TTL expiry
+        logger.warning(f"Failed to publish {cache_name} cache invalidation for user {user_id}: {e}")
+
+
+def clear_local_caches() -> None:
+    """Empty every L1 cache in this process"""
+    global _global_generation
+    _global_generation += 1
+    for caches in _invalidation_targets.values():
+        for cache in caches:
+            cache.clear()
+
+
+def _apply_invalidation_message(data: str) -> None:
+    """Apply an invalidation published by another process"""
+    try:
+        message = json.loads(data)
+        if message.get("origin") == _PROCESS_ID:
+            return
+        _drop_local(message["cache"], int(message["user_id"]), message.get("key"))
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        logger.warning(f"Ignoring malformed cache invalidation message {data!r}: {e}")
+
+
+_listener_task: Optional[asyncio.Task] = None
+
+
+async def _listen_for_invalidations() -> None:
+    """Apply invalidations from other processes, resubscribing after connection errors"""
+    while True:
+        pubsub = None
+        try:
+            pubsub = get_async_redis_client().pubsub()
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            # Messages published while unsubscribed are lost - start from a clean L1
+            clear_local_caches()
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    _apply_invalidation_message(message.get("data"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener error, resubscribing: {e}")
+            await asyncio.sleep(1)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+def start_cache_invalidation_listener() -> None:
+    """Start applying other processes' invalidations (API lifespan / worker startup)"""
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_listen_for_invalidations())
+        logger.info(f"Local cache invalidation listener started on {CACHE_INVALIDATION_CHANNEL}")
+
+
+async def stop_cache_invalidation_listener() -> None:
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
@@ -3,7 +3,8 @@ import redis
 import redis.asyncio as aioredis
 import json
 import logging
-from typing import Optional, Dict
+import time
+from typing import Optional, Dict, List, Tuple
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -98,10 +99,70 @@ PENDING_REGISTRATION_TTL = 30 * 60  # 30 minutes for pending sign-ups
 PASSWORD_RESET_TTL = 15 * 60  # 15 minutes for password reset codes
 
 
+# Per-user key indexes - one sorted set per user and key family (sessions,
+# settings cache, OAuth cache, upload progress) holding that user's keys scored
+# by their expiry time. Maintained on write so invalidation only touches the
+# user's own keys instead of KEYS-scanning (and blocking) the whole keyspace.
+USER_KEY_INDEX_PREFIX = "user_keys"
+
+# Sorted set of active user IDs scored by their last activity time
+ACTIVE_USERS_KEY = "active_users"
+
+
+def _user_key_index(family: str, user_id: int) -> str:
+    """Key of a user's index for one key family"""
+    return f"{USER_KEY_INDEX_PREFIX}:{family}:{user_id}"
+
+
+def _setex_indexed(family: str, user_id: int, key: str, ttl: int, value, member: Optional[str] = None) -> None:
+    """SETEX a per-user key and record it in the user's index (one round trip)
+
+    Index members whose keys have expired are pruned on the same write. All keys
+    of a family share one TTL, so refreshing the index TTL never cuts it short.
+
+    Args:
+        family: Key family (sessions, settings, oauth, progress)
+        user_id: Owner of the key
+        key: Redis key to set
+        ttl: Key TTL in seconds
+        value: Value to store
+        member: Index member (defaults to the key itself)
+    """
+    index_key = _user_key_index(family, user_id)
+    now = time.time()
+    pipe = get_redis_client().pipeline()
+    pipe.setex(key, ttl, value)
+    pipe.zadd(index_key, {member or key: now + ttl})
+    pipe.zremrangebyscore(index_key, "-inf", now)
+    pipe.expire(index_key, ttl)
+    pipe.execute()
+
+
+def _delete_indexed(family: str, user_id: int) -> int:
+    """Delete every key recorded in a user's index for one family
+
+    Only the members that were read are removed from the index, so a key
+    written concurrently stays indexed.
+
+    Returns:
+        Number of keys that existed and were deleted
+    """
+    client = get_redis_client()
+    index_key = _user_key_index(family, user_id)
+    keys = client.zrange(index_key, 0, -1)
+    if not keys:
+        return 0
+    pipe = client.pipeline()
+    pipe.delete(*keys)
+    pipe.zrem(index_key, *keys)
+    deleted, _ = pipe.execute()
+    return deleted
+
+
 def set_session(session_id: str, user_id: int) -> None:
-    """Store session in Redis"""
+    """Store session in Redis (indexed under the user for delete_all_user_sessions)"""
     key = f"session:{session_id}"
-    get_redis_client().setex(key, SESSION_TTL, user_id)
+    _setex_indexed("sessions", user_id, key, SESSION_TTL, user_id, member=session_id)
 
 
 def get_session(session_id: str) -> Optional[int]:
@@ -119,9 +180,13 @@ async def async_get_session(session_id: str) -> Optional[int]:
 
 
 def delete_session(session_id: str) -> None:
-    """Delete session from Redis"""
+    """Delete session from Redis and drop it from its user's session index"""
     key = f"session:{session_id}"
-    get_redis_client().delete(key)
+    client = get_redis_client()
+    user_id = client.get(key)
+    client.delete(key)
+    if user_id:
+        client.zrem(_user_key_index("sessions", int(user_id)), session_id)
 
 
 def set_csrf_token(session_id: str, token: str) -> None:
@@ -161,7 +226,7 @@ def get_or_create_csrf_token(session_id: str) -> str:
 def set_upload_progress(user_id: int, video_id: int, progress: int) -> None:
     """Store upload progress in Redis"""
     key = f"progress:{user_id}:{video_id}"
-    get_redis_client().setex(key, 3600, progress)  # 1 hour TTL
+    _setex_indexed("progress", user_id, key, 3600, progress)  # 1 hour TTL
 
 
 def get_upload_progress(user_id: int, video_id: int) -> Optional[int]:
@@ -180,7 +245,7 @@ def delete_upload_progress(user_id: int, video_id: int) -> None:
 def set_platform_upload_progress(user_id: int, video_id: int, platform: str, progress: int) -> None:
     """Store platform-specific upload progress in Redis"""
     key = f"progress:{user_id}:{video_id}:{platform}"
-    get_redis_client().setex(key, 3600, progress)  # 1 hour TTL
+    _setex_indexed("progress", user_id, key, 3600, progress)  # 1 hour TTL
 
 
 def get_platform_upload_progress(user_id: int, video_id: int, platform: str) -> Optional[int]:
@@ -232,6 +297,24 @@ def clear_r2_upload_cancelled(video_id: int) -> None:
     get_redis_client().delete(key)
 
 
+def set_upload_cancelled(video_id: int) -> None:
+    """Mark destination uploads as cancelled (seen by every API and worker process)"""
+    key = f"upload_cancelled:{video_id}"
+    get_redis_client().setex(key, 3600, "1")  # 1 hour TTL
+
+
+def is_upload_cancelled(video_id: int) -> bool:
+    """Check if destination uploads are cancelled"""
+    key = f"upload_cancelled:{video_id}"
+    return get_redis_client().exists(key) > 0
+
+
+def clear_upload_cancelled(video_id: int) -> None:
+    """Clear destination upload cancellation flag"""
+    key = f"upload_cancelled:{video_id}"
+    get_redis_client().delete(key)
+
+
 def set_r2_upload_info(video_id: int, upload_type: str, object_key: str, upload_id: Optional[str] = None) -> None:
     """Store R2 upload info (works for both single and multipart uploads)
     
@@ -273,6 +356,76 @@ def clear_r2_upload_info(video_id: int) -> None:
     get_redis_client().delete(key)
 
 
+# YouTube keeps resumable upload sessions for about a week
+YOUTUBE_UPLOAD_SESSION_TTL = 6 * 24 * 60 * 60
+
+
+def set_youtube_upload_session(video_id: int, session_uri: str, offset: int, object_key: str, size: int) -> None:
+    """Store a YouTube resumable upload session so a retry can continue it
+    
+    Args:
+        video_id: Video ID
+        session_uri: Resumable session URI returned by YouTube
+        offset: Bytes YouTube has confirmed receiving
+        object_key: R2 object key being uploaded
+        size: Object size in bytes
+    """
+    key = f"youtube_upload_session:{video_id}"
+    session = {
+        "session_uri": session_uri,
+        "offset": offset,
+        "object_key": object_key,
+        "size": size
+    }
+    get_redis_client().setex(key, YOUTUBE_UPLOAD_SESSION_TTL, json.dumps(session))
+
+
+def get_youtube_upload_session(video_id: int) -> Optional[Dict]:
+    """Get the saved YouTube resumable upload session
+    
+    Args:
+        video_id: Video ID
+        
+    Returns:
+        Dict with session_uri, offset, object_key and size, or None if not found
+    """
+    key = f"youtube_upload_session:{video_id}"
+    data = get_redis_client().get(key)
+    if data:
+        return json.loads(data)
+    return None
+
+
+def clear_youtube_upload_session(video_id: int) -> None:
+    """Clear the saved YouTube resumable upload session"""
+    key = f"youtube_upload_session:{video_id}"
+    get_redis_client().delete(key)
+
+
+# Last TikTok publish status per publish_id (refreshed by the status checker / upload polling)
+TIKTOK_PUBLISH_STATUS_TTL = 60 * 60
+
+
+def set_tiktok_publish_status(publish_id: str, status_data: Dict) -> None:
+    """Store the last publish status fetched from TikTok
+    
+    Args:
+        publish_id: TikTok publish_id
+        status_data: Status data returned by the status API
+    """
+    key = f"tiktok_publish_status:{publish_id}"
+    get_redis_client().setex(key, TIKTOK_PUBLISH_STATUS_TTL, json.dumps(status_data))
+
+
+def get_tiktok_publish_status(publish_id: str) -> Optional[Dict]:
+    """Get the last publish status fetched from TikTok (None if not fetched recently)"""
+    key = f"tiktok_publish_status:{publish_id}"
+    data = get_redis_client().get(key)
+    if data:
+        return json.loads(data)
+    return None
+
+
 def increment_rate_limit(identifier: str, window: int) -> int:
     """Increment rate limit counter and return current count.
     Uses Lua script to atomically increment and set TTL only for new keys (fixed window rate limiting)."""
@@ -314,6 +467,83 @@ def get_rate_limit_count(identifier: str) -> int:
     return int(count) if count else 0
 
 
+TOKEN_BUCKET_KEY_PREFIX = "ratelimit:bucket:"
+
+# Token bucket with reservations: every call takes a token, letting the balance go
+# negative, and returns how long the caller must wait for its token to exist.
+# Waiters are spaced exactly 1/rate apart with a single round-trip each.
+# Uses the Redis clock so all workers share one time base.
+_RESERVE_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+-- Keep the key until the bucket would be full again
+redis.call('EXPIRE', KEYS[1], math.floor((capacity - tokens) / rate) + 1)
+
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+
+def reserve_rate_limit_token(bucket: str, rate: float, capacity: float) -> float:
+    """Take one token from a distributed token bucket.
+    
+    Args:
+        bucket: Bucket name (e.g. "tiktok:video_init:42")
+        rate: Tokens added per second
+        capacity: Bucket size (maximum burst)
+        
+    Returns:
+        Seconds to wait before using the token (0 if available now)
+    """
+    wait = get_redis_client().eval(_RESERVE_TOKEN_SCRIPT, 1, f"{TOKEN_BUCKET_KEY_PREFIX}{bucket}", rate, capacity)
+    return float(wait)
+
+
+async def async_reserve_rate_limit_token(bucket: str, rate: float, capacity: float) -> float:
+    """Async version of reserve_rate_limit_token"""
+    wait = await get_async_redis_client().eval(
+        _RESERVE_TOKEN_SCRIPT, 1, f"{TOKEN_BUCKET_KEY_PREFIX}{bucket}", rate, capacity
+    )
+    return float(wait)
+
+
+# Give back a reserved token that won't be used (caller gave up or was cancelled).
+# Callers already waiting keep their reservations; the next reservation is served earlier.
+_REFUND_TOKEN_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tonumber(ARGV[1]), tokens + 1)))
+end
+return 0
+"""
+
+
+def refund_rate_limit_token(bucket: str, capacity: float) -> None:
+    """Return a token taken by reserve_rate_limit_token that won't be used.
+    
+    Args:
+        bucket: Bucket name the token was reserved from
+        capacity: Bucket size (the balance never exceeds it)
+    """
+    get_redis_client().eval(_REFUND_TOKEN_SCRIPT, 1, f"{TOKEN_BUCKET_KEY_PREFIX}{bucket}", capacity)
+
+
+async def async_refund_rate_limit_token(bucket: str, capacity: float) -> None:
+    """Async version of refund_rate_limit_token"""
+    await get_async_redis_client().eval(_REFUND_TOKEN_SCRIPT, 1, f"{TOKEN_BUCKET_KEY_PREFIX}{bucket}", capacity)
+
+
 def get_cached_settings(user_id: int, category: str) -> Optional[Dict]:
     """Get cached user settings from Redis"""
     key = f"cache:settings:{user_id}:{category}"
@@ -326,14 +556,17 @@ def get_cached_settings(user_id: int, category: str) -> Optional[Dict]:
 def set_cached_settings(user_id: int, category: str, settings: Dict) -> None:
     """Cache user settings in Redis"""
     key = f"cache:settings:{user_id}:{category}"
-    get_redis_client().setex(key, SETTINGS_CACHE_TTL, json.dumps(settings))
+    _setex_indexed("settings", user_id, key, SETTINGS_CACHE_TTL, json.dumps(settings))
 
 
 def invalidate_settings_cache(user_id: int, category: Optional[str] = None) -> None:
     """Invalidate cached settings for a user (all categories or specific category)
     
     Gracefully handles Redis failures - cache invalidation should not break user operations.
+    Also drops the in-process (L1) copies in every API/worker process.
     """
+    from app.db.local_cache import invalidate_local_cache
+    invalidate_local_cache("settings", user_id, category)
     try:
         client = get_redis_client()
         if category:
@@ -345,10 +578,7 @@ def invalidate_settings_cache(user_id: int, category: Optional[str] = None) -> N
             client.delete(all_key)
         else:
             # Invalidate all categories for this user
-            pattern = f"cache:settings:{user_id}:*"
-            keys = client.keys(pattern)
-            if keys:
-                client.delete(*keys)
+            _delete_indexed("settings", user_id)
     except Exception as e:
         # Log but don't fail - cache invalidation is best-effort
         logger.warning(f"Failed to invalidate settings cache for user {user_id}: {e}")
@@ -370,7 +600,7 @@ def get_cached_oauth_token(user_id: int, platform: str) -> Optional[Dict]:
 def set_cached_oauth_token(user_id: int, platform: str, token_data: Dict) -> None:
     """Cache OAuth token in Redis (stores serialized token data)"""
     key = f"cache:oauth:{user_id}:{platform}"
-    get_redis_client().setex(key, OAUTH_TOKEN_CACHE_TTL, json.dumps(token_data))
+    _setex_indexed("oauth", user_id, key, OAUTH_TOKEN_CACHE_TTL, json.dumps(token_data))
 
 
 def get_cached_all_oauth_tokens(user_id: int) -> Optional[Dict]:
@@ -385,14 +615,17 @@ def get_cached_all_oauth_tokens(user_id: int) -> Optional[Dict]:
 def set_cached_all_oauth_tokens(user_id: int, tokens: Dict) -> None:
     """Cache all OAuth tokens in Redis"""
     key = f"cache:oauth:{user_id}:all"
-    get_redis_client().setex(key, OAUTH_TOKEN_CACHE_TTL, json.dumps(tokens))
+    _setex_indexed("oauth", user_id, key, OAUTH_TOKEN_CACHE_TTL, json.dumps(tokens))
 
 
 def invalidate_oauth_token_cache(user_id: int, platform: Optional[str] = None) -> None:
     """Invalidate cached OAuth tokens for a user (all platforms or specific platform)
     
     Gracefully handles Redis failures - cache invalidation should not break user operations.
+    Also drops the in-process (L1) copies in every API/worker process.
     """
+    from app.db.local_cache import invalidate_local_cache
+    invalidate_local_cache("oauth", user_id, platform)
     try:
         client = get_redis_client()
         if platform:
@@ -404,10 +637,7 @@ def invalidate_oauth_token_cache(user_id: int, platform: Optional[str] = None) -
             client.delete(all_key)
         else:
             # Invalidate all platforms for this user
-            pattern = f"cache:oauth:{user_id}:*"
-            keys = client.keys(pattern)
-            if keys:
-                client.delete(*keys)
+            _delete_indexed("oauth", user_id)
     except Exception as e:
         # Log but don't fail - cache invalidation is best-effort
         logger.warning(f"Failed to invalidate OAuth token cache for user {user_id}: {e}")
@@ -416,10 +646,10 @@ def invalidate_oauth_token_cache(user_id: int, platform: Optional[str] = None) -
 
 
 def delete_all_user_sessions(user_id: int) -> int:
-    """Delete all sessions for a user by scanning session keys.
+    """Delete all sessions for a user using the user's session index.
     
-    This scans all session:* keys and deletes those that match the user_id.
-    Also deletes associated CSRF tokens.
+    Reads the session IDs recorded by set_session for this user only (no
+    keyspace scan). Also deletes associated CSRF tokens.
     
     Args:
         user_id: User ID to delete sessions for
@@ -429,28 +659,16 @@ def delete_all_user_sessions(user_id: int) -> int:
     """
     try:
         client = get_redis_client()
-        deleted_count = 0
+        index_key = _user_key_index("sessions", user_id)
+        session_ids = client.zrange(index_key, 0, -1)
+        if not session_ids:
+            return 0
         
-        # Scan all session keys
-        session_keys = client.keys("session:*")
-        for key in session_keys:
-            try:
-                # Get the user_id stored in this session
-                stored_user_id = client.get(key)
-                if stored_user_id and int(stored_user_id) == user_id:
-                    # Extract session_id from key format "session:{session_id}"
-                    session_id = key.split(":", 1)[1]
-                    
-                    # Delete the session
-                    client.delete(key)
-                    deleted_count += 1
-                    
-                    # Also delete associated CSRF token
-                    csrf_key = f"csrf:{session_id}"
-                    client.delete(csrf_key)
-            except (ValueError, IndexError, TypeError):
-                # Skip invalid keys or conversion errors
-                continue
+        pipe = client.pipeline()
+        pipe.delete(*[f"session:{session_id}" for session_id in session_ids])
+        pipe.delete(*[f"csrf:{session_id}" for session_id in session_ids])
+        pipe.zrem(index_key, *session_ids)
+        deleted_count, _, _ = pipe.execute()
         
         return deleted_count
     except Exception as e:
@@ -471,30 +689,15 @@ def invalidate_all_user_caches(user_id: int) -> int:
     Returns:
         Total number of keys deleted
     """
+    from app.db.local_cache import invalidate_local_cache
+    invalidate_local_cache("settings", user_id)
+    invalidate_local_cache("oauth", user_id)
     try:
-        client = get_redis_client()
         deleted_count = 0
         
-        # Invalidate settings cache
-        pattern = f"cache:settings:{user_id}:*"
-        keys = client.keys(pattern)
-        if keys:
-            client.delete(*keys)
-            deleted_count += len(keys)
-        
-        # Invalidate OAuth token cache
-        pattern = f"cache:oauth:{user_id}:*"
-        keys = client.keys(pattern)
-        if keys:
-            client.delete(*keys)
-            deleted_count += len(keys)
-        
-        # Invalidate upload progress
-        pattern = f"progress:{user_id}:*"
-        keys = client.keys(pattern)
-        if keys:
-            client.delete(*keys)
-            deleted_count += len(keys)
+        # Invalidate settings cache, OAuth token cache and upload progress
+        for family in ("settings", "oauth", "progress"):
+            deleted_count += _delete_indexed(family, user_id)
         
         # Delete all sessions for this user
         sessions_deleted = delete_all_user_sessions(user_id)
@@ -507,6 +710,60 @@ def invalidate_all_user_caches(user_id: int) -> int:
         return 0
 
 
+def backfill_user_session_index() -> int:
+    """Index sessions created before set_session maintained the per-user index
+    
+    One-shot job run by the cleanup leader. A marker key records completion and a
+    claim key keeps a second process from scanning at the same time. Uses
+    incremental SCAN, so it never blocks the server the way KEYS does, with one
+    pipelined read and one pipelined write per SCAN batch. Cache and progress keys
+    are not backfilled - they expire within an hour anyway.
+    
+    Returns:
+        Number of sessions indexed (0 if the backfill already ran or is running elsewhere)
+    """
+    client = get_redis_client()
+    marker_key = f"{USER_KEY_INDEX_PREFIX}:sessions_backfilled"
+    claim_key = f"{USER_KEY_INDEX_PREFIX}:sessions_backfill_running"
+    if client.exists(marker_key) or not client.set(claim_key, "1", nx=True, ex=600):
+        return 0
+    
+    try:
+        indexed = 0
+        now = time.time()
+        cursor = 0
+        while True:
+            cursor, keys = client.scan(cursor, match="session:*", count=1000)
+            if keys:
+                pipe = client.pipeline(transaction=False)
+                for key in keys:
+                    pipe.get(key)
+                    pipe.ttl(key)
+                values = pipe.execute()
+                
+                pipe = client.pipeline(transaction=False)
+                for key, user_id, ttl in zip(keys, values[0::2], values[1::2]):
+                    if not user_id or ttl is None or ttl <= 0:
+                        continue
+                    try:
+                        index_key = _user_key_index("sessions", int(user_id))
+                    except ValueError:
+                        continue
+                    pipe.zadd(index_key, {key.split(":", 1)[1]: now + ttl})
+                    pipe.expire(index_key, SESSION_TTL)
+                    indexed += 1
+                pipe.execute()
+            if cursor == 0:
+                break
+        
+        # Set only once complete, so an interrupted backfill runs again (ZADD is idempotent)
+        client.set(marker_key, "1")
+    finally:
+        client.delete(claim_key)
+    logger.info(f"Backfilled {indexed} sessions into per-user session indexes")
+    return indexed
+
+
 def set_email_verification_code(email: str, code: str) -> None:
     """Store email verification code in Redis with a short TTL."""
     key = f"email_verification:{email}"
@@ -569,39 +826,44 @@ def delete_password_reset_token(token: str) -> None:
 
 
 def set_user_activity(user_id: int) -> None:
-    """Track user activity - sets a heartbeat key with TTL and timestamp.
+    """Track user activity - records the user in the active users set with a timestamp.
     
     This is used to track users who are currently active (using the site).
-    The key automatically expires after ACTIVITY_TTL, so only recent activity is counted.
-    Stores timestamp so we can show actual last login time.
+    Entries older than ACTIVITY_TTL are pruned, so only recent activity is counted.
+    The score is the activity time so we can show actual last login time.
     
     Args:
         user_id: User ID to track activity for
     """
-    from datetime import datetime, timezone
-    key = f"activity:{user_id}"
-    # Store timestamp as JSON so we can retrieve it later
-    timestamp = datetime.now(timezone.utc).isoformat()
-    data = {"timestamp": timestamp}
-    get_redis_client().setex(key, ACTIVITY_TTL, json.dumps(data))
+    now = time.time()
+    pipe = get_redis_client().pipeline()
+    pipe.zadd(ACTIVE_USERS_KEY, {str(user_id): now})
+    pipe.zremrangebyscore(ACTIVE_USERS_KEY, "-inf", now - ACTIVITY_TTL)
+    pipe.execute()
 
 
 async def async_set_user_activity(user_id: int) -> None:
-    """Track user activity - sets a heartbeat key with TTL and timestamp (async)
+    """Track user activity - records the user in the active users set with a timestamp (async)
     
     This is used to track users who are currently active (using the site).
-    The key automatically expires after ACTIVITY_TTL, so only recent activity is counted.
-    Stores timestamp so we can show actual last login time.
+    Entries older than ACTIVITY_TTL are pruned, so only recent activity is counted.
+    The score is the activity time so we can show actual last login time.
     
     Args:
         user_id: User ID to track activity for
     """
-    from datetime import datetime, timezone
-    key = f"activity:{user_id}"
-    # Store timestamp as JSON so we can retrieve it later
-    timestamp = datetime.now(timezone.utc).isoformat()
-    data = {"timestamp": timestamp}
-    await get_async_redis_client().setex(key, ACTIVITY_TTL, json.dumps(data))
+    now = time.time()
+    pipe = get_async_redis_client().pipeline()
+    pipe.zadd(ACTIVE_USERS_KEY, {str(user_id): now})
+    pipe.zremrangebyscore(ACTIVE_USERS_KEY, "-inf", now - ACTIVITY_TTL)
+    await pipe.execute()
+
+
+def _get_recent_activity() -> List[Tuple[str, float]]:
+    """Members of the active users set seen within ACTIVITY_TTL, with their scores"""
+    return get_redis_client().zrangebyscore(
+        ACTIVE_USERS_KEY, time.time() - ACTIVITY_TTL, "+inf", withscores=True
+    )
 
 
 def get_active_user_ids() -> set[int]:
@@ -610,20 +872,7 @@ def get_active_user_ids() -> set[int]:
     Returns:
         Set of user IDs with recent activity
     """
-    activity_keys = get_redis_client().keys("activity:*")
-    active_user_ids = set()
-    
-    for key in activity_keys:
-        # Extract user_id from key format "activity:{user_id}"
-        try:
-            user_id_str = key.split(":", 1)[1]
-            user_id = int(user_id_str)
-            active_user_ids.add(user_id)
-        except (ValueError, IndexError):
-            # Skip invalid keys
-            continue
-    
-    return active_user_ids
+    return {int(user_id) for user_id, _ in _get_recent_activity()}
 
 
 def get_active_users_with_timestamps() -> Dict[int, str]:
@@ -632,70 +881,307 @@ def get_active_users_with_timestamps() -> Dict[int, str]:
     Returns:
         Dictionary mapping user_id to ISO timestamp string
     """
-    activity_keys = get_redis_client().keys("activity:*")
-    active_users = {}
-    
-    for key in activity_keys:
-        try:
-            # Extract user_id from key format "activity:{user_id}"
-            user_id_str = key.split(":", 1)[1]
-            user_id = int(user_id_str)
-            
-            # Get the stored data (should be JSON with timestamp)
-            data_str = get_redis_client().get(key)
-            if data_str:
-                try:
-                    data = json.loads(data_str)
-                    # Check if data is a dict (new format) or just an int/string (old format)
-                    if isinstance(data, dict):
-                        timestamp = data.get("timestamp")
-                        if timestamp:
-                            active_users[user_id] = timestamp
-                        else:
-                            # Fallback: if no timestamp in dict, use current time
-                            from datetime import datetime, timezone
-                            active_users[user_id] = datetime.now(timezone.utc).isoformat()
-                    else:
-                        # Old format (just "1" or integer) - use current time as fallback
-                        from datetime import datetime, timezone
-                        active_users[user_id] = datetime.now(timezone.utc).isoformat()
-                except (json.JSONDecodeError, TypeError, AttributeError):
-                    # Old format or invalid JSON - use current time as fallback
-                    from datetime import datetime, timezone
-                    active_users[user_id] = datetime.now(timezone.utc).isoformat()
-            else:
-                # Key exists but no value - shouldn't happen, but handle gracefully
-                from datetime import datetime, timezone
-                active_users[user_id] = datetime.now(timezone.utc).isoformat()
-        except (ValueError, IndexError):
-            # Skip invalid keys
-            continue
-    
-    return active_users
-
-
-def acquire_lock(lock_key: str, timeout: int = 30) -> bool:
+    from datetime import datetime, timezone
+    return {
+        int(user_id): datetime.fromtimestamp(seen_at, timezone.utc).isoformat()
+        for user_id, seen_at in _get_recent_activity()
+    }
+
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# SET NX and the token increment in one step: a crash in between can't leave
+# a held lock without a token, or a token issued for a lock nobody holds
+_ACQUIRE_FENCED_LOCK_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return redis.call('INCR', KEYS[2])
+end
+return nil
+"""
+
+
+def acquire_lock(lock_key: str, timeout: int = 30, owner: str = "1") -> bool:
     """Acquire a distributed lock using Redis SET with NX and EX.
     
     Args:
         lock_key: The lock key to acquire
         timeout: Lock timeout in seconds (default 30)
+        owner: Value stored in the lock, identifies the holder for renew/release
         
     Returns:
         True if lock was acquired, False if lock already exists
     """
     # SET key value NX EX timeout - atomically set if not exists with expiration
-    result = get_redis_client().set(lock_key, "1", nx=True, ex=timeout)
+    result = get_redis_client().set(lock_key, owner, nx=True, ex=timeout)
     return result is True
 
 
-def release_lock(lock_key: str) -> None:
+def release_lock(lock_key: str, owner: Optional[str] = None) -> None:
     """Release a distributed lock by deleting the key.
     
     Args:
         lock_key: The lock key to release
+        owner: If given, only release the lock while it is still held by this owner
+    """
+    if owner is None:
+        get_redis_client().delete(lock_key)
+        return
+    
+    # Compare-and-delete so an expired holder can't release someone else's lock
+    get_redis_client().eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, owner)
+
+
+async def async_release_lock(lock_key: str, owner: str) -> None:
+    """Async version of release_lock (owner required)"""
+    await get_async_redis_client().eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, owner)
+
+
+def renew_lock(lock_key: str, owner: str, timeout: int = 30) -> bool:
+    """Extend a lock's expiry if it is still held by owner.
+    
+    Args:
+        lock_key: The lock key to renew
+        owner: Holder value the lock was acquired with
+        timeout: New lock timeout in seconds
+        
+    Returns:
+        True if renewed, False if the lock expired or is held by someone else
+    """
+    return get_redis_client().eval(_RENEW_LOCK_SCRIPT, 1, lock_key, owner, timeout) == 1
+
+
+async def async_renew_lock(lock_key: str, owner: str, timeout: int = 30) -> bool:
+    """Async version of renew_lock"""
+    return await get_async_redis_client().eval(_RENEW_LOCK_SCRIPT, 1, lock_key, owner, timeout) == 1
+
+
+def acquire_fenced_lock(lock_key: str, owner: str, timeout: int = 30) -> Optional[int]:
+    """Acquire a lock and issue a fencing token.
+    
+    Fencing tokens increase by one on every successful acquisition of lock_key,
+    so work tagged with an older token can be recognised as coming from a
+    holder whose lease has since expired.
+    
+    Args:
+        lock_key: The lock key to acquire
+        owner: Value stored in the lock, identifies the holder for renew/release
+        timeout: Lock timeout in seconds
+        
+    Returns:
+        Fencing token if lock was acquired, None if lock already exists
+    """
+    token = get_redis_client().eval(_ACQUIRE_FENCED_LOCK_SCRIPT, 2, lock_key, f"{lock_key}:fence", owner, timeout)
+    return int(token) if token is not None else None
+
+
+async def async_acquire_fenced_lock(lock_key: str, owner: str, timeout: int = 30) -> Optional[int]:
+    """Async version of acquire_fenced_lock"""
+    token = await get_async_redis_client().eval(
+        _ACQUIRE_FENCED_LOCK_SCRIPT, 2, lock_key, f"{lock_key}:fence", owner, timeout
+    )
+    return int(token) if token is not None else None
+
+
+def get_fencing_token(lock_key: str) -> Optional[int]:
+    """Get the latest fencing token issued for lock_key.
+    
+    Args:
+        lock_key: The lock key
+        
+    Returns:
+        Latest token, or None if the lock was never acquired with a token
+    """
+    token = get_redis_client().get(f"{lock_key}:fence")
+    return int(token) if token else None
+
+
+async def async_get_fencing_token(lock_key: str) -> Optional[int]:
+    """Async version of get_fencing_token"""
+    token = await get_async_redis_client().get(f"{lock_key}:fence")
+    return int(token) if token else None
+
+
+# List the scheduler blocks on between due items; pushed to when videos are (re)scheduled
+SCHEDULER_WAKEUP_KEY = "scheduler:wakeup"
+
+
+def notify_scheduler() -> None:
+    """Wake the scheduler early so it picks up a newly scheduled time.
+    
+    The list is capped at one entry - any number of notifications
+    before the scheduler wakes collapse into a single wake-up. Best effort:
+    without it the scheduler still runs within SCHEDULER_MAX_SLEEP.
+    """
+    try:
+        pipe = get_redis_client().pipeline(transaction=True)
+        pipe.lpush(SCHEDULER_WAKEUP_KEY, "1")
+        pipe.ltrim(SCHEDULER_WAKEUP_KEY, 0, 0)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to wake scheduler: {e}")
+
+
+async def wait_for_scheduler_wakeup(timeout: float) -> bool:
+    """Block until notify_scheduler() is called or the timeout passes.
+    
+    Args:
+        timeout: Maximum seconds to wait (rounded up to whole seconds, at least 1)
+        
+    Returns:
+        True if woken by a notification, False on timeout
+    """
+    import math
+    # Whole seconds: BLPOP's fractional timeouts need Redis 6+, and 0 would block forever
+    blpop_timeout = max(1, math.ceil(timeout))
+    result = await get_async_redis_client().blpop(SCHEDULER_WAKEUP_KEY, timeout=blpop_timeout)
+    return result is not None
+
+
+# Scheduled videos claimed for upload (status "uploading"), scored by the time of the claim or of the
+# upload job's start. A claim older than the task timeout has lost its job and is re-dispatched.
+SCHEDULED_CLAIMS_KEY = "scheduler:claims"
+# Lock held by the upload job of a claimed video while it runs (prevents duplicate jobs uploading twice)
+SCHEDULED_UPLOAD_LOCK_PREFIX = "scheduler:upload_lock:"
+
+
+def record_scheduled_claims(video_ids: List[int], only_new: bool = False) -> None:
+    """Record (or refresh) the upload claims of scheduled videos as of now
+    
+    Args:
+        video_ids: Claimed video IDs
+        only_new: Leave claims that are already recorded untouched
+    """
+    if not video_ids:
+        return
+    now = time.time()
+    get_redis_client().zadd(SCHEDULED_CLAIMS_KEY, {str(video_id): now for video_id in video_ids}, nx=only_new)
+
+
+def release_scheduled_claim(video_id: int) -> None:
+    """Forget a claim once its upload finished or the video went back to the scheduler"""
+    get_redis_client().zrem(SCHEDULED_CLAIMS_KEY, str(video_id))
+
+
+def scheduled_claims_backfilled() -> bool:
+    """Whether claims of videos left "uploading" before claims were recorded have been adopted"""
+    return bool(get_redis_client().exists(f"{SCHEDULED_CLAIMS_KEY}:backfilled"))
+
+
+def mark_scheduled_claims_backfilled() -> None:
+    get_redis_client().set(f"{SCHEDULED_CLAIMS_KEY}:backfilled", "1")
+
+
+def get_stale_scheduled_claims(claimed_before: float, limit: int) -> List[int]:
+    """Get claims recorded (or refreshed) before a point in time
+    
+    Args:
+        claimed_before: Unix time
+        limit: Maximum number of claims to return
+        
+    Returns:
+        Video IDs, oldest claim first
+    """
+    members = get_redis_client().zrangebyscore(SCHEDULED_CLAIMS_KEY, "-inf", claimed_before, start=0, num=limit)
+    return [int(member) for member in members]
+
+
+# In-flight publish jobs (TikTok publish_id, Instagram container) polled by the status checker.
+# The ZSET holds "<platform>:<video_id>" scored by next poll time; the hash counts polls per job.
+PUBLISH_JOBS_DUE_KEY = "publish_jobs:due"
+PUBLISH_JOBS_POLLS_KEY = "publish_jobs:polls"
+
+
+def register_publish_job(platform: str, video_id: int, first_poll_in: float, only_new: bool = False) -> None:
+    """Start polling a publish job, fast at first (resets its backoff)
+    
+    Best effort: jobs missed here are picked up by the status checker's
+    periodic full scan.
+    
+    Args:
+        platform: tiktok or instagram
+        video_id: Video ID
+        first_poll_in: Seconds until the first poll
+        only_new: Leave jobs that are already registered untouched
+    """
+    member = f"{platform}:{video_id}"
+    try:
+        pipe = get_redis_client().pipeline(transaction=True)
+        if only_new:
+            pipe.zadd(PUBLISH_JOBS_DUE_KEY, {member: time.time() + first_poll_in}, nx=True)
+        else:
+            pipe.zadd(PUBLISH_JOBS_DUE_KEY, {member: time.time() + first_poll_in})
+            pipe.hdel(PUBLISH_JOBS_POLLS_KEY, member)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to register {platform} publish job for video {video_id}: {e}")
+
+
+def get_due_publish_jobs(now: float, limit: int) -> List[Tuple[str, int]]:
+    """Get publish jobs whose next poll time has passed
+    
+    Args:
+        now: Unix time
+        limit: Maximum number of jobs to return
+        
+    Returns:
+        (platform, video_id) pairs, most overdue first
+    """
+    members = get_redis_client().zrangebyscore(PUBLISH_JOBS_DUE_KEY, "-inf", now, start=0, num=limit)
+    jobs = []
+    for member in members:
+        platform, video_id = member.split(":", 1)
+        jobs.append((platform, int(video_id)))
+    return jobs
+
+
+def get_next_publish_job_time() -> Optional[float]:
+    """Unix time of the earliest scheduled poll (None if no jobs)"""
+    entries = get_redis_client().zrange(PUBLISH_JOBS_DUE_KEY, 0, 0, withscores=True)
+    return entries[0][1] if entries else None
+
+
+def reschedule_publish_job(platform: str, video_id: int, min_interval: float, max_interval: float, backoff: float) -> float:
+    """Schedule a job's next poll, backing off exponentially with each poll
+    
+    Jobs completed in the meantime are not re-added.
+    
+    Args:
+        platform: tiktok or instagram
+        video_id: Video ID
+        min_interval: Seconds until the next poll after the first one
+        max_interval: Upper bound on the interval
+        backoff: Factor the interval grows by per poll
+        
+    Returns:
+        Seconds until the next poll
     """
-    get_redis_client().delete(lock_key)
+    member = f"{platform}:{video_id}"
+    client = get_redis_client()
+    polls = client.hincrby(PUBLISH_JOBS_POLLS_KEY, member, 1)
+    delay = min(max_interval, min_interval * backoff ** (polls - 1))
+    client.zadd(PUBLISH_JOBS_DUE_KEY, {member: time.time() + delay}, xx=True)
+    return delay
+
+
+def complete_publish_job(platform: str, video_id: int) -> None:
+    """Stop polling a publish job"""
+    member = f"{platform}:{video_id}"
+    pipe = get_redis_client().pipeline(transaction=True)
+    pipe.zrem(PUBLISH_JOBS_DUE_KEY, member)
+    pipe.hdel(PUBLISH_JOBS_POLLS_KEY, member)
+    pipe.execute()
 
 
 def set_token_check_cooldown(user_id: int, platform: str, ttl: int = 30) -> None:
@@ -2,13 +2,29 @@
 
 DRY, reusable task queue implementation using Redis Lists and Hashes.
 Supports unlimited concurrency, automatic retries, and task persistence.
+Every state transition is a single atomic round-trip (MULTI pipeline or Lua script).
+
+Retries and delayed tasks wait in a ZSET scored by due time; a promoter
+moves due tasks onto the ready queue in batches, so backoff never blocks
+the worker loop.
+
+Delivery is reliable: dequeue atomically moves a task into this worker's
+in-flight list (BLMOVE), workers hold a heartbeat lease, and a reaper moves
+in-flight tasks of workers whose lease expired back onto the ready queue.
+
+Each operation has an async_* twin on the async Redis client for use from
+coroutines; both share the same command builders and Lua scripts.
 """
 import json
 import logging
+import os
+import socket
+import time
 import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
+from app.core.config import settings
 from app.db.redis import get_redis_client, get_async_redis_client
 
 logger = logging.getLogger(__name__)
@@ -16,67 +32,522 @@ logger = logging.getLogger(__name__)
 # Redis key prefixes
 QUEUE_KEY_PREFIX = "task:queue:"
 META_KEY_PREFIX = "task:meta:"
-PROCESSING_SET_KEY = "task:processing"
+# ZSET of processing task IDs scored by start time (epoch seconds)
+PROCESSING_KEY = "task:processing:started"
+INFLIGHT_KEY_PREFIX = "task:inflight:"
+DELAYED_SET_KEY = "task:delayed"
+WORKER_LEASES_KEY = "task:workers"
+# String key per (task_type, dedup_key) holding the ID of the task still waiting to run
+DEDUP_KEY_PREFIX = "task:dedup:"
+
+# Identifies this process's in-flight list and heartbeat lease
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
 
 # Task TTL (24 hours for completed/failed tasks metadata)
 TASK_META_TTL = 24 * 60 * 60
 
 
-def enqueue_task(
-    task_type: str,
-    payload: Dict[str, Any],
-    retry_count: int = 0,
-    max_retries: int = 3
-) -> str:
-    """Enqueue a task to the Redis queue
+# Shared Lua helper: create task metadata and either push the task ID onto its
+# ready queue or, if it has a due time, park it in the delayed ZSET.
+# Used by the enqueue/failure/retry scripts so a task is created in the same
+# atomic step that updates the original task (or claims the dedup key).
+# A follow-up task inherits the dedup key only if no other task holds it.
+# Common ARGV: [meta_prefix, queue_prefix, meta_ttl, delayed_key, ...]
+_LUA_CREATE_TASK = """
+local function create_task(task_id, task_type, payload, retry_count, max_retries, created_at, due_at_ts, dedup_key)
+    local meta_key = ARGV[1] .. task_id
+    redis.call('HSET', meta_key,
+        'task_id', task_id,
+        'task_type', task_type,
+        'payload', payload,
+        'retry_count', tostring(retry_count),
+        'max_retries', tostring(max_retries),
+        'created_at', created_at,
+        'status', 'pending')
+    redis.call('EXPIRE', meta_key, ARGV[3])
+    if due_at_ts then
+        redis.call('HSET', meta_key, 'status', 'delayed', 'due_at_ts', due_at_ts)
+        redis.call('ZADD', ARGV[4], due_at_ts, task_id)
+    else
+        redis.call('LPUSH', ARGV[2] .. task_type, task_id)
+    end
+    if dedup_key and redis.call('SET', dedup_key, task_id, 'NX', 'EX', ARGV[3]) then
+        redis.call('HSET', meta_key, 'dedup_key', dedup_key)
+    end
+end
+"""
+
+# Enqueue a task unless another task with the same dedup key is still waiting
+# to run (pending/delayed), in which case the enqueue is merged into it.
+# KEYS: [dedup_key]
+# ARGV: [meta_prefix, queue_prefix, meta_ttl, delayed_key,
+#        task_id, task_type, payload, retry_count, max_retries, created_at, due_at_ts]
+_ENQUEUE_DEDUP_SCRIPT = _LUA_CREATE_TASK + """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    local status = redis.call('HGET', ARGV[1] .. existing, 'status')
+    if status == 'pending' or status == 'delayed' then
+        redis.call('HINCRBY', ARGV[1] .. existing, 'coalesced', 1)
+        return existing
+    end
+    -- Holder already ran or vanished - the key is stale
+    redis.call('DEL', KEYS[1])
+end
+
+local due_at_ts = ARGV[11]
+if due_at_ts == '' then
+    due_at_ts = nil
+end
+create_task(ARGV[5], ARGV[6], ARGV[7], ARGV[8], ARGV[9], ARGV[10], due_at_ts, KEYS[1])
+return ARGV[5]
+"""
+
+# Release the task's dedup key once it starts running, so a later enqueue
+# creates a follow-up task instead of merging into one already in progress.
+# KEYS: [meta_key]
+# ARGV: [task_id]
+_RELEASE_DEDUP_SCRIPT = """
+local dedup_key = redis.call('HGET', KEYS[1], 'dedup_key')
+if dedup_key and redis.call('GET', dedup_key) == ARGV[1] then
+    redis.call('DEL', dedup_key)
+end
+return 0
+"""
+
+# Mark a task failed and, if retries remain, create its (delayed) retry task atomically.
+# KEYS: [meta_key, processing_zset, inflight_list]
+# ARGV: [meta_prefix, queue_prefix, meta_ttl, delayed_key,
+#        task_id, error, retry, now_iso, now_ts, new_task_id]
+_FAIL_TASK_SCRIPT = _LUA_CREATE_TASK + """
+local meta_key = KEYS[1]
+if redis.call('EXISTS', meta_key) == 0 then
+    return {'missing'}
+end
+
+local fields = redis.call('HMGET', meta_key, 'retry_count', 'max_retries', 'task_type', 'payload', 'dedup_key')
+local retry_count = tonumber(fields[1]) or 0
+local max_retries = tonumber(fields[2]) or 3
+local task_type = fields[3]
+local payload = fields[4]
+local dedup_key = fields[5]
+if not payload then
+    return {'no_payload'}
+end
+
+redis.call('ZREM', KEYS[2], ARGV[5])
+redis.call('LREM', KEYS[3], 0, ARGV[5])
+
+if ARGV[7] == '1' and retry_count < max_retries then
+    -- Exponential backoff, max 5 minutes
+    local new_retry_count = retry_count + 1
+    local delay = 1
+    for i = 1, new_retry_count do
+        delay = delay * 2
+    end
+    delay = math.min(300, delay)
+    local due_at_ts = string.format('%.3f', tonumber(ARGV[9]) + delay)
+
+    redis.call('HSET', meta_key,
+        'status', 'retrying',
+        'error', ARGV[6],
+        'retry_scheduled_at', ARGV[8],
+        'retry_delay_seconds', string.format('%d', delay))
+    create_task(ARGV[10], task_type, payload, new_retry_count, max_retries, ARGV[8], due_at_ts, dedup_key)
+    return {'retry', ARGV[10], delay, retry_count, max_retries}
+end
+
+redis.call('HSET', meta_key,
+    'status', 'failed',
+    'error', ARGV[6],
+    'failed_at', ARGV[8])
+return {'failed', retry_count}
+"""
+
+# Fail up to batch_size tasks that started processing before the cutoff.
+# KEYS: [processing_zset]
+# ARGV: [meta_prefix, inflight_prefix, cutoff_ts, now_ts, batch_size]
+_REAP_STALE_TASKS_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[3], 'WITHSCORES', 'LIMIT', 0, ARGV[5])
+local reaped = {}
+for i = 1, #stale, 2 do
+    local task_id = stale[i]
+    local elapsed = math.floor(tonumber(ARGV[4]) - tonumber(stale[i + 1]))
+    local meta_key = ARGV[1] .. task_id
+    redis.call('ZREM', KEYS[1], task_id)
+    if redis.call('EXISTS', meta_key) == 1 then
+        redis.call('HSET', meta_key,
+            'status', 'failed',
+            'error', string.format('Task timeout after %d seconds', elapsed))
+        local worker_id = redis.call('HGET', meta_key, 'worker_id')
+        if worker_id then
+            redis.call('LREM', ARGV[2] .. worker_id, 0, task_id)
+        end
+    end
+    table.insert(reaped, task_id)
+end
+return reaped
+"""
+
+# Re-enqueue a task as a fresh attempt (retry_count reset to 0), optionally delayed.
+# KEYS: [meta_key]
+# ARGV: [meta_prefix, queue_prefix, meta_ttl, delayed_key, now_iso, new_task_id, due_at_ts]
+_RETRY_TASK_SCRIPT = _LUA_CREATE_TASK + """
+local meta_key = KEYS[1]
+if redis.call('EXISTS', meta_key) == 0 then
+    return {'missing'}
+end
+
+local fields = redis.call('HMGET', meta_key, 'max_retries', 'task_type', 'payload', 'dedup_key')
+local max_retries = tonumber(fields[1]) or 3
+local task_type = fields[2]
+local payload = fields[3]
+local dedup_key = fields[4]
+if not payload then
+    return {'no_payload'}
+end
+
+local due_at_ts = nil
+if ARGV[7] ~= '' then
+    due_at_ts = ARGV[7]
+end
+create_task(ARGV[6], task_type, payload, 0, max_retries, ARGV[5], due_at_ts, dedup_key)
+return {'ok', ARGV[6]}
+"""
+
+# Move up to batch_size due tasks from the delayed ZSET onto their ready queues.
+# KEYS: [delayed_key]
+# ARGV: [meta_prefix, queue_prefix, now_ts, batch_size]
+_PROMOTE_DUE_TASKS_SCRIPT = """
+local promoted = 0
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[3], 'LIMIT', 0, ARGV[4])
+for _, task_id in ipairs(due) do
+    redis.call('ZREM', KEYS[1], task_id)
+    local meta_key = ARGV[1] .. task_id
+    local task_type = redis.call('HGET', meta_key, 'task_type')
+    if task_type then
+        redis.call('HSET', meta_key, 'status', 'pending')
+        redis.call('LPUSH', ARGV[2] .. task_type, task_id)
+        promoted = promoted + 1
+    end
+end
+return {promoted, #due}
+"""
+
+# Move in-flight tasks of every worker whose lease expired back onto their
+# ready queues (RPUSH, so they are the next to be dequeued).
+# KEYS: [worker_leases, processing_zset]
+# ARGV: [meta_prefix, queue_prefix, inflight_prefix, now_ts, now_iso]
+_REAP_EXPIRED_LEASES_SCRIPT = """
+local requeued = 0
+local dead_workers = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[4])
+for _, worker_id in ipairs(dead_workers) do
+    local inflight_key = ARGV[3] .. worker_id
+    while true do
+        local task_id = redis.call('RPOP', inflight_key)
+        if not task_id then
+            break
+        end
+        local meta_key = ARGV[1] .. task_id
+        local task_type = redis.call('HGET', meta_key, 'task_type')
+        if task_type then
+            redis.call('HSET', meta_key, 'status', 'pending', 'requeued_at', ARGV[5])
+            redis.call('HINCRBY', meta_key, 'redeliveries', 1)
+            redis.call('ZREM', KEYS[2], task_id)
+            redis.call('RPUSH', ARGV[2] .. task_type, task_id)
+            requeued = requeued + 1
+        end
+    end
+    redis.call('ZREM', KEYS[1], worker_id)
+end
+return requeued
+"""
+
+
+def _parse_task_meta(meta: Dict[str, str]) -> Dict[str, Any]:
+    """Convert a raw task metadata hash into a task dict
     
     Args:
-        task_type: Type of task (e.g., 'upload_videos')
-        payload: Task payload (must include 'user_id' for upload tasks)
-        retry_count: Current retry attempt (0 for new tasks)
-        max_retries: Maximum number of automatic retries
+        meta: Raw hash fields from Redis
         
     Returns:
-        task_id: Unique task identifier
+        Task dict with JSON and numeric fields decoded
     """
-    task_id = str(uuid.uuid4())
+    task = dict(meta)
     
-    task_data = {
-        "task_id": task_id,
-        "task_type": task_type,
-        "payload": payload,
-        "retry_count": retry_count,
-        "max_retries": max_retries,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "status": "pending"
-    }
+    # Parse JSON fields
+    if "payload" in task:
+        task["payload"] = json.loads(task["payload"])
     
-    # Store task metadata in Redis hash
+    # Convert numeric fields
+    if "retry_count" in task:
+        task["retry_count"] = int(task["retry_count"])
+    if "max_retries" in task:
+        task["max_retries"] = int(task["max_retries"])
+    if "due_at_ts" in task:
+        task["due_at_ts"] = float(task["due_at_ts"])
+    if "redeliveries" in task:
+        task["redeliveries"] = int(task["redeliveries"])
+    
+    return task
+
+
+# Command builders shared by the sync and async APIs.
+# Pipeline builders only queue commands (identical on sync and async pipelines),
+# eval builders return the script arguments, result handlers do the logging.
+
+def _queue_enqueue(
+    pipe,
+    task_type: str,
+    payload: Dict[str, Any],
+    retry_count: int,
+    max_retries: int,
+    delay_seconds: float
+) -> str:
+    """Queue the commands that create a task on a MULTI pipeline, return its task_id"""
+    task_id = str(uuid.uuid4())
     meta_key = f"{META_KEY_PREFIX}{task_id}"
-    client = get_redis_client()
-    client.hset(meta_key, mapping={
+    queue_key = f"{QUEUE_KEY_PREFIX}{task_type}"
+    
+    now = datetime.now(timezone.utc)
+    meta = {
         "task_id": task_id,
         "task_type": task_type,
         "payload": json.dumps(payload),
         "retry_count": str(retry_count),
         "max_retries": str(max_retries),
-        "created_at": task_data["created_at"],
+        "created_at": now.isoformat(),
         "status": "pending"
+    }
+    
+    if delay_seconds > 0:
+        due_at_ts = now.timestamp() + delay_seconds
+        meta["status"] = "delayed"
+        meta["due_at_ts"] = f"{due_at_ts:.3f}"
+        pipe.hset(meta_key, mapping=meta)
+        pipe.zadd(DELAYED_SET_KEY, {task_id: due_at_ts})
+    else:
+        pipe.hset(meta_key, mapping=meta)
+        # Queue holds task IDs only - the metadata hash is the source of truth
+        pipe.lpush(queue_key, task_id)
+    pipe.expire(meta_key, TASK_META_TTL)
+    return task_id
+
+
+def _enqueue_dedup_args(
+    task_type: str,
+    payload: Dict[str, Any],
+    retry_count: int,
+    max_retries: int,
+    delay_seconds: float,
+    dedup_key: str
+) -> Tuple[str, tuple]:
+    """New task_id and arguments for _ENQUEUE_DEDUP_SCRIPT"""
+    now = datetime.now(timezone.utc)
+    new_task_id = str(uuid.uuid4())
+    due_at_ts = f"{now.timestamp() + delay_seconds:.3f}" if delay_seconds > 0 else ""
+    return new_task_id, (
+        _ENQUEUE_DEDUP_SCRIPT, 1,
+        f"{DEDUP_KEY_PREFIX}{task_type}:{dedup_key}",
+        META_KEY_PREFIX, QUEUE_KEY_PREFIX, TASK_META_TTL, DELAYED_SET_KEY,
+        new_task_id, task_type, json.dumps(payload),
+        retry_count, max_retries, now.isoformat(), due_at_ts
+    )
+
+
+def _log_enqueue(task_type: str, task_id: str, new_task_id: str, retry_count: int, dedup_key: Optional[str]) -> None:
+    """Log an enqueue, noting when it was merged into an already-queued task"""
+    if task_id != new_task_id:
+        logger.info(f"Coalesced {task_type} enqueue (dedup_key={dedup_key}) into queued task {task_id}")
+    else:
+        logger.info(f"Enqueued task {task_id} of type {task_type} (retry_count={retry_count})")
+
+
+def _queue_mark_processing(pipe, task_id: str) -> None:
+    """Queue the processing transition on a MULTI pipeline"""
+    now = datetime.now(timezone.utc)
+    pipe.hset(f"{META_KEY_PREFIX}{task_id}", mapping={
+        "status": "processing",
+        "started_at": now.isoformat(),
+        "worker_id": WORKER_ID
     })
-    client.expire(meta_key, TASK_META_TTL)
+    # Indexed by start time so stale tasks can be found with a range query
+    pipe.zadd(PROCESSING_KEY, {task_id: now.timestamp()})
+    pipe.eval(_RELEASE_DEDUP_SCRIPT, 1, f"{META_KEY_PREFIX}{task_id}", task_id)
+
+
+def _queue_mark_completed(pipe, task_id: str, result: Optional[Dict[str, Any]]) -> None:
+    """Queue the completed transition on a MULTI pipeline"""
+    fields = {
+        "status": "completed",
+        "completed_at": datetime.now(timezone.utc).isoformat()
+    }
+    if result:
+        fields["result"] = json.dumps(result)
     
-    # Enqueue task to appropriate queue
-    queue_key = f"{QUEUE_KEY_PREFIX}{task_type}"
-    task_json = json.dumps(task_data)
-    client.lpush(queue_key, task_json)
+    pipe.hset(f"{META_KEY_PREFIX}{task_id}", mapping=fields)
+    pipe.zrem(PROCESSING_KEY, task_id)
+    pipe.lrem(f"{INFLIGHT_KEY_PREFIX}{WORKER_ID}", 0, task_id)
+
+
+def _queue_defer(pipe, task_id: str, delay_seconds: float) -> None:
+    """Queue the commands that hand an in-flight task back to the delayed set"""
+    due_at_ts = time.time() + delay_seconds
+    pipe.lrem(f"{INFLIGHT_KEY_PREFIX}{WORKER_ID}", 0, task_id)
+    # Deferred mid-run (e.g. rate limited) - no longer counts as processing for the stale reaper
+    pipe.zrem(PROCESSING_KEY, task_id)
+    pipe.hset(f"{META_KEY_PREFIX}{task_id}", mapping={
+        "status": "delayed",
+        "due_at_ts": f"{due_at_ts:.3f}"
+    })
+    pipe.zadd(DELAYED_SET_KEY, {task_id: due_at_ts})
+
+
+def _fail_task_args(task_id: str, error: str, retry: bool) -> tuple:
+    """Arguments for _FAIL_TASK_SCRIPT"""
+    now = datetime.now(timezone.utc)
+    return (
+        _FAIL_TASK_SCRIPT, 3,
+        f"{META_KEY_PREFIX}{task_id}", PROCESSING_KEY, f"{INFLIGHT_KEY_PREFIX}{WORKER_ID}",
+        META_KEY_PREFIX, QUEUE_KEY_PREFIX, TASK_META_TTL, DELAYED_SET_KEY,
+        task_id, error, "1" if retry else "0",
+        now.isoformat(), now.timestamp(), str(uuid.uuid4())
+    )
+
+
+def _handle_fail_result(task_id: str, error: str, result: list) -> Optional[str]:
+    """Log the outcome of _FAIL_TASK_SCRIPT and return the retry task_id, if any"""
+    outcome = result[0]
+    
+    if outcome == "missing":
+        logger.warning(f"Task {task_id} metadata not found")
+        return None
     
-    logger.info(f"Enqueued task {task_id} of type {task_type} (retry_count={retry_count})")
+    if outcome == "no_payload":
+        logger.error(f"Task {task_id} missing payload")
+        return None
+    
+    if outcome == "retry":
+        _, new_task_id, delay_seconds, retry_count, max_retries = result
+        logger.info(
+            f"Task {task_id} failed (attempt {retry_count + 1}/{max_retries + 1}), "
+            f"scheduled retry {new_task_id} in {delay_seconds}s: {error}"
+        )
+        return new_task_id
+    
+    retry_count = result[1]
+    logger.warning(
+        f"Task {task_id} failed permanently after {retry_count + 1} attempts: {error}"
+    )
+    return None
+
+
+def _retry_task_args(task_id: str, new_task_id: str, delay_seconds: float) -> tuple:
+    """Arguments for _RETRY_TASK_SCRIPT"""
+    now = datetime.now(timezone.utc)
+    due_at_ts = f"{now.timestamp() + delay_seconds:.3f}" if delay_seconds > 0 else ""
+    return (
+        _RETRY_TASK_SCRIPT, 1,
+        f"{META_KEY_PREFIX}{task_id}",
+        META_KEY_PREFIX, QUEUE_KEY_PREFIX, TASK_META_TTL, DELAYED_SET_KEY,
+        now.isoformat(), new_task_id, due_at_ts
+    )
+
+
+def _handle_retry_result(task_id: str, new_task_id: str, result: list) -> Optional[str]:
+    """Log the outcome of _RETRY_TASK_SCRIPT and return the new task_id, if any"""
+    outcome = result[0]
+    
+    if outcome == "missing":
+        logger.warning(f"Task {task_id} not found for retry")
+        return None
+    
+    if outcome == "no_payload":
+        logger.error(f"Task {task_id} missing payload")
+        return None
+    
+    logger.info(f"Manually retrying task {task_id} as new task {new_task_id}")
+    return new_task_id
+
+
+def _promote_args(batch_size: int) -> tuple:
+    """Arguments for _PROMOTE_DUE_TASKS_SCRIPT"""
+    return (
+        _PROMOTE_DUE_TASKS_SCRIPT, 1,
+        DELAYED_SET_KEY,
+        META_KEY_PREFIX, QUEUE_KEY_PREFIX, time.time(), batch_size
+    )
+
+
+def _reap_leases_args() -> tuple:
+    """Arguments for _REAP_EXPIRED_LEASES_SCRIPT"""
+    now = datetime.now(timezone.utc)
+    return (
+        _REAP_EXPIRED_LEASES_SCRIPT, 2,
+        WORKER_LEASES_KEY, PROCESSING_KEY,
+        META_KEY_PREFIX, QUEUE_KEY_PREFIX, INFLIGHT_KEY_PREFIX,
+        now.timestamp(), now.isoformat()
+    )
+
+
+def _reap_stale_args(timeout_seconds: int, batch_size: int) -> tuple:
+    """Arguments for _REAP_STALE_TASKS_SCRIPT"""
+    now = time.time()
+    return (
+        _REAP_STALE_TASKS_SCRIPT, 1,
+        PROCESSING_KEY,
+        META_KEY_PREFIX, INFLIGHT_KEY_PREFIX, now - timeout_seconds, now, batch_size
+    )
+
+
+def enqueue_task(
+    task_type: str,
+    payload: Dict[str, Any],
+    retry_count: int = 0,
+    max_retries: int = 3,
+    delay_seconds: float = 0,
+    dedup_key: Optional[str] = None
+) -> str:
+    """Enqueue a task to the Redis queue
+    
+    Metadata and queue entry are written in a single MULTI/EXEC round-trip
+    (or one Lua script with a dedup key), so a task is never visible on the
+    queue without its metadata. The dedup key is released when the task
+    starts processing, so a later enqueue queues one follow-up task.
+    
+    Args:
+        task_type: Type of task (e.g., 'upload_videos')
+        payload: Task payload (must include 'user_id' for upload tasks)
+        retry_count: Current retry attempt (0 for new tasks)
+        max_retries: Maximum number of automatic retries
+        delay_seconds: Hold the task in the delayed set for this long before it becomes ready
+        dedup_key: Coalescing key (e.g. user_id) - while a task of this type with the
+            same key is still pending/delayed, the enqueue merges into it
+        
+    Returns:
+        task_id: Unique task identifier (the existing task's ID if merged)
+    """
+    if dedup_key is not None:
+        new_task_id, args = _enqueue_dedup_args(
+            task_type, payload, retry_count, max_retries, delay_seconds, dedup_key
+        )
+        task_id = get_redis_client().eval(*args)
+        _log_enqueue(task_type, task_id, new_task_id, retry_count, dedup_key)
+        return task_id
+    
+    pipe = get_redis_client().pipeline(transaction=True)
+    task_id = _queue_enqueue(pipe, task_type, payload, retry_count, max_retries, delay_seconds)
+    pipe.execute()
+    
+    _log_enqueue(task_type, task_id, task_id, retry_count, dedup_key)
     return task_id
 
 
 async def dequeue_task(task_type: str, timeout: int = 5) -> Optional[Dict[str, Any]]:
     """Dequeue a task from the Redis queue (blocking)
     
+    The task ID is atomically moved into this worker's in-flight list, so it
+    is re-delivered by the lease reaper if this worker dies before acking it.
+    
     Args:
         task_type: Type of task to dequeue
         timeout: Blocking timeout in seconds
@@ -85,6 +556,7 @@ async def dequeue_task(task_type: str, timeout: int = 5) -> Optional[Dict[str, A
         Task dict if task available, None if timeout
     """
     queue_key = f"{QUEUE_KEY_PREFIX}{task_type}"
+    inflight_key = f"{INFLIGHT_KEY_PREFIX}{WORKER_ID}"
     client = get_async_redis_client()
     
     if client is None:
@@ -92,15 +564,24 @@ async def dequeue_task(task_type: str, timeout: int = 5) -> Optional[Dict[str, A
         return None
     
     try:
-        # BRPOP returns [queue_name, task_json] or None
-        result = await client.brpop(queue_key, timeout=timeout)
+        # BLMOVE returns the moved task_id or None on timeout
+        entry = await client.blmove(queue_key, inflight_key, timeout, "RIGHT", "LEFT")
         
-        if result is None:
+        if entry is None:
             return None
         
-        _, task_json = result
-        task_data = json.loads(task_json)
-        return task_data
+        # Entries enqueued before task IDs were used carry the full task JSON
+        if entry.startswith("{"):
+            await client.lrem(inflight_key, 0, entry)
+            return json.loads(entry)
+        
+        meta = await client.hgetall(f"{META_KEY_PREFIX}{entry}")
+        if not meta:
+            logger.warning(f"Dequeued task {entry} has no metadata (expired?), skipping")
+            await client.lrem(inflight_key, 0, entry)
+            return None
+        
+        return _parse_task_meta(meta)
     except Exception as e:
         logger.error(f"Error dequeuing task: {e}", exc_info=True)
         return None
@@ -115,24 +596,11 @@ def get_task_status(task_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Task metadata dict or None if not found
     """
-    meta_key = f"{META_KEY_PREFIX}{task_id}"
-    client = get_redis_client()
-    
-    meta = client.hgetall(meta_key)
+    meta = get_redis_client().hgetall(f"{META_KEY_PREFIX}{task_id}")
     if not meta:
         return None
     
-    # Parse JSON fields
-    if "payload" in meta:
-        meta["payload"] = json.loads(meta["payload"])
-    
-    # Convert numeric fields
-    if "retry_count" in meta:
-        meta["retry_count"] = int(meta["retry_count"])
-    if "max_retries" in meta:
-        meta["max_retries"] = int(meta["max_retries"])
-    
-    return meta
+    return _parse_task_meta(meta)
 
 
 def mark_task_processing(task_id: str) -> None:
@@ -141,12 +609,9 @@ def mark_task_processing(task_id: str) -> None:
     Args:
         task_id: Task identifier
     """
-    meta_key = f"{META_KEY_PREFIX}{task_id}"
-    client = get_redis_client()
-    
-    client.hset(meta_key, "status", "processing")
-    client.hset(meta_key, "started_at", datetime.now(timezone.utc).isoformat())
-    client.sadd(PROCESSING_SET_KEY, task_id)
+    pipe = get_redis_client().pipeline(transaction=True)
+    _queue_mark_processing(pipe, task_id)
+    pipe.execute()
     
     logger.debug(f"Marked task {task_id} as processing")
 
@@ -158,16 +623,9 @@ def mark_task_completed(task_id: str, result: Optional[Dict[str, Any]] = None) -
         task_id: Task identifier
         result: Optional result data to store
     """
-    meta_key = f"{META_KEY_PREFIX}{task_id}"
-    client = get_redis_client()
-    
-    client.hset(meta_key, "status", "completed")
-    client.hset(meta_key, "completed_at", datetime.now(timezone.utc).isoformat())
-    
-    if result:
-        client.hset(meta_key, "result", json.dumps(result))
-    
-    client.srem(PROCESSING_SET_KEY, task_id)
+    pipe = get_redis_client().pipeline(transaction=True)
+    _queue_mark_completed(pipe, task_id, result)
+    pipe.execute()
     
     logger.info(f"Marked task {task_id} as completed")
 
@@ -175,6 +633,10 @@ def mark_task_completed(task_id: str, result: Optional[Dict[str, Any]] = None) -
 def mark_task_failed(task_id: str, error: str, retry: bool = True) -> Optional[str]:
     """Mark task as failed and optionally schedule retry
     
+    Runs as a single Lua script: the failure is recorded and the retry task
+    (if any) is created atomically, so a crash can't leave half-written state.
+    The retry task is parked in the delayed set until its backoff elapses.
+    
     Args:
         task_id: Task identifier
         error: Error message
@@ -183,158 +645,374 @@ def mark_task_failed(task_id: str, error: str, retry: bool = True) -> Optional[s
     Returns:
         New task_id if retry scheduled, None otherwise
     """
-    meta_key = f"{META_KEY_PREFIX}{task_id}"
-    client = get_redis_client()
+    result = get_redis_client().eval(*_fail_task_args(task_id, error, retry))
+    return _handle_fail_result(task_id, error, result)
+
+
+def retry_task(task_id: str, delay_seconds: float = 0) -> Optional[str]:
+    """Manually retry a failed task
     
-    meta = client.hgetall(meta_key)
-    if not meta:
-        logger.warning(f"Task {task_id} metadata not found")
-        return None
+    Args:
+        task_id: Task identifier
+        delay_seconds: Hold the new attempt in the delayed set for this long
+        
+    Returns:
+        New task_id if retry scheduled, None if task not found
+    """
+    # Create new task with retry_count reset to 0 (fresh attempt)
+    new_task_id = str(uuid.uuid4())
+    result = get_redis_client().eval(*_retry_task_args(task_id, new_task_id, delay_seconds))
+    return _handle_retry_result(task_id, new_task_id, result)
+
+
+def defer_task(task_id: str, delay_seconds: float) -> None:
+    """Hand a dequeued task back to the delayed set without counting it as a retry
     
-    retry_count = int(meta.get("retry_count", "0"))
-    max_retries = int(meta.get("max_retries", "3"))
-    task_type = meta.get("task_type")
-    payload_json = meta.get("payload")
+    Used when this worker can't take the task right now (e.g. per-user limit reached)
+    or a running task has to wait for a platform quota.
     
-    if not payload_json:
-        logger.error(f"Task {task_id} missing payload")
-        return None
+    Args:
+        task_id: Task identifier (must be in this worker's in-flight list)
+        delay_seconds: How long until the task becomes ready again
+    """
+    pipe = get_redis_client().pipeline(transaction=True)
+    _queue_defer(pipe, task_id, delay_seconds)
+    pipe.execute()
     
-    payload = json.loads(payload_json)
+    logger.debug(f"Deferred task {task_id} by {delay_seconds}s")
+
+
+def get_queue_depth(task_type: str) -> Dict[str, int]:
+    """Get number of ready and delayed tasks
     
-    # Check if we should retry
-    if retry and retry_count < max_retries:
-        # Schedule retry with exponential backoff
-        new_retry_count = retry_count + 1
-        delay_seconds = min(300, 2 ** new_retry_count)  # Max 5 minutes
+    Args:
+        task_type: Type of task whose ready queue to measure
         
-        logger.info(
-            f"Task {task_id} failed (attempt {retry_count + 1}/{max_retries + 1}), "
-            f"scheduling retry in {delay_seconds}s: {error}"
-        )
+    Returns:
+        Dict with 'ready' (this task type) and 'delayed' (all task types) counts
+    """
+    pipe = get_redis_client().pipeline(transaction=False)
+    pipe.llen(f"{QUEUE_KEY_PREFIX}{task_type}")
+    pipe.zcard(DELAYED_SET_KEY)
+    ready, delayed = pipe.execute()
+    return {"ready": ready, "delayed": delayed}
+
+
+def promote_due_tasks(batch_size: int = 100) -> int:
+    """Move delayed tasks whose due time has passed onto their ready queues
+    
+    Args:
+        batch_size: Maximum number of tasks moved per Lua call
         
-        # Store retry info
-        client.hset(meta_key, "status", "retrying")
-        client.hset(meta_key, "error", error)
-        client.hset(meta_key, "retry_scheduled_at", datetime.now(timezone.utc).isoformat())
-        client.hset(meta_key, "retry_delay_seconds", str(delay_seconds))
-        client.srem(PROCESSING_SET_KEY, task_id)
+    Returns:
+        Number of tasks promoted
+    """
+    client = get_redis_client()
+    total = 0
+    
+    while True:
+        promoted, scanned = client.eval(*_promote_args(batch_size))
+        total += promoted
+        # A short batch means nothing else is due yet
+        if scanned < batch_size:
+            break
+    
+    if total:
+        logger.debug(f"Promoted {total} delayed task(s) to ready queues")
+    return total
+
+
+def heartbeat_worker() -> None:
+    """Renew this worker's lease
+    
+    Must be called more often than TASK_QUEUE_WORKER_LEASE_SECONDS, otherwise
+    the reaper treats the worker as dead and re-delivers its in-flight tasks.
+    """
+    lease_expires_at = time.time() + settings.TASK_QUEUE_WORKER_LEASE_SECONDS
+    get_redis_client().zadd(WORKER_LEASES_KEY, {WORKER_ID: lease_expires_at})
+
+
+def requeue_expired_leases() -> int:
+    """Re-queue in-flight tasks held by workers whose lease has expired
+    
+    Safe to run from every worker concurrently - the sweep is a single Lua
+    script, so each in-flight task is moved back exactly once.
+    
+    Returns:
+        Number of tasks re-queued
+    """
+    requeued = get_redis_client().eval(*_reap_leases_args())
+    
+    if requeued:
+        logger.warning(f"Re-queued {requeued} in-flight task(s) from workers with expired leases")
+    return int(requeued)
+
+
+def release_worker() -> int:
+    """Give up this worker's lease and immediately re-queue anything it still holds
+    
+    Called on graceful shutdown so unfinished tasks don't wait for the lease to expire.
+    
+    Returns:
+        Number of tasks re-queued
+    """
+    get_redis_client().zadd(WORKER_LEASES_KEY, {WORKER_ID: 0})
+    return requeue_expired_leases()
+
+
+def get_processing_tasks() -> list[str]:
+    """Get list of currently processing task IDs
+    
+    Returns:
+        List of task IDs currently being processed
+    """
+    client = get_redis_client()
+    return client.zrange(PROCESSING_KEY, 0, -1)
+
+
+def cleanup_stale_tasks(timeout_seconds: int = 3600, batch_size: int = 100) -> int:
+    """Clean up tasks that have been in processing state too long (likely hung)
+    
+    Range query on the start-time index, so cost depends on the number of
+    stale tasks rather than the number of processing tasks.
+    
+    Args:
+        timeout_seconds: Time in seconds after which a processing task is considered stale
+        batch_size: Maximum number of tasks failed per Lua call
         
-        # Calculate when retry should be processed (exponential backoff)
-        from datetime import timedelta
-        retry_after = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+    Returns:
+        Number of tasks cleaned up
+    """
+    client = get_redis_client()
+    cleaned = 0
+    
+    while True:
+        reaped = client.eval(*_reap_stale_args(timeout_seconds, batch_size))
+        for task_id in reaped:
+            # Task has been processing too long, likely hung
+            logger.warning(f"Cleaned up stale task {task_id} (timeout={timeout_seconds}s)")
+        cleaned += len(reaped)
+        if len(reaped) < batch_size:
+            break
+    
+    return cleaned
+
+
+# Async API - same operations on the async Redis client, for use from coroutines
+# (upload worker, async routes) so queue calls never block the event loop.
+
+async def async_enqueue_task(
+    task_type: str,
+    payload: Dict[str, Any],
+    retry_count: int = 0,
+    max_retries: int = 3,
+    delay_seconds: float = 0,
+    dedup_key: Optional[str] = None
+) -> str:
+    """Enqueue a task to the Redis queue (async)
+    
+    Args:
+        task_type: Type of task (e.g., 'upload_videos')
+        payload: Task payload (must include 'user_id' for upload tasks)
+        retry_count: Current retry attempt (0 for new tasks)
+        max_retries: Maximum number of automatic retries
+        delay_seconds: Hold the task in the delayed set for this long before it becomes ready
+        dedup_key: Coalescing key (e.g. user_id) - while a task of this type with the
+            same key is still pending/delayed, the enqueue merges into it
         
-        # Store retry_after timestamp in metadata for the new task
-        # Enqueue retry task immediately (worker will check retry_after before processing)
-        new_task_id = enqueue_task(
-            task_type=task_type,
-            payload=payload,
-            retry_count=new_retry_count,
-            max_retries=max_retries
+    Returns:
+        task_id: Unique task identifier (the existing task's ID if merged)
+    """
+    if dedup_key is not None:
+        new_task_id, args = _enqueue_dedup_args(
+            task_type, payload, retry_count, max_retries, delay_seconds, dedup_key
         )
+        task_id = await get_async_redis_client().eval(*args)
+        _log_enqueue(task_type, task_id, new_task_id, retry_count, dedup_key)
+        return task_id
+    
+    pipe = get_async_redis_client().pipeline(transaction=True)
+    task_id = _queue_enqueue(pipe, task_type, payload, retry_count, max_retries, delay_seconds)
+    await pipe.execute()
+    
+    _log_enqueue(task_type, task_id, task_id, retry_count, dedup_key)
+    return task_id
+
+
+async def async_get_task_status(task_id: str) -> Optional[Dict[str, Any]]:
+    """Get task status and metadata (async)
+    
+    Args:
+        task_id: Task identifier
         
-        # Store retry_after timestamp in new task's metadata
-        new_meta_key = f"{META_KEY_PREFIX}{new_task_id}"
-        client.hset(new_meta_key, "retry_after", retry_after.isoformat())
-        
-        return new_task_id
-    else:
-        # Max retries exceeded, mark as failed
-        client.hset(meta_key, "status", "failed")
-        client.hset(meta_key, "error", error)
-        client.hset(meta_key, "failed_at", datetime.now(timezone.utc).isoformat())
-        client.srem(PROCESSING_SET_KEY, task_id)
-        
-        logger.warning(
-            f"Task {task_id} failed permanently after {retry_count + 1} attempts: {error}"
-        )
+    Returns:
+        Task metadata dict or None if not found
+    """
+    meta = await get_async_redis_client().hgetall(f"{META_KEY_PREFIX}{task_id}")
+    if not meta:
         return None
+    
+    return _parse_task_meta(meta)
 
 
-def retry_task(task_id: str) -> Optional[str]:
-    """Manually retry a failed task
+async def async_mark_task_processing(task_id: str) -> None:
+    """Mark task as processing (async)
+    
+    Args:
+        task_id: Task identifier
+    """
+    pipe = get_async_redis_client().pipeline(transaction=True)
+    _queue_mark_processing(pipe, task_id)
+    await pipe.execute()
+    
+    logger.debug(f"Marked task {task_id} as processing")
+
+
+async def async_mark_task_completed(task_id: str, result: Optional[Dict[str, Any]] = None) -> None:
+    """Mark task as completed (async)
     
     Args:
         task_id: Task identifier
+        result: Optional result data to store
+    """
+    pipe = get_async_redis_client().pipeline(transaction=True)
+    _queue_mark_completed(pipe, task_id, result)
+    await pipe.execute()
+    
+    logger.info(f"Marked task {task_id} as completed")
+
+
+async def async_mark_task_failed(task_id: str, error: str, retry: bool = True) -> Optional[str]:
+    """Mark task as failed and optionally schedule retry (async)
+    
+    Args:
+        task_id: Task identifier
+        error: Error message
+        retry: Whether to schedule automatic retry
+        
+    Returns:
+        New task_id if retry scheduled, None otherwise
+    """
+    result = await get_async_redis_client().eval(*_fail_task_args(task_id, error, retry))
+    return _handle_fail_result(task_id, error, result)
+
+
+async def async_retry_task(task_id: str, delay_seconds: float = 0) -> Optional[str]:
+    """Manually retry a failed task (async)
+    
+    Args:
+        task_id: Task identifier
+        delay_seconds: Hold the new attempt in the delayed set for this long
         
     Returns:
         New task_id if retry scheduled, None if task not found
     """
-    meta_key = f"{META_KEY_PREFIX}{task_id}"
-    client = get_redis_client()
+    new_task_id = str(uuid.uuid4())
+    result = await get_async_redis_client().eval(*_retry_task_args(task_id, new_task_id, delay_seconds))
+    return _handle_retry_result(task_id, new_task_id, result)
+
+
+async def async_defer_task(task_id: str, delay_seconds: float) -> None:
+    """Hand a dequeued task back to the delayed set without counting it as a retry (async)
     
-    meta = client.hgetall(meta_key)
-    if not meta:
-        logger.warning(f"Task {task_id} not found for retry")
-        return None
+    Args:
+        task_id: Task identifier (must be in this worker's in-flight list)
+        delay_seconds: How long until the task becomes ready again
+    """
+    pipe = get_async_redis_client().pipeline(transaction=True)
+    _queue_defer(pipe, task_id, delay_seconds)
+    await pipe.execute()
     
-    task_type = meta.get("task_type")
-    payload_json = meta.get("payload")
+    logger.debug(f"Deferred task {task_id} by {delay_seconds}s")
+
+
+async def async_get_queue_depth(task_type: str) -> Dict[str, int]:
+    """Get number of ready and delayed tasks (async)
     
-    if not payload_json:
-        logger.error(f"Task {task_id} missing payload")
-        return None
+    Args:
+        task_type: Type of task whose ready queue to measure
+        
+    Returns:
+        Dict with 'ready' (this task type) and 'delayed' (all task types) counts
+    """
+    pipe = get_async_redis_client().pipeline(transaction=False)
+    pipe.llen(f"{QUEUE_KEY_PREFIX}{task_type}")
+    pipe.zcard(DELAYED_SET_KEY)
+    ready, delayed = await pipe.execute()
+    return {"ready": ready, "delayed": delayed}
+
+
+async def async_promote_due_tasks(batch_size: int = 100) -> int:
+    """Move delayed tasks whose due time has passed onto their ready queues (async)
+    
+    Args:
+        batch_size: Maximum number of tasks moved per Lua call
+        
+    Returns:
+        Number of tasks promoted
+    """
+    client = get_async_redis_client()
+    total = 0
     
-    payload = json.loads(payload_json)
+    while True:
+        promoted, scanned = await client.eval(*_promote_args(batch_size))
+        total += promoted
+        if scanned < batch_size:
+            break
     
-    # Create new task with retry_count reset to 0 (fresh attempt)
-    new_task_id = enqueue_task(
-        task_type=task_type,
-        payload=payload,
-        retry_count=0,
-        max_retries=int(meta.get("max_retries", "3"))
-    )
+    if total:
+        logger.debug(f"Promoted {total} delayed task(s) to ready queues")
+    return total
+
+
+async def async_heartbeat_worker() -> None:
+    """Renew this worker's lease (async)"""
+    lease_expires_at = time.time() + settings.TASK_QUEUE_WORKER_LEASE_SECONDS
+    await get_async_redis_client().zadd(WORKER_LEASES_KEY, {WORKER_ID: lease_expires_at})
+
+
+async def async_requeue_expired_leases() -> int:
+    """Re-queue in-flight tasks held by workers whose lease has expired (async)
     
-    logger.info(f"Manually retrying task {task_id} as new task {new_task_id}")
-    return new_task_id
+    Returns:
+        Number of tasks re-queued
+    """
+    requeued = await get_async_redis_client().eval(*_reap_leases_args())
+    
+    if requeued:
+        logger.warning(f"Re-queued {requeued} in-flight task(s) from workers with expired leases")
+    return int(requeued)
 
 
-def get_processing_tasks() -> list[str]:
-    """Get list of currently processing task IDs
+async def async_release_worker() -> int:
+    """Give up this worker's lease and immediately re-queue anything it still holds (async)
     
     Returns:
-        List of task IDs currently being processed
+        Number of tasks re-queued
     """
-    client = get_redis_client()
-    return list(client.smembers(PROCESSING_SET_KEY))
+    await get_async_redis_client().zadd(WORKER_LEASES_KEY, {WORKER_ID: 0})
+    return await async_requeue_expired_leases()
 
 
-def cleanup_stale_tasks(timeout_seconds: int = 3600) -> int:
-    """Clean up tasks that have been in processing state too long (likely crashed)
+async def async_cleanup_stale_tasks(timeout_seconds: int = 3600, batch_size: int = 100) -> int:
+    """Clean up tasks that have been in processing state too long (async)
     
     Args:
         timeout_seconds: Time in seconds after which a processing task is considered stale
+        batch_size: Maximum number of tasks failed per Lua call
         
     Returns:
         Number of tasks cleaned up
     """
-    client = get_redis_client()
-    processing_tasks = get_processing_tasks()
+    client = get_async_redis_client()
     cleaned = 0
     
-    for task_id in processing_tasks:
-        meta_key = f"{META_KEY_PREFIX}{task_id}"
-        started_at_str = client.hget(meta_key, "started_at")
-        
-        if started_at_str:
-            try:
-                started_at = datetime.fromisoformat(started_at_str.replace('Z', '+00:00'))
-                elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
-                
-                if elapsed > timeout_seconds:
-                    # Task has been processing too long, likely crashed
-                    logger.warning(
-                        f"Cleaning up stale task {task_id} "
-                        f"(processing for {elapsed:.0f}s, timeout={timeout_seconds}s)"
-                    )
-                    client.srem(PROCESSING_SET_KEY, task_id)
-                    client.hset(meta_key, "status", "failed")
-                    client.hset(meta_key, "error", f"Task timeout after {elapsed:.0f} seconds")
-                    cleaned += 1
-            except (ValueError, TypeError) as e:
-                logger.warning(f"Error parsing started_at for task {task_id}: {e}")
-                # Remove from processing set if we can't parse the time
-                client.srem(PROCESSING_SET_KEY, task_id)
-                cleaned += 1
+    while True:
+        reaped = await client.eval(*_reap_stale_args(timeout_seconds, batch_size))
+        for task_id in reaped:
+            logger.warning(f"Cleaned up stale task {task_id} (timeout={timeout_seconds}s)")
+        cleaned += len(reaped)
+        if len(reaped) < batch_size:
+            break
     
     return cleaned
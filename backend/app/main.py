@@ -1,5 +1,4 @@
 """FastAPI application entry point"""
-import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, Request
@@ -31,6 +30,9 @@ from app.api import settings as settings_router
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown"""
+    # Background loops started below, per role (kept referenced so they can be stopped on shutdown)
+    background_roles = {}
+    
     # Startup
     otel_initialized = initialize_otel()
     otel_logging_initialized = False
@@ -76,40 +78,26 @@ async def lifespan(app: FastAPI):
         # Instrument SQLAlchemy
         instrument_sqlalchemy(engine)
         
-        # Start background tasks
-        logger.info("Starting scheduler tasks...")
-        from app.tasks.scheduler import scheduler_task, token_reset_scheduler_task
-        from app.tasks.cleanup import cleanup_task
-        from app.tasks.status_checker import status_checker_task
-        
-        asyncio.create_task(scheduler_task())
-        asyncio.create_task(token_reset_scheduler_task())
-        logger.info("Scheduler tasks started")
-        
-        # Start status checker task
-        logger.info("Starting status checker task...")
-        asyncio.create_task(status_checker_task())
-        logger.info("Status checker task started")
-        
-        # Start the cleanup task
-        logger.info("Starting cleanup task...")
-        asyncio.create_task(cleanup_task())
-        logger.info("Cleanup task started")
-        
-        # Start upload worker task
-        logger.info("Starting upload worker task...")
-        from app.tasks.upload_worker import upload_worker_task
-        asyncio.create_task(upload_worker_task())
-        logger.info("Upload worker task started")
+        # Start background roles that run in this process (may be none on API-only replicas)
+        from app.tasks.runner import parse_roles, start_role_tasks
+        background_roles = start_role_tasks(parse_roles(settings.IN_PROCESS_WORKER_ROLES))
         
         # Start WebSocket manager Redis subscription
         logger.info("Starting WebSocket manager...")
         from app.services.websocket_service import websocket_manager
         await websocket_manager.start_listening()
         logger.info("WebSocket manager started")
+        
+        # Drop in-process cache entries when other replicas/workers invalidate them
+        from app.db.local_cache import start_cache_invalidation_listener
+        start_cache_invalidation_listener()
     else:
         logger.info("Skipping database/Redis initialization in test environment (using test fixtures)")
     
+    # Pooled HTTP clients for platform APIs (TikTok, Instagram), shared by routes and background loops
+    from app.services.video.platforms.http_clients import open_platform_clients
+    open_platform_clients()
+    
     # Validate email service configuration (always run)
     from app.services.email_service import validate_email_config
     
@@ -124,6 +112,22 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down...")
+    
+    if background_roles:
+        # Stop background loops; the upload worker drains in-flight uploads first
+        from app.tasks.runner import stop_role_tasks
+        await stop_role_tasks(background_roles)
+    
+    # Send realtime events still held in a coalescing window
+    from app.services.event_service import flush_pending_events
+    await flush_pending_events()
+    
+    from app.db.local_cache import stop_cache_invalidation_listener
+    await stop_cache_invalidation_listener()
+    
+    # Close pooled platform API connections once nothing can use them anymore
+    from app.services.video.platforms.http_clients import close_platform_clients
+    await close_platform_clients()
 
 
 # Create FastAPI app
@@ -1,13 +1,218 @@
-"""Event publishing service for real-time updates via Redis pub/sub"""
+"""Event publishing service for real-time updates via Redis pub/sub
+
+Video status / update and upload progress events are coalesced per user: events
+arriving within EVENT_COALESCE_WINDOW of each other are merged (one event per
+video, the latest progress per video and platform) and published together in a
+single Redis pipeline. Snapshots are always sent in full: pub/sub drops messages
+while a client is disconnected and every process publishes, so a client can't be
+relied on to hold the state a delta would be computed against. Every other event is published immediately, after the user's pending events, so
+clients always receive events in the order they were published.
+"""
+import asyncio
+import copy
 import json
 import logging
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Hashable, List, Optional, Tuple
 
+from app.core.config import settings
+from app.core.metrics import realtime_events_counter
 from app.db.redis import get_async_redis_client
 
 logger = logging.getLogger(__name__)
 
+# Events merged per video within a window; a status change absorbs later updates of the same video
+_VIDEO_EVENTS = ("video_status_changed", "video_updated")
+
+
+def _event_channel(user_id: int, event_type: str) -> str:
+    """Default channel for an event type"""
+    if event_type.startswith('video_'):
+        return f"user:{user_id}:videos"
+    elif event_type == 'destination_toggled':
+        return f"user:{user_id}:destinations"
+    elif event_type == 'upload_progress':
+        return f"user:{user_id}:upload_progress"
+    elif event_type == 'settings_changed':
+        return f"user:{user_id}:settings"
+    elif event_type == 'token_balance_changed':
+        return f"user:{user_id}:tokens"
+    # Default to videos channel
+    return f"user:{user_id}:videos"
+
+
+def _serialize_event(event_type: str, data: Dict[str, Any]) -> str:
+    """Build the JSON message for an event"""
+    event_json = json.dumps({
+        "type": event_type,
+        "data": data,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    })
+    if len(event_json) > 1000000:  # 1MB warning
+        logger.warning(f"Large event payload: {len(event_json)} bytes for event {event_type}")
+    return event_json
+
+
+def _coalesce_key(event_type: str, data: Dict[str, Any]) -> Optional[Hashable]:
+    """Key under which an event merges with earlier pending events, or None if it is sent as is"""
+    video_id = data.get("video_id")
+    if video_id is None:
+        return None
+    if event_type in _VIDEO_EVENTS:
+        return ("video", video_id)
+    if event_type == "upload_progress":
+        return ("upload_progress", video_id, data.get("platform"))
+    return None
+
+
+def _merge_events(
+    earlier: Tuple[str, Dict[str, Any]],
+    later: Tuple[str, Dict[str, Any]]
+) -> Tuple[str, Dict[str, Any]]:
+    """Merge two pending events of the same video (or video/platform for progress)
+
+    The later event's fields win, except that a merged status change keeps the
+    first old_status, and a partial update (changes) is applied onto an earlier snapshot.
+    """
+    earlier_type, earlier_data = earlier
+    later_type, later_data = later
+    if later_type == "upload_progress":
+        return later
+
+    merged = dict(earlier_data)
+    changes = later_data.get("changes")
+    if "video" in later_data:
+        merged.pop("changes", None)
+    elif changes and "video" in merged:
+        merged["video"] = {**merged["video"], **changes}
+        later_data = {k: v for k, v in later_data.items() if k != "changes"}
+    elif changes:
+        merged["changes"] = {**merged.get("changes", {}), **changes}
+        later_data = {k: v for k, v in later_data.items() if k != "changes"}
+    merged.update(later_data)
+
+    if "video_status_changed" in (earlier_type, later_type):
+        if earlier_type == "video_status_changed":
+            merged["old_status"] = earlier_data["old_status"]
+        if later_type != "video_status_changed" and "video" in merged:
+            merged["new_status"] = merged["video"].get("status", merged["new_status"])
+        return "video_status_changed", merged
+    return "video_updated", merged
+
+
+class _PendingBatch:
+    """Events of one user waiting for their window to close"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.events: "OrderedDict[Hashable, Tuple[str, Dict[str, Any], str]]" = OrderedDict()
+        self.first_at = loop.time()
+        self.last_at = self.first_at
+        self.flush_task: Optional[asyncio.Task] = None
+
+
+class EventCoalescer:
+    """Per-user batching and debouncing of realtime events
+
+    Coalesced events are held until no new event arrived for EVENT_COALESCE_WINDOW
+    (but at most EVENT_COALESCE_MAX_DELAY), then published in one pipeline.
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, _PendingBatch] = {}
+
+    async def publish(self, user_id: int, event_type: str, data: Dict[str, Any], channel: Optional[str] = None) -> None:
+        """Queue a coalescible event, or publish any other event right after the user's pending ones"""
+        channel = channel or _event_channel(user_id, event_type)
+        key = _coalesce_key(event_type, data)
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(user_id)
+        # Events from another event loop (e.g. asyncio.run in a thread) bypass that loop's batch
+        if key is None or settings.EVENT_COALESCE_WINDOW <= 0 or (batch is not None and batch.loop is not loop):
+            await self.flush(user_id)
+            await self._publish_messages(user_id, [self._prepare(event_type, data, channel)])
+            return
+
+        if batch is None:
+            batch = self._pending[user_id] = _PendingBatch(loop)
+        # Callers may reuse their dicts after publishing - keep our own copy until the flush
+        event = (event_type, copy.deepcopy(data))
+        pending = batch.events.get(key)
+        if pending is not None:
+            realtime_events_counter.labels(event_type=pending[0], result="coalesced").inc()
+            event = _merge_events(pending[:2], event)
+        batch.events[key] = (*event, channel)
+        batch.last_at = loop.time()
+        if batch.flush_task is None:
+            batch.flush_task = asyncio.create_task(self._flush_when_quiet(user_id, batch))
+
+    async def _flush_when_quiet(self, user_id: int, batch: _PendingBatch) -> None:
+        """Flush a batch once its window closes (debounced, capped at the max delay)"""
+        while True:
+            due = min(
+                batch.last_at + settings.EVENT_COALESCE_WINDOW,
+                batch.first_at + settings.EVENT_COALESCE_MAX_DELAY
+            )
+            delay = due - batch.loop.time()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        if self._pending.get(user_id) is batch:
+            try:
+                await self.flush(user_id)
+            except Exception as e:
+                logger.error(f"Failed to publish coalesced events for user {user_id}: {e}", exc_info=True)
+
+    async def flush(self, user_id: int) -> None:
+        """Publish a user's pending events now"""
+        batch = self._pending.get(user_id)
+        # A batch of another event loop is left to its own timer
+        if batch is None or batch.loop is not asyncio.get_running_loop():
+            return
+        del self._pending[user_id]
+        if batch.flush_task is not None and batch.flush_task is not asyncio.current_task():
+            batch.flush_task.cancel()
+        messages = [
+            self._prepare(event_type, data, channel)
+            for event_type, data, channel in batch.events.values()
+        ]
+        await self._publish_messages(user_id, messages)
+
+    async def flush_all(self) -> None:
+        """Publish every user's pending events (shutdown)"""
+        for user_id in list(self._pending):
+            try:
+                await self.flush(user_id)
+            except Exception as e:
+                logger.error(f"Failed to publish pending events for user {user_id}: {e}", exc_info=True)
+
+    @staticmethod
+    def _prepare(event_type: str, data: Dict[str, Any], channel: str) -> Tuple[str, str, str]:
+        """(event_type, channel, json) for an event"""
+        realtime_events_counter.labels(event_type=event_type, result="published").inc()
+        return event_type, channel, _serialize_event(event_type, data)
+
+    async def _publish_messages(self, user_id: int, messages: List[Tuple[str, str, str]]) -> None:
+        """Publish messages in order - one PUBLISH, or one pipeline round trip for a batch"""
+        if not messages:
+            return
+        client = get_async_redis_client()
+        if len(messages) == 1:
+            event_type, channel, event_json = messages[0]
+            results = [await client.publish(channel, event_json)]
+        else:
+            async with client.pipeline(transaction=False) as pipe:
+                for _, channel, event_json in messages:
+                    pipe.publish(channel, event_json)
+                results = await pipe.execute()
+        for (event_type, channel, event_json), result in zip(messages, results):
+            logger.debug(f"Published {event_type} for user {user_id} to {channel} ({len(event_json)} bytes, {result} subscriber(s))")
+
+
+# Global coalescer instance
+event_coalescer = EventCoalescer()
+
 
 async def publish_event(
     user_id: int,
@@ -17,6 +222,9 @@ async def publish_event(
 ) -> None:
     """Publish an event to Redis pub/sub for real-time updates (async)
     
+    Video status / update and upload progress events are coalesced and published
+    shortly after; every other event is published before this returns.
+    
     Args:
         user_id: User ID to send event to
         event_type: Event type (e.g., 'video_added', 'video_status_changed')
@@ -24,49 +232,17 @@ async def publish_event(
         channel: Optional channel override (defaults to channel based on event type)
     """
     try:
-        # Determine channel if not provided
-        if not channel:
-            if event_type.startswith('video_'):
-                channel = f"user:{user_id}:videos"
-            elif event_type == 'destination_toggled':
-                channel = f"user:{user_id}:destinations"
-            elif event_type == 'upload_progress':
-                channel = f"user:{user_id}:upload_progress"
-            elif event_type == 'settings_changed':
-                channel = f"user:{user_id}:settings"
-            elif event_type == 'token_balance_changed':
-                channel = f"user:{user_id}:tokens"
-            else:
-                # Default to videos channel
-                channel = f"user:{user_id}:videos"
-        
-        # Build event message
-        event = {
-            "type": event_type,
-            "data": data,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        
-        # Serialize and check size
-        event_json = json.dumps(event)
-        event_size = len(event_json)
-        logger.info(f"Publishing event {event_type} to {channel}, size: {event_size} bytes")
-        
-        if event_size > 1000000:  # 1MB warning
-            logger.warning(f"Large event payload: {event_size} bytes for event {event_type}")
-        
-        # Publish to Redis using async client
-        result = await get_async_redis_client().publish(channel, event_json)
-        if result > 0:
-            logger.info(f"✓ Event {event_type} published successfully to {channel}: {result} subscriber(s) received it")
-        else:
-            logger.warning(f"⚠ Event {event_type} published to {channel} but no subscribers received it (result={result})")
-        
+        await event_coalescer.publish(user_id, event_type, data, channel)
     except Exception as e:
         logger.error(f"Failed to publish event {event_type} for user {user_id}: {e}", exc_info=True)
         raise  # Re-raise to surface the error
 
 
+async def flush_pending_events() -> None:
+    """Publish all coalesced events still waiting for their window (call on shutdown)"""
+    await event_coalescer.flush_all()
+
+
 # Convenience functions for specific event types
 
 async def publish_video_added(user_id: int, video_dict: dict) -> None:
@@ -136,7 +312,7 @@ async def publish_video_updated(
     Args:
         user_id: User ID
         video_id: Video ID
-        changes: Optional dict of specific changes (for partial updates)
+        changes: Optional dict of changed video fields (partial update, merged into the client's copy)
         video_dict: Optional full video data (backend is source of truth - preferred when available)
     """
     payload = {
@@ -22,7 +22,7 @@ youtube_logger = logging.getLogger("youtube")
 instagram_logger = logging.getLogger("instagram")
 
 
-def get_tiktok_account_info(
+async def get_tiktok_account_info(
     user_id: int,
     db: Session,
     force_refresh: bool = False
@@ -76,7 +76,7 @@ def get_tiktok_account_info(
     )
     
     # Ensure token is fresh (with distributed locking)
-    access_token = _ensure_fresh_token(user_id, db)
+    access_token = await _ensure_fresh_token(user_id, db)
     if not access_token:
         # Token refresh failed - return cached data if available
         if has_cache:
@@ -101,7 +101,7 @@ def get_tiktok_account_info(
     # Always fetch privacy_level_options synchronously (critical for UI)
     # This ensures the UI always has the latest privacy options
     try:
-        fresh_creator_info = _fetch_creator_info_safe(access_token, user_id, db=db)
+        fresh_creator_info = await _fetch_creator_info_safe(access_token, user_id, db=db)
         if fresh_creator_info:
             # ROOT CAUSE FIX: Extract and update display_name/username synchronously
             # This ensures account info is available immediately, not just in background task
@@ -422,6 +422,34 @@ class R2Service:
             logger.warning(f"Unexpected error getting object size for {object_key}: {e}")
             return None
     
+    def read_range(self, object_key: str, start: int, length: int) -> bytes:
+        """Read part of an object with a ranged GET
+        
+        Args:
+            object_key: R2 object key (path in bucket)
+            start: Offset of the first byte to read
+            length: Number of bytes to read
+            
+        Returns:
+            Bytes read (shorter than length if the object ends first)
+            
+        Raises:
+            ClientError: If the object can't be read
+        """
+        if length <= 0:
+            return b""
+        
+        response = self.s3_client.get_object(
+            Bucket=self.bucket,
+            Key=object_key,
+            Range=f"bytes={start}-{start + length - 1}"
+        )
+        body = response['Body']
+        try:
+            return body.read()
+        finally:
+            body.close()
+    
     def copy_object(self, source_key: str, dest_key: str) -> bool:
         """Copy object within same bucket (used for renaming)
         
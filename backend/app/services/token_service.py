@@ -374,6 +374,60 @@ async def deduct_tokens(
             db.close()
 
 
+async def charge_video_upload_tokens(
+    video: Video,
+    platform: str,
+    db: Session,
+    metadata: Optional[Dict[str, Any]] = None
+) -> int:
+    """Deduct a video's upload tokens on its first successful platform upload
+    
+    The charge is claimed with a single conditional UPDATE (tokens_consumed 0 ->
+    tokens_required) before deducting, so destinations finishing concurrently, or
+    the status checker in another process, never charge the same video twice.
+    
+    Args:
+        video: Uploaded video
+        platform: Platform whose upload succeeded
+        db: Database session
+        metadata: Extra transaction metadata (e.g. the platform's video ID)
+    
+    Returns:
+        Tokens deducted by this call (0 if the video was already charged or is free)
+    """
+    tokens_required = video.tokens_required if video.tokens_required is not None else (
+        calculate_tokens_from_bytes(video.file_size_bytes) if video.file_size_bytes else 0
+    )
+    if tokens_required <= 0:
+        return 0
+    
+    claimed = db.query(Video).filter(
+        Video.id == video.id,
+        Video.tokens_consumed == 0
+    ).update({Video.tokens_consumed: tokens_required}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        logger.info(f"Tokens already deducted for video {video.id}, skipping ({platform} upload)")
+        return 0
+    
+    await deduct_tokens(
+        user_id=video.user_id,
+        tokens=tokens_required,
+        transaction_type='upload',
+        video_id=video.id,
+        metadata={
+            'filename': video.filename,
+            'platform': platform,
+            **(metadata or {}),
+            'file_size_bytes': video.file_size_bytes,
+            'file_size_mb': round(video.file_size_bytes / (1024 * 1024), 2) if video.file_size_bytes else 0
+        },
+        db=db
+    )
+    logger.info(f"Deducted {tokens_required} tokens for user {video.user_id} ({platform}, first platform upload)")
+    return tokens_required
+
+
 async def add_tokens(
     user_id: int,
     tokens: int,
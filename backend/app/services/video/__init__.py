@@ -6,6 +6,7 @@ from app.services.video.registry import DESTINATION_UPLOADERS
 # Re-export all public functions from submodules
 from app.services.video.helpers import (
     format_platform_error,
+    UploadContext,
     build_upload_context,
     build_video_response,
     check_upload_success,
@@ -51,6 +52,7 @@ __all__ = [
     "upload_video_to_tiktok",
     "upload_video_to_instagram",
     "format_platform_error",
+    "UploadContext",
     "build_upload_context",
     "build_video_response",
     "check_upload_success",
@@ -1,5 +1,7 @@
 """Video service configuration constants"""
 
+from app.core.config import settings
+
 # Constants for redis locking
 TOKEN_REFRESH_LOCK_TIMEOUT = 10  # seconds
 DATA_REFRESH_COOLDOWN = 60  # seconds
@@ -41,3 +43,50 @@ PLATFORM_CONFIG = {
     },
 }
 
+# Quota units charged by the YouTube Data API per videos.insert
+YOUTUBE_VIDEO_INSERT_UNITS = 1600
+
+# Platform API rate limits - token bucket per (platform, endpoint, account), shared by all workers
+# (platform, endpoint): (sustained requests per second, burst)
+# Endpoints without an entry are not limited
+PLATFORM_RATE_LIMITS = {
+    # YouTube Data API: the project's daily units buy units/1600 inserts per day (shared by all users).
+    # A burst of 1 keeps any 24h window within one day's quota plus one insert.
+    ('youtube', 'videos.insert'): (settings.YOUTUBE_DAILY_QUOTA_UNITS / YOUTUBE_VIDEO_INSERT_UNITS / 86400, 1),
+    # TikTok Content Posting API limits are per user access token
+    ('tiktok', 'oauth_token'): (6 / 60, 6),
+    ('tiktok', 'creator_info'): (20 / 60, 20),
+    ('tiktok', 'video_init'): (
+        settings.TIKTOK_RATE_LIMIT_REQUESTS / settings.TIKTOK_RATE_LIMIT_WINDOW,
+        settings.TIKTOK_RATE_LIMIT_REQUESTS
+    ),
+    ('tiktok', 'publish_status'): (30 / 60, 30),
+    # Instagram Graph API: ~200 calls/hour per account, 50 published posts per 24h
+    ('instagram', 'graph_api'): (200 / 3600, 25),
+    ('instagram', 'media_publish'): (50 / 86400, 10),
+}
+
+# Endpoints that draw from another endpoint's bucket: (platform, endpoint) -> bucket endpoint
+PLATFORM_RATE_LIMIT_SHARED = {
+    # Container creation and status polls count against the same hourly call limit
+    ('instagram', 'media'): 'graph_api',
+    ('instagram', 'container_status'): 'graph_api',
+}
+
+# Limits whose quota belongs to our API project rather than to each user - one bucket for all accounts
+PLATFORM_RATE_LIMIT_PROJECT_WIDE = {('youtube', 'videos.insert')}
+
+# Longest a synchronous caller may block for a rate limit token before giving up
+PLATFORM_RATE_LIMIT_MAX_SYNC_WAIT = 2.0  # seconds
+
+# Longest an upload job may wait for a rate limit token while holding its worker slot;
+# beyond this the job is deferred until the token is due
+PLATFORM_RATE_LIMIT_MAX_WAIT = 120.0  # seconds
+
+# Default request timeout of each platform's shared HTTP client (see platforms/http_clients.py)
+PLATFORM_HTTP_TIMEOUTS = {
+    'tiktok': 30.0,
+    # Container creation waits for Instagram to accept the video URL
+    'instagram': 300.0,
+}
+PLATFORM_HTTP_DEFAULT_TIMEOUT = 30.0  # seconds
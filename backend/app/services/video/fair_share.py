@@ -0,0 +1,208 @@
+"""Fair-share admission for video uploads across users
+
+Every video upload takes a slot before it starts. While slots are free and the
+user is under UPLOAD_MAX_IN_FLIGHT_PER_USER it starts at once; otherwise it
+waits, and freed slots are handed out by deficit round-robin over the users
+with waiting uploads. Each turn adds the user's plan weight to their deficit
+and every video started costs 1, so a user with 500 queued videos gets their
+weighted share of UPLOAD_MAX_CONCURRENT_VIDEOS instead of all of it.
+
+Limits apply per process (each upload worker has its own scheduler).
+"""
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.subscription import Subscription
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLAN_WEIGHT = 1.0
+
+
+def parse_plan_weights(value: str) -> Dict[str, float]:
+    """Parse plan weights like "free:1,starter:2"
+    
+    Args:
+        value: Comma-separated plan_type:weight pairs
+        
+    Returns:
+        Weight per plan type
+        
+    Raises:
+        ValueError: If an entry is malformed or a weight is not positive
+    """
+    weights: Dict[str, float] = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        plan_type, sep, weight = entry.partition(":")
+        if not sep or float(weight) <= 0:
+            raise ValueError(f"Invalid upload plan weight: {entry.strip()!r} (expected plan_type:positive_number)")
+        weights[plan_type.strip()] = float(weight)
+    return weights
+
+
+def get_upload_weight(user_id: int, db: Session) -> float:
+    """Fair-share weight of a user, from their Subscription.plan_type
+    
+    Args:
+        user_id: User ID
+        db: Database session
+        
+    Returns:
+        Plan weight from UPLOAD_PLAN_WEIGHTS (DEFAULT_PLAN_WEIGHT if unknown or no subscription)
+    """
+    plan_type = db.query(Subscription.plan_type).filter(Subscription.user_id == user_id).scalar()
+    if plan_type is None:
+        return DEFAULT_PLAN_WEIGHT
+    return parse_plan_weights(settings.UPLOAD_PLAN_WEIGHTS).get(plan_type, DEFAULT_PLAN_WEIGHT)
+
+
+class FairShareScheduler:
+    """Weighted deficit round-robin slots for concurrent video uploads"""
+    
+    def __init__(self, max_concurrent: int, max_per_user: int):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self._in_flight_total = 0
+        self._in_flight: Dict[int, int] = {}
+        # Waiting uploads per user (FIFO) and users with waiters in round-robin order
+        self._waiters: Dict[int, Deque[asyncio.Future]] = {}
+        self._active: Deque[int] = deque()
+        self._weights: Dict[int, float] = {}
+        self._deficits: Dict[int, float] = {}
+    
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight_total
+    
+    def waiting(self, user_id: Optional[int] = None) -> int:
+        """Number of uploads waiting for a slot (for one user, or all)"""
+        if user_id is not None:
+            return len(self._waiters.get(user_id, ()))
+        return sum(len(queue) for queue in self._waiters.values())
+    
+    @asynccontextmanager
+    async def slot(self, user_id: int, weight: float = DEFAULT_PLAN_WEIGHT):
+        """Hold an upload slot for user_id for the duration of the block
+        
+        Args:
+            user_id: User the upload belongs to
+            weight: User's share relative to other users (see get_upload_weight)
+        """
+        await self._acquire(user_id, weight)
+        try:
+            yield
+        finally:
+            self._release(user_id)
+    
+    def _has_capacity(self, user_id: int) -> bool:
+        return (
+            self._in_flight_total < self.max_concurrent
+            and self._in_flight.get(user_id, 0) < self.max_per_user
+        )
+    
+    def _grant(self, user_id: int) -> None:
+        self._in_flight_total += 1
+        self._in_flight[user_id] = self._in_flight.get(user_id, 0) + 1
+    
+    async def _acquire(self, user_id: int, weight: float) -> None:
+        self._weights[user_id] = weight
+        
+        # Free slot and nobody of this user queued ahead: anyone still waiting is
+        # blocked by their own per-user cap, so starting now is fair
+        if not self._waiters.get(user_id) and self._has_capacity(user_id):
+            self._grant(user_id)
+            return
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, deque()).append(waiter)
+        if user_id not in self._active:
+            self._active.append(user_id)
+        
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted just as we were cancelled - hand it on
+                self._release(user_id)
+            else:
+                self._remove_waiter(user_id, waiter)
+            raise
+    
+    def _remove_waiter(self, user_id: int, waiter: asyncio.Future) -> None:
+        queue = self._waiters.get(user_id)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+        if not queue:
+            self._forget(user_id)
+    
+    def _forget(self, user_id: int) -> None:
+        """Drop round-robin state of a user with no waiting uploads"""
+        self._waiters.pop(user_id, None)
+        self._deficits.pop(user_id, None)
+        if user_id in self._active:
+            self._active.remove(user_id)
+        if not self._in_flight.get(user_id):
+            self._weights.pop(user_id, None)
+    
+    def _release(self, user_id: int) -> None:
+        self._in_flight_total -= 1
+        remaining = self._in_flight.get(user_id, 1) - 1
+        if remaining > 0:
+            self._in_flight[user_id] = remaining
+        else:
+            self._in_flight.pop(user_id, None)
+            if user_id not in self._waiters:
+                self._weights.pop(user_id, None)
+        self._dispatch()
+    
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting uploads in deficit round-robin order"""
+        blocked = 0
+        while self._in_flight_total < self.max_concurrent and self._active:
+            if blocked >= len(self._active):
+                # Every waiting user is at their per-user cap
+                return
+            
+            user_id = self._active[0]
+            queue = self._waiters[user_id]
+            if self._in_flight.get(user_id, 0) >= self.max_per_user:
+                # Capped users don't bank credit while they wait
+                self._deficits[user_id] = min(self._deficits.get(user_id, 0.0), self._weights[user_id])
+                self._active.rotate(-1)
+                blocked += 1
+                continue
+            blocked = 0
+            
+            # Start of a turn: add the user's quantum (a turn interrupted by a full
+            # scheduler resumes with the deficit it had left)
+            if self._deficits.get(user_id, 0.0) < 1:
+                self._deficits[user_id] = self._deficits.get(user_id, 0.0) + self._weights[user_id]
+            
+            while queue and self._deficits[user_id] >= 1 and self._has_capacity(user_id):
+                waiter = queue.popleft()
+                if waiter.done():
+                    # Cancelled while waiting
+                    continue
+                self._deficits[user_id] -= 1
+                self._grant(user_id)
+                waiter.set_result(None)
+            
+            if not queue:
+                self._forget(user_id)
+            elif self._deficits[user_id] < 1 or self._in_flight.get(user_id, 0) >= self.max_per_user:
+                self._active.rotate(-1)
+
+
+# Shared by every upload path in this process
+upload_fair_share = FairShareScheduler(
+    settings.UPLOAD_MAX_CONCURRENT_VIDEOS,
+    settings.UPLOAD_MAX_IN_FLIGHT_PER_USER
+)
@@ -632,19 +632,18 @@ async def delete_video_files(
             
             # Safety measure: Cancel any in-progress uploads before deletion (shouldn't reach here for uploading videos)
             # This handles edge cases where status might change between check and deletion
-            from app.services.video.orchestrator import _cancellation_flags
-            from app.db.redis import set_r2_upload_cancelled
+            from app.db.redis import set_r2_upload_cancelled, set_upload_cancelled
             from app.services.video.helpers import get_upload_state, build_upload_context
             
             # Get enabled destinations to check upload state
             upload_context = build_upload_context(video.user_id, db=db)
-            enabled_destinations = upload_context["enabled_destinations"]
+            enabled_destinations = upload_context.enabled_destinations
             
             # Get unified upload state to determine what needs to be cancelled
             upload_state = get_upload_state(video, video.user_id, enabled_destinations)
             
             # Set cancellation flag to stop any upload task
-            _cancellation_flags[video.id] = True
+            set_upload_cancelled(video.id)
             
             # Cancel R2 upload if in progress
             if upload_state['has_r2_upload']:
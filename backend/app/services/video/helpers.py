@@ -13,16 +13,16 @@ from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.db.helpers import (
-    get_user_settings, get_all_user_settings, get_all_oauth_tokens, get_oauth_token
+    get_user_settings, get_all_user_settings, get_all_oauth_tokens, get_oauth_token,
+    get_video_for_update
 )
-from app.db.redis import get_upload_progress, get_platform_upload_progress
+from app.db.redis import get_upload_progress, get_platform_upload_progress, get_tiktok_publish_status
 from app.models.oauth_token import OAuthToken
 from app.models.video import Video
 from app.utils.templates import (
     replace_template_placeholders, get_video_title, get_video_description
 )
 from app.services.video.config import PLATFORM_CONFIG
-from app.services.video.platforms.tiktok_api import fetch_tiktok_publish_status
 from datetime import datetime, timezone
 from typing import List
 
@@ -63,7 +63,67 @@ def should_publish_progress(current_progress: int, last_published_progress: int)
     return (current_progress - last_published_progress >= 1) or (current_progress == 100)
 
 
-def build_upload_context(user_id: int, db: Session) -> Dict[str, Any]:
+class UploadContext:
+    """Settings, OAuth tokens, enabled destinations and plan weight of one upload run
+    
+    Built once per run by build_upload_context and passed through the upload
+    pipeline (orchestrator, set_platform_status, status events), so every status
+    change can rebuild video_dict without reloading settings and tokens.
+    ensure_fresh reloads it only after the user's settings or tokens were
+    invalidated (e.g. a token refresh during the upload, or a settings change).
+    """
+    
+    def __init__(self, user_id: int, db: Session):
+        self.user_id = user_id
+        self._upload_weight: Optional[float] = None
+        self._load(db)
+    
+    def _load(self, db: Session) -> None:
+        from app.db.local_cache import get_invalidation_generation
+        
+        # Read the generation first, so an invalidation racing the load triggers a reload later
+        self.generation = get_invalidation_generation(self.user_id)
+        self.all_settings: Dict[str, Dict] = get_all_user_settings(self.user_id, db=db)
+        self.all_tokens: Dict[str, Optional[OAuthToken]] = get_all_oauth_tokens(self.user_id, db=db)
+        self.dest_settings: Dict[str, Any] = self.all_settings.get("destinations", {})
+        
+        # Determine enabled destinations
+        self.enabled_destinations: List[str] = []
+        for dest_name in ["youtube", "tiktok", "instagram"]:
+            is_enabled = self.dest_settings.get(f"{dest_name}_enabled", False)
+            has_token = self.all_tokens.get(dest_name) is not None
+            if is_enabled and has_token:
+                self.enabled_destinations.append(dest_name)
+    
+    def ensure_fresh(self, db: Session) -> "UploadContext":
+        """Reload settings and tokens if they were invalidated since the last load
+        
+        Args:
+            db: Database session used for the reload
+            
+        Returns:
+            This context (for chaining)
+        """
+        from app.db.local_cache import get_invalidation_generation
+        
+        if get_invalidation_generation(self.user_id) != self.generation:
+            self._load(db)
+        return self
+    
+    def upload_weight(self, db: Session) -> float:
+        """Fair-share weight of the user's plan (loaded on first use)"""
+        if self._upload_weight is None:
+            from app.services.video.fair_share import get_upload_weight
+            self._upload_weight = get_upload_weight(self.user_id, db)
+        return self._upload_weight
+    
+    def build_video_response(self, video: Video, db: Session) -> Dict[str, Any]:
+        """build_video_response with this context's (fresh) settings and tokens"""
+        self.ensure_fresh(db)
+        return build_video_response(video, self.all_settings, self.all_tokens, self.user_id)
+
+
+def build_upload_context(user_id: int, db: Session) -> UploadContext:
     """Build upload context for a user (enabled destinations, settings, tokens)
     
     Args:
@@ -71,28 +131,14 @@ def build_upload_context(user_id: int, db: Session) -> Dict[str, Any]:
         db: Database session
         
     Returns:
-        Dictionary with:
+        UploadContext with:
             - enabled_destinations: List of enabled destination names
             - dest_settings: Destination settings dict
+            - all_settings: All settings by category
             - all_tokens: All OAuth tokens dict
     """
-    # Batch load destination settings and OAuth tokens to prevent N+1 queries
-    dest_settings = get_user_settings(user_id, "destinations", db=db)
-    all_tokens = get_all_oauth_tokens(user_id, db=db)
-    
-    # Determine enabled destinations
-    enabled_destinations = []
-    for dest_name in ["youtube", "tiktok", "instagram"]:
-        is_enabled = dest_settings.get(f"{dest_name}_enabled", False)
-        has_token = all_tokens.get(dest_name) is not None
-        if is_enabled and has_token:
-            enabled_destinations.append(dest_name)
-    
-    return {
-        "enabled_destinations": enabled_destinations,
-        "dest_settings": dest_settings,
-        "all_tokens": all_tokens
-    }
+    # Batch load settings and OAuth tokens once to prevent N+1 queries
+    return UploadContext(user_id, db)
 
 
 def build_video_response(video: Video, all_settings: Dict[str, Dict], all_tokens: Dict[str, Optional[OAuthToken]], user_id: int) -> Dict[str, Any]:
@@ -258,15 +304,15 @@ def build_video_response(video: Video, all_settings: Dict[str, Dict], all_tokens
     # Add TikTok publish status if available
     tiktok_publish_id = custom_settings.get("tiktok_publish_id")
     if tiktok_publish_id and tiktok_token:
-        # Try to fetch current status (non-blocking - if it fails, we'll get it on next poll)
+        # Last status fetched by the status checker / upload polling (no TikTok call here)
         try:
-            status_data = fetch_tiktok_publish_status(user_id, tiktok_publish_id, db=None)
+            status_data = get_tiktok_publish_status(tiktok_publish_id)
             if status_data:
                 video_dict['tiktok_publish_status'] = status_data.get("status", "UNKNOWN")
                 if status_data.get("fail_reason"):
                     video_dict['tiktok_publish_error'] = status_data.get("fail_reason")
         except Exception:
-            # If fetch fails, don't block the response - background task will update it
+            # If the cache is unavailable, don't block the response - the next poll will update it
             pass
     
     return video_dict
@@ -489,7 +535,8 @@ async def set_platform_status(
     platform: str,
     status: str,
     error: Optional[str] = None,
-    db: Session = None
+    db: Session = None,
+    context: Optional[UploadContext] = None
 ) -> None:
     """Set status for a platform and update global status
     
@@ -500,12 +547,11 @@ async def set_platform_status(
         status: Status string ('pending', 'uploading', 'success', 'failed', 'cancelled')
         error: Optional error message (required if status is 'failed')
         db: Database session (optional)
+        context: Upload context of the running upload (optional - built here if omitted)
     """
     from app.db.session import SessionLocal
-    from app.db.helpers import update_video, get_user_settings
     from sqlalchemy.orm.attributes import flag_modified
     from app.services.event_service import publish_video_status_changed
-    from app.db.helpers import get_all_user_settings, get_all_oauth_tokens
     
     should_close = False
     if db is None:
@@ -513,10 +559,8 @@ async def set_platform_status(
         should_close = True
     
     try:
-        video = db.query(Video).filter(
-            Video.id == video_id,
-            Video.user_id == user_id
-        ).first()
+        # Fresh, locked row - other destinations write their statuses concurrently
+        video = get_video_for_update(video_id, user_id, db)
         
         if not video:
             return
@@ -537,19 +581,15 @@ async def set_platform_status(
         # Flag as modified so SQLAlchemy detects the change
         flag_modified(video, "custom_settings")
         
-        # Get enabled destinations to compute global status
-        dest_settings = get_user_settings(user_id, "destinations", db=db)
-        all_tokens = get_all_oauth_tokens(user_id, db=db)
-        enabled_destinations = []
-        for dest_name in ["youtube", "tiktok", "instagram"]:
-            is_enabled = dest_settings.get(f"{dest_name}_enabled", False)
-            has_token = all_tokens.get(dest_name) is not None
-            if is_enabled and has_token:
-                enabled_destinations.append(dest_name)
+        # Get enabled destinations to compute global status (settings/tokens loaded once per run)
+        if context is None:
+            context = build_upload_context(user_id, db)
+        else:
+            context.ensure_fresh(db)
         
         # Compute and update global status
         old_status = video.status
-        new_global_status = compute_global_status(video, enabled_destinations)
+        new_global_status = compute_global_status(video, context.enabled_destinations)
         
         # Update global status if it changed
         if old_status != new_global_status:
@@ -564,9 +604,7 @@ async def set_platform_status(
         db.refresh(video)
         
         # Publish WebSocket event with updated video data
-        all_settings = get_all_user_settings(user_id, db=db)
-        all_tokens = get_all_oauth_tokens(user_id, db=db)
-        video_dict = build_video_response(video, all_settings, all_tokens, user_id)
+        video_dict = context.build_video_response(video, db)
         await publish_video_status_changed(user_id, video_id, old_status, new_global_status, video_dict=video_dict)
         
     finally:
@@ -593,10 +631,7 @@ def record_platform_error(video_id: int, user_id: int, platform: str, error_mess
         should_close = True
     
     try:
-        video = db.query(Video).filter(
-            Video.id == video_id,
-            Video.user_id == user_id
-        ).first()
+        video = get_video_for_update(video_id, user_id, db)
         
         if not video:
             return
@@ -8,19 +8,22 @@ from typing import Any, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 
 from app.db.helpers import get_user_videos, get_user_settings, update_video
+from app.db.redis import notify_scheduler, set_upload_cancelled, is_upload_cancelled, clear_upload_cancelled
 from app.db.session import SessionLocal
 from app.models.video import Video
+from app.services.video.fair_share import upload_fair_share
+from app.services.video.platforms.rate_limiter import PlatformRateLimitExceeded
 from app.services.token_service import check_tokens_available, get_token_balance, calculate_tokens_from_bytes
 from app.services.video.helpers import (
-    build_upload_context, check_upload_success, record_platform_error,
+    UploadContext, build_upload_context, check_upload_success, record_platform_error,
     set_platform_status, compute_global_status, is_video_cancellable,
-    build_video_response, get_upload_state, get_all_platform_statuses
+    get_upload_state, get_all_platform_statuses
 )
 
 upload_logger = logging.getLogger("upload")
 
-# Track cancellation requests by video_id (thread-safe for async operations)
-_cancellation_flags: Dict[int, bool] = {}
+# Seconds between cancellation checks while destination uploads run
+CANCEL_POLL_INTERVAL = 1.0
 
 
 def calculate_scheduled_time(
@@ -79,11 +82,158 @@ def calculate_scheduled_time(
     return scheduled_time
 
 
+async def _upload_to_destination(
+    video_id: int,
+    user_id: int,
+    dest_name: str,
+    context: Optional[UploadContext] = None
+) -> str:
+    """Upload a video to one destination and record its platform status
+    
+    Errors are contained here so a failing destination never affects the others.
+    Runs on its own database session - sessions must not be shared across the
+    video's concurrent destination uploads.
+    
+    Args:
+        video_id: Video ID to upload
+        user_id: User ID
+        dest_name: Destination name
+        context: Upload context reused by the status updates
+    
+    Returns:
+        "success", "failed", "cancelled", or "skipped" if no uploader is registered
+    
+    Raises:
+        PlatformRateLimitExceeded: If the destination has to wait for its quota (status back to pending)
+    """
+    from app.services.video import DESTINATION_UPLOADERS
+    
+    uploader_func = DESTINATION_UPLOADERS.get(dest_name)
+    if not uploader_func:
+        return "skipped"
+    
+    db = SessionLocal()
+    try:
+        # Set platform status to uploading before starting
+        await set_platform_status(video_id, user_id, dest_name, "uploading", error=None, db=db, context=context)
+        
+        await uploader_func(user_id, video_id, db=db)
+        
+        # Check if upload succeeded
+        updated_video = db.query(Video).filter(Video.id == video_id).first()
+        if updated_video and check_upload_success(updated_video, dest_name):
+            await set_platform_status(video_id, user_id, dest_name, "success", error=None, db=db, context=context)
+            return "success"
+        
+        # Upload didn't succeed - check if there's an error recorded
+        platform_errors = ((updated_video.custom_settings if updated_video else None) or {}).get("platform_errors", {})
+        error_msg = platform_errors.get(dest_name, "Upload failed")
+        await set_platform_status(video_id, user_id, dest_name, "failed", error=error_msg, db=db, context=context)
+        return "failed"
+    except PlatformRateLimitExceeded as rate_limited:
+        # Not a failure - the destination is retried when the job runs again
+        upload_logger.info(f"Deferring {dest_name} upload of video {video_id}: {rate_limited}")
+        await set_platform_status(video_id, user_id, dest_name, "pending", error=None, db=db, context=context)
+        raise
+    except Exception as upload_err:
+        # Check if error is due to cancellation
+        if "cancelled by user" in str(upload_err).lower():
+            upload_logger.info(f"Upload cancelled for {dest_name}: {upload_err}")
+            await set_platform_status(video_id, user_id, dest_name, "cancelled", error="Upload cancelled by user", db=db, context=context)
+            return "cancelled"
+        
+        upload_logger.error(f"Upload failed for {dest_name}: {upload_err}")
+        # Record platform-specific error and set status to failed
+        record_platform_error(video_id, user_id, dest_name, str(upload_err), db=db)
+        await set_platform_status(video_id, user_id, dest_name, "failed", error=str(upload_err), db=db, context=context)
+        return "failed"
+    finally:
+        db.close()
+
+
+async def upload_to_destinations(
+    video_id: int,
+    user_id: int,
+    enabled_destinations: list,
+    db: Session,
+    context: Optional[UploadContext] = None
+) -> Dict[str, str]:
+    """Upload a video to all enabled destinations concurrently
+    
+    Each destination runs as its own task on its own database session, so total
+    time is that of the slowest destination rather than the sum. Uploaders only
+    merge their own keys into custom_settings and leave the global status to
+    set_platform_status, so concurrent destinations never overwrite each other.
+    
+    The video's cancellation flag is checked every CANCEL_POLL_INTERVAL seconds;
+    once set, destinations still uploading are cancelled and marked cancelled,
+    while finished ones keep their result.
+    
+    Args:
+        video_id: Video ID to upload
+        user_id: User ID
+        enabled_destinations: List of enabled destination names
+        db: Database session (for the final status of cancelled destinations)
+        context: Upload context shared by the destinations' status updates (built once if omitted)
+    
+    Returns:
+        Result per destination: "success", "failed", "cancelled" or "skipped"
+    
+    Raises:
+        PlatformRateLimitExceeded: If a destination has to wait longer for its quota than a job may
+            (the longest wait, raised after the other destinations finished; not when cancelled)
+    """
+    if context is None:
+        context = build_upload_context(user_id, db)
+    
+    tasks = {
+        dest_name: asyncio.create_task(_upload_to_destination(video_id, user_id, dest_name, context))
+        for dest_name in enabled_destinations
+    }
+    
+    try:
+        pending = set(tasks.values())
+        while pending:
+            _, pending = await asyncio.wait(pending, timeout=CANCEL_POLL_INTERVAL)
+            if pending and is_upload_cancelled(video_id):
+                upload_logger.info(f"Upload cancelled for video {video_id}, stopping {len(pending)} destination upload(s)")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                pending = set()
+    finally:
+        # Never leave destination uploads running if this coroutine is cancelled
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+    
+    clear_upload_cancelled(video_id)
+    
+    results: Dict[str, str] = {}
+    deferred = []
+    for dest_name, task in tasks.items():
+        if task.cancelled():
+            await set_platform_status(video_id, user_id, dest_name, "cancelled", error="Upload cancelled by user", db=db, context=context)
+            results[dest_name] = "cancelled"
+        elif isinstance(task.exception(), PlatformRateLimitExceeded):
+            deferred.append(task.exception())
+            results[dest_name] = "deferred"
+        elif task.exception() is not None:
+            upload_logger.error(f"Upload failed for {dest_name}: {task.exception()}")
+            results[dest_name] = "failed"
+        else:
+            results[dest_name] = task.result()
+    
+    if deferred and "cancelled" not in results.values():
+        raise max(deferred, key=lambda error: error.retry_after)
+    return results
+
+
 async def _upload_single_video_to_destinations(
     video_id: int,
     user_id: int,
     enabled_destinations: list,
-    upload_context: Dict[str, Any]
+    upload_context: UploadContext
 ) -> Tuple[str, int]:  # Returns (result: "succeeded"|"failed"|"cancelled", video_id)
     """Upload a single video to all enabled destinations
     
@@ -94,7 +244,7 @@ async def _upload_single_video_to_destinations(
         video_id: Video ID to upload
         user_id: User ID
         enabled_destinations: List of enabled destination names
-        upload_context: Upload context dict (for settings, tokens, etc.)
+        upload_context: Upload context of the run (settings, tokens), reused for every status event
     
     Returns:
         Tuple of (result, video_id) where result is "succeeded", "failed", or "cancelled"
@@ -102,9 +252,6 @@ async def _upload_single_video_to_destinations(
     # Create a new database session for this concurrent task
     db = SessionLocal()
     try:
-        # Import DESTINATION_UPLOADERS
-        from app.services.video import DESTINATION_UPLOADERS
-        
         # Get video from database
         from app.models.video import Video as VideoModel
         video = db.query(VideoModel).filter(VideoModel.id == video_id).first()
@@ -130,11 +277,7 @@ async def _upload_single_video_to_destinations(
                 # Refresh video and build full response
                 db.refresh(video)
                 from app.services.event_service import publish_video_status_changed
-                from app.services.video.helpers import build_video_response
-                from app.db.helpers import get_all_user_settings, get_all_oauth_tokens
-                all_settings = get_all_user_settings(user_id, db=db)
-                all_tokens = get_all_oauth_tokens(user_id, db=db)
-                video_dict = build_video_response(video, all_settings, all_tokens, user_id)
+                video_dict = upload_context.build_video_response(video, db)
                 
                 # Publish status change event
                 await publish_video_status_changed(user_id, video_id, old_status, "failed", video_dict=video_dict)
@@ -142,20 +285,16 @@ async def _upload_single_video_to_destinations(
                 return ("failed", video_id)
         
         # Check if upload was cancelled before starting
-        if _cancellation_flags.get(video_id, False):
+        if is_upload_cancelled(video_id):
             upload_logger.info(f"Upload cancelled for video {video_id} before starting")
-            _cancellation_flags.pop(video_id, None)
+            clear_upload_cancelled(video_id)
             old_status = video.status
             update_video(video_id, user_id, db=db, status="cancelled", error="Upload cancelled by user")
             
             # Refresh video and build full response
             db.refresh(video)
             from app.services.event_service import publish_video_status_changed
-            from app.services.video.helpers import build_video_response
-            from app.db.helpers import get_all_user_settings, get_all_oauth_tokens
-            all_settings = get_all_user_settings(user_id, db=db)
-            all_tokens = get_all_oauth_tokens(user_id, db=db)
-            video_dict = build_video_response(video, all_settings, all_tokens, user_id)
+            video_dict = upload_context.build_video_response(video, db)
             
             await publish_video_status_changed(user_id, video_id, old_status, "cancelled", video_dict=video_dict)
             return ("cancelled", video_id)
@@ -168,16 +307,12 @@ async def _upload_single_video_to_destinations(
             update_video(video_id, user_id, db=db, status="uploading")
         
         # Clear any previous cancellation flag
-        _cancellation_flags.pop(video_id, None)
+        clear_upload_cancelled(video_id)
         
         # Refresh video and build full response
         db.refresh(video)
         from app.services.event_service import publish_video_status_changed
-        from app.services.video.helpers import build_video_response
-        from app.db.helpers import get_all_user_settings, get_all_oauth_tokens
-        all_settings = get_all_user_settings(user_id, db=db)
-        all_tokens = get_all_oauth_tokens(user_id, db=db)
-        video_dict = build_video_response(video, all_settings, all_tokens, user_id)
+        video_dict = upload_context.build_video_response(video, db)
         
         # Publish status change event
         await publish_video_status_changed(user_id, video_id, old_status, "uploading", video_dict=video_dict)
@@ -193,64 +328,11 @@ async def _upload_single_video_to_destinations(
         flag_modified(video, "custom_settings")
         db.commit()
         
-        # Track if upload was cancelled during processing
-        upload_cancelled = False
-        
-        # Upload to all enabled destinations
-        for dest_name in enabled_destinations:
-            # Check for cancellation before each destination
-            if _cancellation_flags.get(video_id, False):
-                upload_logger.info(f"Upload cancelled for video {video_id} during {dest_name} upload")
-                _cancellation_flags.pop(video_id, None)
-                
-                # Set all remaining platforms to cancelled
-                for remaining_dest in enabled_destinations[enabled_destinations.index(dest_name):]:
-                    await set_platform_status(video_id, user_id, remaining_dest, "cancelled", error="Upload cancelled by user", db=db)
-                
-                upload_cancelled = True
-                break  # Exit destination loop
-            
-            uploader_func = DESTINATION_UPLOADERS.get(dest_name)
-            if uploader_func:
-                try:
-                    # Set platform status to uploading before starting
-                    await set_platform_status(video_id, user_id, dest_name, "uploading", error=None, db=db)
-                    
-                    await uploader_func(user_id, video_id, db=db)
-                    
-                    # Check if upload succeeded
-                    updated_video = db.query(VideoModel).filter(VideoModel.id == video_id).first()
-                    if updated_video and check_upload_success(updated_video, dest_name):
-                        # Set platform status to success
-                        await set_platform_status(video_id, user_id, dest_name, "success", error=None, db=db)
-                    else:
-                        # Upload didn't succeed - check if there's an error recorded
-                        platform_errors = (updated_video.custom_settings or {}).get("platform_errors", {})
-                        error_msg = platform_errors.get(dest_name, "Upload failed")
-                        await set_platform_status(video_id, user_id, dest_name, "failed", error=error_msg, db=db)
-                    
-                    # Check for cancellation after each upload
-                    if _cancellation_flags.get(video_id, False):
-                        upload_logger.info(f"Upload cancelled for video {video_id} after {dest_name} upload")
-                        _cancellation_flags.pop(video_id, None)
-                        
-                        # Set platform status to cancelled
-                        await set_platform_status(video_id, user_id, dest_name, "cancelled", error="Upload cancelled by user", db=db)
-                        
-                        upload_cancelled = True
-                        break  # Exit destination loop
-                except Exception as upload_err:
-                    # Check if error is due to cancellation
-                    if "cancelled by user" in str(upload_err).lower():
-                        upload_logger.info(f"Upload cancelled for {dest_name}: {upload_err}")
-                        await set_platform_status(video_id, user_id, dest_name, "cancelled", error="Upload cancelled by user", db=db)
-                        upload_cancelled = True
-                        break
-                    else:
-                        upload_logger.error(f"Upload failed for {dest_name}: {upload_err}")
-                        # Record platform-specific error and set status to failed
-                        record_platform_error(video_id, user_id, dest_name, str(upload_err), db=db)
-                        await set_platform_status(video_id, user_id, dest_name, "failed", error=str(upload_err), db=db)
+        # Upload to all enabled destinations concurrently - a deferred run must not post
+        # again where an earlier attempt already succeeded
+        remaining = [dest for dest in enabled_destinations if not check_upload_success(video, dest)]
+        results = await upload_to_destinations(video_id, user_id, remaining, db, upload_context)
+        upload_cancelled = "cancelled" in results.values()
         
         # Skip final status check if upload was cancelled
         if upload_cancelled:
@@ -296,9 +378,7 @@ async def _upload_single_video_to_destinations(
                 db.refresh(updated_video)
                 
                 # Build full video response
-                all_settings = get_all_user_settings(user_id, db=db)
-                all_tokens = get_all_oauth_tokens(user_id, db=db)
-                video_dict = build_video_response(updated_video, all_settings, all_tokens, user_id)
+                video_dict = upload_context.build_video_response(updated_video, db)
                 
                 # Publish status change event
                 await publish_video_status_changed(user_id, video_id, old_status, new_global_status, video_dict=video_dict)
@@ -312,6 +392,9 @@ async def _upload_single_video_to_destinations(
                 return ("failed", video_id)
         
         return ("failed", video_id)
+    except PlatformRateLimitExceeded:
+        # Video stays uploading with the waiting destinations pending; upload_all_pending_videos defers the job
+        raise
     except Exception as e:
         upload_logger.error(f"Error uploading video {video_id} for user {user_id}: {e}", exc_info=True)
         # Update video status to failed
@@ -324,6 +407,18 @@ async def _upload_single_video_to_destinations(
         db.close()
 
 
+async def _fair_share_upload(
+    video_id: int,
+    user_id: int,
+    enabled_destinations: list,
+    upload_context: UploadContext,
+    weight: float
+) -> Tuple[str, int]:
+    """Upload a single video once the fair-share scheduler grants it a slot"""
+    async with upload_fair_share.slot(user_id, weight):
+        return await _upload_single_video_to_destinations(video_id, user_id, enabled_destinations, upload_context)
+
+
 async def upload_all_pending_videos(
     user_id: int,
     db: Session
@@ -338,10 +433,14 @@ async def upload_all_pending_videos(
     
     Returns:
         Dict with 'ok', 'message', and upload statistics
+    
+    Raises:
+        PlatformRateLimitExceeded: If some destination has to wait for its quota - once the
+            other uploads finished, so the worker can defer the job by retry_after
     """
     # Build upload context (enabled destinations, settings, tokens)
     upload_context = build_upload_context(user_id, db)
-    enabled_destinations = upload_context["enabled_destinations"]
+    enabled_destinations = upload_context.enabled_destinations
     
     upload_logger.debug(f"Checking destinations for user {user_id}...")
     upload_logger.info(f"Enabled destinations for user {user_id}: {enabled_destinations}")
@@ -352,8 +451,12 @@ async def upload_all_pending_videos(
         raise ValueError(error_msg)
     
     # Get videos that can be uploaded: pending, failed (retry), uploading (retry if stuck), or cancelled (retry)
+    # Scheduled videos that are uploading are claimed by a scheduler job (recovered by the scheduler if lost)
     user_videos = get_user_videos(user_id, db=db)
-    pending_videos = [v for v in user_videos if v.status in ['pending', 'failed', 'uploading', 'cancelled']]
+    pending_videos = [
+        v for v in user_videos
+        if v.status in ['pending', 'failed', 'cancelled'] or (v.status == 'uploading' and v.scheduled_time is None)
+    ]
     
     upload_logger.info(f"Videos ready to upload for user {user_id}: {len(pending_videos)}")
     
@@ -376,27 +479,33 @@ async def upload_all_pending_videos(
     
     # If upload immediately is enabled, upload all at once to all enabled destinations
     if upload_immediately:
-        # Create concurrent tasks for all videos
+        # Create concurrent tasks for all videos - each waits for a fair-share slot,
+        # so a large batch is interleaved with other users' uploads
+        weight = upload_context.upload_weight(db)
         tasks = [
-            _upload_single_video_to_destinations(
+            _fair_share_upload(
                 video.id,
                 user_id,
                 enabled_destinations,
-                upload_context
+                upload_context,
+                weight
             )
             for video in pending_videos
         ]
         
-        # Run all uploads concurrently
+        # Run all uploads concurrently (bounded by the fair-share scheduler)
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Count results
         videos_succeeded = 0
         videos_failed = 0
         videos_cancelled = 0
+        deferred = []
         
         for result in results:
-            if isinstance(result, Exception):
+            if isinstance(result, PlatformRateLimitExceeded):
+                deferred.append(result)
+            elif isinstance(result, Exception):
                 upload_logger.error(f"Exception in concurrent upload: {result}", exc_info=True)
                 videos_failed += 1
             else:
@@ -408,6 +517,10 @@ async def upload_all_pending_videos(
                 elif result_type == "cancelled":
                     videos_cancelled += 1
         
+        if deferred:
+            upload_logger.info(f"{len(deferred)} video(s) of user {user_id} wait for a platform quota, deferring the upload job")
+            raise max(deferred, key=lambda error: error.retry_after)
+        
         # Build appropriate message based on results
         if videos_succeeded > 0 and videos_failed == 0 and videos_cancelled == 0:
             message = f"Successfully uploaded {videos_succeeded} video(s) to all enabled destinations"
@@ -434,6 +547,10 @@ async def upload_all_pending_videos(
             update_video(video.id, user_id, db=db, status="scheduled", scheduled_time=scheduled_time)
             scheduled_count += 1
         
+        # Wake the scheduler in case the first video is due before its next pass
+        if scheduled_count:
+            notify_scheduler()
+        
         return {
             "ok": True,
             "message": f"Scheduled {scheduled_count} video(s) for upload",
@@ -485,7 +602,7 @@ async def retry_failed_upload(
         )
     
     # Clear all cancellation flags on retry
-    _cancellation_flags.pop(video_id, None)
+    clear_upload_cancelled(video_id)
     from app.db.redis import clear_r2_upload_cancelled
     clear_r2_upload_cancelled(video_id)
     
@@ -497,14 +614,13 @@ async def retry_failed_upload(
     
     # Publish websocket event so frontend updates immediately
     from app.services.event_service import publish_video_status_changed
-    from app.services.video.helpers import build_video_response
-    from app.db.helpers import get_all_user_settings, get_all_oauth_tokens
+    
+    # Build upload context once (settings, tokens, enabled destinations) for every event of this retry
+    upload_context = build_upload_context(user_id, db)
     
     # Refresh video and build full response (backend is source of truth)
     db.refresh(video)
-    all_settings = get_all_user_settings(user_id, db=db)
-    all_tokens = get_all_oauth_tokens(user_id, db=db)
-    video_dict = build_video_response(video, all_settings, all_tokens, user_id)
+    video_dict = upload_context.build_video_response(video, db)
     
     # Publish status change event with full video data and queue token count
     from app.services.token_service import get_queue_token_count
@@ -513,8 +629,7 @@ async def retry_failed_upload(
     
     # Trigger upload immediately
     # Get enabled destinations
-    upload_context = build_upload_context(user_id, db)
-    enabled_destinations = upload_context["enabled_destinations"]
+    enabled_destinations = upload_context.enabled_destinations
     
     if not enabled_destinations:
         raise ValueError("No enabled destinations. Enable at least one destination first.")
@@ -531,7 +646,7 @@ async def retry_failed_upload(
             if platform_status in ["failed", "cancelled"]:
                 platforms_to_retry.append(dest_name)
                 # Reset failed platform status to pending for retry
-                await set_platform_status(video_id, user_id, dest_name, "pending", error=None, db=db)
+                await set_platform_status(video_id, user_id, dest_name, "pending", error=None, db=db, context=upload_context)
         if not platforms_to_retry:
             raise ValueError("No failed platforms to retry. All platforms already succeeded.")
     else:
@@ -552,20 +667,18 @@ async def retry_failed_upload(
         # Set status to uploading and publish event so frontend knows upload started
         update_video(video_id, user_id, db=db, status="uploading")
         db.refresh(retry_video)
-        all_settings = get_all_user_settings(user_id, db=db)
-        all_tokens = get_all_oauth_tokens(user_id, db=db)
-        video_dict = build_video_response(retry_video, all_settings, all_tokens, user_id)
+        video_dict = upload_context.build_video_response(retry_video, db)
         await publish_video_status_changed(user_id, video_id, "pending", "uploading", video_dict=video_dict)
     
     for dest_name in platforms_to_retry:
         # Check for cancellation before each destination
-        if _cancellation_flags.get(video_id, False):
+        if is_upload_cancelled(video_id):
             upload_logger.info(f"Retry upload cancelled for video {video_id} during {dest_name} upload")
-            _cancellation_flags.pop(video_id, None)
+            clear_upload_cancelled(video_id)
             
             # Set all remaining platforms to cancelled
             for remaining_dest in platforms_to_retry[platforms_to_retry.index(dest_name):]:
-                await set_platform_status(video_id, user_id, remaining_dest, "cancelled", error="Upload cancelled by user", db=db)
+                await set_platform_status(video_id, user_id, remaining_dest, "cancelled", error="Upload cancelled by user", db=db, context=upload_context)
             
             upload_cancelled = True
             break  # Exit destination loop
@@ -581,15 +694,15 @@ async def retry_failed_upload(
                     uploader_func(user_id, video_id, db=db)
                 
                 # Set platform status to uploading before starting
-                await set_platform_status(video_id, user_id, dest_name, "uploading", error=None, db=db)
+                await set_platform_status(video_id, user_id, dest_name, "uploading", error=None, db=db, context=upload_context)
                 
                 # Check for cancellation after each upload
-                if _cancellation_flags.get(video_id, False):
+                if is_upload_cancelled(video_id):
                     upload_logger.info(f"Retry upload cancelled for video {video_id} after {dest_name} upload")
-                    _cancellation_flags.pop(video_id, None)
+                    clear_upload_cancelled(video_id)
                     
                     # Set platform status to cancelled
-                    await set_platform_status(video_id, user_id, dest_name, "cancelled", error="Upload cancelled by user", db=db)
+                    await set_platform_status(video_id, user_id, dest_name, "cancelled", error="Upload cancelled by user", db=db, context=upload_context)
                     
                     upload_cancelled = True
                     break  # Exit destination loop
@@ -600,24 +713,24 @@ async def retry_failed_upload(
                 if updated_video and check_upload_success(updated_video, dest_name):
                     succeeded_destinations.append(dest_name)
                     # Set platform status to success
-                    await set_platform_status(video_id, user_id, dest_name, "success", error=None, db=db)
+                    await set_platform_status(video_id, user_id, dest_name, "success", error=None, db=db, context=upload_context)
                 else:
                     # Upload didn't succeed - check if there's an error recorded
                     platform_errors = (updated_video.custom_settings or {}).get("platform_errors", {})
                     error_msg = platform_errors.get(dest_name, "Upload failed")
-                    await set_platform_status(video_id, user_id, dest_name, "failed", error=error_msg, db=db)
+                    await set_platform_status(video_id, user_id, dest_name, "failed", error=error_msg, db=db, context=upload_context)
             except Exception as upload_err:
                 # Check if error is due to cancellation
                 if "cancelled by user" in str(upload_err).lower():
                     upload_logger.info(f"Retry upload cancelled for {dest_name}: {upload_err}")
-                    await set_platform_status(video_id, user_id, dest_name, "cancelled", error="Upload cancelled by user", db=db)
+                    await set_platform_status(video_id, user_id, dest_name, "cancelled", error="Upload cancelled by user", db=db, context=upload_context)
                     upload_cancelled = True
                     break
                 else:
                     upload_logger.error(f"Retry upload failed for {dest_name}: {upload_err}")
                     # Record platform-specific error and set status to failed
                     record_platform_error(video_id, user_id, dest_name, str(upload_err), db=db)
-                    await set_platform_status(video_id, user_id, dest_name, "failed", error=str(upload_err), db=db)
+                    await set_platform_status(video_id, user_id, dest_name, "failed", error=str(upload_err), db=db, context=upload_context)
     
     # If upload was cancelled, return early
     if upload_cancelled:
@@ -704,7 +817,6 @@ async def cancel_upload(video_id: int, user_id: int, db: Session) -> Dict[str, A
         Dict with 'ok' and 'message' keys
     """
     from app.db.redis import set_r2_upload_cancelled
-    from app.db.helpers import get_all_user_settings, get_all_oauth_tokens
     from app.services.event_service import publish_video_status_changed
     
     # Verify video belongs to user
@@ -718,7 +830,7 @@ async def cancel_upload(video_id: int, user_id: int, db: Session) -> Dict[str, A
     
     # Get enabled destinations to check platform statuses
     upload_context = build_upload_context(user_id, db=db)
-    enabled_destinations = upload_context["enabled_destinations"]
+    enabled_destinations = upload_context.enabled_destinations
     
     # Check if video is cancellable using unified upload state detection
     if not is_video_cancellable(video, enabled_destinations, user_id):
@@ -767,7 +879,7 @@ async def cancel_upload(video_id: int, user_id: int, db: Session) -> Dict[str, A
     
     # Cancel destination uploads - set flag FIRST to stop any in-progress uploads
     # This must happen before updating platform statuses to prevent race conditions
-    _cancellation_flags[video_id] = True
+    set_upload_cancelled(video_id)
     
     # Cancel ALL platforms that are not already in final state (success/failed)
     # This ensures we cancel any remaining uploads even if some already succeeded
@@ -778,7 +890,7 @@ async def cancel_upload(video_id: int, user_id: int, db: Session) -> Dict[str, A
         # Cancel if platform is still uploading or pending
         if platform_status in ["uploading", "pending"]:
             await set_platform_status(video_id, user_id, platform, "cancelled", 
-                                     error="Upload cancelled by user", db=db)
+                                     error="Upload cancelled by user", db=db, context=upload_context)
             cancelled_any = True
     
     # Force status to "cancelled" if we cancelled anything, or if status is "partial"
@@ -794,9 +906,7 @@ async def cancel_upload(video_id: int, user_id: int, db: Session) -> Dict[str, A
     
     # Publish status change event for immediate UI update
     db.refresh(video)
-    all_settings = get_all_user_settings(user_id, db=db)
-    all_tokens = get_all_oauth_tokens(user_id, db=db)
-    video_dict = build_video_response(video, all_settings, all_tokens, user_id)
+    video_dict = upload_context.build_video_response(video, db)
     
     await publish_video_status_changed(user_id, video_id, old_status, new_status, video_dict=video_dict)
     
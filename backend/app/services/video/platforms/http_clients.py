@@ -0,0 +1,91 @@
+"""Shared HTTP clients for platform APIs
+
+One long-lived, pooled client per platform per process, so TikTok and
+Instagram requests (including status polls) reuse keep-alive connections
+instead of paying a TCP + TLS handshake on every call. HTTP/2 is used when
+the h2 package is installed (httpx[http2]), letting concurrent requests to
+the same host share one connection.
+
+Clients are opened in the API lifespan / worker startup and closed on
+shutdown. They are also created lazily on first use, so code running
+outside those (scripts, tests) gets one too.
+"""
+import asyncio
+import importlib.util
+import logging
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.services.video.config import PLATFORM_HTTP_TIMEOUTS, PLATFORM_HTTP_DEFAULT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Async clients are bound to the event loop they were created on
+_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+_http2_available: Optional[bool] = None
+
+
+def _use_http2() -> bool:
+    """Whether clients negotiate HTTP/2 (enabled and h2 installed)"""
+    global _http2_available
+    if not settings.PLATFORM_HTTP2:
+        return False
+    if _http2_available is None:
+        _http2_available = importlib.util.find_spec("h2") is not None
+        if not _http2_available:
+            logger.warning("PLATFORM_HTTP2 is enabled but h2 is not installed - platform clients use HTTP/1.1")
+    return _http2_available
+
+
+def _client_options(platform: str) -> dict:
+    """Pool limits and timeout for a platform's client"""
+    return {
+        "timeout": PLATFORM_HTTP_TIMEOUTS.get(platform, PLATFORM_HTTP_DEFAULT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=settings.PLATFORM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PLATFORM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.PLATFORM_HTTP_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def get_platform_client(platform: str) -> httpx.AsyncClient:
+    """Shared async client for a platform (created on first use)
+
+    Do not close the returned client - it is closed by close_platform_clients.
+
+    Args:
+        platform: Platform name (tiktok, instagram)
+
+    Returns:
+        Pooled httpx.AsyncClient bound to the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(platform)
+    if entry is not None and entry[0] is loop and not entry[1].is_closed:
+        return entry[1]
+
+    client = httpx.AsyncClient(http2=_use_http2(), **_client_options(platform))
+    _clients[platform] = (loop, client)
+    return client
+
+
+def open_platform_clients() -> None:
+    """Create the async client of every configured platform on the running loop"""
+    for platform in PLATFORM_HTTP_TIMEOUTS:
+        get_platform_client(platform)
+    logger.info(f"Platform HTTP clients ready (HTTP/2: {_use_http2()})")
+
+
+async def close_platform_clients() -> None:
+    """Close all shared clients, releasing their pooled connections"""
+    loop = asyncio.get_running_loop()
+    clients = list(_clients.values())
+    _clients.clear()
+    for client_loop, client in clients:
+        # A client from another (finished) loop cannot be awaited here; its connections are already gone
+        if client_loop is loop:
+            await client.aclose()
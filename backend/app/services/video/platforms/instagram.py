@@ -10,12 +10,14 @@ from typing import Dict, Any, Optional
 
 from app.core.config import INSTAGRAM_GRAPH_API_BASE, settings
 from app.db.helpers import get_user_videos, get_user_settings, get_oauth_token, update_video
-from app.db.redis import set_upload_progress, delete_upload_progress, get_upload_progress, set_platform_upload_progress, get_platform_upload_progress
-from app.services.token_service import check_tokens_available, get_token_balance, deduct_tokens, calculate_tokens_from_bytes
+from app.db.redis import set_upload_progress, delete_upload_progress, get_upload_progress, set_platform_upload_progress, get_platform_upload_progress, register_publish_job
+from app.services.token_service import check_tokens_available, get_token_balance, calculate_tokens_from_bytes, charge_video_upload_tokens
 from app.utils.encryption import decrypt
 from app.utils.templates import get_video_title
 from app.utils.video_tokens import generate_video_access_token
 from app.services.video.helpers import record_platform_error
+from app.services.video.platforms.rate_limiter import acquire_platform_rate_limit, PlatformRateLimitExceeded
+from app.services.video.platforms.http_clients import get_platform_client
 
 instagram_logger = logging.getLogger("instagram")
 
@@ -80,8 +82,7 @@ async def _poll_container_status(
         Exception if ERROR, EXPIRED, timeout, or cancelled
     """
     # Import cancellation flag to check for cancellation during polling
-    from app.services.video.orchestrator import _cancellation_flags
-    from app.db.redis import set_active_upload_session, clear_active_upload_session
+    from app.db.redis import is_upload_cancelled, set_active_upload_session, clear_active_upload_session
     from app.models.video import Video
     from app.db.session import SessionLocal
     
@@ -101,7 +102,7 @@ async def _poll_container_status(
     try:
         for attempt in range(max_retries):
             # Check for cancellation during polling
-            if _cancellation_flags.get(video_id, False):
+            if is_upload_cancelled(video_id):
                 instagram_logger.info(f"Instagram upload cancelled for video {video_id} during polling")
                 raise Exception("Upload cancelled by user")
             
@@ -126,10 +127,11 @@ async def _poll_container_status(
                 "access_token": access_token.strip()
             }
             
+            await acquire_platform_rate_limit("instagram", "container_status", user_id)
             status_response = await client.get(status_url, params=status_params)
             
             # Check cancellation after getting status response (before processing)
-            if _cancellation_flags.get(video_id, False):
+            if is_upload_cancelled(video_id):
                 instagram_logger.info(f"Instagram upload cancelled for video {video_id} during polling")
                 raise Exception("Upload cancelled by user")
             
@@ -143,7 +145,7 @@ async def _poll_container_status(
                 
                 if status_code == "FINISHED":
                     # Check cancellation before marking as finished
-                    if _cancellation_flags.get(video_id, False):
+                    if is_upload_cancelled(video_id):
                         instagram_logger.info(f"Instagram upload cancelled for video {video_id} before marking as finished")
                         raise Exception("Upload cancelled by user")
                     
@@ -154,7 +156,7 @@ async def _poll_container_status(
                     progress = 90
                     
                     # Check cancellation again before updating progress
-                    if _cancellation_flags.get(video_id, False):
+                    if is_upload_cancelled(video_id):
                         instagram_logger.info(f"Instagram upload cancelled for video {video_id} before updating progress")
                         raise Exception("Upload cancelled by user")
                     
@@ -315,10 +317,10 @@ async def upload_video_to_instagram(user_id: int, video_id: int, db: Session = N
     """Upload a single video to Instagram using file_url method (like TikTok)"""
     from app.core.metrics import successful_uploads_counter, failed_uploads_gauge
     # Import cancellation flag to check for cancellation during upload
-    from app.services.video.orchestrator import _cancellation_flags
+    from app.db.redis import is_upload_cancelled
     
     # Check for cancellation before starting
-    if _cancellation_flags.get(video_id, False):
+    if is_upload_cancelled(video_id):
         instagram_logger.info(f"Instagram upload cancelled for video {video_id} before starting")
         raise Exception("Upload cancelled by user")
     
@@ -488,187 +490,171 @@ async def upload_video_to_instagram(user_id: int, video_id: int, db: Session = N
         set_platform_upload_progress(user_id, video_id, "instagram", 15)
         await publish_upload_progress(user_id, video_id, "instagram", 15)
         
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            container_url = f"{INSTAGRAM_GRAPH_API_BASE}/{business_account_id}/media"
-            container_params = _build_container_params(
-                media_type, file_url, caption, custom_settings, instagram_settings
-            )
-            
-            container_headers = {
-                "Authorization": f"Bearer {access_token.strip()}",
-                "Content-Type": "application/json"
-            }
-            
-            instagram_logger.info(f"Creating media container with file_url for {video.filename}")
-            
-            container_response = await client.post(
-                container_url,
-                json=container_params,
-                headers=container_headers
+        client = get_platform_client("instagram")
+        container_url = f"{INSTAGRAM_GRAPH_API_BASE}/{business_account_id}/media"
+        container_params = _build_container_params(
+            media_type, file_url, caption, custom_settings, instagram_settings
+        )
+        
+        container_headers = {
+            "Authorization": f"Bearer {access_token.strip()}",
+            "Content-Type": "application/json"
+        }
+        
+        instagram_logger.info(f"Creating media container with file_url for {video.filename}")
+        
+        await acquire_platform_rate_limit("instagram", "media", user_id)
+        container_response = await client.post(
+            container_url,
+            json=container_params,
+            headers=container_headers
+        )
+        
+        if container_response.status_code != 200:
+            import json as json_module
+            error_data = container_response.json() if container_response.headers.get('content-type', '').startswith('application/json') else container_response.text
+            
+            error_context = _build_error_context(
+                user_id, video_id, video.filename, "create_container",
+                http_status=container_response.status_code,
+                business_account_id=business_account_id,
+                response_data=json_module.dumps(error_data) if isinstance(error_data, (dict, list)) else str(error_data),
+                response_headers=json_module.dumps(dict(container_response.headers))
             )
             
-            if container_response.status_code != 200:
-                import json as json_module
-                error_data = container_response.json() if container_response.headers.get('content-type', '').startswith('application/json') else container_response.text
+            if isinstance(error_data, dict):
+                error_obj = error_data.get('error', {})
+                error_context.update({
+                    "error_code": error_obj.get('code'),
+                    "error_message": error_obj.get('message'),
+                    "error_type": error_obj.get('type')
+                })
                 
-                error_context = _build_error_context(
-                    user_id, video_id, video.filename, "create_container",
-                    http_status=container_response.status_code,
-                    business_account_id=business_account_id,
-                    response_data=json_module.dumps(error_data) if isinstance(error_data, (dict, list)) else str(error_data),
-                    response_headers=json_module.dumps(dict(container_response.headers))
-                )
-                
-                if isinstance(error_data, dict):
-                    error_obj = error_data.get('error', {})
-                    error_context.update({
-                        "error_code": error_obj.get('code'),
-                        "error_message": error_obj.get('message'),
-                        "error_type": error_obj.get('type')
-                    })
-                    
-                    if error_obj.get('code') == 190:
-                        error_msg = "Instagram access token is invalid or expired. Please reconnect your Instagram account."
-                        instagram_logger.error(
-                            f"❌ Instagram upload FAILED - Token expired - User {user_id}, Video {video_id} ({video.filename}): "
-                            f"HTTP {container_response.status_code} - {error_msg}",
-                            extra=error_context
-                        )
-                        raise Exception(error_msg)
-                    
-                    # Include file URL in error context for debugging (especially for custom domain issues)
-                    error_context["file_url"] = file_url if 'file_url' in locals() else "unknown"
-                    error_context["r2_public_domain"] = settings.R2_PUBLIC_DOMAIN
+                if error_obj.get('code') == 190:
+                    error_msg = "Instagram access token is invalid or expired. Please reconnect your Instagram account."
+                    instagram_logger.error(
+                        f"❌ Instagram upload FAILED - Token expired - User {user_id}, Video {video_id} ({video.filename}): "
+                        f"HTTP {container_response.status_code} - {error_msg}",
+                        extra=error_context
+                    )
+                    raise Exception(error_msg)
                 
-                instagram_logger.error(
-                    f"❌ Instagram upload FAILED - Container creation error - User {user_id}, Video {video_id} ({video.filename}): "
-                    f"HTTP {container_response.status_code}",
-                    extra=error_context
-                )
-                raise Exception(f"Failed to create media container: {error_data}")
+                # Include file URL in error context for debugging (especially for custom domain issues)
+                error_context["file_url"] = file_url if 'file_url' in locals() else "unknown"
+                error_context["r2_public_domain"] = settings.R2_PUBLIC_DOMAIN
             
-            container_result = container_response.json()
-            container_id = container_result.get('id')
-            
-            if not container_id:
-                raise Exception(f"No container ID in response: {container_result}")
-            
-            instagram_logger.info(f"Created container {container_id}, Instagram will now download video from file_url")
-            custom_settings = custom_settings.copy() if custom_settings else {}
-            custom_settings['instagram_container_id'] = container_id
-            update_video(video_id, user_id, db=db, custom_settings=custom_settings)
-            
-            # Container created, start polling at 20% - publish immediately
-            set_upload_progress(user_id, video_id, 20)
-            set_platform_upload_progress(user_id, video_id, "instagram", 20)
-            await publish_upload_progress(user_id, video_id, "instagram", 20)
-            
-            instagram_logger.info(f"Waiting for Instagram to process video from URL...")
-            
-            await _poll_container_status(
-                client, container_id, access_token, user_id, video_id,
-                max_retries=60, retry_delay=10  # Reduced from 120 to fail faster, exponential backoff for errors
+            instagram_logger.error(
+                f"❌ Instagram upload FAILED - Container creation error - User {user_id}, Video {video_id} ({video.filename}): "
+                f"HTTP {container_response.status_code}",
+                extra=error_context
             )
-            
-            # Check for cancellation after polling completes
-            if _cancellation_flags.get(video_id, False):
-                instagram_logger.info(f"Instagram upload cancelled for video {video_id} after polling")
-                raise Exception("Upload cancelled by user")
-            
-            # After FINISHED, publish step = 100%
-            progress = 100
-            set_upload_progress(user_id, video_id, progress)
-            set_platform_upload_progress(user_id, video_id, "instagram", progress)
-            from app.services.event_service import publish_upload_progress
-            await publish_upload_progress(user_id, video_id, "instagram", progress)
-            
-            # Check for cancellation before publishing
-            if _cancellation_flags.get(video_id, False):
-                instagram_logger.info(f"Instagram upload cancelled for video {video_id} before publishing")
-                raise Exception("Upload cancelled by user")
-            
-            publish_url = f"{INSTAGRAM_GRAPH_API_BASE}/{business_account_id}/media_publish"
-            publish_data = {
-                "creation_id": container_id
-            }
-            publish_headers = {
-                "Authorization": f"Bearer {access_token.strip()}",
-                "Content-Type": "application/json"
-            }
-            
-            instagram_logger.info(f"Publishing container {container_id}")
-            
-            publish_response = await client.post(
-                publish_url,
-                json=publish_data,
-                headers=publish_headers
+            raise Exception(f"Failed to create media container: {error_data}")
+        
+        container_result = container_response.json()
+        container_id = container_result.get('id')
+        
+        if not container_id:
+            raise Exception(f"No container ID in response: {container_result}")
+        
+        instagram_logger.info(f"Created container {container_id}, Instagram will now download video from file_url")
+        update_video(video_id, user_id, db=db, instagram_container_id=container_id)
+        register_publish_job("instagram", video_id, settings.STATUS_CHECKER_MIN_INTERVAL)
+        
+        # Container created, start polling at 20% - publish immediately
+        set_upload_progress(user_id, video_id, 20)
+        set_platform_upload_progress(user_id, video_id, "instagram", 20)
+        await publish_upload_progress(user_id, video_id, "instagram", 20)
+        
+        instagram_logger.info(f"Waiting for Instagram to process video from URL...")
+        
+        await _poll_container_status(
+            client, container_id, access_token, user_id, video_id,
+            max_retries=60, retry_delay=10  # Reduced from 120 to fail faster, exponential backoff for errors
+        )
+        
+        # Check for cancellation after polling completes
+        if is_upload_cancelled(video_id):
+            instagram_logger.info(f"Instagram upload cancelled for video {video_id} after polling")
+            raise Exception("Upload cancelled by user")
+        
+        # After FINISHED, publish step = 100%
+        progress = 100
+        set_upload_progress(user_id, video_id, progress)
+        set_platform_upload_progress(user_id, video_id, "instagram", progress)
+        from app.services.event_service import publish_upload_progress
+        await publish_upload_progress(user_id, video_id, "instagram", progress)
+        
+        # Check for cancellation before publishing
+        if is_upload_cancelled(video_id):
+            instagram_logger.info(f"Instagram upload cancelled for video {video_id} before publishing")
+            raise Exception("Upload cancelled by user")
+        
+        publish_url = f"{INSTAGRAM_GRAPH_API_BASE}/{business_account_id}/media_publish"
+        publish_data = {
+            "creation_id": container_id
+        }
+        publish_headers = {
+            "Authorization": f"Bearer {access_token.strip()}",
+            "Content-Type": "application/json"
+        }
+        
+        instagram_logger.info(f"Publishing container {container_id}")
+        
+        await acquire_platform_rate_limit("instagram", "media_publish", user_id)
+        publish_response = await client.post(
+            publish_url,
+            json=publish_data,
+            headers=publish_headers
+        )
+        
+        if publish_response.status_code != 200:
+            import json as json_module
+            error_data = publish_response.json() if publish_response.headers.get('content-type', '').startswith('application/json') else publish_response.text
+            
+            error_context = _build_error_context(
+                user_id, video_id, video.filename, "publish_media",
+                http_status=publish_response.status_code,
+                container_id=container_id,
+                response_data=json_module.dumps(error_data) if isinstance(error_data, (dict, list)) else str(error_data),
+                response_headers=json_module.dumps(dict(publish_response.headers))
             )
             
-            if publish_response.status_code != 200:
-                import json as json_module
-                error_data = publish_response.json() if publish_response.headers.get('content-type', '').startswith('application/json') else publish_response.text
-                
-                error_context = _build_error_context(
-                    user_id, video_id, video.filename, "publish_media",
-                    http_status=publish_response.status_code,
-                    container_id=container_id,
-                    response_data=json_module.dumps(error_data) if isinstance(error_data, (dict, list)) else str(error_data),
-                    response_headers=json_module.dumps(dict(publish_response.headers))
-                )
-                
-                if isinstance(error_data, dict):
-                    error_obj = error_data.get('error', {})
-                    error_context.update({
-                        "error_code": error_obj.get('code'),
-                        "error_message": error_obj.get('message'),
-                        "error_type": error_obj.get('type')
-                    })
-                
-                instagram_logger.error(
-                    f"❌ Instagram upload FAILED - Publish error - User {user_id}, Video {video_id} ({video.filename}): "
-                    f"HTTP {publish_response.status_code}",
-                    extra=error_context
-                )
-                raise Exception(f"Failed to publish media: {error_data}")
-            
-            publish_result = publish_response.json()
-            media_id = publish_result.get('id')
-            
-            if not media_id:
-                raise Exception(f"No media ID in publish response: {publish_result}")
-            
-            instagram_logger.info(f"Successfully published to Instagram: {media_id}")
-            
-            custom_settings = custom_settings.copy() if custom_settings else {}
-            custom_settings['instagram_id'] = media_id
-            update_video(video_id, user_id, db=db, status="completed", custom_settings=custom_settings)
-            set_upload_progress(user_id, video_id, 100)
+            if isinstance(error_data, dict):
+                error_obj = error_data.get('error', {})
+                error_context.update({
+                    "error_code": error_obj.get('code'),
+                    "error_message": error_obj.get('message'),
+                    "error_type": error_obj.get('type')
+                })
             
-            if video.tokens_consumed == 0:
-                tokens_required = video.tokens_required if video.tokens_required is not None else (calculate_tokens_from_bytes(video.file_size_bytes) if video.file_size_bytes else 0)
-                if tokens_required > 0:
-                    await deduct_tokens(
-                        user_id=user_id,
-                        tokens=tokens_required,
-                        transaction_type='upload',
-                        video_id=video.id,
-                        metadata={
-                            'filename': video.filename,
-                            'platform': 'instagram',
-                            'instagram_id': media_id,
-                            'file_size_bytes': video.file_size_bytes,
-                            'file_size_mb': round(video.file_size_bytes / (1024 * 1024), 2)
-                        },
-                        db=db
-                    )
-                    update_video(video_id, user_id, db=db, tokens_consumed=tokens_required)
-                    instagram_logger.info(f"Deducted {tokens_required} tokens for user {user_id} (first platform upload)")
-            else:
-                instagram_logger.info(f"Tokens already deducted for this video (tokens_consumed={video.tokens_consumed}), skipping")
-            
-            await asyncio.sleep(2)
-            delete_upload_progress(user_id, video_id)
+            instagram_logger.error(
+                f"❌ Instagram upload FAILED - Publish error - User {user_id}, Video {video_id} ({video.filename}): "
+                f"HTTP {publish_response.status_code}",
+                extra=error_context
+            )
+            raise Exception(f"Failed to publish media: {error_data}")
+        
+        publish_result = publish_response.json()
+        media_id = publish_result.get('id')
+        
+        if not media_id:
+            raise Exception(f"No media ID in publish response: {publish_result}")
+        
+        instagram_logger.info(f"Successfully published to Instagram: {media_id}")
+        
+        # Merged into custom_settings; the global status is left to set_platform_status
+        update_video(video_id, user_id, db=db, instagram_id=media_id)
+        set_upload_progress(user_id, video_id, 100)
         
+        await charge_video_upload_tokens(video, "instagram", db, metadata={'instagram_id': media_id})
+        
+        await asyncio.sleep(2)
+        delete_upload_progress(user_id, video_id)
+    
+    except PlatformRateLimitExceeded:
+        # Quota exhausted for longer than a job may wait - the upload job is deferred, not failed
+        raise
+    
     except Exception as e:
         error_type = type(e).__name__
         error_msg = str(e)
@@ -721,14 +707,13 @@ async def upload_video_to_instagram(user_id: int, video_id: int, db: Session = N
         record_platform_error(video_id, user_id, "instagram", error_message, db=db)
         delete_upload_progress(user_id, video_id)
         
-        # Clear active upload session BEFORE updating status to ensure cleanup happens
-        # This prevents deletion from being blocked if status update fails
+        # Clear active upload session right away so deletion is not blocked while the
+        # orchestrator records the failed platform status
         try:
             clear_active_upload_session(video_id, "instagram")
         except Exception as clear_err:
             instagram_logger.warning(f"Failed to clear active upload session for video {video_id}: {clear_err}")
         
-        update_video(video_id, user_id, db=db, status="failed", error=error_message)
         failed_uploads_gauge.inc()
     finally:
         # Always clear the active session flag when upload completes (success or failure)
@@ -0,0 +1,162 @@
+"""Distributed rate limiting for platform API calls
+
+Uploaders acquire a token before each limited platform request. Buckets are
+kept in Redis per (platform, endpoint, account), so every API and worker
+process draws from the same quota and requests are spaced out instead of
+running into 429s. Limits are configured in PLATFORM_RATE_LIMITS; endpoints
+listed in PLATFORM_RATE_LIMIT_SHARED draw from another endpoint's bucket.
+
+Time spent waiting is reported to hopper_platform_rate_limit_wait_seconds.
+Waits longer than allowed raise PlatformRateLimitExceeded instead, and a
+reservation that is given up (too long, or the caller was cancelled) is
+returned to the bucket. If Redis is unavailable the limiter fails open
+(the call goes ahead).
+"""
+import asyncio
+import logging
+import time
+from typing import Optional, Tuple
+
+from app.core.metrics import platform_rate_limit_wait_histogram
+from app.db.redis import (
+    reserve_rate_limit_token, async_reserve_rate_limit_token,
+    refund_rate_limit_token, async_refund_rate_limit_token
+)
+from app.services.video.config import (
+    PLATFORM_RATE_LIMITS, PLATFORM_RATE_LIMIT_PROJECT_WIDE, PLATFORM_RATE_LIMIT_SHARED,
+    PLATFORM_RATE_LIMIT_MAX_SYNC_WAIT, PLATFORM_RATE_LIMIT_MAX_WAIT
+)
+
+logger = logging.getLogger(__name__)
+
+# Account of buckets in PLATFORM_RATE_LIMIT_PROJECT_WIDE
+PROJECT_ACCOUNT = "project"
+
+
+class PlatformRateLimitExceeded(Exception):
+    """A caller would have to wait longer than allowed for a token
+    
+    retry_after is when the token would have been available (seconds from now);
+    upload jobs are deferred by that long instead of holding a worker slot.
+    """
+    
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _bucket(platform: str, endpoint: str, account) -> Optional[Tuple[str, float, float]]:
+    """Bucket name, rate and capacity for a call (None if the endpoint is not limited)"""
+    endpoint = PLATFORM_RATE_LIMIT_SHARED.get((platform, endpoint), endpoint)
+    limit = PLATFORM_RATE_LIMITS.get((platform, endpoint))
+    if limit is None:
+        return None
+    if (platform, endpoint) in PLATFORM_RATE_LIMIT_PROJECT_WIDE:
+        account = PROJECT_ACCOUNT
+    rate, capacity = limit
+    return f"{platform}:{endpoint}:{account}", rate, capacity
+
+
+def _exceeded(platform: str, endpoint: str, wait: float) -> PlatformRateLimitExceeded:
+    return PlatformRateLimitExceeded(
+        f"{platform.capitalize()} rate limit exceeded for {endpoint}. Wait {wait:.0f}s before trying again.",
+        retry_after=wait
+    )
+
+
+async def _refund(bucket_name: str, capacity: float) -> None:
+    try:
+        await async_refund_rate_limit_token(bucket_name, capacity)
+    except Exception as e:
+        logger.warning(f"Failed to return rate limit token to {bucket_name}: {e}")
+
+
+async def acquire_platform_rate_limit(
+    platform: str,
+    endpoint: str,
+    account,
+    max_wait: float = PLATFORM_RATE_LIMIT_MAX_WAIT
+) -> float:
+    """Wait until a platform request is allowed by its rate limit
+    
+    Args:
+        platform: Platform name (youtube, tiktok, instagram)
+        endpoint: Endpoint key from PLATFORM_RATE_LIMITS
+        account: Account the quota belongs to (e.g. user_id; ignored for project-wide limits)
+        max_wait: Longest wait allowed in seconds
+        
+    Returns:
+        Seconds waited
+        
+    Raises:
+        PlatformRateLimitExceeded: If the wait would exceed max_wait
+    """
+    bucket = _bucket(platform, endpoint, account)
+    if bucket is None:
+        return 0.0
+    bucket_name, _, capacity = bucket
+    
+    try:
+        wait = await async_reserve_rate_limit_token(*bucket)
+    except Exception as e:
+        logger.warning(f"Rate limiter unavailable for {platform}/{endpoint}, proceeding: {e}")
+        return 0.0
+    
+    platform_rate_limit_wait_histogram.labels(platform=platform, endpoint=endpoint).observe(wait)
+    if wait > max_wait:
+        await _refund(bucket_name, capacity)
+        raise _exceeded(platform, endpoint, wait)
+    if wait > 0:
+        logger.info(f"Rate limited {platform}/{endpoint} for account {account}: waiting {wait:.1f}s")
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # Don't let an abandoned reservation delay everyone queued behind it
+            await asyncio.shield(_refund(bucket_name, capacity))
+            raise
+    return wait
+
+
+
+def acquire_platform_rate_limit_sync(
+    platform: str,
+    endpoint: str,
+    account,
+    max_wait: float = PLATFORM_RATE_LIMIT_MAX_SYNC_WAIT
+) -> float:
+    """Blocking version of acquire_platform_rate_limit for synchronous clients
+    
+    Blocks the calling thread, so waits are capped at max_wait.
+    
+    Args:
+        platform: Platform name (youtube, tiktok, instagram)
+        endpoint: Endpoint key from PLATFORM_RATE_LIMITS
+        account: Account the quota belongs to (e.g. user_id)
+        max_wait: Longest wait allowed in seconds
+        
+    Returns:
+        Seconds waited
+        
+    Raises:
+        PlatformRateLimitExceeded: If the wait would exceed max_wait
+    """
+    bucket = _bucket(platform, endpoint, account)
+    if bucket is None:
+        return 0.0
+    
+    try:
+        wait = reserve_rate_limit_token(*bucket)
+    except Exception as e:
+        logger.warning(f"Rate limiter unavailable for {platform}/{endpoint}, proceeding: {e}")
+        return 0.0
+    
+    platform_rate_limit_wait_histogram.labels(platform=platform, endpoint=endpoint).observe(wait)
+    if wait > max_wait:
+        try:
+            refund_rate_limit_token(bucket[0], bucket[2])
+        except Exception as e:
+            logger.warning(f"Failed to return rate limit token to {bucket[0]}: {e}")
+        raise _exceeded(platform, endpoint, wait)
+    if wait > 0:
+        time.sleep(wait)
+    return wait
@@ -1,52 +1,35 @@
-"""TikTok API client - token management, API calls, rate limiting"""
+"""TikTok API client - token management, API calls
 
+All calls are async and go through the shared pooled TikTok client, so they
+never block the event loop.
+"""
+
+import asyncio
+import hashlib
 import json
 import logging
 import time
 from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
-import httpx
+from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import Session
 
-from app.core.config import (
-    settings, TIKTOK_CREATOR_INFO_URL, TIKTOK_STATUS_URL,
-    TIKTOK_RATE_LIMIT_REQUESTS, TIKTOK_RATE_LIMIT_WINDOW
-)
+from app.core.config import settings, TIKTOK_CREATOR_INFO_URL, TIKTOK_STATUS_URL
 from app.db.helpers import (
     get_oauth_token, check_token_expiration, save_oauth_token,
     delete_oauth_token, set_user_setting
 )
 from app.db.redis import (
-    increment_rate_limit, get_token_check_cooldown, set_token_check_cooldown,
-    get_redis_client
+    get_token_check_cooldown, set_token_check_cooldown, get_redis_client, set_tiktok_publish_status
 )
 from app.utils.encryption import decrypt
 from app.services.video.config import TOKEN_REFRESH_LOCK_TIMEOUT
+from app.services.video.platforms.rate_limiter import acquire_platform_rate_limit, PlatformRateLimitExceeded
+from app.services.video.platforms.http_clients import get_platform_client
 
 tiktok_logger = logging.getLogger("tiktok")
 
 
-def check_tiktok_rate_limit(session_id: str = None, user_id: int = None):
-    """Check if TikTok API rate limit is exceeded (6 requests per minute) using Redis"""
-    # Use session_id if available, otherwise use user_id
-    if session_id:
-        identifier = f"tiktok:{session_id}"
-    elif user_id:
-        identifier = f"tiktok:user:{user_id}"
-    else:
-        raise Exception("Either session_id or user_id must be provided for TikTok rate limiting")
-    
-    # Increment counter in Redis (with TTL)
-    current_count = increment_rate_limit(identifier, TIKTOK_RATE_LIMIT_WINDOW)
-    
-    # Check if limit exceeded
-    if current_count > TIKTOK_RATE_LIMIT_REQUESTS:
-        # Calculate wait time (approximate, since we're using fixed window)
-        wait_time = TIKTOK_RATE_LIMIT_WINDOW
-        raise Exception(f"TikTok rate limit exceeded. Wait {wait_time}s before trying again.")
-
-
 @contextmanager
 def _distributed_lock(lock_key: str, timeout: int = TOKEN_REFRESH_LOCK_TIMEOUT):
     """Distributed lock using Redis to prevent race conditions
@@ -201,7 +184,7 @@ def _check_refresh_token_expiration(user_id: int, db: Session) -> Optional[str]:
     return refresh_token if refresh_token else None
 
 
-def refresh_tiktok_token(user_id: int, refresh_token: str, db: Session) -> str:
+async def refresh_tiktok_token(user_id: int, refresh_token: str, db: Session) -> str:
     """Refresh TikTok access token using refresh token
     
     Follows TikTok OAuth documentation:
@@ -230,7 +213,7 @@ def refresh_tiktok_token(user_id: int, refresh_token: str, db: Session) -> str:
         if not acquired:
             # Another process is refreshing - wait and get result
             tiktok_logger.info(f"Waiting for concurrent token refresh (user {user_id})")
-            time.sleep(1.5)
+            await asyncio.sleep(1.5)
             
             # Get refreshed token from database
             fresh_token = get_oauth_token(user_id, "tiktok", db=db)
@@ -308,7 +291,11 @@ def refresh_tiktok_token(user_id: int, refresh_token: str, db: Session) -> str:
         tiktok_logger.info(f"Refreshing TikTok token (user {user_id})")
         
         try:
-            response = httpx.post(
+            # Wait only briefly for the slot - the refresh lock expires after TOKEN_REFRESH_LOCK_TIMEOUT
+            await acquire_platform_rate_limit(
+                "tiktok", "oauth_token", user_id, max_wait=TOKEN_REFRESH_LOCK_TIMEOUT / 2
+            )
+            response = await get_platform_client("tiktok").post(
                 settings.TIKTOK_TOKEN_URL,
                 data={
                     "client_key": settings.TIKTOK_CLIENT_KEY,
@@ -403,6 +390,9 @@ def refresh_tiktok_token(user_id: int, refresh_token: str, db: Session) -> str:
             tiktok_logger.info(f"Successfully refreshed token (user {user_id})")
             return new_access_token
             
+        except PlatformRateLimitExceeded:
+            # Callers defer on this (retry_after) instead of failing the upload
+            raise
         except Exception as e:
             # If it's already our custom exception, re-raise it
             if "expired or invalid" in str(e).lower() or "reconnect" in str(e).lower() or "invalid_grant" in str(e).lower():
@@ -413,7 +403,7 @@ def refresh_tiktok_token(user_id: int, refresh_token: str, db: Session) -> str:
             raise Exception(f"Token refresh failed: {str(e)}")
 
 
-def get_tiktok_creator_info(access_token: str):
+async def get_tiktok_creator_info(access_token: str):
     """Query TikTok creator info
     
     Args:
@@ -428,7 +418,11 @@ def get_tiktok_creator_info(access_token: str):
     if not access_token or not access_token.strip():
         raise Exception("No TikTok access token or token is empty")
     
-    response = httpx.post(
+    # Creator info quota is per access token
+    token_fingerprint = hashlib.sha256(access_token.strip().encode()).hexdigest()[:16]
+    await acquire_platform_rate_limit("tiktok", "creator_info", token_fingerprint)
+    
+    response = await get_platform_client("tiktok").post(
         TIKTOK_CREATOR_INFO_URL,
         headers={
             "Authorization": f"Bearer {access_token.strip()}",
@@ -483,7 +477,7 @@ def get_tiktok_creator_info(access_token: str):
     return creator_info
 
 
-def _ensure_fresh_token(user_id: int, db: Session) -> Optional[str]:
+async def _ensure_fresh_token(user_id: int, db: Session) -> Optional[str]:
     """Internal helper to ensure user has a fresh access token
     
     Automatically refreshes if needed using distributed locking.
@@ -543,14 +537,14 @@ def _ensure_fresh_token(user_id: int, db: Session) -> Optional[str]:
     
     # Refresh with distributed locking (via public API)
     try:
-        new_access_token = refresh_tiktok_token(user_id, refresh_token, db)
+        new_access_token = await refresh_tiktok_token(user_id, refresh_token, db)
         return new_access_token
     except Exception as e:
         tiktok_logger.warning(f"Token refresh failed (user {user_id}): {str(e)}")
         return None
 
 
-def _fetch_creator_info_safe(access_token: str, user_id: int, db: Session = None) -> Optional[Dict]:
+async def _fetch_creator_info_safe(access_token: str, user_id: int, db: Session = None) -> Optional[Dict]:
     """Internal helper to fetch creator info with error handling
     
     ROOT CAUSE FIX: Add retry logic to handle token invalidation race conditions.
@@ -573,7 +567,7 @@ def _fetch_creator_info_safe(access_token: str, user_id: int, db: Session = None
     try:
         # First attempt with provided token
         try:
-            return get_tiktok_creator_info(access_token)
+            return await get_tiktok_creator_info(access_token)
         except Exception as e:
             error_msg = str(e).lower()
             # Check if error is due to invalid token (race condition with concurrent refresh)
@@ -594,14 +588,14 @@ def _fetch_creator_info_safe(access_token: str, user_id: int, db: Session = None
             tiktok_logger.info(f"Token invalid during creator info fetch (user {user_id}), re-fetching from DB and retrying...")
             
             # Get fresh token from DB (will auto-refresh if needed)
-            fresh_access_token = _ensure_fresh_token(user_id, db)
+            fresh_access_token = await _ensure_fresh_token(user_id, db)
             if not fresh_access_token:
                 tiktok_logger.warning(f"Could not get fresh token for retry (user {user_id})")
                 return None
             
             # Retry with fresh token
             try:
-                return get_tiktok_creator_info(fresh_access_token)
+                return await get_tiktok_creator_info(fresh_access_token)
             except Exception as retry_error:
                 tiktok_logger.warning(f"Retry failed to fetch creator info (user {user_id}): {str(retry_error)}")
                 return None
@@ -610,42 +604,46 @@ def _fetch_creator_info_safe(access_token: str, user_id: int, db: Session = None
             db.close()
 
 
-def fetch_tiktok_publish_status(user_id: int, publish_id: str, db: Session = None) -> Optional[Dict[str, Any]]:
-    """Fetch TikTok publish status for a given publish_id
+async def _get_status_access_token(user_id: int, db: Session = None) -> Optional[str]:
+    """Access token for status calls, refreshed first if it has expired
+    
+    Returns:
+        Access token (decrypted), or None if unavailable
+    """
+    # Get TikTok access token
+    tiktok_token = get_oauth_token(user_id, "tiktok", db=db)
+    if not tiktok_token:
+        tiktok_logger.warning(f"No TikTok token for user {user_id} when fetching publish status")
+        return None
+    
+    access_token = decrypt(tiktok_token.access_token)
+    if not access_token:
+        tiktok_logger.warning(f"Failed to decrypt TikTok token for user {user_id}")
+        return None
+    
+    # Check if token needs refresh
+    if tiktok_token.expires_at and tiktok_token.expires_at < datetime.now(timezone.utc):
+        try:
+            refresh_token = decrypt(tiktok_token.refresh_token) if tiktok_token.refresh_token else None
+            if refresh_token:
+                access_token = await refresh_tiktok_token(user_id, refresh_token, db=db)
+            else:
+                tiktok_logger.warning(f"No refresh token available for user {user_id}")
+                return None
+        except Exception as refresh_err:
+            tiktok_logger.error(f"Failed to refresh TikTok token for user {user_id}: {refresh_err}")
+            return None
+    
+    return access_token
+
+
+async def _request_publish_status(user_id: int, access_token: str, publish_id: str) -> Optional[Dict[str, Any]]:
+    """Call the TikTok status API for one publish_id
     
-    Args:
-        user_id: User ID
-        publish_id: TikTok publish_id from the upload response
-        db: Database session
-        
     Returns:
         Dictionary with status information, or None if error
     """
     try:
-        # Get TikTok access token
-        tiktok_token = get_oauth_token(user_id, "tiktok", db=db)
-        if not tiktok_token:
-            tiktok_logger.warning(f"No TikTok token for user {user_id} when fetching status for publish_id {publish_id}")
-            return None
-        
-        access_token = decrypt(tiktok_token.access_token)
-        if not access_token:
-            tiktok_logger.warning(f"Failed to decrypt TikTok token for user {user_id}")
-            return None
-        
-        # Check if token needs refresh
-        if tiktok_token.expires_at and tiktok_token.expires_at < datetime.now(timezone.utc):
-            try:
-                refresh_token = decrypt(tiktok_token.refresh_token) if tiktok_token.refresh_token else None
-                if refresh_token:
-                    access_token = refresh_tiktok_token(user_id, refresh_token, db=db)
-                else:
-                    tiktok_logger.warning(f"No refresh token available for user {user_id}")
-                    return None
-            except Exception as refresh_err:
-                tiktok_logger.error(f"Failed to refresh TikTok token for user {user_id}: {refresh_err}")
-                return None
-        
         # Call TikTok status API
         headers = {
             "Authorization": f"Bearer {access_token}",
@@ -656,7 +654,8 @@ def fetch_tiktok_publish_status(user_id: int, publish_id: str, db: Session = Non
             "publish_id": publish_id
         }
         
-        response = httpx.post(
+        await acquire_platform_rate_limit("tiktok", "publish_status", user_id)
+        response = await get_platform_client("tiktok").post(
             TIKTOK_STATUS_URL,
             headers=headers,
             json=payload,
@@ -670,26 +669,34 @@ def fetch_tiktok_publish_status(user_id: int, publish_id: str, db: Session = Non
                 f"TikTok status API returned 404 for publish_id {publish_id} (user {user_id}). "
                 f"Video was published - publish_id is no longer valid for status checking. Marking as PUBLISHED."
             )
-            return {"status": "PUBLISHED", "video_id": None}
+            status_data = {"status": "PUBLISHED", "video_id": None}
         elif response.status_code != 200:
             tiktok_logger.warning(
                 f"Failed to fetch TikTok status for publish_id {publish_id} (user {user_id}): "
                 f"HTTP {response.status_code} - {response.text[:200]}"
             )
             return None
+        else:
+            data = response.json()
+            
+            # Check for errors in response
+            if "error" in data:
+                error_info = data["error"]
+                tiktok_logger.warning(
+                    f"TikTok API error for publish_id {publish_id} (user {user_id}): "
+                    f"{error_info.get('code', 'unknown')} - {error_info.get('message', 'unknown error')}"
+                )
+                return None
+            
+            status_data = data.get("data", {})
         
-        data = response.json()
-        
-        # Check for errors in response
-        if "error" in data:
-            error_info = data["error"]
-            tiktok_logger.warning(
-                f"TikTok API error for publish_id {publish_id} (user {user_id}): "
-                f"{error_info.get('code', 'unknown')} - {error_info.get('message', 'unknown error')}"
-            )
-            return None
+        # Remember the latest status so video responses can show it without calling TikTok
+        try:
+            set_tiktok_publish_status(publish_id, status_data)
+        except Exception as cache_err:
+            tiktok_logger.debug(f"Failed to cache TikTok status for publish_id {publish_id}: {cache_err}")
         
-        return data.get("data", {})
+        return status_data
         
     except Exception as e:
         tiktok_logger.error(
@@ -699,6 +706,59 @@ def fetch_tiktok_publish_status(user_id: int, publish_id: str, db: Session = Non
         return None
 
 
+async def fetch_tiktok_publish_status(user_id: int, publish_id: str, db: Session = None) -> Optional[Dict[str, Any]]:
+    """Fetch TikTok publish status for a given publish_id
+    
+    Args:
+        user_id: User ID
+        publish_id: TikTok publish_id from the upload response
+        db: Database session
+        
+    Returns:
+        Dictionary with status information, or None if error
+    """
+    access_token = await _get_status_access_token(user_id, db=db)
+    if not access_token:
+        return None
+    return await _request_publish_status(user_id, access_token, publish_id)
+
+
+async def fetch_tiktok_publish_statuses(
+    user_id: int,
+    publish_ids: List[str],
+    db: Session = None
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Fetch the publish status of several of a user's publish_ids concurrently
+    
+    The access token is looked up (and refreshed) once, then up to
+    TIKTOK_STATUS_FETCH_CONCURRENCY status requests run at a time over the
+    shared connection pool.
+    
+    Args:
+        user_id: User ID
+        publish_ids: TikTok publish_ids from the upload responses
+        db: Database session
+        
+    Returns:
+        Status information per publish_id (None for each one that failed)
+    """
+    if not publish_ids:
+        return {}
+    
+    access_token = await _get_status_access_token(user_id, db=db)
+    if not access_token:
+        return {publish_id: None for publish_id in publish_ids}
+    
+    semaphore = asyncio.Semaphore(settings.TIKTOK_STATUS_FETCH_CONCURRENCY)
+    
+    async def fetch(publish_id: str) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            return await _request_publish_status(user_id, access_token, publish_id)
+    
+    results = await asyncio.gather(*(fetch(publish_id) for publish_id in publish_ids))
+    return dict(zip(publish_ids, results))
+
+
 def map_privacy_level_to_tiktok(privacy_level, creator_info):
     """Map frontend privacy level to TikTok's format
     
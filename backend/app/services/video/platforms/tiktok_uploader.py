@@ -4,7 +4,6 @@ import asyncio
 import logging
 from pathlib import Path
 from typing import Optional
-import httpx
 from sqlalchemy.orm import Session
 
 from app.core.config import settings, TIKTOK_INIT_UPLOAD_URL
@@ -12,15 +11,16 @@ from app.db.helpers import (
     get_user_videos, get_user_settings, get_oauth_token,
     check_token_expiration, update_video
 )
-from app.db.redis import set_upload_progress, delete_upload_progress, set_platform_upload_progress
+from app.db.redis import set_upload_progress, delete_upload_progress, set_platform_upload_progress, register_publish_job
 from app.services.event_service import publish_upload_progress
-from app.services.token_service import check_tokens_available, get_token_balance, deduct_tokens, calculate_tokens_from_bytes
+from app.services.token_service import check_tokens_available, get_token_balance, calculate_tokens_from_bytes, charge_video_upload_tokens
 from app.utils.encryption import decrypt
 from app.utils.templates import get_video_title
 from app.utils.video_tokens import generate_video_access_token
 
+from app.services.video.platforms.rate_limiter import acquire_platform_rate_limit, PlatformRateLimitExceeded
+from app.services.video.platforms.http_clients import get_platform_client
 from app.services.video.platforms.tiktok_api import (
-    check_tiktok_rate_limit,
     refresh_tiktok_token,
     get_tiktok_creator_info,
     map_privacy_level_to_tiktok
@@ -39,10 +39,10 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
     # Import metrics from centralized location
     from app.core.metrics import successful_uploads_counter, failed_uploads_gauge
     # Import cancellation flag to check for cancellation during upload
-    from app.services.video.orchestrator import _cancellation_flags
+    from app.db.redis import is_upload_cancelled
     
     # Check for cancellation before starting
-    if _cancellation_flags.get(video_id, False):
+    if is_upload_cancelled(video_id):
         tiktok_logger.info(f"TikTok upload cancelled for video {video_id} before starting")
         raise Exception("Upload cancelled by user")
     
@@ -123,7 +123,7 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
         if refresh_token_decrypted:
             try:
                 tiktok_logger.info(f"TikTok token expired/expiring for user {user_id}, refreshing...")
-                access_token = refresh_tiktok_token(user_id, refresh_token_decrypted, db)
+                access_token = await refresh_tiktok_token(user_id, refresh_token_decrypted, db)
                 tiktok_token = get_oauth_token(user_id, "tiktok", db=db)
                 if not tiktok_token:
                     raise Exception("Failed to retrieve token after refresh")
@@ -178,12 +178,9 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
         await publish_upload_progress(user_id, video_id, "tiktok", 0)
         last_published_progress = 0
         
-        # Check rate limit (use user_id if session_id not provided)
-        check_tiktok_rate_limit(session_id=session_id, user_id=user_id)
-        
         # Get creator info (with automatic retry on token error)
         try:
-            creator_info = get_tiktok_creator_info(access_token)
+            creator_info = await get_tiktok_creator_info(access_token)
         except Exception as creator_info_error:
             error_msg = str(creator_info_error)
             # If token is invalid, try refreshing once more
@@ -207,11 +204,11 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
                 refresh_token_decrypted = decrypt(tiktok_token.refresh_token) if tiktok_token.refresh_token else None
                 if refresh_token_decrypted:
                     try:
-                        access_token = refresh_tiktok_token(user_id, refresh_token_decrypted, db)
+                        access_token = await refresh_tiktok_token(user_id, refresh_token_decrypted, db)
                         tiktok_token = get_oauth_token(user_id, "tiktok", db=db)
                         if not tiktok_token:
                             raise Exception("Failed to retrieve token after refresh")
-                        creator_info = get_tiktok_creator_info(access_token)
+                        creator_info = await get_tiktok_creator_info(access_token)
                         tiktok_logger.info(f"Successfully refreshed token and retried creator info query for user {user_id}")
                     except Exception as retry_error:
                         error_msg = f"TikTok: Failed to refresh access token after invalid token error. Please reconnect your TikTok account. Error: {str(retry_error)}"
@@ -417,7 +414,8 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
             "video_url": video_url
         }
         
-        init_response = httpx.post(
+        await acquire_platform_rate_limit("tiktok", "video_init", user_id)
+        init_response = await get_platform_client("tiktok").post(
             TIKTOK_INIT_UPLOAD_URL,
             headers={
                 "Authorization": f"Bearer {access_token.strip()}",
@@ -467,7 +465,7 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
                     refresh_token_decrypted = decrypt(tiktok_token.refresh_token) if tiktok_token.refresh_token else None
                     if refresh_token_decrypted:
                         try:
-                            access_token = refresh_tiktok_token(user_id, refresh_token_decrypted, db)
+                            access_token = await refresh_tiktok_token(user_id, refresh_token_decrypted, db)
                             tiktok_token = get_oauth_token(user_id, "tiktok", db=db)
                             if not tiktok_token:
                                 raise Exception("Failed to retrieve token after refresh")
@@ -477,7 +475,8 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
                                 "video_url": video_url
                             }
                             
-                            init_response = httpx.post(
+                            await acquire_platform_rate_limit("tiktok", "video_init", user_id)
+                            init_response = await get_platform_client("tiktok").post(
                                 TIKTOK_INIT_UPLOAD_URL,
                                 headers={
                                     "Authorization": f"Bearer {access_token.strip()}",
@@ -617,10 +616,9 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
         
         # ROOT CAUSE FIX: Save publish_id to database immediately so status_checker can track it
         # even if this upload task times out. This ensures long-running uploads aren't lost.
-        custom_settings = video.custom_settings or {}
-        custom_settings = custom_settings.copy()
-        custom_settings['tiktok_publish_id'] = publish_id
-        update_video(video_id, user_id, db=db, custom_settings=custom_settings, status="uploading")
+        # Merged into custom_settings; the global status is left to set_platform_status
+        update_video(video_id, user_id, db=db, tiktok_publish_id=publish_id)
+        register_publish_job("tiktok", video_id, settings.STATUS_CHECKER_MIN_INTERVAL)
         
         progress = 10
         set_upload_progress(user_id, video_id, progress)
@@ -631,7 +629,7 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
         
         # PULL_FROM_URL method: TikTok will download the file automatically
         # Check for cancellation before marking as success
-        if _cancellation_flags.get(video_id, False):
+        if is_upload_cancelled(video_id):
             tiktok_logger.info(f"TikTok upload cancelled for video {video_id} before PULL_FROM_URL completion")
             raise Exception("Upload cancelled by user")
         
@@ -651,7 +649,7 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
         
         while poll_count < max_polls:
             # Check for cancellation
-            if _cancellation_flags.get(video_id, False):
+            if is_upload_cancelled(video_id):
                 tiktok_logger.info(f"TikTok upload cancelled for video {video_id} during PULL_FROM_URL polling")
                 raise Exception("Upload cancelled by user")
             
@@ -665,13 +663,13 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
             await asyncio.sleep(5)  # Poll every 5 seconds
             poll_count += 1
             
-            status_data = fetch_tiktok_publish_status(user_id, publish_id, db=db)
+            status_data = await fetch_tiktok_publish_status(user_id, publish_id, db=db)
             if not status_data:
                 # Status not available yet, continue polling
                 continue
             
             # Check cancellation after getting status (before processing)
-            if _cancellation_flags.get(video_id, False):
+            if is_upload_cancelled(video_id):
                 tiktok_logger.info(f"TikTok upload cancelled for video {video_id} during PULL_FROM_URL polling")
                 raise Exception("Upload cancelled by user")
             
@@ -691,7 +689,7 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
                 progress = 10 + int(min(poll_count / estimated_download_polls, 1.0) * 40)
                 
                 # Check cancellation before updating progress
-                if _cancellation_flags.get(video_id, False):
+                if is_upload_cancelled(video_id):
                     tiktok_logger.info(f"TikTok upload cancelled for video {video_id} during PULL_FROM_URL polling")
                     raise Exception("Upload cancelled by user")
                 
@@ -707,7 +705,7 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
                 progress = 50 + int(min(upload_polls / estimated_upload_polls, 1.0) * 40)
                 
                 # Check cancellation before updating progress
-                if _cancellation_flags.get(video_id, False):
+                if is_upload_cancelled(video_id):
                     tiktok_logger.info(f"TikTok upload cancelled for video {video_id} during PULL_FROM_URL polling")
                     raise Exception("Upload cancelled by user")
                 
@@ -718,7 +716,7 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
                     last_published_progress = progress
             elif status == "PUBLISH_COMPLETE":
                 # Check cancellation before marking as complete
-                if _cancellation_flags.get(video_id, False):
+                if is_upload_cancelled(video_id):
                     tiktok_logger.info(f"TikTok upload cancelled for video {video_id} before marking as complete")
                     raise Exception("Upload cancelled by user")
                 
@@ -782,20 +780,15 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
                 f"handing off to status_checker for User {user_id}, Video {video_id} ({video.filename}), "
                 f"publish_id: {publish_id}. Status checker will continue monitoring."
             )
-            # Ensure video status is "uploading" so status_checker picks it up
-            update_video(video_id, user_id, db=db, status="uploading")
             # Return successfully - status_checker will complete the monitoring
             return
         
         # Check for cancellation before marking as success
-        if _cancellation_flags.get(video_id, False):
+        if is_upload_cancelled(video_id):
             tiktok_logger.info(f"TikTok upload cancelled for video {video_id} before finalizing")
             raise Exception("Upload cancelled by user")
         
-        # Success - update video in database
-        custom_settings = custom_settings.copy() if custom_settings else {}
-        custom_settings['tiktok_publish_id'] = publish_id
-        update_video(video_id, user_id, db=db, status="uploaded", custom_settings=custom_settings)
+        # Success - tiktok_publish_id is already stored, so the platform counts as uploaded
         progress = 100
         set_upload_progress(user_id, video_id, progress)
         set_platform_upload_progress(user_id, video_id, "tiktok", progress)
@@ -811,29 +804,11 @@ async def upload_video_to_tiktok(user_id: int, video_id: int, db: Session = None
         )
         
         # Deduct tokens after successful upload (only if not already deducted)
-        if video.tokens_consumed == 0:
-            # Use stored tokens_required with fallback for backward compatibility
-            tokens_required = video.tokens_required if video.tokens_required is not None else (calculate_tokens_from_bytes(video.file_size_bytes) if video.file_size_bytes else 0)
-            if tokens_required > 0:
-                await deduct_tokens(
-                    user_id=user_id,
-                    tokens=tokens_required,
-                    transaction_type='upload',
-                    video_id=video.id,
-                    metadata={
-                        'filename': video.filename,
-                        'platform': 'tiktok',
-                        'tiktok_publish_id': publish_id,
-                        'file_size_bytes': video.file_size_bytes,
-                        'file_size_mb': round(video.file_size_bytes / (1024 * 1024), 2)
-                    },
-                    db=db
-                )
-            # Update tokens_consumed in video record to prevent double-charging
-            update_video(video_id, user_id, db=db, tokens_consumed=tokens_required)
-            tiktok_logger.info(f"Deducted {tokens_required} tokens for user {user_id} (first platform upload)")
-        else:
-            tiktok_logger.info(f"Tokens already deducted for this video (tokens_consumed={video.tokens_consumed}), skipping")
+        await charge_video_upload_tokens(video, "tiktok", db, metadata={'tiktok_publish_id': publish_id})
+    
+    except PlatformRateLimitExceeded:
+        # Quota exhausted for longer than a job may wait - the upload job is deferred, not failed
+        raise
     
     except Exception as e:
         error_type = type(e).__name__
@@ -1,13 +1,16 @@
 """YouTube-specific upload logic"""
 
+import asyncio
 import logging
-from pathlib import Path
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 
 from google.auth.transport.requests import Request as GoogleRequest
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.errors import HttpError
 
 from app.core.config import settings
 from app.db.helpers import (
@@ -15,24 +18,104 @@ from app.db.helpers import (
     oauth_token_to_credentials, credentials_to_oauth_token_data,
     save_oauth_token, update_video
 )
-from app.db.redis import set_upload_progress, delete_upload_progress, set_platform_upload_progress
+from app.db.redis import (
+    set_upload_progress, delete_upload_progress, set_platform_upload_progress,
+    set_youtube_upload_session, get_youtube_upload_session, clear_youtube_upload_session
+)
 from app.services.event_service import publish_upload_progress
-from app.services.token_service import check_tokens_available, get_token_balance, deduct_tokens, calculate_tokens_from_bytes
+from app.services.token_service import check_tokens_available, get_token_balance, calculate_tokens_from_bytes, charge_video_upload_tokens
 from app.utils.templates import get_video_title, get_video_description, replace_template_placeholders
 from app.services.video.helpers import record_platform_error, set_platform_status
+from app.services.video.platforms.rate_limiter import acquire_platform_rate_limit, PlatformRateLimitExceeded
+from app.services.video.platforms.youtube_media import R2MediaUpload
 
 youtube_logger = logging.getLogger("youtube")
 
+# googleapiclient transfers chunks with blocking httplib2 calls - run them here, not on the event loop
+_chunk_executor = ThreadPoolExecutor(
+    max_workers=settings.YOUTUBE_UPLOAD_THREADS,
+    thread_name_prefix="youtube-upload"
+)
+
+
+async def _next_chunk(request):
+    """Send the next chunk of a resumable upload without blocking the event loop
+    
+    Args:
+        request: googleapiclient HttpRequest with a resumable media body
+        
+    Returns:
+        (status, response) from request.next_chunk()
+    """
+    return await asyncio.get_running_loop().run_in_executor(_chunk_executor, request.next_chunk)
+
+
+def _query_upload_offset(request, session_uri: str, size: int) -> Tuple[int, Optional[Dict]]:
+    """Ask YouTube how much of a resumable session it has received (blocking)
+    
+    Sends the status query of the resumable upload protocol: an empty PUT with
+    Content-Range: bytes */size. A 308 reply's Range header holds the bytes
+    YouTube confirmed - the offset we saved may be ahead of or behind it.
+    
+    Args:
+        request: googleapiclient HttpRequest whose (authorized) http client is used
+        session_uri: Resumable session URI
+        size: Total upload size in bytes
+        
+    Returns:
+        (offset, None), or (size, video resource) if the session already finished
+        
+    Raises:
+        HttpError: If the session can't be resumed (404/410 once it expired)
+    """
+    resp, content = request.http.request(
+        session_uri,
+        method="PUT",
+        body=b"",
+        headers={"Content-Range": f"bytes */{size}", "Content-Length": "0"}
+    )
+    if resp.status in (200, 201):
+        return size, request.postproc(resp, content)
+    if resp.status != 308:
+        raise HttpError(resp, content, uri=session_uri)
+    # e.g. "bytes=0-524287"; no Range header means nothing was received yet
+    byte_range = resp.get("range")
+    return (int(byte_range.rsplit("-", 1)[1]) + 1 if byte_range else 0), None
+
+
+async def _resume_upload_request(request, session: Dict, size: int) -> Optional[Dict]:
+    """Point a new insert request at a saved resumable session
+    
+    The next next_chunk() continues from the offset YouTube confirms.
+    
+    Args:
+        request: googleapiclient HttpRequest with a resumable media body
+        session: Saved session from get_youtube_upload_session
+        size: Total upload size in bytes
+        
+    Returns:
+        The uploaded video resource if the session had already finished, else None
+        
+    Raises:
+        HttpError: If the session can't be resumed (404/410 once it expired)
+    """
+    offset, response = await asyncio.get_running_loop().run_in_executor(
+        _chunk_executor, _query_upload_offset, request, session['session_uri'], size
+    )
+    request.resumable_uri = session['session_uri']
+    request.resumable_progress = offset
+    return response
+
 
 async def upload_video_to_youtube(user_id: int, video_id: int, db: Session = None):
     """Upload a single video to YouTube - queries database directly"""
     # Import metrics from centralized location
     from app.core.metrics import successful_uploads_counter, failed_uploads_gauge
     # Import cancellation flag to check for cancellation during upload
-    from app.services.video.orchestrator import _cancellation_flags
+    from app.db.redis import is_upload_cancelled
     
     # Check for cancellation before starting
-    if _cancellation_flags.get(video_id, False):
+    if is_upload_cancelled(video_id):
         youtube_logger.info(f"YouTube upload cancelled for video {video_id} before starting")
         raise Exception("Upload cancelled by user")
     
@@ -228,7 +311,7 @@ async def upload_video_to_youtube(user_id: int, video_id: int, db: Session = Non
         
         youtube_logger.info(f"Preparing upload request - Title: {title[:50]}..., Visibility: {visibility}")
         
-        # Verify R2 object exists and download to temp file
+        # Verify R2 object exists - it's streamed to YouTube in chunks, not downloaded first
         if not video.path:
             error_msg = f"Video has no R2 object key"
             youtube_logger.error(
@@ -269,17 +352,11 @@ async def upload_video_to_youtube(user_id: int, video_id: int, db: Session = Non
             record_platform_error(video_id, user_id, "youtube", error_msg, db=db)
             raise FileNotFoundError(error_msg)
         
-        # Download from R2 to temp file for YouTube upload
-        import tempfile
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f"_{video.filename}")
-        temp_video_path = Path(temp_file.name)
-        temp_file.close()
-        
-        youtube_logger.debug(f"Downloading from R2: {video.path} to temp file: {temp_video_path}")
-        if not r2_service.download_file(video.path, temp_video_path):
-            error_msg = f"Failed to download video from R2: {video.path}"
+        object_size = r2_service.get_object_size(video.path)
+        if object_size is None:
+            error_msg = f"Failed to read video size from R2: {video.path}"
             youtube_logger.error(
-                f"❌ YouTube upload FAILED - R2 download failed - User {user_id}, Video {video_id} ({video.filename}): "
+                f"❌ YouTube upload FAILED - R2 read failed - User {user_id}, Video {video_id} ({video.filename}): "
                 f"R2 object key: {video.path}",
                 extra={
                     "user_id": user_id,
@@ -293,8 +370,16 @@ async def upload_video_to_youtube(user_id: int, video_id: int, db: Session = Non
             record_platform_error(video_id, user_id, "youtube", error_msg, db=db)
             raise Exception(error_msg)
         
-        try:
-            request = youtube.videos().insert(
+        media = R2MediaUpload(
+            r2_service,
+            video.path,
+            object_size,
+            mimetype=mimetypes.guess_type(video.filename)[0] or 'application/octet-stream'
+        )
+        youtube_logger.debug(f"Streaming from R2: {video.path} ({object_size} bytes)")
+        
+        def insert_request():
+            return youtube.videos().insert(
                 part='snippet,status',
                 body={
                     'snippet': snippet_body,
@@ -303,26 +388,69 @@ async def upload_video_to_youtube(user_id: int, video_id: int, db: Session = Non
                         'selfDeclaredMadeForKids': made_for_kids
                     }
                 },
-                media_body=MediaFileUpload(str(temp_video_path), resumable=True)
+                media_body=media
+            )
+        
+        try:
+            request = insert_request()
+            # Continue the session of an earlier attempt (e.g. the worker restarted mid-upload)
+            saved_session = get_youtube_upload_session(video_id)
+            resuming = bool(
+                saved_session
+                and saved_session.get('object_key') == video.path
+                and saved_session.get('size') == object_size
             )
-            
-            youtube_logger.info("Starting resumable upload...")
             response = None
+            if resuming:
+                try:
+                    response = await _resume_upload_request(request, saved_session, object_size)
+                    youtube_logger.info(
+                        f"Resuming YouTube upload for video {video_id} from byte {request.resumable_progress} of {object_size}"
+                    )
+                except HttpError as http_error:
+                    if http_error.resp.status not in (404, 410):
+                        raise
+                    # Saved session expired - start a new one from byte zero
+                    youtube_logger.warning(f"YouTube upload session for video {video_id} expired, starting over")
+                    clear_youtube_upload_session(video_id)
+                    resuming = False
+                    request = insert_request()
+            if not resuming:
+                # videos.insert is charged against the project's daily quota (resuming doesn't start a new insert)
+                await acquire_platform_rate_limit("youtube", "videos.insert", user_id)
+                youtube_logger.info("Starting resumable upload...")
+            
             chunk_count = 0
             last_published_progress = -1
             while response is None:
                 # Check for cancellation FIRST, before processing chunk
-                if _cancellation_flags.get(video_id, False):
+                if is_upload_cancelled(video_id):
                     youtube_logger.info(f"YouTube upload cancelled for video {video_id} during upload")
+                    clear_youtube_upload_session(video_id)
                     raise Exception("Upload cancelled by user")
                 
-                status, response = request.next_chunk()
+                try:
+                    status, response = await _next_chunk(request)
+                except HttpError as http_error:
+                    if not resuming or http_error.resp.status not in (404, 410):
+                        raise
+                    # Saved session expired - start a new one from byte zero
+                    youtube_logger.warning(f"YouTube upload session for video {video_id} expired, starting over")
+                    clear_youtube_upload_session(video_id)
+                    resuming = False
+                    await acquire_platform_rate_limit("youtube", "videos.insert", user_id)
+                    request = insert_request()
+                    continue
+                
+                if response is None and request.resumable_uri:
+                    set_youtube_upload_session(video_id, request.resumable_uri, request.resumable_progress, video.path, object_size)
                 if status:
                     progress = int(status.progress() * 100)
                     
                     # Check cancellation again after getting progress (before updating state)
-                    if _cancellation_flags.get(video_id, False):
+                    if is_upload_cancelled(video_id):
                         youtube_logger.info(f"YouTube upload cancelled for video {video_id} during upload")
+                        clear_youtube_upload_session(video_id)
                         raise Exception("Upload cancelled by user")
                     
                     set_upload_progress(user_id, video_id, progress)
@@ -336,10 +464,10 @@ async def upload_video_to_youtube(user_id: int, video_id: int, db: Session = Non
                     if chunk_count % 10 == 0 or progress == 100:  # Log every 10 chunks or at completion
                         youtube_logger.info(f"Upload progress: {progress}%")
             
-            # Update video in database with YouTube ID
-            custom_settings = custom_settings.copy() if custom_settings else {}
-            custom_settings['youtube_id'] = response['id']
-            update_video(video_id, user_id, db=db, custom_settings=custom_settings)
+            clear_youtube_upload_session(video_id)
+            
+            # Store the YouTube ID (merged into custom_settings - other destinations write theirs concurrently)
+            update_video(video_id, user_id, db=db, youtube_id=response['id'])
             set_upload_progress(user_id, video_id, 100)
             set_platform_upload_progress(user_id, video_id, "youtube", 100)
             # Publish final progress update
@@ -349,46 +477,15 @@ async def upload_video_to_youtube(user_id: int, video_id: int, db: Session = Non
             youtube_logger.info(f"Successfully uploaded {video.filename}, YouTube ID: {response['id']}")
             
             # Deduct tokens after successful upload (only if not already deducted)
-            if video.tokens_consumed == 0:
-                # Use stored tokens_required with fallback for backward compatibility
-                tokens_required = video.tokens_required if video.tokens_required is not None else (calculate_tokens_from_bytes(video.file_size_bytes) if video.file_size_bytes else 0)
-                if tokens_required > 0:
-                    await deduct_tokens(
-                        user_id=user_id,
-                        tokens=tokens_required,
-                        transaction_type='upload',
-                        video_id=video.id,
-                        metadata={
-                            'filename': video.filename,
-                            'platform': 'youtube',
-                            'youtube_id': response['id'],
-                            'file_size_bytes': video.file_size_bytes,
-                            'file_size_mb': round(video.file_size_bytes / (1024 * 1024), 2)
-                        },
-                        db=db
-                    )
-                # Update tokens_consumed in video record to prevent double-charging
-                update_video(video_id, user_id, db=db, tokens_consumed=tokens_required)
-                youtube_logger.info(f"Deducted {tokens_required} tokens for user {user_id} (first platform upload)")
-            else:
-                youtube_logger.info(f"Tokens already deducted for this video (tokens_consumed={video.tokens_consumed}), skipping")
+            await charge_video_upload_tokens(video, "youtube", db, metadata={'youtube_id': response['id']})
         finally:
-            # Clean up temp file
-            if 'temp_video_path' in locals() and temp_video_path and temp_video_path.exists():
-                try:
-                    temp_video_path.unlink()
-                    youtube_logger.debug(f"Cleaned up temp file: {temp_video_path}")
-                except Exception as cleanup_error:
-                    youtube_logger.warning(f"Failed to clean up temp file {temp_video_path}: {cleanup_error}")
+            media.close()
+    
+    except PlatformRateLimitExceeded:
+        # Quota exhausted for longer than a job may wait - the upload job is deferred, not failed
+        raise
     
     except Exception as e:
-        # Clean up temp file on error
-        if 'temp_video_path' in locals() and temp_video_path and temp_video_path.exists():
-            try:
-                temp_video_path.unlink()
-            except:
-                pass
-        
         error_type = type(e).__name__
         error_msg = str(e)
         
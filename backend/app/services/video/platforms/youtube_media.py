@@ -0,0 +1,111 @@
+"""Streaming media source for YouTube resumable uploads
+
+R2MediaUpload feeds googleapiclient's resumable upload straight from R2: every
+chunk YouTube asks for is read with a ranged GET, and the following chunk is
+fetched in the background while the current one is being sent. Nothing is
+written to local disk and at most two chunks are held in memory per upload.
+"""
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from googleapiclient.http import MediaUpload
+
+from app.core.config import settings
+from app.services.storage.r2_service import R2Service
+
+logger = logging.getLogger(__name__)
+
+# YouTube requires every chunk but the last to be a multiple of this
+CHUNK_SIZE_ALIGNMENT = 256 * 1024
+
+
+class R2MediaUpload(MediaUpload):
+    """Resumable MediaUpload that reads an R2 object chunk by chunk"""
+    
+    def __init__(
+        self,
+        r2_service: R2Service,
+        object_key: str,
+        size: int,
+        mimetype: str = "video/*",
+        chunksize: Optional[int] = None
+    ):
+        """Stream object_key from R2 as a resumable upload body
+        
+        Args:
+            r2_service: R2 service to read from
+            object_key: R2 object key of the video
+            size: Object size in bytes
+            mimetype: Mime type sent to YouTube
+            chunksize: Bytes per resumable upload request (default: YOUTUBE_UPLOAD_CHUNK_SIZE)
+            
+        Raises:
+            ValueError: If chunksize is not a positive multiple of 256 KiB
+        """
+        if chunksize is None:
+            chunksize = settings.YOUTUBE_UPLOAD_CHUNK_SIZE
+        if chunksize <= 0 or chunksize % CHUNK_SIZE_ALIGNMENT:
+            raise ValueError(f"YouTube upload chunk size must be a positive multiple of {CHUNK_SIZE_ALIGNMENT} bytes, got {chunksize}")
+        
+        super().__init__()
+        self._r2_service = r2_service
+        self._object_key = object_key
+        self._size = size
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # (begin, length) of the chunk being read ahead
+        self._prefetch: Optional[Tuple[Tuple[int, int], Future]] = None
+    
+    def chunksize(self):
+        return self._chunksize
+    
+    def mimetype(self):
+        return self._mimetype
+    
+    def size(self):
+        return self._size
+    
+    def resumable(self):
+        return True
+    
+    def has_stream(self):
+        return False
+    
+    def _read(self, begin: int, length: int) -> bytes:
+        return self._r2_service.read_range(self._object_key, begin, min(length, self._size - begin))
+    
+    def getbytes(self, begin, length):
+        """Bytes [begin, begin + length) of the object, then start reading the next chunk"""
+        data = None
+        if self._prefetch is not None:
+            key, future = self._prefetch
+            self._prefetch = None
+            if key == (begin, length):
+                data = future.result()
+            else:
+                # YouTube resumed from a different offset - the read-ahead is of no use
+                future.cancel()
+        
+        if data is None:
+            data = self._read(begin, length)
+        
+        next_begin = begin + len(data)
+        if next_begin < self._size:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="r2-read-ahead")
+            self._prefetch = ((next_begin, length), self._executor.submit(self._read, next_begin, length))
+        return data
+    
+    def close(self) -> None:
+        """Stop reading ahead (call once the upload has finished or failed)"""
+        if self._prefetch is not None:
+            self._prefetch[1].cancel()
+            self._prefetch = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    def to_json(self):
+        raise NotImplementedError("R2MediaUpload can't be serialized")
@@ -6,6 +6,7 @@ from typing import Any, Dict, Optional
 from sqlalchemy.orm import Session
 
 from app.db.helpers import get_user_videos, get_user_settings, update_video
+from app.db.redis import notify_scheduler
 from app.utils.templates import replace_template_placeholders
 from app.services.video.config import PLATFORM_CONFIG
 
@@ -206,6 +207,9 @@ def update_video_settings(
     
     # Update in database
     update_video(video_id, user_id, db=db, **update_data)
+    if update_data.get("scheduled_time") is not None:
+        # New due time may be earlier than the scheduler's next wake-up
+        notify_scheduler()
     
     # Return updated video
     updated_videos = get_user_videos(user_id, db=db)
@@ -9,6 +9,7 @@ from app.db.helpers import get_all_scheduled_videos
 from app.db.session import SessionLocal
 from app.models.video import Video
 from app.services.video.helpers import cleanup_video_file
+from app.tasks.leader import still_leader
 
 # Import Prometheus metrics from centralized location
 from app.core.metrics import (
@@ -27,7 +28,16 @@ async def cleanup_task():
     Runs every hour to:
     1. Delete video files for videos uploaded more than 24 hours ago
     2. Remove orphaned files (files on disk without database records)
+    
+    Also runs one-shot Redis migrations on start, since this loop has a single leader.
     """
+    try:
+        # Index sessions created before per-user session indexes existed (once per Redis)
+        from app.db.redis import backfill_user_session_index
+        await asyncio.get_running_loop().run_in_executor(None, backfill_user_session_index)
+    except Exception as e:
+        cleanup_logger.error(f"Session index backfill failed: {e}", exc_info=True)
+    
     while True:
         try:
             await asyncio.sleep(3600)  # Run every hour
@@ -51,6 +61,10 @@ async def cleanup_task():
                 
                 cleaned_count = 0
                 for video in old_uploaded_videos:
+                    # Stop as soon as another process has taken over the cleanup lease
+                    if not await still_leader():
+                        cleanup_logger.warning("Lost cleanup leadership, stopping cleanup pass")
+                        break
                     if cleanup_video_file(video):
                         cleaned_count += 1
                 
@@ -0,0 +1,117 @@
+"""Leader election for singleton periodic tasks
+
+Each singleton loop (scheduler, token reset, cleanup, status checker) runs on
+exactly one process at a time. Processes compete for a Redis lease per loop;
+the holder runs the loop and renews the lease, everyone else retries. If the
+leader dies, its lease expires and another process takes over within
+LEADER_LEASE_SECONDS + LEADER_RETRY_INTERVAL.
+
+Each acquisition issues a fencing token (see acquire_fenced_lock). The leader
+stops its loop as soon as a renewal fails, and leader-only writes call
+still_leader() right before writing so a leader that has been replaced (e.g.
+after a long pause) skips them instead of racing its successor.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import socket
+import uuid
+from typing import Callable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import leader_gauge
+from app.db.redis import (
+    async_acquire_fenced_lock, async_renew_lock, async_release_lock, async_get_fencing_token
+)
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY_PREFIX = "leader:"
+
+# Identifies this process as lease holder
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# (job name, fencing token) of the leader job the current task runs in
+_current_lease: contextvars.ContextVar[Optional[Tuple[str, int]]] = contextvars.ContextVar(
+    "current_lease", default=None
+)
+
+
+async def still_leader() -> bool:
+    """Check the leader job calling this still holds the newest lease
+
+    Call right before a leader-only write. Code not started by run_as_leader
+    (tests, one-off scripts) is always allowed to write.
+
+    Returns:
+        False if a newer fencing token has been issued for the calling job
+    """
+    lease = _current_lease.get()
+    if lease is None:
+        return True
+    name, token = lease
+    return await async_get_fencing_token(f"{LEADER_KEY_PREFIX}{name}") == token
+
+
+async def _run_with_lease(loop_func: Callable, name: str, token: int) -> None:
+    """Run loop_func in its own task context tagged with the lease for still_leader()"""
+    _current_lease.set((name, token))
+    await loop_func()
+
+
+async def run_as_leader(name: str, loop_func: Callable) -> None:
+    """Run loop_func only while this process holds the leader lease for name
+
+    Runs forever (until cancelled): waits for the lease, runs the loop while
+    renewing it, and stops the loop immediately if the lease is lost.
+
+    Args:
+        name: Job name (one lease per name)
+        loop_func: Coroutine function of the periodic loop
+    """
+    lock_key = f"{LEADER_KEY_PREFIX}{name}"
+    lease = settings.LEADER_LEASE_SECONDS
+
+    while True:
+        try:
+            token = await async_acquire_fenced_lock(lock_key, NODE_ID, timeout=lease)
+        except Exception as e:
+            logger.error(f"Error acquiring leader lease for {name}: {e}", exc_info=True)
+            token = None
+
+        if token is None:
+            await asyncio.sleep(settings.LEADER_RETRY_INTERVAL)
+            continue
+
+        leader_gauge.labels(job=name).set(1)
+        logger.info(f"Became leader for {name} (fencing token {token})")
+        job = asyncio.create_task(_run_with_lease(loop_func, name, token))
+
+        try:
+            while not job.done():
+                await asyncio.wait({job}, timeout=settings.LEADER_RENEW_INTERVAL)
+                if job.done():
+                    break
+                try:
+                    renewed = await async_renew_lock(lock_key, NODE_ID, timeout=lease)
+                except Exception as e:
+                    logger.error(f"Error renewing leader lease for {name}: {e}", exc_info=True)
+                    renewed = False
+                if not renewed:
+                    logger.warning(f"Lost leader lease for {name} (fencing token {token}), stopping job")
+                    break
+
+            if job.done() and not job.cancelled() and job.exception():
+                logger.error(f"Leader job {name} crashed: {job.exception()}", exc_info=job.exception())
+        finally:
+            job.cancel()
+            await asyncio.gather(job, return_exceptions=True)
+            leader_gauge.labels(job=name).set(0)
+            try:
+                # Hand over immediately instead of waiting for the lease to expire
+                await async_release_lock(lock_key, NODE_ID)
+            except Exception as e:
+                logger.warning(f"Error releasing leader lease for {name}: {e}")
+
+        await asyncio.sleep(settings.LEADER_RETRY_INTERVAL)
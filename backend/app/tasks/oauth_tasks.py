@@ -10,7 +10,7 @@ from app.services.platform_service import extract_tiktok_account_from_creator_in
 tiktok_logger = logging.getLogger("tiktok")
 
 
-def refresh_tiktok_account_data(user_id: int):
+async def refresh_tiktok_account_data(user_id: int):
     """Background task to refresh TikTok account data
     
     ROOT CAUSE FIX: Fetch token from DB at execution time to avoid using stale token strings.
@@ -24,7 +24,7 @@ def refresh_tiktok_account_data(user_id: int):
     try:
         # ROOT CAUSE FIX: Fetch fresh token from DB at execution time, not from parameter
         # This ensures we always use the latest token, even if it was refreshed after task was scheduled
-        access_token = _ensure_fresh_token(user_id, db)
+        access_token = await _ensure_fresh_token(user_id, db)
         if not access_token:
             tiktok_logger.warning(f"Could not get fresh token for background refresh (user {user_id})")
             return
@@ -40,7 +40,7 @@ def refresh_tiktok_account_data(user_id: int):
         
         # Fetch fresh data using token fetched from DB
         # ROOT CAUSE FIX: Pass db session so retry logic can re-fetch token if needed
-        fresh_creator_info = _fetch_creator_info_safe(access_token, user_id, db=db)
+        fresh_creator_info = await _fetch_creator_info_safe(access_token, user_id, db=db)
         if not fresh_creator_info:
             return
         
@@ -0,0 +1,109 @@
+"""Background task roles - which background loops a process runs
+
+A role is a named group of loops. The API process runs the roles listed in
+settings.IN_PROCESS_WORKER_ROLES (all of them by default, i.e. the original
+single-process deployment). Dedicated worker processes run one or more roles
+via the worker CLI (`python -m app.worker --role upload-worker`), so API and
+upload capacity can be scaled independently.
+
+Loops of singleton roles run under leader election (app.tasks.leader), so
+they run on exactly one process however many processes enable the role.
+"""
+import asyncio
+import logging
+from typing import Callable, Dict, List
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ROLE_UPLOAD_WORKER = "upload-worker"
+ROLE_SCHEDULER = "scheduler"
+ROLE_STATUS_CHECKER = "status-checker"
+
+WORKER_ROLES = (ROLE_UPLOAD_WORKER, ROLE_SCHEDULER, ROLE_STATUS_CHECKER)
+
+# Roles whose loops must run on exactly one process - each loop runs under leader election
+SINGLETON_ROLES = (ROLE_SCHEDULER, ROLE_STATUS_CHECKER)
+
+
+def parse_roles(value: str) -> List[str]:
+    """Parse a comma-separated role list
+
+    Args:
+        value: e.g. "upload-worker,scheduler" ("" for none)
+
+    Returns:
+        Role names in WORKER_ROLES order, without duplicates
+
+    Raises:
+        ValueError: If a role name is unknown
+    """
+    requested = {role.strip() for role in value.split(",") if role.strip()}
+    unknown = requested - set(WORKER_ROLES)
+    if unknown:
+        raise ValueError(
+            f"Unknown worker role(s): {', '.join(sorted(unknown))} "
+            f"(expected: {', '.join(WORKER_ROLES)})"
+        )
+    return [role for role in WORKER_ROLES if role in requested]
+
+
+def _role_loops(role: str) -> List[Callable]:
+    """Loop coroutine functions for a role (imported lazily so unused roles cost nothing)"""
+    if role == ROLE_UPLOAD_WORKER:
+        from app.tasks.upload_worker import upload_worker_task
+        return [upload_worker_task]
+
+    if role == ROLE_SCHEDULER:
+        from app.tasks.scheduler import scheduler_task, token_reset_scheduler_task
+        from app.tasks.cleanup import cleanup_task
+        return [scheduler_task, token_reset_scheduler_task, cleanup_task]
+
+    from app.tasks.status_checker import status_checker_task
+    return [status_checker_task]
+
+
+def start_role_tasks(roles: List[str]) -> Dict[str, List[asyncio.Task]]:
+    """Start the background loops for each role
+
+    Args:
+        roles: Role names (see parse_roles)
+
+    Returns:
+        Running tasks per role - pass to stop_role_tasks on shutdown
+    """
+    from app.tasks.leader import run_as_leader
+    
+    running: Dict[str, List[asyncio.Task]] = {}
+    for role in roles:
+        logger.info(f"Starting {role} role...")
+        if role in SINGLETON_ROLES:
+            running[role] = [
+                asyncio.create_task(run_as_leader(loop_func.__name__, loop_func))
+                for loop_func in _role_loops(role)
+            ]
+        else:
+            running[role] = [asyncio.create_task(loop_func()) for loop_func in _role_loops(role)]
+        logger.info(f"{role} role started")
+    return running
+
+
+async def stop_role_tasks(running: Dict[str, List[asyncio.Task]]) -> None:
+    """Cancel the loops started by start_role_tasks
+
+    The upload worker stops taking new tasks, then in-flight uploads get up
+    to UPLOAD_WORKER_DRAIN_TIMEOUT seconds to finish before being re-queued.
+
+    Args:
+        running: Tasks per role as returned by start_role_tasks
+    """
+    for tasks in running.values():
+        for task in tasks:
+            task.cancel()
+    await asyncio.gather(*(task for tasks in running.values() for task in tasks), return_exceptions=True)
+
+    if ROLE_UPLOAD_WORKER in running:
+        from app.tasks.upload_worker import drain_upload_worker
+        await drain_upload_worker(timeout=settings.UPLOAD_WORKER_DRAIN_TIMEOUT)
+        logger.info("Upload worker drained")
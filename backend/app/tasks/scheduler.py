@@ -1,20 +1,35 @@
 """Background scheduler tasks for video posting queue and token resets"""
 import asyncio
 import logging
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List
 
-from app.db.helpers import get_all_scheduled_videos, update_video
+from app.core.config import settings
+from app.db.helpers import (
+    claim_scheduled_videos, get_due_scheduled_videos, get_next_scheduled_time,
+    get_uploading_scheduled_video_ids, update_video
+)
+from app.db.redis import (
+    wait_for_scheduler_wakeup, acquire_lock, renew_lock, release_lock,
+    record_scheduled_claims, release_scheduled_claim, get_stale_scheduled_claims,
+    scheduled_claims_backfilled, mark_scheduled_claims_backfilled, clear_upload_cancelled,
+    SCHEDULED_UPLOAD_LOCK_PREFIX
+)
+from app.db.task_queue import async_enqueue_task
+from app.tasks.leader import still_leader
 from app.db.session import SessionLocal
 from app.models.subscription import Subscription
 from app.models.token_balance import TokenBalance
 from app.models.video import Video
 from app.services.token_service import reset_tokens_for_subscription
 from app.services.video import (
-    DESTINATION_UPLOADERS,
     build_upload_context, check_upload_success, cleanup_video_file
 )
-from app.services.video.helpers import set_platform_status
+from app.services.video.fair_share import upload_fair_share
+from app.services.video.orchestrator import upload_to_destinations
+from app.services.video.platforms.rate_limiter import PlatformRateLimitExceeded
 
 # Import Prometheus metrics from centralized location
 from app.core.metrics import (
@@ -26,359 +41,352 @@ from app.core.metrics import (
 logger = logging.getLogger(__name__)
 upload_logger = logging.getLogger("upload")
 
+# Scheduled uploads share the upload worker queue (payload carries video_id)
+SCHEDULED_UPLOAD_TASK_TYPE = "upload_videos"
 
-async def scheduler_task():
-    """Background task that checks for scheduled videos and uploads them to all enabled destinations
-    Optimized to use batch queries instead of querying per user/video"""
+
+async def upload_scheduled_video(video_id: int, user_id: int, db) -> str:
+    """Upload one claimed scheduled video to all enabled destinations
+    
+    Runs as an upload worker job (enqueued by scheduler_task), so a slow
+    upload only occupies a worker slot instead of holding up the scheduler.
+    While it runs, a heartbeat renews the video's upload lock and refreshes
+    its claim; finishing releases both. Claims whose job was lost stop being
+    refreshed and are re-dispatched by _recover_lost_claims.
+    
+    Args:
+        video_id: Video ID (claimed by claim_scheduled_videos)
+        user_id: User ID
+        db: Database session
+    
+    Returns:
+        "uploaded", "failed", "cancelled", or "skipped" if the video is no longer claimed
+    
+    Raises:
+        PlatformRateLimitExceeded: If a destination waits for its quota (the job is deferred, video stays claimed)
+    """
+    video = db.query(Video).filter(Video.id == video_id, Video.user_id == user_id).first()
+    if not video or video.status != "uploading":
+        # Deleted or cancelled while the job was queued
+        clear_upload_cancelled(video_id)
+        release_scheduled_claim(video_id)
+        upload_logger.info(f"Skipping scheduled upload of video {video_id} - no longer claimed")
+        return "skipped"
+    
+    # A re-dispatched claim can leave two jobs for one video - only one may upload
+    lock_key = f"{SCHEDULED_UPLOAD_LOCK_PREFIX}{video_id}"
+    lock_owner = uuid.uuid4().hex
+    if not acquire_lock(lock_key, timeout=settings.TASK_QUEUE_WORKER_LEASE_SECONDS, owner=lock_owner):
+        upload_logger.info(f"Skipping scheduled upload of video {video_id} - another job is uploading it")
+        return "skipped"
+    
+    try:
+        record_scheduled_claims([video_id])
+        upload = asyncio.create_task(_upload_claimed_video(video, user_id, db))
+        heartbeat = asyncio.create_task(_upload_heartbeat(video_id, lock_key, lock_owner))
+        try:
+            await asyncio.wait({upload, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            upload.cancel()
+            heartbeat.cancel()
+            await asyncio.gather(upload, heartbeat, return_exceptions=True)
+        
+        if upload.cancelled():
+            # The heartbeat lost the lock - another job owns the video now
+            return "skipped"
+        result = upload.result()
+        # Not reached when the worker is stopped mid-upload - the claim then stays for recovery
+        release_scheduled_claim(video_id)
+        return result
+    finally:
+        release_lock(lock_key, owner=lock_owner)
+
+
+async def _upload_heartbeat(video_id: int, lock_key: str, lock_owner: str) -> None:
+    """Keep a running scheduled upload's lock and claim alive
+    
+    Returns only if the lock was lost (expired and taken by another job),
+    so the caller stops uploading instead of racing the new owner.
+    """
     while True:
+        await asyncio.sleep(settings.TASK_QUEUE_HEARTBEAT_INTERVAL)
+        try:
+            renewed = renew_lock(lock_key, lock_owner, timeout=settings.TASK_QUEUE_WORKER_LEASE_SECONDS)
+            if renewed:
+                record_scheduled_claims([video_id])
+        except Exception as e:
+            upload_logger.warning(f"Error renewing upload lock of video {video_id}: {e}")
+            continue
+        if not renewed:
+            upload_logger.error(f"Lost upload lock of video {video_id}, stopping this upload")
+            return
+
+
+async def _upload_claimed_video(video: Video, user_id: int, db) -> str:
+    """Body of upload_scheduled_video, run while holding the video's upload lock"""
+    video_id = video.id
+    
+    # Build upload context (enabled destinations, settings, tokens)
+    upload_context = build_upload_context(user_id, db)
+    enabled_destinations = upload_context.enabled_destinations
+    
+    if not enabled_destinations:
+        # Destinations disconnected since the claim - hand the video back to the scheduler
+        update_video(video_id, user_id, db=db, status="scheduled")
+        return "skipped"
+    
+    # A re-dispatched job must not post again where an earlier attempt already succeeded
+    already_uploaded = [dest for dest in enabled_destinations if check_upload_success(video, dest)]
+    
+    upload_logger.info(f"Uploading scheduled video for user {user_id}: {video.filename}")
+    old_status = video.status
+    
+    try:
+        # Upload to all enabled destinations concurrently (cancellable via cancel_upload)
+        # Failures are isolated per destination and recorded as platform statuses
+        remaining = [dest for dest in enabled_destinations if dest not in already_uploaded]
+        async with upload_fair_share.slot(user_id, upload_context.upload_weight(db)):
+            results = await upload_to_destinations(video_id, user_id, remaining, db, upload_context)
+        results.update({dest: "success" for dest in already_uploaded})
+        
+        if "cancelled" in results.values():
+            # cancel_upload already set the video status
+            upload_logger.info(f"Scheduled upload cancelled for video {video_id} ({video.filename})")
+            return "cancelled"
+        
+        success_count = sum(1 for result in results.values() if result == "success")
+        
+        if success_count == len(enabled_destinations):
+            update_video(video_id, user_id, db=db, status="uploaded")
+            
+            # Refresh video and build full response (backend is source of truth)
+            updated_video = db.query(Video).filter(Video.id == video_id).first()
+            if updated_video:
+                from app.services.event_service import publish_video_status_changed
+                video_dict = upload_context.build_video_response(updated_video, db)
+                
+                # Publish status change event with full video data
+                await publish_video_status_changed(user_id, video_id, old_status, "uploaded", video_dict=video_dict)
+                
+                # Cleanup: Delete video file after successful upload to all destinations
+                # Keep database record for history
+                cleanup_video_file(updated_video)
+            
+            successful_uploads_counter.inc()
+            return "uploaded"
+        
+        update_video(video_id, user_id, db=db, status="failed", error=f"Upload failed for some destinations")
+        
+        # Publish status change event
+        from app.services.event_service import publish_video_status_changed
+        await publish_video_status_changed(user_id, video_id, old_status, "failed")
+        return "failed"
+    
+    except PlatformRateLimitExceeded:
+        # Video stays claimed with the waiting destinations pending - the worker defers this job
+        raise
+        
+    except Exception as e:
+        error_type = type(e).__name__
+        error_msg = str(e)
+        
+        # Gather context for troubleshooting
+        # Note: Use 'video_filename' instead of 'filename' to avoid conflict with LogRecord.filename
+        context = {
+            "user_id": user_id,
+            "video_id": video_id,
+            "video_filename": video.filename,
+            "error_type": error_type,
+            "error_message": error_msg,
+            "scheduled_time": str(video.scheduled_time),
+        }
+        
+        # Log comprehensive error
+        upload_logger.error(
+            f"❌ Scheduled upload FAILED - User {user_id}, Video {video_id} "
+            f"({video.filename}): {error_type}: {error_msg}",
+            extra={"context": context},
+            exc_info=True
+        )
+        
+        detailed_error = f"Scheduler error: {error_type}: {error_msg}"
         try:
-            await asyncio.sleep(30)  # Check every 30 seconds
+            db.rollback()
+            update_video(video_id, user_id, db=db, status="failed", error=detailed_error)
             
+            # Refresh video and build full response (backend is source of truth)
+            updated_video = db.query(Video).filter(Video.id == video_id).first()
+            if updated_video:
+                from app.services.event_service import publish_video_status_changed
+                video_dict = upload_context.build_video_response(updated_video, db)
+                
+                # Publish status change event with full video data
+                await publish_video_status_changed(user_id, video_id, old_status, "failed", video_dict=video_dict)
+        except Exception as status_err:
+            logger.warning(f"Failed to mark scheduled video {video_id} as failed: {status_err}")
+        return "failed"
+
+
+async def _dispatch_due_videos(videos_by_user: Dict[int, List[Video]], db) -> int:
+    """Claim a batch of due videos and enqueue one upload job per claimed video
+    
+    Args:
+        videos_by_user: Due videos grouped by user_id
+        db: Database session
+    
+    Returns:
+        Number of videos dispatched to the upload queue
+    """
+    videos_dispatched = 0
+    
+    for user_id, videos in videos_by_user.items():
+        # Skip this user if no destinations are enabled (videos stay scheduled)
+        upload_context = build_upload_context(user_id, db)
+        if not upload_context.enabled_destinations:
+            continue
+        
+        if not await still_leader():
+            # Replaced as leader (e.g. after a long pause) - the new leader dispatches these
+            logger.warning("Scheduler lost leadership, skipping claims")
+            break
+        claimed = claim_scheduled_videos([video.id for video in videos], db=db)
+        record_scheduled_claims(claimed)
+        for video_id in claimed:
+            try:
+                await async_enqueue_task(
+                    SCHEDULED_UPLOAD_TASK_TYPE,
+                    {"user_id": user_id, "video_id": video_id},
+                    dedup_key=f"video:{video_id}"
+                )
+            except Exception as e:
+                # Release the claim so the next pass retries
+                logger.error(f"Error enqueuing scheduled video {video_id}: {e}", exc_info=True)
+                update_video(video_id, user_id, db=db, status="scheduled")
+                release_scheduled_claim(video_id)
+                continue
+            
+            videos_dispatched += 1
+            scheduler_videos_processed_counter.inc()
+            upload_logger.info(f"Queued scheduled video {video_id} for user {user_id}")
+    
+    return videos_dispatched
+
+
+async def _recover_lost_claims(db) -> int:
+    """Re-dispatch claimed scheduled videos whose upload job was lost
+    
+    A claim moves a video scheduled -> uploading, and only scheduled videos are
+    selected again, so a job that never finishes (reaped as stale by the task
+    queue, lost with Redis data) would leave its video uploading forever. Claims
+    not refreshed by a starting job within TASK_QUEUE_STALE_TASK_TIMEOUT are
+    enqueued again; the dedup key folds this into a job that is still waiting.
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        Number of videos re-dispatched
+    """
+    if not scheduled_claims_backfilled():
+        # Videos the scheduler claimed before claims were recorded get one timeout to finish
+        record_scheduled_claims(get_uploading_scheduled_video_ids(db=db), only_new=True)
+        mark_scheduled_claims_backfilled()
+    
+    stale = get_stale_scheduled_claims(time.time() - settings.TASK_QUEUE_STALE_TASK_TIMEOUT, settings.SCHEDULER_BATCH_SIZE)
+    if not stale or not await still_leader():
+        return 0
+    
+    still_claimed = {
+        row.id: row.user_id for row in db.query(Video.id, Video.user_id).filter(
+            Video.id.in_(stale),
+            Video.status == 'uploading'
+        ).all()
+    }
+    
+    recovered = 0
+    for video_id in stale:
+        user_id = still_claimed.get(video_id)
+        if user_id is None:
+            # Finished, cancelled or deleted without its job releasing the claim
+            release_scheduled_claim(video_id)
+            continue
+        try:
+            await async_enqueue_task(
+                SCHEDULED_UPLOAD_TASK_TYPE,
+                {"user_id": user_id, "video_id": video_id},
+                dedup_key=f"video:{video_id}"
+            )
+        except Exception as e:
+            logger.error(f"Error re-enqueuing scheduled video {video_id}: {e}", exc_info=True)
+            continue
+        # The new job gets a full timeout before the claim counts as lost again
+        record_scheduled_claims([video_id])
+        recovered += 1
+        upload_logger.warning(f"Re-dispatched scheduled video {video_id} for user {user_id} - its upload job was lost")
+    
+    return recovered
+
+
+async def scheduler_task():
+    """Background task that dispatches scheduled videos to the upload queue when they are due
+    
+    Event-driven: each pass loads only due videos (indexed range query, in
+    batches), claims them and enqueues one upload job per video for the upload
+    workers (see upload_scheduled_video), then sleeps until the next
+    scheduled_time - or until woken by notify_scheduler() when a video is
+    (re)scheduled. Passes happen at least every SCHEDULER_MAX_SLEEP seconds.
+    Upload duration never delays dispatch of other users' videos. Each pass
+    also re-dispatches claimed videos whose upload job was lost."""
+    while True:
+        try:
             current_time = datetime.now(timezone.utc)
             
-            # Batch query: Get all scheduled videos across all users in a single query
             db = SessionLocal()
             if db is None:
                 logger.error("Failed to create database session in scheduler task")
+                await asyncio.sleep(settings.SCHEDULER_MAX_SLEEP)
                 continue
             try:
-                # Single query to get all scheduled videos, grouped by user_id
-                videos_by_user = get_all_scheduled_videos(db=db)
-                
-                videos_processed = 0
-                # Process videos grouped by user (allows batch loading of user settings/tokens)
-                for user_id, videos in videos_by_user.items():
-                    # Build upload context (enabled destinations, settings, tokens)
-                    # ROOT CAUSE FIX: Ensure session is valid before use, create new one if invalid
-                    if db is None:
-                        db = SessionLocal()
-                    try:
-                        upload_context = build_upload_context(user_id, db)
-                    except Exception as context_err:
-                        # Session might be invalid - create a new one
-                        logger.warning(f"Session invalid when building upload context for user {user_id}, creating new session: {context_err}")
-                        if db is not None:
-                            try:
-                                db.close()
-                            except Exception:
-                                pass
-                        db = SessionLocal()
-                        upload_context = build_upload_context(user_id, db)
+                videos_processed = await _recover_lost_claims(db)
+                cursor = None
+                while True:
+                    # Batch query: next page of due videos across all users
+                    due_videos = get_due_scheduled_videos(
+                        current_time, settings.SCHEDULER_BATCH_SIZE, after=cursor, db=db
+                    )
+                    if not due_videos:
+                        break
+                    cursor = (due_videos[-1].scheduled_time, due_videos[-1].id)
                     
-                    enabled_destinations = upload_context["enabled_destinations"]
+                    # Group by user (allows batch loading of user settings/tokens)
+                    videos_by_user: Dict[int, List[Video]] = {}
+                    for video in due_videos:
+                        videos_by_user.setdefault(video.user_id, []).append(video)
                     
-                    if not enabled_destinations:
-                        # Skip this user if no destinations are enabled
-                        continue
+                    videos_processed += await _dispatch_due_videos(videos_by_user, db)
                     
-                    # Process each scheduled video for this user
-                    for video in videos:
-                        try:
-                            scheduled_time = datetime.fromisoformat(video.scheduled_time) if isinstance(video.scheduled_time, str) else video.scheduled_time
-                            
-                            # ROOT CAUSE FIX: Skip if scheduled_time is None (defensive programming)
-                            # This can happen due to race conditions where video is updated between query and processing
-                            if scheduled_time is None:
-                                logger.warning(f"Skipping video {video.id} - scheduled_time is None (likely updated between query and processing)")
-                                continue
-                            
-                            # ROOT CAUSE FIX: Upload if scheduled time has passed
-                            # This handles both:
-                            # 1. Videos scheduled for future upload (status="scheduled")
-                            # 2. Videos that were uploading when server restarted (status="uploading")
-                            if current_time >= scheduled_time:
-                                video_id = video.id
-                                videos_processed += 1
-                                scheduler_videos_processed_counter.inc()
-                                
-                                # Log whether this is a retry or new upload
-                                if video.status == "uploading":
-                                    upload_logger.info(f"Retrying upload for video that was in progress: {video.filename} (user {user_id})")
-                                else:
-                                    upload_logger.info(f"Uploading scheduled video for user {user_id}: {video.filename}")
-                                
-                                # Mark as uploading - use shared session
-                                # This is idempotent - safe to call even if already "uploading"
-                                # ROOT CAUSE FIX: Ensure session is valid before use
-                                if db is None:
-                                    db = SessionLocal()
-                                try:
-                                    update_video(video_id, user_id, db=db, status="uploading")
-                                except Exception as update_err:
-                                    # Session might be invalid - create a new one
-                                    logger.warning(f"Session invalid when updating video {video_id}, creating new session: {update_err}")
-                                    if db is not None:
-                                        try:
-                                            db.close()
-                                        except Exception:
-                                            pass
-                                    db = SessionLocal()
-                                    update_video(video_id, user_id, db=db, status="uploading")
-                                
-                                # Upload to each enabled destination - uploader functions query DB directly
-                                # Note: Upload functions create their own sessions (backward compatible)
-                                success_count = 0
-                                for dest_name in enabled_destinations:
-                                    uploader_func = DESTINATION_UPLOADERS.get(dest_name)
-                                    if uploader_func:
-                                        try:
-                                            logger.debug(f"  Uploading to {dest_name}...")
-                                            # Pass user_id, video_id, and db session - uploader functions need db
-                                            # ROOT CAUSE FIX: Pass db session to uploader functions so they don't receive None
-                                            await uploader_func(user_id, video_id, db=db)
-                                            
-                                            # Expire the video object from this session to force fresh query
-                                            # The upload function uses its own session, so we need to refresh
-                                            # ROOT CAUSE FIX: Ensure session is valid before use, create new one if invalid
-                                            if db is None:
-                                                db = SessionLocal()
-                                            try:
-                                                db.expire_all()
-                                                
-                                                # Check if upload succeeded by querying updated video - use shared session
-                                                # Note: We could optimize this further by caching the video object, but for now
-                                                # we'll query to ensure we have the latest state
-                                                updated_video = db.query(Video).filter(Video.id == video_id).first()
-                                                if updated_video and check_upload_success(updated_video, dest_name):
-                                                    success_count += 1
-                                                    # Set platform status to success
-                                                    await set_platform_status(video_id, user_id, dest_name, "success", error=None, db=db)
-                                            except Exception as db_err:
-                                                # Session might be invalid - create a new one to check upload status
-                                                logger.warning(f"Session invalid when checking upload status for video {video_id}, creating new session: {db_err}")
-                                                if db is not None:
-                                                    try:
-                                                        db.close()
-                                                    except Exception:
-                                                        pass
-                                                db = SessionLocal()
-                                                try:
-                                                    updated_video = db.query(Video).filter(Video.id == video_id).first()
-                                                    if updated_video and check_upload_success(updated_video, dest_name):
-                                                        success_count += 1
-                                                        # Set platform status to success
-                                                        await set_platform_status(video_id, user_id, dest_name, "success", error=None, db=db)
-                                                except Exception:
-                                                    # If still failing, use temporary session
-                                                    temp_db = SessionLocal()
-                                                    try:
-                                                        updated_video = temp_db.query(Video).filter(Video.id == video_id).first()
-                                                        if updated_video and check_upload_success(updated_video, dest_name):
-                                                            success_count += 1
-                                                            # Set platform status to success
-                                                            await set_platform_status(video_id, user_id, dest_name, "success", error=None, db=temp_db)
-                                                    finally:
-                                                        temp_db.close()
-                                        except Exception as upload_err:
-                                            error_type = type(upload_err).__name__
-                                            error_msg = str(upload_err)
-                                            
-                                            # Gather context for troubleshooting
-                                            # Note: Use 'video_filename' instead of 'filename' to avoid conflict with LogRecord.filename
-                                            context = {
-                                                "user_id": user_id,
-                                                "video_id": video_id,
-                                                "video_filename": video.filename,
-                                                "platform": dest_name,
-                                                "error_type": error_type,
-                                                "error_message": error_msg,
-                                                "scheduled_time": str(scheduled_time) if 'scheduled_time' in locals() else None,
-                                            }
-                                            
-                                            # Log comprehensive error
-                                            upload_logger.error(
-                                                f"❌ Upload FAILED in scheduler - User {user_id}, Video {video_id} ({video.filename}), "
-                                                f"Platform {dest_name}: {error_type}: {error_msg}",
-                                                extra=context,
-                                                exc_info=True
-                                            )
-                                            
-                                            logger.debug(f"  Error uploading to {dest_name}: {upload_err}")
-                                            
-                                            # Set platform status to failed
-                                            try:
-                                                if db is None:
-                                                    db = SessionLocal()
-                                                await set_platform_status(video_id, user_id, dest_name, "failed", error=error_msg, db=db)
-                                            except Exception as status_err:
-                                                logger.warning(f"Failed to set platform status for {dest_name}: {status_err}")
-                                                # Try with temporary session
-                                                try:
-                                                    temp_db = SessionLocal()
-                                                    await set_platform_status(video_id, user_id, dest_name, "failed", error=error_msg, db=temp_db)
-                                                    temp_db.close()
-                                                except Exception:
-                                                    pass
-                                
-                                # Update final status - use shared session if valid, otherwise create new one
-                                # ROOT CAUSE FIX: Ensure session is valid before use
-                                if db is None:
-                                    db = SessionLocal()
-                                
-                                if success_count == len(enabled_destinations):
-                                    old_status = video.status
-                                    try:
-                                        update_video(video_id, user_id, db=db, status="uploaded")
-                                    except Exception as update_err:
-                                        # Session might be invalid - create a new one
-                                        logger.warning(f"Session invalid when updating video {video_id} to uploaded, creating new session: {update_err}")
-                                        if db is not None:
-                                            try:
-                                                db.close()
-                                            except Exception:
-                                                pass
-                                        db = SessionLocal()
-                                        update_video(video_id, user_id, db=db, status="uploaded")
-                                    
-                                    # Refresh video and build full response (backend is source of truth)
-                                    if db is None:
-                                        db = SessionLocal()
-                                    updated_video = db.query(Video).filter(Video.id == video_id).first()
-                                    if updated_video:
-                                        from app.services.event_service import publish_video_status_changed
-                                        from app.services.video.helpers import build_video_response
-                                        from app.db.helpers import get_all_user_settings, get_all_oauth_tokens
-                                        all_settings = get_all_user_settings(user_id, db=db)
-                                        all_tokens = get_all_oauth_tokens(user_id, db=db)
-                                        video_dict = build_video_response(updated_video, all_settings, all_tokens, user_id)
-                                        
-                                        # Publish status change event with full video data
-                                        await publish_video_status_changed(user_id, video_id, old_status, "uploaded", video_dict=video_dict)
-                                    
-                                    # Only increment counter if video status is changing to "uploaded" (not already uploaded)
-                                    # This prevents double-counting if scheduler runs multiple times or if status_checker already counted it
-                                    if old_status != "uploaded":
-                                        # Increment successful uploads counter
-                                        successful_uploads_counter.inc()
-                                    
-                                    # Cleanup: Delete video file after successful upload to all destinations
-                                    # Keep database record for history
-                                    try:
-                                        updated_video = db.query(Video).filter(Video.id == video_id).first()
-                                        if updated_video:
-                                            cleanup_video_file(updated_video)
-                                    except Exception as query_err:
-                                        # Session might be invalid - create a new one
-                                        logger.warning(f"Session invalid when querying video {video_id}, creating new session: {query_err}")
-                                        if db is not None:
-                                            try:
-                                                db.close()
-                                            except Exception:
-                                                pass
-                                        db = SessionLocal()
-                                        updated_video = db.query(Video).filter(Video.id == video_id).first()
-                                        if updated_video:
-                                            cleanup_video_file(updated_video)
-                                else:
-                                    old_status = video.status
-                                    try:
-                                        update_video(video_id, user_id, db=db, status="failed", error=f"Upload failed for some destinations")
-                                    except Exception as update_err:
-                                        # Session might be invalid - create a new one
-                                        logger.warning(f"Session invalid when updating video {video_id} to failed, creating new session: {update_err}")
-                                        if db is not None:
-                                            try:
-                                                db.close()
-                                            except Exception:
-                                                pass
-                                        db = SessionLocal()
-                                        update_video(video_id, user_id, db=db, status="failed", error=f"Upload failed for some destinations")
-                                    
-                                    # Publish status change event
-                                    from app.services.event_service import publish_video_status_changed
-                                    await publish_video_status_changed(user_id, video_id, old_status, "failed")
-                                    
-                        except Exception as e:
-                            error_type = type(e).__name__
-                            error_msg = str(e)
-                            
-                            # Gather context for troubleshooting
-                            # Note: Use 'video_filename' instead of 'filename' to avoid conflict with LogRecord.filename
-                            context = {
-                                "user_id": user_id,
-                                "video_id": video_id if 'video_id' in locals() else None,
-                                "video_filename": video.filename,
-                                "video_status": video.status,
-                                "error_type": error_type,
-                                "error_message": error_msg,
-                                "scheduled_time": str(scheduled_time) if 'scheduled_time' in locals() else None,
-                            }
-                            
-                            # Log comprehensive error
-                            upload_logger.error(
-                                f"❌ Scheduler task FAILED - User {user_id}, Video {video.id if hasattr(video, 'id') else 'unknown'} "
-                                f"({video.filename}): {error_type}: {error_msg}",
-                                extra={"context": context},
-                                exc_info=True
-                            )
-                            
-                            logger.debug(f"Error processing scheduled video {video.filename}: {e}")
-                            if 'video_id' in locals():
-                                detailed_error = f"Scheduler error: {error_type}: {error_msg}"
-                                old_status = video.status
-                                if db is not None:
-                                    try:
-                                        update_video(video_id, user_id, db=db, status="failed", error=detailed_error)
-                                        
-                                        # Refresh video and build full response (backend is source of truth)
-                                        updated_video = db.query(Video).filter(Video.id == video_id).first()
-                                        if updated_video:
-                                            from app.services.event_service import publish_video_status_changed
-                                            from app.services.video.helpers import build_video_response
-                                            from app.db.helpers import get_all_user_settings, get_all_oauth_tokens
-                                            all_settings = get_all_user_settings(user_id, db=db)
-                                            all_tokens = get_all_oauth_tokens(user_id, db=db)
-                                            video_dict = build_video_response(updated_video, all_settings, all_tokens, user_id)
-                                            
-                                            # Publish status change event with full video data
-                                            await publish_video_status_changed(user_id, video_id, old_status, "failed", video_dict=video_dict)
-                                    except Exception:
-                                        # Session invalid - create new one
-                                        temp_db = SessionLocal()
-                                        try:
-                                            update_video(video_id, user_id, db=temp_db, status="failed", error=detailed_error)
-                                            
-                                            # Refresh video and build full response (backend is source of truth)
-                                            updated_video = temp_db.query(Video).filter(Video.id == video_id).first()
-                                            if updated_video:
-                                                from app.services.event_service import publish_video_status_changed
-                                                from app.services.video.helpers import build_video_response
-                                                from app.db.helpers import get_all_user_settings, get_all_oauth_tokens
-                                                all_settings = get_all_user_settings(user_id, db=temp_db)
-                                                all_tokens = get_all_oauth_tokens(user_id, db=temp_db)
-                                                video_dict = build_video_response(updated_video, all_settings, all_tokens, user_id)
-                                                
-                                                # Publish status change event with full video data
-                                                await publish_video_status_changed(user_id, video_id, old_status, "failed", video_dict=video_dict)
-                                        finally:
-                                            temp_db.close()
-                                else:
-                                    temp_db = SessionLocal()
-                                    try:
-                                        update_video(video_id, user_id, db=temp_db, status="failed", error=detailed_error)
-                                        
-                                        # Refresh video and build full response (backend is source of truth)
-                                        updated_video = temp_db.query(Video).filter(Video.id == video_id).first()
-                                        if updated_video:
-                                            from app.services.event_service import publish_video_status_changed
-                                            from app.services.video.helpers import build_video_response
-                                            from app.db.helpers import get_all_user_settings, get_all_oauth_tokens
-                                            all_settings = get_all_user_settings(user_id, db=temp_db)
-                                            all_tokens = get_all_oauth_tokens(user_id, db=temp_db)
-                                            video_dict = build_video_response(updated_video, all_settings, all_tokens, user_id)
-                                            
-                                            # Publish status change event with full video data
-                                            await publish_video_status_changed(user_id, video_id, old_status, "failed", video_dict=video_dict)
-                                    finally:
-                                        temp_db.close()
+                    if len(due_videos) < settings.SCHEDULER_BATCH_SIZE:
+                        break
                 
                 scheduler_runs_counter.labels(status="success").inc()
+                
+                # Sleep until the next video is due (capped), unless woken by a new schedule
+                now = datetime.now(timezone.utc)
+                next_due = get_next_scheduled_time(now, db=db)
             finally:
                 db.close()
+            
+            sleep_seconds = settings.SCHEDULER_MAX_SLEEP
+            if next_due is not None:
+                sleep_seconds = min(sleep_seconds, (next_due - now).total_seconds())
+            sleep_seconds = max(settings.SCHEDULER_MIN_SLEEP, sleep_seconds)
+            
+            if await wait_for_scheduler_wakeup(sleep_seconds):
+                logger.debug("Scheduler woken early by a new schedule")
         except Exception as e:
             logger.error(f"Error in scheduler task: {e}", exc_info=True)
             scheduler_runs_counter.labels(status="failure").inc()
-            await asyncio.sleep(30)
+            await asyncio.sleep(settings.SCHEDULER_MAX_SLEEP)
 
 
 async def token_reset_scheduler_task():
@@ -430,6 +438,11 @@ async def token_reset_scheduler_task():
                         else:
                             is_renewal = False  # First time for this period, but not a renewal
                     
+                    if should_reset and not await still_leader():
+                        # Replaced as leader - the new leader resets the remaining subscriptions
+                        logger.warning("Token reset scheduler lost leadership, stopping pass")
+                        break
+                    
                     if should_reset:
                         # For free subscriptions, we need to update the period dates when renewing
                         # Stripe subscriptions have their periods updated via webhooks
@@ -1,28 +1,49 @@
-"""Background status checker task for long-running uploads"""
+"""Background status checker task for long-running uploads
+
+Polls publish jobs that finish on the platform's side after our upload
+returns: TikTok PULL_FROM_URL publishes and Instagram media containers.
+
+Jobs are indexed in Redis (register_publish_job) when the uploader gets a
+publish_id / container id, so each pass only touches jobs that are due.
+Each job has its own poll interval: STATUS_CHECKER_MIN_INTERVAL at first,
+growing by STATUS_CHECKER_BACKOFF per poll up to STATUS_CHECKER_MAX_INTERVAL.
+Due jobs are grouped per user (one settings/token lookup and one batched
+TikTok status fetch per user), and up to STATUS_CHECKER_CONCURRENCY users
+are checked at once. A periodic full scan re-indexes jobs the index missed
+(e.g. jobs started before a Redis flush).
+"""
 import asyncio
 import logging
-import httpx
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple
 
+from app.core.config import settings
 from app.db.helpers import update_video, get_oauth_token, get_all_user_settings, get_all_oauth_tokens
 from app.db.session import SessionLocal
-from app.db.redis import set_upload_progress, get_upload_progress, is_upload_active, set_platform_upload_progress, delete_upload_progress
+from app.db.redis import (
+    set_upload_progress, get_upload_progress, is_upload_active, set_platform_upload_progress, delete_upload_progress,
+    register_publish_job, get_due_publish_jobs, get_next_publish_job_time, reschedule_publish_job, complete_publish_job
+)
 from app.models.video import Video
-from app.services.video.platforms.tiktok_api import fetch_tiktok_publish_status
+from app.services.video.platforms.tiktok_api import fetch_tiktok_publish_statuses
+from app.services.video.platforms.http_clients import get_platform_client
 from app.services.event_service import publish_video_status_changed, publish_video_updated, publish_upload_progress
 from app.services.video.helpers import set_platform_status, compute_global_status
 from app.core.config import INSTAGRAM_GRAPH_API_BASE
 from app.utils.encryption import decrypt
-from app.services.token_service import deduct_tokens, calculate_tokens_from_bytes
+from app.services.token_service import charge_video_upload_tokens
+from app.tasks.leader import still_leader
 from app.core.metrics import successful_uploads_counter
 from sqlalchemy.orm.attributes import flag_modified
 
 logger = logging.getLogger(__name__)
 status_logger = logging.getLogger("status_checker")
 
+PUBLISH_JOB_PLATFORMS = ("tiktok", "instagram")
 
-def _get_user_data_for_video(video, db):
-    """DRY helper to get user settings and tokens for a video
+
+def _get_user_data(user_id: int, db):
+    """DRY helper to get user settings and tokens for a user's videos
     
     This centralizes the call to avoid scoping issues and provides consistent error handling.
     
@@ -30,525 +51,578 @@ def _get_user_data_for_video(video, db):
         tuple: (all_settings, all_tokens) or (None, None) on error
     """
     try:
-        all_settings = get_all_user_settings(video.user_id, db=db)
-        all_tokens = get_all_oauth_tokens(video.user_id, db=db)
+        all_settings = get_all_user_settings(user_id, db=db)
+        all_tokens = get_all_oauth_tokens(user_id, db=db)
         return all_settings, all_tokens
     except Exception as e:
-        status_logger.error(f"Error getting user data for video {video.id}: {e}", exc_info=True)
+        status_logger.error(f"Error getting user data for user {user_id}: {e}", exc_info=True)
         return None, None
 
 
-async def status_checker_task():
-    """Background task that periodically checks status for in-progress uploads
+def _is_in_flight(platform: str, video: Video) -> bool:
+    """Whether a video still has a publish job to poll on a platform
     
-    Checks:
-    - TikTok: Videos with tiktok_publish_id but no tiktok_id (PULL_FROM_URL in progress)
-    - Instagram: Videos with instagram_container_id and status="uploading"
+    - TikTok: has tiktok_publish_id but no tiktok_id (PULL_FROM_URL in progress)
+    - Instagram: has instagram_container_id and status="uploading"
+    """
+    custom_settings = video.custom_settings or {}
+    if platform == "tiktok":
+        return (
+            video.status in ("uploading", "uploaded") and
+            bool(custom_settings.get("tiktok_publish_id")) and
+            not custom_settings.get("tiktok_id")
+        )
+    return video.status == "uploading" and bool(custom_settings.get("instagram_container_id"))
+
+
+def _index_in_flight_publish_jobs(db) -> int:
+    """Full scan for in-flight publish jobs, adding any missing from the index
     
-    Publishes WebSocket events when status changes.
+    Jobs already indexed keep their schedule and backoff.
+    
+    Returns:
+        Number of in-flight jobs found
     """
-    while True:
-        try:
-            await asyncio.sleep(30)  # Check every 30 seconds
+    videos = db.query(Video).filter(
+        Video.status.in_(['uploading', 'uploaded']),
+        Video.custom_settings.isnot(None)
+    ).all()
+    
+    found = 0
+    for video in videos:
+        for platform in PUBLISH_JOB_PLATFORMS:
+            if _is_in_flight(platform, video):
+                register_publish_job(platform, video.id, 0, only_new=True)
+                found += 1
+    return found
+
+
+async def _apply_tiktok_status(
+    video: Video,
+    tiktok_publish_id: str,
+    status_data: Dict[str, Any],
+    all_settings: Dict,
+    all_tokens: Dict,
+    db
+) -> None:
+    """Apply a fetched TikTok publish status to a video (success, progress or failure)"""
+    if not await still_leader():
+        status_logger.warning(f"Lost status checker leadership, not applying TikTok status for video {video.id}")
+        return
+    
+    status = status_data.get("status", "UNKNOWN")
+    
+    if status == "PUBLISHED":
+        # Video was published - get tiktok_id (may be None if 404 was returned)
+        tiktok_id = status_data.get("video_id")
+        # Handle PUBLISHED status even when video_id is None (from 404)
+        # Having tiktok_publish_id means video was published, so we should mark it as uploaded
+        old_status = video.status
+        
+        # Check if all destinations are done
+        from app.services.video import check_upload_success
+        dest_settings = all_settings.get("destinations", {})
+        
+        # Check all enabled destinations
+        enabled_destinations = []
+        if all_settings.get("youtube", {}).get("youtube_enabled"):
+            enabled_destinations.append("youtube")
+        if all_settings.get("tiktok", {}).get("tiktok_enabled"):
+            enabled_destinations.append("tiktok")
+        if all_settings.get("instagram", {}).get("instagram_enabled"):
+            enabled_destinations.append("instagram")
+        
+        all_done = all(check_upload_success(video, dest) for dest in enabled_destinations)
+        
+        # Refresh video to get latest state before checking tokens
+        db.refresh(video)
+        
+        # Deduct tokens if not already deducted (claimed atomically, matches upload function behavior)
+        await charge_video_upload_tokens(
+            video, "tiktok", db, metadata={'tiktok_publish_id': tiktok_publish_id, 'tiktok_id': tiktok_id}
+        )
+        
+        # Update video with tiktok_id (merged - other platforms may be writing their keys)
+        if tiktok_id:
+            update_video(video.id, video.user_id, db=db, tiktok_id=tiktok_id)
+        
+        # Set TikTok platform status to success
+        await set_platform_status(video.id, video.user_id, "tiktok", "success", error=None, db=db)
+        
+        # Refresh video to get updated status
+        db.refresh(video)
+        
+        # Check if all destinations are done and update global status if needed
+        if all_done:
+            # Only increment counter if video status is changing to "uploaded" (not already uploaded)
+            # This prevents double-counting if status_checker runs multiple times
+            if old_status != "uploaded":
+                # Increment successful uploads counter
+                successful_uploads_counter.inc()
+            
+            # Refresh video and build full response (backend is source of truth)
+            from app.services.video.helpers import build_video_response
+            video_dict = build_video_response(video, all_settings, all_tokens, video.user_id)
             
-            db = SessionLocal()
-            if db is None:
-                logger.error("Failed to create database session in status checker task")
-                await asyncio.sleep(30)
-                continue
+            await publish_video_status_changed(video.user_id, video.id, old_status, video.status, video_dict=video_dict)
+            if tiktok_id:
+                status_logger.info(f"TikTok video {video.id} published successfully, tiktok_id: {tiktok_id}")
+            else:
+                status_logger.info(f"TikTok video {video.id} published successfully (via 404), publish_id: {tiktok_publish_id}")
+        else:
+            # Refresh video and build full response (backend is source of truth)
+            from app.services.event_service import publish_video_updated
+            from app.services.video.helpers import build_video_response
+            video_dict = build_video_response(video, all_settings, all_tokens, video.user_id)
+            
+            await publish_video_updated(video.user_id, video.id, video_dict=video_dict)
+            if tiktok_id:
+                status_logger.info(f"TikTok video {video.id} updated with tiktok_id: {tiktok_id}")
+            else:
+                status_logger.info(f"TikTok video {video.id} updated (published via 404), publish_id: {tiktok_publish_id}")
+        
+    elif status in ["PROCESSING_DOWNLOAD", "PROCESSING_UPLOAD", "PROCESSING"]:
+        # Map status to progress percentages
+        # PROCESSING_DOWNLOAD: 10-50% (TikTok downloading from our server)
+        # PROCESSING_UPLOAD: 50-90% (TikTok processing the video)
+        # PROCESSING: legacy status, treat as PROCESSING_UPLOAD (50-90%)
+        
+        from app.services.video.helpers import should_publish_progress
+        from app.services.event_service import publish_upload_progress
+        
+        # Get current progress to determine which range we're in
+        current_progress = get_upload_progress(video.user_id, video.id) or 0
+        
+        if status == "PROCESSING_DOWNLOAD":
+            # Estimate 10-50% based on time (we don't know exact progress)
+            # Use a simple increment approach: start at 10%, gradually move to 50%
+            if current_progress < 10:
+                progress = 10
+            elif current_progress < 50:
+                # Increment by 5% each check
+                progress = min(current_progress + 5, 50)
+            else:
+                progress = 50
+        elif status in ["PROCESSING_UPLOAD", "PROCESSING"]:
+            # Estimate 50-90% based on time
+            if current_progress < 50:
+                progress = 50
+            elif current_progress < 90:
+                # Increment by 5% each check
+                progress = min(current_progress + 5, 90)
+            else:
+                progress = 90
+        else:
+            progress = current_progress
+        
+        set_upload_progress(video.user_id, video.id, progress)
+        
+        # Publish progress updates (1% increments)
+        if should_publish_progress(progress, current_progress):
+            await publish_upload_progress(video.user_id, video.id, "tiktok", progress)
+        
+        status_logger.debug(f"TikTok video {video.id} still processing: {status}, progress: {progress}%")
+    
+    elif status == "FAILED":
+        # Upload failed - ensure proper error handling and status updates
+        fail_reason = status_data.get("fail_reason", "Unknown error")
+        error_code = status_data.get("error_code", "")
+        
+        # Build comprehensive error message
+        if error_code:
+            error_msg = f"TikTok upload failed ({error_code}): {fail_reason}"
+        else:
+            error_msg = f"TikTok upload failed: {fail_reason}"
+        
+        old_status = video.status
+        
+        # Set TikTok platform status to failed
+        await set_platform_status(video.id, video.user_id, "tiktok", "failed", error=error_msg, db=db)
+        
+        # Refresh video to get updated status
+        db.refresh(video)
+        
+        # Build video response and publish status change
+        from app.services.video.helpers import build_video_response
+        # publish_video_status_changed is already imported at top of file
+        video_dict = build_video_response(video, all_settings, all_tokens, video.user_id)
+        await publish_video_status_changed(video.user_id, video.id, old_status, video.status, video_dict=video_dict)
+        
+        status_logger.error(
+            f"TikTok video {video.id} failed - User {video.user_id}, "
+            f"publish_id: {tiktok_publish_id}, fail_reason: {fail_reason}, error_code: {error_code}",
+            extra={
+                "user_id": video.user_id,
+                "video_id": video.id,
+                "video_filename": video.filename,
+                "publish_id": tiktok_publish_id,
+                "fail_reason": fail_reason,
+                "error_code": error_code,
+                "platform": "tiktok",
+                "error_type": "TikTokAPIFailure"
+            }
+        )
+
+
+async def _check_instagram_container(
+    video: Video,
+    instagram_token,
+    access_token: str,
+    all_settings: Dict,
+    all_tokens: Dict,
+    db
+) -> None:
+    """Check an Instagram container and publish it once Instagram has finished processing"""
+    custom_settings = video.custom_settings or {}
+    instagram_container_id = custom_settings.get("instagram_container_id")
+    
+    # Check container status
+    client = get_platform_client("instagram")
+    status_url = f"{INSTAGRAM_GRAPH_API_BASE}/{instagram_container_id}"
+    status_params = {
+        "fields": "status_code",
+        "access_token": access_token.strip()
+    }
+    
+    status_response = await client.get(status_url, params=status_params, timeout=30.0)
+    
+    if status_response.status_code == 200:
+        status_data = status_response.json()
+        status_code = status_data.get('status_code')
+        
+        if status_code == "FINISHED":
+            # Container is ready - check if it was already published
+            instagram_id = custom_settings.get("instagram_id")
+            if instagram_id:
+                # Already published - just update progress
+                set_upload_progress(video.user_id, video.id, 100)
+                set_platform_upload_progress(video.user_id, video.id, "instagram", 100)
+                status_logger.debug(f"Instagram container {instagram_container_id} already published for video {video.id} (instagram_id: {instagram_id})")
+                return
+            
+            # Check if upload is actively being processed - if yes, let upload function handle it
+            if is_upload_active(video.id, "instagram"):
+                status_logger.debug(f"Instagram container {instagram_container_id} finished but upload is active - letting upload function handle publishing")
+                set_upload_progress(video.user_id, video.id, 90)
+                set_platform_upload_progress(video.user_id, video.id, "instagram", 90)
+                return
+            
+            # Container is FINISHED and not published - publish it now (publishing twice posts twice)
+            if not await still_leader():
+                status_logger.warning(f"Lost status checker leadership, not publishing Instagram container for video {video.id}")
+                return
+            status_logger.info(f"Instagram container {instagram_container_id} finished for video {video.id} - publishing via status_checker")
             
             try:
-                # Query TikTok videos with publish_id but no tiktok_id (PULL_FROM_URL in progress)
-                tiktok_videos = db.query(Video).filter(
-                    Video.status.in_(['uploading', 'uploaded']),
-                    Video.custom_settings.isnot(None)
-                ).all()
+                # Get business_account_id from token extra_data
+                extra_data = instagram_token.extra_data or {}
+                business_account_id = extra_data.get("business_account_id")
+                if not business_account_id:
+                    status_logger.error(f"No business_account_id for video {video.id} - cannot publish")
+                    return
                 
-                tiktok_videos_to_check = []
-                for video in tiktok_videos:
-                    custom_settings = video.custom_settings or {}
-                    tiktok_publish_id = custom_settings.get("tiktok_publish_id")
-                    tiktok_id = custom_settings.get("tiktok_id")
-                    # Has publish_id but no tiktok_id yet - still processing
-                    if tiktok_publish_id and not tiktok_id:
-                        tiktok_videos_to_check.append(video)
+                # Publish the container
+                publish_url = f"{INSTAGRAM_GRAPH_API_BASE}/{business_account_id}/media_publish"
+                publish_data = {
+                    "creation_id": instagram_container_id
+                }
+                publish_headers = {
+                    "Authorization": f"Bearer {access_token.strip()}",
+                    "Content-Type": "application/json"
+                }
                 
-                # Query Instagram videos with container_id and status="uploading"
-                instagram_videos = db.query(Video).filter(
-                    Video.status == "uploading",
-                    Video.custom_settings.isnot(None)
-                ).all()
+                publish_response = await client.post(
+                    publish_url,
+                    json=publish_data,
+                    headers=publish_headers,
+                    timeout=30.0
+                )
                 
-                instagram_videos_to_check = []
-                for video in instagram_videos:
-                    custom_settings = video.custom_settings or {}
-                    instagram_container_id = custom_settings.get("instagram_container_id")
-                    # Has container_id but still uploading - check if container is finished
-                    if instagram_container_id:
-                        instagram_videos_to_check.append(video)
+                if publish_response.status_code != 200:
+                    import json as json_module
+                    error_data = publish_response.json() if publish_response.headers.get('content-type', '').startswith('application/json') else publish_response.text
+                    status_logger.error(
+                        f"Failed to publish Instagram container {instagram_container_id} for video {video.id}: "
+                        f"HTTP {publish_response.status_code} - {error_data}"
+                    )
+                    return
                 
-                # Check TikTok videos
-                for video in tiktok_videos_to_check:
-                    try:
-                        custom_settings = video.custom_settings or {}
-                        tiktok_publish_id = custom_settings.get("tiktok_publish_id")
-                        
-                        if not tiktok_publish_id:
-                            continue
-                        
-                        status_data = fetch_tiktok_publish_status(video.user_id, tiktok_publish_id, db=db)
-                        
-                        if status_data:
-                            status = status_data.get("status", "UNKNOWN")
-                            
-                            if status == "PUBLISHED":
-                                # Video was published - get tiktok_id (may be None if 404 was returned)
-                                tiktok_id = status_data.get("video_id")
-                                # Handle PUBLISHED status even when video_id is None (from 404)
-                                # Having tiktok_publish_id means video was published, so we should mark it as uploaded
-                                custom_settings = custom_settings.copy()
-                                if tiktok_id:
-                                    custom_settings["tiktok_id"] = tiktok_id
-                                old_status = video.status
-                                
-                                # Check if all destinations are done
-                                from app.services.video import check_upload_success
-                                all_settings, all_tokens = _get_user_data_for_video(video, db)
-                                if all_settings is None or all_tokens is None:
-                                    continue
-                                dest_settings = all_settings.get("destinations", {})
-                                
-                                # Check all enabled destinations
-                                enabled_destinations = []
-                                if all_settings.get("youtube", {}).get("youtube_enabled"):
-                                    enabled_destinations.append("youtube")
-                                if all_settings.get("tiktok", {}).get("tiktok_enabled"):
-                                    enabled_destinations.append("tiktok")
-                                if all_settings.get("instagram", {}).get("instagram_enabled"):
-                                    enabled_destinations.append("instagram")
-                                
-                                all_done = all(check_upload_success(video, dest) for dest in enabled_destinations)
-                                
-                                # Refresh video to get latest state before checking tokens
-                                db.refresh(video)
-                                
-                                # Deduct tokens if not already deducted (matches upload function behavior)
-                                if video.tokens_consumed == 0:
-                                    tokens_required = video.tokens_required if video.tokens_required is not None else (calculate_tokens_from_bytes(video.file_size_bytes) if video.file_size_bytes else 0)
-                                    if tokens_required > 0:
-                                        await deduct_tokens(
-                                            user_id=video.user_id,
-                                            tokens=tokens_required,
-                                            transaction_type='upload',
-                                            video_id=video.id,
-                                            metadata={
-                                                'filename': video.filename,
-                                                'platform': 'tiktok',
-                                                'tiktok_publish_id': tiktok_publish_id,
-                                                'tiktok_id': tiktok_id,
-                                                'file_size_bytes': video.file_size_bytes,
-                                                'file_size_mb': round(video.file_size_bytes / (1024 * 1024), 2) if video.file_size_bytes else 0
-                                            },
-                                            db=db
-                                        )
-                                        update_video(video.id, video.user_id, db=db, tokens_consumed=tokens_required)
-                                        status_logger.info(f"Deducted {tokens_required} tokens for user {video.user_id} (TikTok upload via status_checker)")
-                                
-                                # Update video with tiktok_id
-                                update_video(video.id, video.user_id, db=db, custom_settings=custom_settings)
-                                
-                                # Set TikTok platform status to success
-                                await set_platform_status(video.id, video.user_id, "tiktok", "success", error=None, db=db)
-                                
-                                # Refresh video to get updated status
-                                db.refresh(video)
-                                
-                                # Check if all destinations are done and update global status if needed
-                                if all_done:
-                                    # Only increment counter if video status is changing to "uploaded" (not already uploaded)
-                                    # This prevents double-counting if status_checker runs multiple times
-                                    if old_status != "uploaded":
-                                        # Increment successful uploads counter
-                                        successful_uploads_counter.inc()
-                                    
-                                    # Refresh video and build full response (backend is source of truth)
-                                    from app.services.video.helpers import build_video_response
-                                    video_dict = build_video_response(video, all_settings, all_tokens, video.user_id)
-                                    
-                                    await publish_video_status_changed(video.user_id, video.id, old_status, video.status, video_dict=video_dict)
-                                    if tiktok_id:
-                                        status_logger.info(f"TikTok video {video.id} published successfully, tiktok_id: {tiktok_id}")
-                                    else:
-                                        status_logger.info(f"TikTok video {video.id} published successfully (via 404), publish_id: {tiktok_publish_id}")
-                                else:
-                                    # Refresh video and build full response (backend is source of truth)
-                                    from app.services.event_service import publish_video_updated
-                                    from app.services.video.helpers import build_video_response
-                                    video_dict = build_video_response(video, all_settings, all_tokens, video.user_id)
-                                    
-                                    await publish_video_updated(video.user_id, video.id, video_dict=video_dict)
-                                    if tiktok_id:
-                                        status_logger.info(f"TikTok video {video.id} updated with tiktok_id: {tiktok_id}")
-                                    else:
-                                        status_logger.info(f"TikTok video {video.id} updated (published via 404), publish_id: {tiktok_publish_id}")
-                                
-                            elif status in ["PROCESSING_DOWNLOAD", "PROCESSING_UPLOAD", "PROCESSING"]:
-                                # Map status to progress percentages
-                                # PROCESSING_DOWNLOAD: 10-50% (TikTok downloading from our server)
-                                # PROCESSING_UPLOAD: 50-90% (TikTok processing the video)
-                                # PROCESSING: legacy status, treat as PROCESSING_UPLOAD (50-90%)
-                                
-                                from app.services.video.helpers import should_publish_progress
-                                from app.services.event_service import publish_upload_progress
-                                
-                                # Get current progress to determine which range we're in
-                                current_progress = get_upload_progress(video.user_id, video.id) or 0
-                                
-                                if status == "PROCESSING_DOWNLOAD":
-                                    # Estimate 10-50% based on time (we don't know exact progress)
-                                    # Use a simple increment approach: start at 10%, gradually move to 50%
-                                    if current_progress < 10:
-                                        progress = 10
-                                    elif current_progress < 50:
-                                        # Increment by 5% each check (every 30 seconds)
-                                        progress = min(current_progress + 5, 50)
-                                    else:
-                                        progress = 50
-                                elif status in ["PROCESSING_UPLOAD", "PROCESSING"]:
-                                    # Estimate 50-90% based on time
-                                    if current_progress < 50:
-                                        progress = 50
-                                    elif current_progress < 90:
-                                        # Increment by 5% each check
-                                        progress = min(current_progress + 5, 90)
-                                    else:
-                                        progress = 90
-                                else:
-                                    progress = current_progress
-                                
-                                set_upload_progress(video.user_id, video.id, progress)
-                                
-                                # Publish progress updates (1% increments)
-                                if should_publish_progress(progress, current_progress):
-                                    await publish_upload_progress(video.user_id, video.id, "tiktok", progress)
-                                
-                                status_logger.debug(f"TikTok video {video.id} still processing: {status}, progress: {progress}%")
-                            
-                            elif status == "FAILED":
-                                # Upload failed - ensure proper error handling and status updates
-                                fail_reason = status_data.get("fail_reason", "Unknown error")
-                                error_code = status_data.get("error_code", "")
-                                
-                                # Build comprehensive error message
-                                if error_code:
-                                    error_msg = f"TikTok upload failed ({error_code}): {fail_reason}"
-                                else:
-                                    error_msg = f"TikTok upload failed: {fail_reason}"
-                                
-                                # Get user data for building response
-                                all_settings, all_tokens = _get_user_data_for_video(video, db)
-                                if all_settings is None or all_tokens is None:
-                                    status_logger.warning(f"Could not get user data for video {video.id}, skipping status update")
-                                    continue
-                                
-                                old_status = video.status
-                                
-                                # Set TikTok platform status to failed
-                                await set_platform_status(video.id, video.user_id, "tiktok", "failed", error=error_msg, db=db)
-                                
-                                # Refresh video to get updated status
-                                db.refresh(video)
-                                
-                                # Build video response and publish status change
-                                from app.services.video.helpers import build_video_response
-                                # publish_video_status_changed is already imported at top of file
-                                video_dict = build_video_response(video, all_settings, all_tokens, video.user_id)
-                                await publish_video_status_changed(video.user_id, video.id, old_status, video.status, video_dict=video_dict)
-                                
-                                status_logger.error(
-                                    f"TikTok video {video.id} failed - User {video.user_id}, "
-                                    f"publish_id: {tiktok_publish_id}, fail_reason: {fail_reason}, error_code: {error_code}",
-                                    extra={
-                                        "user_id": video.user_id,
-                                        "video_id": video.id,
-                                        "video_filename": video.filename,
-                                        "publish_id": tiktok_publish_id,
-                                        "fail_reason": fail_reason,
-                                        "error_code": error_code,
-                                        "platform": "tiktok",
-                                        "error_type": "TikTokAPIFailure"
-                                    }
-                                )
-                    
-                    except Exception as e:
-                        status_logger.error(f"Error checking TikTok status for video {video.id}: {e}", exc_info=True)
-                        continue
+                publish_result = publish_response.json()
+                media_id = publish_result.get('id')
+                
+                if not media_id:
+                    status_logger.error(f"No media ID in publish response for video {video.id}: {publish_result}")
+                    return
+                
+                # Update video with instagram_id (merged - other platforms may be writing their keys)
+                old_status = video.status
+                update_video(video.id, video.user_id, db=db, instagram_id=media_id)
+                
+                # Set Instagram platform status to success
+                await set_platform_status(video.id, video.user_id, "instagram", "success", error=None, db=db)
                 
-                # Check Instagram videos
-                for video in instagram_videos_to_check:
+                # Check if all destinations are done
+                from app.services.video import check_upload_success
+                
+                # Check all enabled destinations
+                enabled_destinations = []
+                if all_settings.get("youtube", {}).get("youtube_enabled"):
+                    enabled_destinations.append("youtube")
+                if all_settings.get("tiktok", {}).get("tiktok_enabled"):
+                    enabled_destinations.append("tiktok")
+                if all_settings.get("instagram", {}).get("instagram_enabled"):
+                    enabled_destinations.append("instagram")
+                
+                all_done = all(check_upload_success(video, dest) for dest in enabled_destinations)
+                
+                # Update progress to 100%
+                set_upload_progress(video.user_id, video.id, 100)
+                set_platform_upload_progress(video.user_id, video.id, "instagram", 100)
+                await publish_upload_progress(video.user_id, video.id, "instagram", 100)
+                
+                # Only increment counter if video status is not already "uploaded"
+                # This prevents double-counting if status_checker runs multiple times
+                db.refresh(video)
+                if video.status != "uploaded":
+                    # Increment successful uploads counter
+                    successful_uploads_counter.inc()
+                
+                # Deduct tokens if not already deducted (claimed atomically)
+                await charge_video_upload_tokens(video, "instagram", db, metadata={'instagram_id': media_id})
+                
+                # Refresh video to get updated status
+                db.refresh(video)
+                
+                # Build full response
+                from app.services.video.helpers import build_video_response
+                video_dict = build_video_response(video, all_settings, all_tokens, video.user_id)
+                
+                # Publish status change if global status changed
+                if all_done and old_status != video.status:
+                    await publish_video_status_changed(video.user_id, video.id, old_status, video.status, video_dict=video_dict)
+                else:
+                    await publish_video_updated(video.user_id, video.id, video_dict=video_dict)
+                
+                status_logger.info(f"Successfully published Instagram container {instagram_container_id} for video {video.id} via status_checker (media_id: {media_id})")
+                
+                # Clean up progress after a delay
+                await asyncio.sleep(2)
+                delete_upload_progress(video.user_id, video.id)
+                
+            except Exception as publish_error:
+                status_logger.error(
+                    f"Error publishing Instagram container {instagram_container_id} for video {video.id}: {publish_error}",
+                    exc_info=True
+                )
+                return
+        
+        elif status_code == "ERROR":
+            # ROOT CAUSE FIX: Only mark as failed if upload is NOT actively being processed
+            # Check 1: If video already has instagram_id, upload succeeded - don't mark as failed
+            instagram_id = custom_settings.get("instagram_id")
+            if instagram_id:
+                status_logger.debug(
+                    f"Ignoring ERROR status for video {video.id} - already published successfully "
+                    f"(instagram_id: {instagram_id})"
+                )
+                return
+            
+            # Check 2: If upload is actively being processed, don't interfere
+            if is_upload_active(video.id, "instagram"):
+                status_logger.debug(
+                    f"Ignoring ERROR status for video {video.id} - upload is actively being processed"
+                )
+                return
+            
+            # Check 3: Only mark as failed if video has been stuck for a while
+            # Check if progress exists (indicates recent activity)
+            recent_progress = get_upload_progress(video.user_id, video.id)
+            if recent_progress is not None:
+                # Progress exists = upload was active recently, might still be processing
+                status_logger.debug(
+                    f"Ignoring ERROR status for video {video.id} - progress exists "
+                    f"(progress: {recent_progress}%), upload may still be active"
+                )
+                return
+            
+            if not await still_leader():
+                return
+            
+            # All checks passed - container is truly in ERROR state and upload is not active
+            # Container processing failed and video wasn't published - mark platform as failed
+            error_msg = "Instagram container processing failed"
+            await set_platform_status(video.id, video.user_id, "instagram", "failed", error=error_msg, db=db)
+            status_logger.warning(f"Instagram container {instagram_container_id} failed for video {video.id}")
+        
+        elif status_code == "EXPIRED":
+            # ROOT CAUSE FIX: Only mark as failed if upload is NOT actively being processed
+            instagram_id = custom_settings.get("instagram_id")
+            if instagram_id:
+                status_logger.debug(
+                    f"Ignoring EXPIRED status for video {video.id} - already published successfully "
+                    f"(instagram_id: {instagram_id})"
+                )
+                return
+            
+            # Check if upload is actively being processed
+            if is_upload_active(video.id, "instagram"):
+                status_logger.debug(
+                    f"Ignoring EXPIRED status for video {video.id} - upload is actively being processed"
+                )
+                return
+            
+            if not await still_leader():
+                return
+            
+            # Container expired and video wasn't published - mark platform as failed
+            error_msg = "Instagram container expired (not published within 24 hours)"
+            await set_platform_status(video.id, video.user_id, "instagram", "failed", error=error_msg, db=db)
+            status_logger.warning(f"Instagram container {instagram_container_id} expired for video {video.id}")
+        
+        # IN_PROGRESS - continue waiting
+        else:
+            # Update progress based on how long we've been waiting
+            current_progress = get_upload_progress(video.user_id, video.id) or 40
+            if current_progress < 80:
+                new_progress = min(current_progress + 5, 80)
+                set_upload_progress(video.user_id, video.id, new_progress)
+            status_logger.debug(f"Instagram container {instagram_container_id} still processing for video {video.id}")
+
+
+async def _check_user_publish_jobs(user_id: int, jobs: List[Tuple[str, int]], db) -> None:
+    """Check one user's due publish jobs, then reschedule or complete each of them
+    
+    Args:
+        user_id: User ID
+        jobs: Due (platform, video_id) pairs of this user
+        db: Database session
+    """
+    try:
+        videos = {
+            video.id: video
+            for video in db.query(Video).filter(Video.id.in_([video_id for _, video_id in jobs])).all()
+        }
+        all_settings, all_tokens = _get_user_data(user_id, db)
+        if all_settings is None or all_tokens is None:
+            status_logger.warning(f"Could not get user data for user {user_id}, skipping status checks")
+            return
+        
+        in_flight = [
+            (platform, videos[video_id]) for platform, video_id in jobs
+            if video_id in videos and _is_in_flight(platform, videos[video_id])
+        ]
+        
+        tiktok_videos = [video for platform, video in in_flight if platform == "tiktok"]
+        if tiktok_videos:
+            publish_ids = {video.id: video.custom_settings["tiktok_publish_id"] for video in tiktok_videos}
+            statuses = await fetch_tiktok_publish_statuses(user_id, list(set(publish_ids.values())), db=db)
+            for video in tiktok_videos:
+                try:
+                    status_data = statuses.get(publish_ids[video.id])
+                    if status_data:
+                        await _apply_tiktok_status(video, publish_ids[video.id], status_data, all_settings, all_tokens, db)
+                except Exception as e:
+                    status_logger.error(f"Error checking TikTok status for video {video.id}: {e}", exc_info=True)
+        
+        instagram_videos = [video for platform, video in in_flight if platform == "instagram"]
+        if instagram_videos:
+            instagram_token = get_oauth_token(user_id, "instagram", db=db)
+            access_token = decrypt(instagram_token.access_token) if instagram_token else None
+            if access_token:
+                for video in instagram_videos:
                     try:
-                        # Refresh video from database to ensure it still exists
-                        db.refresh(video)
-                        # Double-check video still exists (user may have deleted it)
-                        video_exists = db.query(Video).filter(Video.id == video.id).first()
-                        if not video_exists:
-                            status_logger.debug(f"Video {video.id} was deleted, skipping Instagram status check")
-                            continue
-                        
-                        custom_settings = video.custom_settings or {}
-                        instagram_container_id = custom_settings.get("instagram_container_id")
-                        
-                        if not instagram_container_id:
-                            continue
-                        
-                        # Get Instagram token
-                        instagram_token = get_oauth_token(video.user_id, "instagram", db=db)
-                        if not instagram_token:
-                            continue
-                        
-                        access_token = decrypt(instagram_token.access_token)
-                        if not access_token:
-                            continue
-                        
-                        # Check container status
-                        async with httpx.AsyncClient(timeout=30.0) as client:
-                            status_url = f"{INSTAGRAM_GRAPH_API_BASE}/{instagram_container_id}"
-                            status_params = {
-                                "fields": "status_code",
-                                "access_token": access_token.strip()
-                            }
-                            
-                            status_response = await client.get(status_url, params=status_params)
-                            
-                            if status_response.status_code == 200:
-                                status_data = status_response.json()
-                                status_code = status_data.get('status_code')
-                                
-                                if status_code == "FINISHED":
-                                    # Container is ready - check if it was already published
-                                    instagram_id = custom_settings.get("instagram_id")
-                                    if instagram_id:
-                                        # Already published - just update progress
-                                        set_upload_progress(video.user_id, video.id, 100)
-                                        set_platform_upload_progress(video.user_id, video.id, "instagram", 100)
-                                        status_logger.debug(f"Instagram container {instagram_container_id} already published for video {video.id} (instagram_id: {instagram_id})")
-                                        continue
-                                    
-                                    # Check if upload is actively being processed - if yes, let upload function handle it
-                                    if is_upload_active(video.id, "instagram"):
-                                        status_logger.debug(f"Instagram container {instagram_container_id} finished but upload is active - letting upload function handle publishing")
-                                        set_upload_progress(video.user_id, video.id, 90)
-                                        set_platform_upload_progress(video.user_id, video.id, "instagram", 90)
-                                        continue
-                                    
-                                    # Container is FINISHED and not published - publish it now
-                                    status_logger.info(f"Instagram container {instagram_container_id} finished for video {video.id} - publishing via status_checker")
-                                    
-                                    try:
-                                        # Get business_account_id from token extra_data
-                                        extra_data = instagram_token.extra_data or {}
-                                        business_account_id = extra_data.get("business_account_id")
-                                        if not business_account_id:
-                                            status_logger.error(f"No business_account_id for video {video.id} - cannot publish")
-                                            continue
-                                        
-                                        # Publish the container
-                                        publish_url = f"{INSTAGRAM_GRAPH_API_BASE}/{business_account_id}/media_publish"
-                                        publish_data = {
-                                            "creation_id": instagram_container_id
-                                        }
-                                        publish_headers = {
-                                            "Authorization": f"Bearer {access_token.strip()}",
-                                            "Content-Type": "application/json"
-                                        }
-                                        
-                                        publish_response = await client.post(
-                                            publish_url,
-                                            json=publish_data,
-                                            headers=publish_headers
-                                        )
-                                        
-                                        if publish_response.status_code != 200:
-                                            import json as json_module
-                                            error_data = publish_response.json() if publish_response.headers.get('content-type', '').startswith('application/json') else publish_response.text
-                                            status_logger.error(
-                                                f"Failed to publish Instagram container {instagram_container_id} for video {video.id}: "
-                                                f"HTTP {publish_response.status_code} - {error_data}"
-                                            )
-                                            continue
-                                        
-                                        publish_result = publish_response.json()
-                                        media_id = publish_result.get('id')
-                                        
-                                        if not media_id:
-                                            status_logger.error(f"No media ID in publish response for video {video.id}: {publish_result}")
-                                            continue
-                                        
-                                        # Update video with instagram_id
-                                        custom_settings = custom_settings.copy()
-                                        custom_settings['instagram_id'] = media_id
-                                        old_status = video.status
-                                        update_video(video.id, video.user_id, db=db, custom_settings=custom_settings)
-                                        
-                                        # Set Instagram platform status to success
-                                        await set_platform_status(video.id, video.user_id, "instagram", "success", error=None, db=db)
-                                        
-                                        # Get user data for building response
-                                        all_settings, all_tokens = _get_user_data_for_video(video, db)
-                                        if all_settings is None or all_tokens is None:
-                                            continue
-                                        
-                                        # Check if all destinations are done
-                                        from app.services.video import check_upload_success
-                                        
-                                        # Check all enabled destinations
-                                        enabled_destinations = []
-                                        if all_settings.get("youtube", {}).get("youtube_enabled"):
-                                            enabled_destinations.append("youtube")
-                                        if all_settings.get("tiktok", {}).get("tiktok_enabled"):
-                                            enabled_destinations.append("tiktok")
-                                        if all_settings.get("instagram", {}).get("instagram_enabled"):
-                                            enabled_destinations.append("instagram")
-                                        
-                                        all_done = all(check_upload_success(video, dest) for dest in enabled_destinations)
-                                        
-                                        # Update progress to 100%
-                                        set_upload_progress(video.user_id, video.id, 100)
-                                        set_platform_upload_progress(video.user_id, video.id, "instagram", 100)
-                                        await publish_upload_progress(video.user_id, video.id, "instagram", 100)
-                                        
-                                        # Only increment counter if video status is not already "uploaded"
-                                        # This prevents double-counting if status_checker runs multiple times
-                                        db.refresh(video)
-                                        if video.status != "uploaded":
-                                            # Increment successful uploads counter
-                                            successful_uploads_counter.inc()
-                                        
-                                        # Deduct tokens if not already deducted
-                                        db.refresh(video)
-                                        if video.tokens_consumed == 0:
-                                            tokens_required = video.tokens_required if video.tokens_required is not None else (calculate_tokens_from_bytes(video.file_size_bytes) if video.file_size_bytes else 0)
-                                            if tokens_required > 0:
-                                                await deduct_tokens(
-                                                    user_id=video.user_id,
-                                                    tokens=tokens_required,
-                                                    transaction_type='upload',
-                                                    video_id=video.id,
-                                                    metadata={
-                                                        'filename': video.filename,
-                                                        'platform': 'instagram',
-                                                        'instagram_id': media_id,
-                                                        'file_size_bytes': video.file_size_bytes,
-                                                        'file_size_mb': round(video.file_size_bytes / (1024 * 1024), 2) if video.file_size_bytes else 0
-                                                    },
-                                                    db=db
-                                                )
-                                                update_video(video.id, video.user_id, db=db, tokens_consumed=tokens_required)
-                                                status_logger.info(f"Deducted {tokens_required} tokens for user {video.user_id} (Instagram upload via status_checker)")
-                                        
-                                        # Refresh video to get updated status
-                                        db.refresh(video)
-                                        
-                                        # Build full response
-                                        from app.services.video.helpers import build_video_response
-                                        video_dict = build_video_response(video, all_settings, all_tokens, video.user_id)
-                                        
-                                        # Publish status change if global status changed
-                                        if all_done and old_status != video.status:
-                                            await publish_video_status_changed(video.user_id, video.id, old_status, video.status, video_dict=video_dict)
-                                        else:
-                                            await publish_video_updated(video.user_id, video.id, video_dict=video_dict)
-                                        
-                                        status_logger.info(f"Successfully published Instagram container {instagram_container_id} for video {video.id} via status_checker (media_id: {media_id})")
-                                        
-                                        # Clean up progress after a delay
-                                        await asyncio.sleep(2)
-                                        delete_upload_progress(video.user_id, video.id)
-                                        
-                                    except Exception as publish_error:
-                                        status_logger.error(
-                                            f"Error publishing Instagram container {instagram_container_id} for video {video.id}: {publish_error}",
-                                            exc_info=True
-                                        )
-                                        continue
-                                
-                                elif status_code == "ERROR":
-                                    # ROOT CAUSE FIX: Only mark as failed if upload is NOT actively being processed
-                                    # Check 1: If video already has instagram_id, upload succeeded - don't mark as failed
-                                    instagram_id = custom_settings.get("instagram_id")
-                                    if instagram_id:
-                                        status_logger.debug(
-                                            f"Ignoring ERROR status for video {video.id} - already published successfully "
-                                            f"(instagram_id: {instagram_id})"
-                                        )
-                                        continue
-                                    
-                                    # Check 2: If upload is actively being processed, don't interfere
-                                    if is_upload_active(video.id, "instagram"):
-                                        status_logger.debug(
-                                            f"Ignoring ERROR status for video {video.id} - upload is actively being processed"
-                                        )
-                                        continue
-                                    
-                                    # Check 3: Only mark as failed if video has been stuck for a while
-                                    # Check if progress exists (indicates recent activity)
-                                    recent_progress = get_upload_progress(video.user_id, video.id)
-                                    if recent_progress is not None:
-                                        # Progress exists = upload was active recently, might still be processing
-                                        status_logger.debug(
-                                            f"Ignoring ERROR status for video {video.id} - progress exists "
-                                            f"(progress: {recent_progress}%), upload may still be active"
-                                        )
-                                        continue
-                                    
-                                    # All checks passed - container is truly in ERROR state and upload is not active
-                                    # Container processing failed and video wasn't published - mark platform as failed
-                                    error_msg = "Instagram container processing failed"
-                                    await set_platform_status(video.id, video.user_id, "instagram", "failed", error=error_msg, db=db)
-                                    status_logger.warning(f"Instagram container {instagram_container_id} failed for video {video.id}")
-                                
-                                elif status_code == "EXPIRED":
-                                    # ROOT CAUSE FIX: Only mark as failed if upload is NOT actively being processed
-                                    instagram_id = custom_settings.get("instagram_id")
-                                    if instagram_id:
-                                        status_logger.debug(
-                                            f"Ignoring EXPIRED status for video {video.id} - already published successfully "
-                                            f"(instagram_id: {instagram_id})"
-                                        )
-                                        continue
-                                    
-                                    # Check if upload is actively being processed
-                                    if is_upload_active(video.id, "instagram"):
-                                        status_logger.debug(
-                                            f"Ignoring EXPIRED status for video {video.id} - upload is actively being processed"
-                                        )
-                                        continue
-                                    
-                                    # Container expired and video wasn't published - mark platform as failed
-                                    error_msg = "Instagram container expired (not published within 24 hours)"
-                                    await set_platform_status(video.id, video.user_id, "instagram", "failed", error=error_msg, db=db)
-                                    status_logger.warning(f"Instagram container {instagram_container_id} expired for video {video.id}")
-                                
-                                # IN_PROGRESS - continue waiting
-                                else:
-                                    # Update progress based on how long we've been waiting
-                                    current_progress = get_upload_progress(video.user_id, video.id) or 40
-                                    if current_progress < 80:
-                                        new_progress = min(current_progress + 5, 80)
-                                        set_upload_progress(video.user_id, video.id, new_progress)
-                                    status_logger.debug(f"Instagram container {instagram_container_id} still processing for video {video.id}")
-                    
+                        await _check_instagram_container(video, instagram_token, access_token, all_settings, all_tokens, db)
                     except Exception as e:
                         status_logger.error(f"Error checking Instagram status for video {video.id}: {e}", exc_info=True)
-                        continue
-                
+    finally:
+        # Poll again later (backing off) while the job is in flight, otherwise stop tracking it
+        # (left to the new leader if this process has been replaced)
+        db.expire_all()
+        for platform, video_id in (jobs if await still_leader() else []):
+            video = db.query(Video).filter(Video.id == video_id).first()
+            if video is not None and _is_in_flight(platform, video):
+                reschedule_publish_job(
+                    platform, video_id,
+                    settings.STATUS_CHECKER_MIN_INTERVAL,
+                    settings.STATUS_CHECKER_MAX_INTERVAL,
+                    settings.STATUS_CHECKER_BACKOFF
+                )
+            else:
+                complete_publish_job(platform, video_id)
+
+
+async def _check_due_publish_jobs() -> int:
+    """Check every due publish job, users in parallel
+    
+    Returns:
+        Number of due jobs handled
+    """
+    jobs = get_due_publish_jobs(time.time(), settings.STATUS_CHECKER_BATCH_SIZE)
+    if not jobs:
+        return 0
+    
+    # Group by user (primary key lookup); jobs of deleted videos are dropped
+    db = SessionLocal()
+    try:
+        owners = dict(
+            db.query(Video.id, Video.user_id).filter(Video.id.in_({video_id for _, video_id in jobs})).all()
+        )
+    finally:
+        db.close()
+    
+    jobs_by_user: Dict[int, List[Tuple[str, int]]] = {}
+    for platform, video_id in jobs:
+        user_id = owners.get(video_id)
+        if user_id is None:
+            complete_publish_job(platform, video_id)
+            continue
+        jobs_by_user.setdefault(user_id, []).append((platform, video_id))
+    
+    semaphore = asyncio.Semaphore(settings.STATUS_CHECKER_CONCURRENCY)
+    
+    async def check_user(user_id: int, user_jobs: List[Tuple[str, int]]) -> None:
+        async with semaphore:
+            # Own session per user - sessions must not be shared across concurrent checks
+            user_db = SessionLocal()
+            try:
+                await _check_user_publish_jobs(user_id, user_jobs, user_db)
             except Exception as e:
-                logger.error(f"Error in status checker task: {e}", exc_info=True)
+                status_logger.error(f"Error checking publish jobs for user {user_id}: {e}", exc_info=True)
             finally:
-                if db:
+                user_db.close()
+    
+    await asyncio.gather(*(check_user(user_id, user_jobs) for user_id, user_jobs in jobs_by_user.items()))
+    return len(jobs)
+
+
+async def status_checker_task():
+    """Background task that checks status for in-progress uploads as their polls come due
+    
+    Checks:
+    - TikTok: Videos with tiktok_publish_id but no tiktok_id (PULL_FROM_URL in progress)
+    - Instagram: Videos with instagram_container_id and status="uploading"
+    
+    Publishes WebSocket events when status changes.
+    """
+    next_reconcile = 0.0
+    while True:
+        try:
+            if time.monotonic() >= next_reconcile:
+                db = SessionLocal()
+                try:
+                    found = _index_in_flight_publish_jobs(db)
+                    status_logger.debug(f"Status checker full scan found {found} in-flight publish jobs")
+                finally:
                     db.close()
+                next_reconcile = time.monotonic() + settings.STATUS_CHECKER_RECONCILE_INTERVAL
+            
+            await _check_due_publish_jobs()
+            
+            # Sleep until the next poll is due (re-reading the index at least every MIN_INTERVAL for new jobs)
+            next_due = get_next_publish_job_time()
+            delay = settings.STATUS_CHECKER_MIN_INTERVAL if next_due is None else next_due - time.time()
+            await asyncio.sleep(min(max(delay, 1.0), settings.STATUS_CHECKER_MIN_INTERVAL))
         
         except Exception as e:
-            logger.error(f"Fatal error in status checker task: {e}", exc_info=True)
-            await asyncio.sleep(30)  # Wait before retrying
-
+            logger.error(f"Error in status checker task: {e}", exc_info=True)
+            await asyncio.sleep(settings.STATUS_CHECKER_MIN_INTERVAL)  # Wait before retrying
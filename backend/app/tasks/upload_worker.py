@@ -1,22 +1,37 @@
 """Background worker for processing upload tasks from Redis queue
 
-Processes tasks with unlimited concurrency - spawns async tasks for each
-queued item without blocking the main polling loop.
+Processes tasks concurrently up to a global and per-user limit - spawns async
+tasks for each queued item and stops dequeuing while all slots are busy.
+Tasks carry either a user's pending batch (upload route) or a single claimed
+scheduled video (payload has video_id, enqueued by the scheduler).
 """
 import asyncio
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Set
 
+from app.core.config import settings
 from app.db.session import SessionLocal
 from app.db.task_queue import (
-    dequeue_task, mark_task_processing, mark_task_completed,
-    mark_task_failed, cleanup_stale_tasks
+    dequeue_task, async_mark_task_processing, async_mark_task_completed,
+    async_mark_task_failed, async_cleanup_stale_tasks,
+    async_heartbeat_worker, async_requeue_expired_leases, async_promote_due_tasks,
+    async_defer_task, async_release_worker
 )
 from app.services.video.orchestrator import upload_all_pending_videos
+from app.services.video.platforms.rate_limiter import PlatformRateLimitExceeded
+from app.tasks.scheduler import upload_scheduled_video
+from app.core.metrics import upload_worker_in_flight_gauge, stale_tasks_reaped_counter
 
 logger = logging.getLogger(__name__)
 upload_logger = logging.getLogger("upload")
 
+# Strong references to running upload tasks (asyncio only keeps weak ones)
+_in_flight_tasks: Set[asyncio.Task] = set()
+# Number of in-flight upload tasks per user_id
+_user_in_flight: Dict[int, int] = {}
+# Lease heartbeat, reaper, promoter and stale-task loops - kept alive until drain completes
+_background_tasks: Set[asyncio.Task] = set()
+
 
 async def process_upload_task(task_data: Dict[str, Any]) -> None:
     """Process a single upload task (runs concurrently with other tasks)
@@ -31,45 +46,59 @@ async def process_upload_task(task_data: Dict[str, Any]) -> None:
     
     if not user_id:
         logger.error(f"Task {task_id} missing user_id in payload")
-        mark_task_failed(task_id, "Missing user_id in task payload", retry=False)
+        await async_mark_task_failed(task_id, "Missing user_id in task payload", retry=False)
         return
     
     # Mark task as processing
-    mark_task_processing(task_id)
+    await async_mark_task_processing(task_id)
     
     # Create DB session for this task
     db = SessionLocal()
     if db is None:
         error_msg = "Failed to create database session"
         logger.error(f"Task {task_id}: {error_msg}")
-        mark_task_failed(task_id, error_msg, retry=True)
+        await async_mark_task_failed(task_id, error_msg, retry=True)
         return
     
     try:
+        video_id = payload.get("video_id")
+        if video_id:
+            # Scheduled video claimed and dispatched by the scheduler
+            logger.info(f"Processing scheduled upload task {task_id} for user {user_id}, video {video_id}")
+            status = await upload_scheduled_video(video_id, user_id, db)
+            await async_mark_task_completed(task_id, {"ok": True, "video_id": video_id, "status": status})
+            logger.info(f"Completed scheduled upload task {task_id} for video {video_id}: {status}")
+            return
+        
         logger.info(f"Processing upload task {task_id} for user {user_id}")
         
         # Process the upload
         result = await upload_all_pending_videos(user_id, db)
         
         # Mark task as completed
-        mark_task_completed(task_id, result)
+        await async_mark_task_completed(task_id, result)
         logger.info(
             f"Completed upload task {task_id} for user {user_id}: "
             f"{result.get('videos_uploaded', 0)} uploaded, "
             f"{result.get('videos_failed', 0)} failed"
         )
         
+    except PlatformRateLimitExceeded as e:
+        # Platform quota exhausted - free the slot and run again once the token is due
+        logger.info(f"Task {task_id} deferred by {e.retry_after:.0f}s: {e}")
+        await async_defer_task(task_id, e.retry_after)
+        
     except ValueError as e:
         # Validation errors - don't retry
         error_msg = str(e)
         logger.warning(f"Task {task_id} validation error: {error_msg}")
-        mark_task_failed(task_id, error_msg, retry=False)
+        await async_mark_task_failed(task_id, error_msg, retry=False)
         
     except Exception as e:
         # Other errors - retry with exponential backoff
         error_msg = str(e)
         logger.error(f"Task {task_id} failed: {error_msg}", exc_info=True)
-        mark_task_failed(task_id, error_msg, retry=True)
+        await async_mark_task_failed(task_id, error_msg, retry=True)
         
     finally:
         # Always close DB session
@@ -79,20 +108,103 @@ async def process_upload_task(task_data: Dict[str, Any]) -> None:
             logger.warning(f"Error closing DB session for task {task_id}: {e}")
 
 
+async def worker_heartbeat_task() -> None:
+    """Keep this worker's queue lease alive so its in-flight tasks aren't re-delivered"""
+    while True:
+        try:
+            await async_heartbeat_worker()
+        except Exception as e:
+            logger.error(f"Error renewing worker lease: {e}", exc_info=True)
+        await asyncio.sleep(settings.TASK_QUEUE_HEARTBEAT_INTERVAL)
+
+
+async def lease_reaper_task() -> None:
+    """Re-queue in-flight tasks of workers that stopped heartbeating (crashed)"""
+    while True:
+        try:
+            await async_requeue_expired_leases()
+        except Exception as e:
+            logger.error(f"Error re-queuing expired leases: {e}", exc_info=True)
+        await asyncio.sleep(settings.TASK_QUEUE_REAPER_INTERVAL)
+
+
+async def stale_task_reaper_task() -> None:
+    """Fail tasks stuck in processing longer than the timeout (hung on a live worker)
+    
+    Runs on its own schedule so the dequeue loop never pays for the sweep.
+    """
+    while True:
+        try:
+            reaped = await async_cleanup_stale_tasks(timeout_seconds=settings.TASK_QUEUE_STALE_TASK_TIMEOUT)
+            if reaped:
+                stale_tasks_reaped_counter.inc(reaped)
+        except Exception as e:
+            logger.error(f"Error cleaning up stale tasks: {e}", exc_info=True)
+        await asyncio.sleep(settings.TASK_QUEUE_STALE_CHECK_INTERVAL)
+
+
+async def delayed_task_promoter_task() -> None:
+    """Move due retries/delayed tasks onto the ready queue (keeps backoff out of the dequeue loop)"""
+    while True:
+        try:
+            await async_promote_due_tasks(batch_size=settings.TASK_QUEUE_PROMOTE_BATCH_SIZE)
+        except Exception as e:
+            logger.error(f"Error promoting delayed tasks: {e}", exc_info=True)
+        await asyncio.sleep(settings.TASK_QUEUE_PROMOTER_INTERVAL)
+
+
+def _spawn_upload_task(task_data: Dict[str, Any], slots: asyncio.Semaphore) -> None:
+    """Start processing a task, holding one global slot until it finishes"""
+    user_id = task_data.get("payload", {}).get("user_id")
+    if user_id:
+        _user_in_flight[user_id] = _user_in_flight.get(user_id, 0) + 1
+    
+    task = asyncio.create_task(process_upload_task(task_data))
+    _in_flight_tasks.add(task)
+    upload_worker_in_flight_gauge.set(len(_in_flight_tasks))
+    
+    def _on_done(finished: asyncio.Task) -> None:
+        _in_flight_tasks.discard(finished)
+        if user_id:
+            remaining = _user_in_flight.get(user_id, 1) - 1
+            if remaining > 0:
+                _user_in_flight[user_id] = remaining
+            else:
+                _user_in_flight.pop(user_id, None)
+        slots.release()
+        upload_worker_in_flight_gauge.set(len(_in_flight_tasks))
+    
+    task.add_done_callback(_on_done)
+
+
 async def upload_worker_task() -> None:
-    """Main worker loop that polls queue and processes tasks with unlimited concurrency
+    """Main worker loop that polls queue and processes tasks with bounded concurrency
     
     Continuously polls the upload queue and spawns async tasks for processing.
-    Each task processes independently, allowing unlimited concurrent uploads.
+    At most UPLOAD_WORKER_MAX_CONCURRENCY tasks run at once (the loop stops
+    dequeuing while saturated) and at most UPLOAD_WORKER_MAX_PER_USER per user;
+    tasks over the per-user limit are deferred back to the delayed set.
     """
-    logger.info("Starting upload worker task")
+    logger.info(
+        f"Starting upload worker task (max_concurrency={settings.UPLOAD_WORKER_MAX_CONCURRENCY}, "
+        f"max_per_user={settings.UPLOAD_WORKER_MAX_PER_USER})"
+    )
+    
+    # Register the lease before the first dequeue so in-flight tasks are always reapable
+    await async_heartbeat_worker()
+    for loop_func in (
+        worker_heartbeat_task, lease_reaper_task,
+        delayed_task_promoter_task, stale_task_reaper_task
+    ):
+        _background_tasks.add(asyncio.create_task(loop_func()))
+    
+    slots = asyncio.Semaphore(settings.UPLOAD_WORKER_MAX_CONCURRENCY)
     
     while True:
+        # Backpressure: wait for a free slot before taking more work off the queue
+        await slots.acquire()
+        spawned = False
         try:
-            # Clean up stale tasks every 10 minutes
-            # (tasks that have been processing too long, likely from crashed workers)
-            cleanup_stale_tasks(timeout_seconds=3600)
-            
             # Dequeue task (blocking, 5 second timeout)
             task_data = await dequeue_task("upload_videos", timeout=5)
             
@@ -100,38 +212,51 @@ async def upload_worker_task() -> None:
                 # Timeout - no tasks available, continue polling
                 continue
             
-            task_id = task_data.get("task_id")
-            
-            # Check if this is a retry task that needs delay (exponential backoff)
-            # Get retry_after timestamp from metadata if it exists
-            from app.db.task_queue import get_task_status
-            task_meta = get_task_status(task_id)
-            retry_after_str = task_meta.get("retry_after") if task_meta else None
-            
-            if retry_after_str:
-                try:
-                    from datetime import datetime, timezone
-                    retry_after = datetime.fromisoformat(retry_after_str.replace('Z', '+00:00'))
-                    now = datetime.now(timezone.utc)
-                    
-                    if retry_after > now:
-                        # Need to wait before processing this retry
-                        delay_seconds = (retry_after - now).total_seconds()
-                        retry_count = task_data.get("retry_count", 0)
-                        logger.info(
-                            f"Task {task_id} is retry attempt {retry_count}, "
-                            f"waiting {delay_seconds:.0f}s before processing (exponential backoff)"
-                        )
-                        await asyncio.sleep(delay_seconds)
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Error parsing retry_after for task {task_id}: {e}")
-            
-            # Spawn async task to process (non-blocking - unlimited concurrency)
-            asyncio.create_task(process_upload_task(task_data))
+            user_id = task_data.get("payload", {}).get("user_id")
+            if user_id and _user_in_flight.get(user_id, 0) >= settings.UPLOAD_WORKER_MAX_PER_USER:
+                # User already at their limit - hand the task back instead of holding a slot
+                await async_defer_task(task_data.get("task_id"), settings.UPLOAD_WORKER_DEFER_SECONDS)
+                continue
             
-            # Continue immediately to next iteration (don't wait for task completion)
+            # Spawn async task to process (non-blocking - the slot is released when it finishes)
+            _spawn_upload_task(task_data, slots)
+            spawned = True
             
         except Exception as e:
             logger.error(f"Error in upload worker loop: {e}", exc_info=True)
             # Wait a bit before retrying to avoid tight error loops
             await asyncio.sleep(5)
+        finally:
+            if not spawned:
+                slots.release()
+
+
+async def drain_upload_worker(timeout: float) -> None:
+    """Wait for in-flight uploads to finish, then give up this worker's queue lease
+    
+    Call after cancelling upload_worker_task. Tasks still running after the
+    timeout are cancelled and re-queued immediately for another worker.
+    
+    Args:
+        timeout: Seconds to wait for in-flight tasks
+    """
+    if _in_flight_tasks:
+        logger.info(f"Draining {len(_in_flight_tasks)} in-flight upload task(s) (timeout={timeout}s)")
+        _, pending = await asyncio.wait(set(_in_flight_tasks), timeout=timeout)
+        if pending:
+            logger.warning(f"Cancelling {len(pending)} upload task(s) still running after drain timeout")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+    
+    try:
+        requeued = await async_release_worker()
+        if requeued:
+            logger.info(f"Re-queued {requeued} unfinished upload task(s) on shutdown")
+    except Exception as e:
+        logger.error(f"Error releasing worker lease on shutdown: {e}", exc_info=True)
@@ -0,0 +1,117 @@
+"""Worker process entry point
+
+Runs background task roles in a dedicated process, or the API without any
+background loops, so each can be scaled on its own:
+
+    python -m app.worker --role upload-worker
+    python -m app.worker --role scheduler --role status-checker
+    python -m app.worker --role api --port 8000
+
+Roles: api, upload-worker, scheduler, status-checker (see app.tasks.runner).
+Scheduler and status-checker loops are leader-elected, so those roles can
+be enabled on several processes for failover.
+
+Worker processes serve their own Prometheus metrics (in-flight uploads,
+rate limit waits, leader state, ...) on --metrics-port; give each process
+on a host its own port. Queue depth is read from Redis by the API's
+/metrics instead, as it is the same for every process.
+"""
+import argparse
+import asyncio
+import signal
+import sys
+
+from app.core.config import settings
+from app.core.logging import setup_logging, get_logger
+from app.tasks.runner import WORKER_ROLES, parse_roles, start_role_tasks, stop_role_tasks
+
+ROLE_API = "api"
+
+logger = get_logger(__name__)
+
+
+def run_api(host: str, port: int) -> None:
+    """Serve the API with no in-process background loops"""
+    import uvicorn
+
+    settings.IN_PROCESS_WORKER_ROLES = ""
+    from app.main import app
+    uvicorn.run(app, host=host, port=port)
+
+
+def start_metrics_server(port: int) -> None:
+    """Serve this process's Prometheus metrics on port (0 disables)"""
+    if not port:
+        return
+    from prometheus_client import start_http_server
+
+    start_http_server(port)
+    logger.info(f"Serving worker metrics on port {port}")
+
+
+async def run_workers(roles: list[str], metrics_port: int = 0) -> None:
+    """Run background roles until SIGTERM/SIGINT, then shut down gracefully"""
+    from app.core.otel import initialize_otel, setup_otel_logging, instrument_httpx, instrument_sqlalchemy
+    from app.db.redis import get_redis_client
+    from app.db.session import engine
+    from app.services.video.platforms.http_clients import open_platform_clients, close_platform_clients
+    from app.db.local_cache import start_cache_invalidation_listener, stop_cache_invalidation_listener
+    from app.services.event_service import flush_pending_events
+
+    if initialize_otel():
+        setup_otel_logging()
+    instrument_httpx()
+    instrument_sqlalchemy(engine)
+
+    logger.info("Testing Redis connection...")
+    get_redis_client().ping()
+    logger.info("Redis connection successful")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    start_metrics_server(metrics_port)
+    open_platform_clients()
+    start_cache_invalidation_listener()
+    running = start_role_tasks(roles)
+    logger.info(f"Worker running roles: {', '.join(roles)}")
+
+    await stop.wait()
+    logger.info("Shutting down worker...")
+    await stop_role_tasks(running)
+    await flush_pending_events()
+    await stop_cache_invalidation_listener()
+    await close_platform_clients()
+    logger.info("Worker stopped")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run hopper API or background worker roles")
+    parser.add_argument(
+        "--role", action="append", required=True,
+        choices=(ROLE_API,) + WORKER_ROLES,
+        help="Role to run (repeat for several background roles)"
+    )
+    parser.add_argument("--host", default="0.0.0.0", help="API bind host (api role only)")
+    parser.add_argument("--port", type=int, default=8000, help="API bind port (api role only)")
+    parser.add_argument(
+        "--metrics-port", type=int, default=settings.WORKER_METRICS_PORT,
+        help="Prometheus metrics port (background roles only, 0 disables)"
+    )
+    args = parser.parse_args(argv)
+
+    if ROLE_API in args.role:
+        if len(args.role) > 1:
+            parser.error("the api role cannot be combined with background roles")
+        run_api(args.host, args.port)
+        return 0
+
+    setup_logging()
+    asyncio.run(run_workers(parse_roles(",".join(args.role)), metrics_port=args.metrics_port))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -38,6 +38,25 @@ def reset_redis_singleton():
     redis_module._client = None
 
 
+@pytest.fixture(autouse=True)
+def clear_local_caches():
+    """Empty the in-process settings/OAuth caches so entries never leak between tests"""
+    from app.db.local_cache import clear_local_caches as clear
+    clear()
+    yield
+    clear()
+
+
+@pytest.fixture(autouse=True)
+def publish_events_immediately():
+    """Publish realtime events without a coalescing window, with no snapshots carried between tests"""
+    from app.core.config import settings
+    from app.services import event_service
+    with patch.object(settings, 'EVENT_COALESCE_WINDOW', 0), \
+         patch.object(event_service, 'event_coalescer', event_service.EventCoalescer()):
+        yield
+
+
 # SQLite in-memory database for testing
 TEST_DATABASE_URL = "sqlite:///:memory:"
 
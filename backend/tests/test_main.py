@@ -5,7 +5,7 @@ import os
 import tempfile
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
 
 # Add backend directory to Python path
 backend_dir = Path(__file__).parent.parent
@@ -943,5 +943,313 @@ class TestCheckoutAndBilling:
         assert token_info["monthly_tokens"] == 300
 
 
+class TestWorkerRoles:
+    """Test background role selection for API and worker processes"""
+    
+    def test_parse_roles(self):
+        """Test role lists are validated, deduplicated and ordered"""
+        from app.tasks.runner import parse_roles
+        
+        assert parse_roles("") == []
+        assert parse_roles(" scheduler, upload-worker,scheduler ") == ["upload-worker", "scheduler"]
+        with pytest.raises(ValueError):
+            parse_roles("upload-worker,bogus")
+    
+    @pytest.mark.asyncio
+    async def test_start_and_stop_roles(self):
+        """Test only the selected roles' loops start and the upload worker is drained on stop"""
+        import asyncio
+        from app.tasks import runner
+        
+        started = []
+        
+        def fake_loops(role):
+            async def loop():
+                started.append(role)
+                await asyncio.sleep(3600)
+            return [loop]
+        
+        with patch.object(runner, '_role_loops', side_effect=fake_loops), \
+                patch('app.tasks.upload_worker.drain_upload_worker') as mock_drain:
+            running = runner.start_role_tasks(["upload-worker", "status-checker"])
+            # status-checker loop starts once its leader lease is acquired
+            await asyncio.sleep(0.05)
+            assert sorted(started) == ["status-checker", "upload-worker"]
+            
+            await runner.stop_role_tasks(running)
+            assert all(task.cancelled() for tasks in running.values() for task in tasks)
+            mock_drain.assert_called_once()
+    
+    def test_worker_cli_rejects_api_with_background_roles(self):
+        """Test the api role cannot be combined with background roles"""
+        from app.worker import main
+        
+        with pytest.raises(SystemExit):
+            main(["--role", "api", "--role", "scheduler"])
+    
+    def test_worker_cli_serves_metrics(self):
+        """Test background roles get their own metrics port, and 0 disables the endpoint"""
+        from app import worker
+        
+        with patch.object(worker, 'run_workers', new=MagicMock(return_value=None)) as mock_run, \
+                patch.object(worker.asyncio, 'run'), \
+                patch.object(worker, 'setup_logging'):
+            worker.main(["--role", "upload-worker", "--metrics-port", "9201"])
+        mock_run.assert_called_once_with(["upload-worker"], metrics_port=9201)
+        
+        with patch('prometheus_client.start_http_server') as mock_server:
+            worker.start_metrics_server(0)
+            mock_server.assert_not_called()
+            worker.start_metrics_server(9201)
+            mock_server.assert_called_once_with(9201)
+
+
+class TestLeaderElection:
+    """Test fenced Redis leases and leader-elected singleton loops"""
+    
+    def test_fenced_lock_tokens_and_ownership(self, mock_redis):
+        """Test tokens increase per acquisition and only the owner can renew/release"""
+        from app.db.redis import acquire_fenced_lock, renew_lock, release_lock, get_fencing_token
+        
+        assert acquire_fenced_lock("leader:job", "node-a", timeout=10) == 1
+        assert acquire_fenced_lock("leader:job", "node-b", timeout=10) is None
+        assert renew_lock("leader:job", "node-b", timeout=10) is False
+        assert renew_lock("leader:job", "node-a", timeout=10) is True
+        
+        release_lock("leader:job", owner="node-b")
+        assert mock_redis.get("leader:job") == "node-a"
+        release_lock("leader:job", owner="node-a")
+        
+        assert acquire_fenced_lock("leader:job", "node-b", timeout=10) == 2
+        assert get_fencing_token("leader:job") == 2
+    
+    @pytest.mark.asyncio
+    async def test_leader_stops_job_when_lease_is_lost(self, mock_async_redis):
+        """Test the job runs only while the lease is held and stops once another node takes it"""
+        import asyncio
+        from app.core.config import settings
+        from app.tasks import leader
+        
+        job_running = asyncio.Event()
+        job_cancelled = asyncio.Event()
+        fencing_checks = []
+        
+        async def job():
+            fencing_checks.append(await leader.still_leader())
+            job_running.set()
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                fencing_checks.append(await leader.still_leader())
+                job_cancelled.set()
+                raise
+        
+        with patch.object(settings, 'LEADER_RENEW_INTERVAL', 0.05), \
+                patch.object(settings, 'LEADER_RETRY_INTERVAL', 0.05):
+            runner = asyncio.create_task(leader.run_as_leader("job", job))
+            await asyncio.wait_for(job_running.wait(), timeout=1)
+            assert fencing_checks == [True]
+            
+            # Another node takes over after our lease expired
+            await mock_async_redis.set("leader:job", "other-node", ex=60)
+            await mock_async_redis.incr("leader:job:fence")
+            await asyncio.wait_for(job_cancelled.wait(), timeout=1)
+            assert fencing_checks == [True, False]
+            
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+        
+        # Our release must not delete the new leader's lease
+        assert await mock_async_redis.get("leader:job") == "other-node"
+    
+    @pytest.mark.asyncio
+    async def test_replaced_leader_skips_scheduler_claims(self, mock_async_redis):
+        """Test a scheduler whose fencing token is outdated does not claim due videos"""
+        from app.tasks import leader, scheduler
+        
+        await mock_async_redis.set("leader:scheduler_task:fence", 2)
+        token = leader._current_lease.set(("scheduler_task", 1))
+        try:
+            assert not await leader.still_leader()
+            with patch.object(scheduler, 'build_upload_context', return_value=Mock(enabled_destinations=["youtube"])), \
+                    patch.object(scheduler, 'claim_scheduled_videos') as mock_claim:
+                assert await scheduler._dispatch_due_videos({1: [Mock(id=10)]}, Mock()) == 0
+            mock_claim.assert_not_called()
+        finally:
+            leader._current_lease.reset(token)
+        
+        # Outside a leader job writes are not fenced
+        assert await leader.still_leader()
+    
+    @pytest.mark.asyncio
+    async def test_replaced_leader_skips_status_checker_writes(self, mock_async_redis):
+        """Test a status checker whose fencing token is outdated neither applies statuses nor publishes"""
+        from app.tasks import leader, status_checker
+        
+        await mock_async_redis.set("leader:status_checker_task:fence", 2)
+        video = Mock(id=10, user_id=1, status="uploading", custom_settings={"instagram_container_id": "c1"})
+        finished = Mock(status_code=200)
+        finished.json.return_value = {"status_code": "FINISHED"}
+        client = Mock(get=AsyncMock(return_value=finished), post=AsyncMock())
+        
+        token = leader._current_lease.set(("status_checker_task", 1))
+        try:
+            with patch.object(status_checker, 'set_platform_status', new=AsyncMock()) as mock_status, \
+                    patch.object(status_checker, 'update_video') as mock_update, \
+                    patch.object(status_checker, 'is_upload_active', return_value=False), \
+                    patch.object(status_checker, 'get_platform_client', return_value=client):
+                await status_checker._apply_tiktok_status(video, "p1", {"status": "FAILED"}, {}, {}, Mock())
+                await status_checker._check_instagram_container(video, Mock(), "token", {}, {}, Mock())
+        finally:
+            leader._current_lease.reset(token)
+        
+        mock_status.assert_not_called()
+        mock_update.assert_not_called()
+        client.post.assert_not_called()
+
+
+class TestPlatformRateLimiter:
+    """Test the distributed token bucket used before platform API calls"""
+    
+    def test_bucket_allows_burst_then_spaces_requests(self):
+        """Test a bucket hands out its burst immediately, then one token per 1/rate seconds"""
+        from app.db.redis import reserve_rate_limit_token
+        
+        waits = [reserve_rate_limit_token("test:burst:1", 2, 3) for _ in range(5)]
+        
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert waits[3] == pytest.approx(0.5, abs=0.05)
+        assert waits[4] == pytest.approx(1.0, abs=0.05)
+        # Other accounts have their own bucket
+        assert reserve_rate_limit_token("test:burst:2", 2, 3) == 0.0
+    
+    @pytest.mark.asyncio
+    async def test_acquire_waits_and_reports_wait_time(self):
+        """Test async acquisition sleeps for its reservation and records the wait"""
+        from app.services.video.platforms import rate_limiter
+        
+        limits = {("tiktok", "video_init"): (20, 1)}
+        with patch.object(rate_limiter, 'PLATFORM_RATE_LIMITS', limits), \
+                patch.object(rate_limiter, 'platform_rate_limit_wait_histogram') as mock_histogram:
+            assert await rate_limiter.acquire_platform_rate_limit("tiktok", "video_init", 7) == 0.0
+            waited = await rate_limiter.acquire_platform_rate_limit("tiktok", "video_init", 7)
+            # Endpoints without a configured limit are never throttled
+            assert await rate_limiter.acquire_platform_rate_limit("tiktok", "unlisted", 7) == 0.0
+        
+        assert waited == pytest.approx(0.05, abs=0.02)
+        mock_histogram.labels.assert_called_with(platform="tiktok", endpoint="video_init")
+        assert mock_histogram.labels.return_value.observe.call_count == 2
+    
+    def test_sync_acquire_refuses_long_waits(self):
+        """Test blocking callers get an error instead of stalling for a long wait"""
+        from app.services.video.platforms import rate_limiter
+        
+        limits = {("tiktok", "creator_info"): (1 / 60, 1)}
+        with patch.object(rate_limiter, 'PLATFORM_RATE_LIMITS', limits):
+            rate_limiter.acquire_platform_rate_limit_sync("tiktok", "creator_info", "abc")
+            with pytest.raises(rate_limiter.PlatformRateLimitExceeded):
+                rate_limiter.acquire_platform_rate_limit_sync("tiktok", "creator_info", "abc", max_wait=1)
+    
+    @pytest.mark.asyncio
+    async def test_long_waits_raise_and_return_the_token(self):
+        """Test project-wide YouTube inserts share one bucket and over-long waits hand the token back"""
+        from app.services.video.platforms import rate_limiter
+        
+        limits = {("youtube", "videos.insert"): (1 / 60, 1)}
+        with patch.object(rate_limiter, 'PLATFORM_RATE_LIMITS', limits):
+            assert await rate_limiter.acquire_platform_rate_limit("youtube", "videos.insert", 1) == 0.0
+            # Another user draws from the same project quota
+            with pytest.raises(rate_limiter.PlatformRateLimitExceeded) as first:
+                await rate_limiter.acquire_platform_rate_limit("youtube", "videos.insert", 2, max_wait=1)
+            with pytest.raises(rate_limiter.PlatformRateLimitExceeded) as second:
+                await rate_limiter.acquire_platform_rate_limit("youtube", "videos.insert", 3, max_wait=1)
+        
+        assert first.value.retry_after == pytest.approx(60, abs=1)
+        # The refused reservation was returned, so the next caller isn't pushed further back
+        assert second.value.retry_after == pytest.approx(60, abs=1)
+    
+    def test_configured_limits_match_platform_quotas(self):
+        """Test YouTube inserts follow the daily unit quota and Instagram media calls share one bucket"""
+        from app.core.config import settings
+        from app.services.video.platforms import rate_limiter
+        
+        _, rate, capacity = rate_limiter._bucket("youtube", "videos.insert", 1)
+        assert rate * 86400 + capacity <= settings.YOUTUBE_DAILY_QUOTA_UNITS / 1600 + 1
+        
+        media = rate_limiter._bucket("instagram", "media", 5)
+        assert rate_limiter._bucket("instagram", "container_status", 5) == media
+        assert media[1] * 3600 == pytest.approx(200)
+        assert rate_limiter._bucket("instagram", "media", 6) != media
+    
+    @pytest.mark.asyncio
+    async def test_token_refresh_does_not_wait_out_its_lock(self, test_user, db_session, mock_redis):
+        """Test a rate limited TikTok refresh raises the rate limit error quickly and frees the refresh lock"""
+        import time
+        from app.services.video.platforms import rate_limiter, tiktok_api
+        
+        limits = {("tiktok", "oauth_token"): (1 / 60, 1)}
+        with patch.object(rate_limiter, 'PLATFORM_RATE_LIMITS', limits), \
+                patch.object(tiktok_api, 'get_platform_client') as mock_client:
+            await rate_limiter.acquire_platform_rate_limit("tiktok", "oauth_token", test_user.id)
+            started = time.monotonic()
+            with pytest.raises(rate_limiter.PlatformRateLimitExceeded) as exc_info:
+                await tiktok_api.refresh_tiktok_token(test_user.id, "refresh-token", db_session)
+        
+        assert time.monotonic() - started < tiktok_api.TOKEN_REFRESH_LOCK_TIMEOUT
+        assert exc_info.value.retry_after == pytest.approx(60, abs=1)
+        mock_client.assert_not_called()
+        assert not mock_redis.exists(f"tiktok_token_refresh:{test_user.id}")
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_wait_returns_the_token(self):
+        """Test a caller cancelled while waiting doesn't delay the callers after it"""
+        import asyncio
+        from app.services.video.platforms import rate_limiter
+        
+        limits = {("tiktok", "video_init"): (5, 1)}
+        with patch.object(rate_limiter, 'PLATFORM_RATE_LIMITS', limits):
+            assert await rate_limiter.acquire_platform_rate_limit("tiktok", "video_init", 7) == 0.0
+            waiting = asyncio.create_task(rate_limiter.acquire_platform_rate_limit("tiktok", "video_init", 7))
+            await asyncio.sleep(0.02)
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+            
+            waited = await rate_limiter.acquire_platform_rate_limit("tiktok", "video_init", 7)
+        
+        assert waited < 0.25
+
+
+
+class TestPlatformHttpClients:
+    """Test the shared pooled HTTP client per platform"""
+    
+    @pytest.mark.asyncio
+    async def test_client_is_shared_per_platform_until_closed(self):
+        """Test callers get the same pooled client per platform, and a new one after shutdown"""
+        from app.services.video.platforms import http_clients
+        
+        tiktok = http_clients.get_platform_client("tiktok")
+        assert http_clients.get_platform_client("tiktok") is tiktok
+        assert http_clients.get_platform_client("instagram") is not tiktok
+        assert tiktok.timeout.read == 30.0
+        
+        await http_clients.close_platform_clients()
+        
+        assert tiktok.is_closed
+        reopened = http_clients.get_platform_client("tiktok")
+        assert reopened is not tiktok
+        await http_clients.close_platform_clients()
+    
+    def test_http2_falls_back_without_h2(self):
+        """Test clients use HTTP/1.1 instead of failing when h2 is not installed"""
+        from app.services.video.platforms import http_clients
+        
+        with patch.object(http_clients, '_http2_available', None), \
+                patch.object(http_clients.importlib.util, 'find_spec', return_value=None):
+            assert http_clients._use_http2() is False
+        
+        with patch.object(http_clients.settings, 'PLATFORM_HTTP2', False):
+            assert http_clients._use_http2() is False
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
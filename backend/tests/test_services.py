@@ -1,7 +1,7 @@
 """Service logic tests"""
 import pytest
 from datetime import datetime, timezone, timedelta
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import ANY, Mock, patch, MagicMock, AsyncMock
 from sqlalchemy.exc import IntegrityError
 
 from app.models.user import User
@@ -881,3 +881,1065 @@ class TestSettingsService:
         
         assert wordbank == []
 
+
+
+class TestSchedulerDueIndex:
+    """Test due-time selection and wake-ups used by the scheduler"""
+    
+    def _add_video(self, db_session, user_id, name, status, scheduled_time):
+        video = create_test_video(
+            user_id=user_id,
+            filename=name,
+            path=f"user_{user_id}/{name}",
+            status=status,
+            scheduled_time=scheduled_time
+        )
+        db_session.add(video)
+        db_session.commit()
+        return video
+    
+    def test_due_videos_are_paged_in_order(self, test_user, db_session):
+        """Test only due unclaimed scheduled videos are returned, in keyset pages"""
+        from app.db.helpers import get_due_scheduled_videos
+        
+        now = datetime.now(timezone.utc)
+        due = [
+            self._add_video(db_session, test_user.id, f"due_{i}.mp4", "scheduled", now - timedelta(minutes=10 - i))
+            for i in range(3)
+        ]
+        self._add_video(db_session, test_user.id, "claimed.mp4", "uploading", now - timedelta(minutes=1))
+        self._add_video(db_session, test_user.id, "future.mp4", "scheduled", now + timedelta(minutes=5))
+        self._add_video(db_session, test_user.id, "done.mp4", "uploaded", now - timedelta(minutes=5))
+        
+        first = get_due_scheduled_videos(now, 2, db=db_session)
+        assert [v.id for v in first] == [due[0].id, due[1].id]
+        
+        rest = get_due_scheduled_videos(now, 2, after=(first[-1].scheduled_time, first[-1].id), db=db_session)
+        assert [v.id for v in rest] == [due[2].id]
+    
+    def test_claim_only_takes_scheduled_videos(self, test_user, db_session):
+        """Test claiming moves scheduled videos to uploading exactly once"""
+        from app.db.helpers import claim_scheduled_videos
+        
+        now = datetime.now(timezone.utc)
+        due = self._add_video(db_session, test_user.id, "due.mp4", "scheduled", now)
+        cancelled = self._add_video(db_session, test_user.id, "cancelled.mp4", "cancelled", now)
+        
+        assert claim_scheduled_videos([due.id, cancelled.id], db=db_session) == [due.id]
+        assert claim_scheduled_videos([due.id], db=db_session) == []
+        db_session.refresh(due)
+        db_session.refresh(cancelled)
+        assert due.status == "uploading"
+        assert cancelled.status == "cancelled"
+    
+    @pytest.mark.asyncio
+    async def test_due_videos_are_dispatched_as_upload_jobs(self, test_user, db_session):
+        """Test the scheduler enqueues one job per claimed video instead of uploading inline"""
+        from app.tasks import scheduler
+        
+        now = datetime.now(timezone.utc)
+        videos = [self._add_video(db_session, test_user.id, f"v{i}.mp4", "scheduled", now) for i in range(2)]
+        
+        with patch.object(scheduler, 'build_upload_context', return_value=Mock(enabled_destinations=["youtube"])), \
+                patch.object(scheduler, 'async_enqueue_task', new=AsyncMock(return_value="task")) as mock_enqueue, \
+                patch.object(scheduler, 'upload_to_destinations', new=AsyncMock()) as mock_upload:
+            dispatched = await scheduler._dispatch_due_videos({test_user.id: videos}, db_session)
+        
+        assert dispatched == 2
+        mock_upload.assert_not_called()
+        for video in videos:
+            mock_enqueue.assert_any_call(
+                "upload_videos", {"user_id": test_user.id, "video_id": video.id}, dedup_key=f"video:{video.id}"
+            )
+            db_session.refresh(video)
+            assert video.status == "uploading"
+    
+    @pytest.mark.asyncio
+    async def test_upload_job_skips_unclaimed_video(self, test_user, db_session):
+        """Test a queued job for a video cancelled in the meantime does nothing"""
+        from app.tasks import scheduler
+        
+        video = self._add_video(db_session, test_user.id, "gone.mp4", "cancelled", datetime.now(timezone.utc))
+        
+        with patch.object(scheduler, 'upload_to_destinations', new=AsyncMock()) as mock_upload:
+            assert await scheduler.upload_scheduled_video(video.id, test_user.id, db_session) == "skipped"
+        mock_upload.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_upload_job_renews_its_lock(self, test_user, db_session, mock_redis):
+        """Test a long scheduled upload keeps its lock and claim alive, and stops if the lock is taken"""
+        import asyncio
+        from app.core.config import settings
+        from app.tasks import scheduler
+        
+        video = self._add_video(db_session, test_user.id, "long.mp4", "uploading", datetime.now(timezone.utc))
+        lock_key = f"{scheduler.SCHEDULED_UPLOAD_LOCK_PREFIX}{video.id}"
+        context = Mock(enabled_destinations=["youtube"], upload_weight=Mock(return_value=1.0))
+        
+        async def slow_upload(*args):
+            await asyncio.sleep(0.2)
+            return {"youtube": "success"}
+        
+        async def stolen_upload(*args):
+            mock_redis.set(lock_key, "other-job")
+            await asyncio.sleep(30)
+        
+        with patch.object(settings, 'TASK_QUEUE_HEARTBEAT_INTERVAL', 0.02), \
+                patch.object(scheduler, 'build_upload_context', return_value=context), \
+                patch.object(scheduler, 'check_upload_success', return_value=False), \
+                patch.object(scheduler, 'cleanup_video_file'), \
+                patch.object(scheduler, 'renew_lock', wraps=scheduler.renew_lock) as mock_renew:
+            with patch.object(scheduler, 'upload_to_destinations', side_effect=slow_upload):
+                assert await scheduler.upload_scheduled_video(video.id, test_user.id, db_session) == "uploaded"
+            assert mock_renew.call_count >= 3
+            mock_renew.assert_called_with(lock_key, ANY, timeout=settings.TASK_QUEUE_WORKER_LEASE_SECONDS)
+            
+            db_session.refresh(video)
+            video.status = "uploading"
+            db_session.commit()
+            with patch.object(scheduler, 'upload_to_destinations', side_effect=stolen_upload):
+                result = await asyncio.wait_for(
+                    scheduler.upload_scheduled_video(video.id, test_user.id, db_session), timeout=5
+                )
+        
+        assert result == "skipped"
+        # The new owner keeps its lock
+        assert mock_redis.get(lock_key) == "other-job"
+    
+    @pytest.mark.asyncio
+    async def test_batch_upload_leaves_claimed_scheduled_videos_alone(self, test_user, db_session):
+        """Test "upload all" does not re-upload scheduled videos a scheduler job is uploading"""
+        from app.services.video import orchestrator
+        
+        now = datetime.now(timezone.utc)
+        pending = self._add_video(db_session, test_user.id, "pending.mp4", "pending", None)
+        stuck = self._add_video(db_session, test_user.id, "stuck.mp4", "uploading", None)
+        self._add_video(db_session, test_user.id, "claimed.mp4", "uploading", now)
+        
+        upload = AsyncMock(side_effect=lambda video_id, *args: ("succeeded", video_id))
+        with patch.object(orchestrator, 'build_upload_context', return_value=Mock(enabled_destinations=["youtube"])), \
+                patch.object(orchestrator, 'get_user_settings', return_value={"upload_immediately": True}), \
+                patch.object(orchestrator, '_fair_share_upload', new=upload):
+            result = await orchestrator.upload_all_pending_videos(test_user.id, db_session)
+        
+        assert result["videos_uploaded"] == 2
+        assert sorted(call.args[0] for call in upload.call_args_list) == sorted([pending.id, stuck.id])
+    
+    @pytest.mark.asyncio
+    async def test_lost_claims_are_redispatched(self, test_user, db_session):
+        """Test claims older than the task timeout are re-enqueued if still uploading, else released"""
+        import time
+        from app.core.config import settings
+        from app.db.redis import get_stale_scheduled_claims, mark_scheduled_claims_backfilled, record_scheduled_claims
+        from app.tasks import scheduler
+        
+        now = datetime.now(timezone.utc)
+        lost = self._add_video(db_session, test_user.id, "lost.mp4", "uploading", now)
+        done = self._add_video(db_session, test_user.id, "done.mp4", "uploaded", now)
+        fresh = self._add_video(db_session, test_user.id, "fresh.mp4", "uploading", now)
+        
+        mark_scheduled_claims_backfilled()
+        claimed_at = time.time() - settings.TASK_QUEUE_STALE_TASK_TIMEOUT - 60
+        with patch('time.time', return_value=claimed_at):
+            record_scheduled_claims([lost.id, done.id])
+        record_scheduled_claims([fresh.id])
+        
+        with patch.object(scheduler, 'async_enqueue_task', new=AsyncMock(return_value="task")) as mock_enqueue:
+            assert await scheduler._recover_lost_claims(db_session) == 1
+        
+        mock_enqueue.assert_called_once_with(
+            "upload_videos", {"user_id": test_user.id, "video_id": lost.id}, dedup_key=f"video:{lost.id}"
+        )
+        # The re-dispatched claim is refreshed and the finished one released
+        assert get_stale_scheduled_claims(time.time() - settings.TASK_QUEUE_STALE_TASK_TIMEOUT, 10) == []
+        assert sorted(get_stale_scheduled_claims(time.time() + 1, 10)) == sorted([lost.id, fresh.id])
+    
+    @pytest.mark.asyncio
+    async def test_legacy_uploading_videos_are_adopted(self, test_user, db_session):
+        """Test videos left uploading before claims were recorded are recovered after one timeout"""
+        import time
+        from app.core.config import settings
+        from app.db.redis import get_stale_scheduled_claims
+        from app.tasks import scheduler
+        
+        video = self._add_video(db_session, test_user.id, "legacy.mp4", "uploading", datetime.now(timezone.utc))
+        
+        with patch.object(scheduler, 'async_enqueue_task', new=AsyncMock(return_value="task")) as mock_enqueue:
+            assert await scheduler._recover_lost_claims(db_session) == 0
+            mock_enqueue.assert_not_called()
+            
+            later = time.time() + settings.TASK_QUEUE_STALE_TASK_TIMEOUT + 60
+            with patch('time.time', return_value=later):
+                assert get_stale_scheduled_claims(later - settings.TASK_QUEUE_STALE_TASK_TIMEOUT, 10) == [video.id]
+                assert await scheduler._recover_lost_claims(db_session) == 1
+        mock_enqueue.assert_called_once()
+    
+    def test_next_scheduled_time(self, test_user, db_session):
+        """Test the next wake-up is the earliest future schedule"""
+        from app.db.helpers import get_next_scheduled_time
+        
+        now = datetime.now(timezone.utc)
+        assert get_next_scheduled_time(now, db=db_session) is None
+        
+        self._add_video(db_session, test_user.id, "later.mp4", "scheduled", now + timedelta(hours=2))
+        soon = now + timedelta(minutes=3)
+        self._add_video(db_session, test_user.id, "soon.mp4", "scheduled", soon)
+        
+        next_time = get_next_scheduled_time(now, db=db_session)
+        assert abs((next_time - soon).total_seconds()) < 1
+    
+    @pytest.mark.asyncio
+    async def test_notify_wakes_scheduler(self):
+        """Test repeated notifications collapse into a single early wake-up"""
+        import fakeredis
+        import fakeredis.aioredis
+        from app.db import redis as redis_module
+        
+        # Sync notifier and async waiter must see the same server
+        server = fakeredis.FakeServer()
+        with patch.object(redis_module, 'get_redis_client', return_value=fakeredis.FakeStrictRedis(server=server, decode_responses=True)), \
+                patch.object(redis_module, 'get_async_redis_client', return_value=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)):
+            redis_module.notify_scheduler()
+            redis_module.notify_scheduler()
+            
+            assert await redis_module.wait_for_scheduler_wakeup(5) is True
+            assert await redis_module.wait_for_scheduler_wakeup(0.1) is False
+
+
+class TestConcurrentDestinationUploads:
+    """Test per-destination fan-out used by the orchestrator and scheduler"""
+    
+    @pytest.mark.asyncio
+    async def test_destinations_upload_concurrently_and_fail_independently(self, test_user, db_session):
+        """Test destinations overlap in time and one failure does not stop the others"""
+        import asyncio
+        from app.services.video import orchestrator
+        from app.services.video.registry import DESTINATION_UPLOADERS
+        
+        video = create_test_video(test_user.id, "fanout.mp4", f"user_{test_user.id}/fanout.mp4")
+        db_session.add(video)
+        db_session.commit()
+        
+        running = set()
+        overlapped = []
+        
+        def make_uploader(name, fail=False):
+            async def uploader(user_id, video_id, db=None):
+                running.add(name)
+                await asyncio.sleep(0.05)
+                overlapped.append(len(running) > 1)
+                running.discard(name)
+                if fail:
+                    raise RuntimeError(f"{name} API error")
+            return uploader
+        
+        uploaders = {
+            "youtube": make_uploader("youtube"),
+            "tiktok": make_uploader("tiktok", fail=True),
+            "instagram": make_uploader("instagram"),
+        }
+        with patch.dict(DESTINATION_UPLOADERS, uploaders), \
+                patch.object(orchestrator, 'SessionLocal', return_value=db_session), \
+                patch.object(orchestrator, 'set_platform_status', new=AsyncMock()), \
+                patch.object(orchestrator, 'check_upload_success', return_value=True), \
+                patch.object(orchestrator, 'record_platform_error') as mock_record:
+            results = await orchestrator.upload_to_destinations(
+                video.id, test_user.id, ["youtube", "tiktok", "instagram"], db_session
+            )
+        
+        assert results == {"youtube": "success", "tiktok": "failed", "instagram": "success"}
+        assert any(overlapped)
+        mock_record.assert_called_once_with(video.id, test_user.id, "tiktok", "tiktok API error", db=db_session)
+    
+    @pytest.mark.asyncio
+    async def test_cancellation_stops_running_destinations_only(self, test_user, db_session, mock_redis):
+        """Test a cancel flag written by another process keeps finished destinations and cancels the rest"""
+        import asyncio
+        from app.services.video import orchestrator
+        from app.services.video.registry import DESTINATION_UPLOADERS
+        
+        video = create_test_video(test_user.id, "cancel.mp4", f"user_{test_user.id}/cancel.mp4")
+        db_session.add(video)
+        db_session.commit()
+        
+        async def fast_uploader(user_id, video_id, db=None):
+            # The API process handling the cancel request only shares Redis with this worker
+            mock_redis.setex(f"upload_cancelled:{video_id}", 3600, "1")
+        
+        async def slow_uploader(user_id, video_id, db=None):
+            await asyncio.sleep(30)
+        
+        status_mock = AsyncMock()
+        with patch.dict(DESTINATION_UPLOADERS, {"youtube": fast_uploader, "instagram": slow_uploader}), \
+                patch.object(orchestrator, 'CANCEL_POLL_INTERVAL', 0.01), \
+                patch.object(orchestrator, 'SessionLocal', return_value=db_session), \
+                patch.object(orchestrator, 'set_platform_status', new=status_mock), \
+                patch.object(orchestrator, 'check_upload_success', return_value=True):
+            results = await asyncio.wait_for(
+                orchestrator.upload_to_destinations(video.id, test_user.id, ["youtube", "instagram"], db_session),
+                timeout=5
+            )
+        
+        assert results == {"youtube": "success", "instagram": "cancelled"}
+        assert not mock_redis.exists(f"upload_cancelled:{video.id}")
+        status_mock.assert_any_call(video.id, test_user.id, "instagram", "cancelled", error="Upload cancelled by user", db=db_session, context=ANY)
+    
+    def test_id_updates_merge_into_current_custom_settings(self, test_user, db_session):
+        """Test an ID written by one destination keeps keys another destination wrote meanwhile"""
+        from sqlalchemy import update
+        from app.db.helpers import update_video
+        from app.models.video import Video
+        
+        video = create_test_video(test_user.id, "merge.mp4", f"user_{test_user.id}/merge.mp4")
+        db_session.add(video)
+        db_session.commit()
+        stale_settings = dict(video.custom_settings)
+        
+        # Another destination stores its ID behind this session's back
+        db_session.execute(
+            update(Video).where(Video.id == video.id).values(custom_settings={**stale_settings, "tiktok_publish_id": "pub-1"}),
+            execution_options={"synchronize_session": False}
+        )
+        
+        updated = update_video(video.id, test_user.id, db=db_session, youtube_id="yt-1")
+        
+        assert updated.custom_settings["tiktok_publish_id"] == "pub-1"
+        assert updated.custom_settings["youtube_id"] == "yt-1"
+        assert "platform_statuses" in updated.custom_settings
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_successes_charge_tokens_once(self, test_user, db_session):
+        """Test destinations finishing together deduct the video's tokens only once"""
+        import asyncio
+        from app.services import token_service
+        
+        video = create_test_video(test_user.id, "charge.mp4", f"user_{test_user.id}/charge.mp4", tokens_required=5, tokens_consumed=0)
+        db_session.add(video)
+        db_session.commit()
+        
+        async def slow_deduct(**kwargs):
+            # deduct_tokens awaits the balance event after committing - let the other destination run
+            await asyncio.sleep(0.01)
+            return True
+        
+        with patch.object(token_service, 'deduct_tokens', new=AsyncMock(side_effect=slow_deduct)) as mock_deduct:
+            charged = await asyncio.gather(
+                token_service.charge_video_upload_tokens(video, "youtube", db_session),
+                token_service.charge_video_upload_tokens(video, "instagram", db_session)
+            )
+        
+        assert sorted(charged) == [0, 5]
+        mock_deduct.assert_called_once()
+        db_session.refresh(video)
+        assert video.tokens_consumed == 5
+
+
+
+class TestFairShareScheduler:
+    """Test fair-share upload slots across users"""
+    
+    @pytest.mark.asyncio
+    async def test_slots_follow_plan_weights(self):
+        """Test freed slots alternate between users in proportion to their weights"""
+        import asyncio
+        from app.services.video.fair_share import FairShareScheduler
+        
+        scheduler = FairShareScheduler(max_concurrent=1, max_per_user=10)
+        order = []
+        
+        async def upload(user_id, weight):
+            async with scheduler.slot(user_id, weight):
+                order.append(user_id)
+                await asyncio.sleep(0)
+        
+        # User 1 (weight 1) queues first with a big batch, user 2 (weight 2) right after
+        tasks = [asyncio.create_task(upload(1, 1)) for _ in range(6)]
+        tasks += [asyncio.create_task(upload(2, 2)) for _ in range(6)]
+        await asyncio.gather(*tasks)
+        
+        # The first upload took the free slot; the waiting ones share it 1:2
+        assert order[1:10] == [1, 2, 2, 1, 2, 2, 1, 2, 2]
+        assert scheduler.in_flight == 0
+        assert scheduler.waiting() == 0
+    
+    @pytest.mark.asyncio
+    async def test_per_user_in_flight_limit(self):
+        """Test a user never exceeds max_per_user while others use the spare slots"""
+        import asyncio
+        from app.services.video.fair_share import FairShareScheduler
+        
+        scheduler = FairShareScheduler(max_concurrent=4, max_per_user=2)
+        running = {1: 0, 2: 0}
+        peak = {1: 0, 2: 0}
+        
+        async def upload(user_id):
+            async with scheduler.slot(user_id):
+                running[user_id] += 1
+                peak[user_id] = max(peak[user_id], running[user_id])
+                await asyncio.sleep(0.01)
+                running[user_id] -= 1
+        
+        await asyncio.gather(*(upload(1) for _ in range(10)), *(upload(2) for _ in range(3)))
+        
+        assert peak == {1: 2, 2: 2}
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_releases_nothing(self):
+        """Test cancelling a waiting upload doesn't leak or steal slots"""
+        import asyncio
+        from app.services.video.fair_share import FairShareScheduler
+        
+        scheduler = FairShareScheduler(max_concurrent=1, max_per_user=1)
+        release = asyncio.Event()
+        
+        async def hold():
+            async with scheduler.slot(1):
+                await release.wait()
+        
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert scheduler.waiting(1) == 1
+        
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        release.set()
+        await holder
+        
+        assert scheduler.in_flight == 0
+        assert scheduler.waiting() == 0
+    
+    def test_weight_comes_from_plan_type(self, test_user, db_session):
+        """Test upload weight is looked up from the user's subscription plan"""
+        from app.services.video.fair_share import get_upload_weight, parse_plan_weights
+        
+        assert parse_plan_weights("free:1, creator:3") == {"free": 1.0, "creator": 3.0}
+        with pytest.raises(ValueError):
+            parse_plan_weights("free:0")
+        
+        subscription = Subscription(
+            user_id=test_user.id,
+            stripe_subscription_id="sub_fair_share",
+            stripe_customer_id="cus_fair_share",
+            plan_type="creator",
+            status="active",
+            current_period_start=datetime.now(timezone.utc),
+            current_period_end=datetime.now(timezone.utc) + timedelta(days=30)
+        )
+        db_session.add(subscription)
+        db_session.commit()
+        
+        with patch('app.services.video.fair_share.settings') as mock_settings:
+            mock_settings.UPLOAD_PLAN_WEIGHTS = "free:1,creator:3"
+            assert get_upload_weight(test_user.id, db_session) == 3.0
+            assert get_upload_weight(test_user.id + 1000, db_session) == 1.0
+
+
+class TestR2MediaUpload:
+    """Test streaming R2 objects into YouTube resumable uploads"""
+    
+    CHUNK = 256 * 1024
+    
+    def _r2_service(self, data):
+        r2_service = Mock()
+        r2_service.read_range.side_effect = lambda key, start, length: data[start:start + length]
+        return r2_service
+    
+    def test_chunks_are_ranged_reads(self):
+        """Test each chunk is one ranged read and the object is reassembled exactly"""
+        from app.services.video.platforms.youtube_media import R2MediaUpload
+        
+        data = bytes(range(256)) * 2560  # 2.5 chunks
+        r2_service = self._r2_service(data)
+        media = R2MediaUpload(r2_service, "user_1/video.mp4", len(data), chunksize=self.CHUNK)
+        
+        try:
+            received = b""
+            while len(received) < media.size():
+                received += media.getbytes(len(received), media.chunksize())
+        finally:
+            media.close()
+        
+        assert received == data
+        assert media.resumable()
+        reads = sorted(call.args[1:] for call in r2_service.read_range.call_args_list)
+        assert reads == [(0, self.CHUNK), (self.CHUNK, self.CHUNK), (2 * self.CHUNK, self.CHUNK // 2)]
+    
+    def test_resume_from_other_offset(self):
+        """Test a resume at an offset other than the read-ahead still returns the right bytes"""
+        from app.services.video.platforms.youtube_media import R2MediaUpload
+        
+        data = bytes(range(256)) * 2560
+        media = R2MediaUpload(self._r2_service(data), "user_1/video.mp4", len(data), chunksize=self.CHUNK)
+        
+        try:
+            assert media.getbytes(0, self.CHUNK) == data[:self.CHUNK]
+            # YouTube only confirmed part of the first chunk
+            assert media.getbytes(1000, self.CHUNK) == data[1000:1000 + self.CHUNK]
+        finally:
+            media.close()
+    
+    def test_chunk_size_must_be_aligned(self):
+        """Test chunk sizes YouTube would reject are refused up front"""
+        from app.services.video.platforms.youtube_media import R2MediaUpload
+        
+        with pytest.raises(ValueError):
+            R2MediaUpload(Mock(), "user_1/video.mp4", 1000, chunksize=1000)
+    
+    @pytest.mark.asyncio
+    async def test_next_chunk_runs_off_event_loop(self):
+        """Test a blocking chunk transfer doesn't stall other coroutines"""
+        import asyncio
+        import threading
+        import time
+        from app.services.video.platforms.youtube import _next_chunk
+        
+        loop_thread = threading.get_ident()
+        transfer_threads = []
+        
+        def next_chunk():
+            transfer_threads.append(threading.get_ident())
+            time.sleep(0.2)
+            return None, {"id": "yt123"}
+        
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        ticking = asyncio.create_task(ticker())
+        try:
+            status, response = await _next_chunk(Mock(next_chunk=next_chunk))
+        finally:
+            ticking.cancel()
+        
+        assert response == {"id": "yt123"}
+        assert transfer_threads and transfer_threads[0] != loop_thread
+        assert ticks >= 5
+
+
+class TestYouTubeResumableSessions:
+    """Test YouTube uploads continue a saved resumable session"""
+    
+    def test_session_round_trip(self):
+        """Test the saved session is returned as stored and cleared afterwards"""
+        from app.db.redis import set_youtube_upload_session, get_youtube_upload_session, clear_youtube_upload_session
+        
+        set_youtube_upload_session(42, "https://upload.example/session", 524288, "user_1/video.mp4", 1048576)
+        assert get_youtube_upload_session(42) == {
+            "session_uri": "https://upload.example/session",
+            "offset": 524288,
+            "object_key": "user_1/video.mp4",
+            "size": 1048576
+        }
+        
+        clear_youtube_upload_session(42)
+        assert get_youtube_upload_session(42) is None
+    
+    @pytest.mark.asyncio
+    async def test_resume_continues_from_confirmed_offset(self):
+        """Test a resumed request asks YouTube for its offset and only sends the rest"""
+        import json
+        from googleapiclient.http import HttpMockSequence, HttpRequest
+        from app.services.video.platforms.youtube import _resume_upload_request
+        from app.services.video.platforms.youtube_media import R2MediaUpload
+        
+        chunk = 256 * 1024
+        data = bytes(range(256)) * 4096  # 4 chunks
+        r2_service = Mock()
+        r2_service.read_range.side_effect = lambda key, start, length: data[start:start + length]
+        media = R2MediaUpload(r2_service, "user_1/video.mp4", len(data), chunksize=4 * chunk)
+        
+        http = HttpMockSequence([
+            # Status query: YouTube has the first chunk, not the offset we saved
+            ({'status': '308', 'range': f'bytes=0-{chunk - 1}'}, b''),
+            ({'status': '200'}, json.dumps({'id': 'yt123'}).encode()),
+        ])
+        request = HttpRequest(
+            http, lambda resp, content: json.loads(content),
+            "https://www.googleapis.com/upload/youtube/v3/videos", method="POST", resumable=media
+        )
+        session = {"session_uri": "https://upload.example/session", "offset": 0}
+        
+        try:
+            assert await _resume_upload_request(request, session, len(data)) is None
+            assert request.resumable_progress == chunk
+            status, response = request.next_chunk(http=http)
+        finally:
+            media.close()
+        
+        assert response == {'id': 'yt123'}
+        assert r2_service.read_range.call_args_list[0].args[1:] == (chunk, 3 * chunk)
+    
+    @pytest.mark.asyncio
+    async def test_resume_of_finished_or_expired_session(self):
+        """Test a session that already completed returns the video, and an expired one raises HttpError"""
+        import json
+        from googleapiclient.errors import HttpError
+        from googleapiclient.http import HttpMockSequence, HttpRequest
+        from app.services.video.platforms.youtube import _resume_upload_request
+        
+        http = HttpMockSequence([
+            ({'status': '200'}, json.dumps({'id': 'yt123'}).encode()),
+            ({'status': '404'}, b'Not Found'),
+        ])
+        request = HttpRequest(
+            http, lambda resp, content: json.loads(content),
+            "https://www.googleapis.com/upload/youtube/v3/videos", method="POST", resumable=Mock()
+        )
+        session = {"session_uri": "https://upload.example/session", "offset": 1024}
+        
+        assert await _resume_upload_request(request, session, 2048) == {'id': 'yt123'}
+        with pytest.raises(HttpError):
+            await _resume_upload_request(request, session, 2048)
+
+
+class TestTikTokPublishStatus:
+    """Test async TikTok publish status fetching"""
+    
+    @pytest.mark.asyncio
+    async def test_statuses_fetched_concurrently_and_cached(self):
+        """Test one token lookup, bounded concurrent requests, and cached results"""
+        import asyncio
+        import httpx
+        from app.db.redis import get_tiktok_publish_status
+        from app.services.video.platforms import tiktok_api
+        
+        in_flight = 0
+        peak = 0
+        
+        async def post(url, headers, json, timeout):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if json["publish_id"] == "gone":
+                return httpx.Response(404)
+            return httpx.Response(200, json={"data": {"status": "PROCESSING_UPLOAD"}})
+        
+        client = Mock()
+        client.post = post
+        with patch.object(tiktok_api, '_get_status_access_token', AsyncMock(return_value="token")) as mock_token, \
+                patch.object(tiktok_api, 'get_platform_client', return_value=client), \
+                patch.object(tiktok_api, 'acquire_platform_rate_limit', AsyncMock(return_value=0.0)), \
+                patch.object(tiktok_api.settings, 'TIKTOK_STATUS_FETCH_CONCURRENCY', 2):
+            results = await tiktok_api.fetch_tiktok_publish_statuses(1, ["a", "b", "c", "gone"])
+        
+        assert mock_token.await_count == 1
+        assert peak == 2
+        assert results["a"] == {"status": "PROCESSING_UPLOAD"}
+        # A 404 means the publish_id is gone because the video was published
+        assert results["gone"] == {"status": "PUBLISHED", "video_id": None}
+        assert get_tiktok_publish_status("b") == {"status": "PROCESSING_UPLOAD"}
+    
+    @pytest.mark.asyncio
+    async def test_statuses_without_token(self):
+        """Test every publish_id fails without calling TikTok when the user has no token"""
+        from app.services.video.platforms import tiktok_api
+        
+        with patch.object(tiktok_api, '_get_status_access_token', AsyncMock(return_value=None)), \
+                patch.object(tiktok_api, 'get_platform_client') as mock_client:
+            results = await tiktok_api.fetch_tiktok_publish_statuses(1, ["a", "b"])
+        
+        assert results == {"a": None, "b": None}
+        mock_client.assert_not_called()
+
+
+class TestStatusCheckerPublishJobs:
+    """Test the publish job index and per-user status checks"""
+    
+    def test_poll_interval_backs_off_per_job(self):
+        """Test each job polls fast at first, then backs off up to the cap, until completed"""
+        import time
+        from app.db.redis import (
+            register_publish_job, get_due_publish_jobs, reschedule_publish_job, complete_publish_job
+        )
+        
+        register_publish_job("tiktok", 1, 0)
+        register_publish_job("instagram", 2, 60)
+        assert get_due_publish_jobs(time.time(), 10) == [("tiktok", 1)]
+        
+        delays = [reschedule_publish_job("tiktok", 1, 5, 20, 2) for _ in range(4)]
+        assert delays == [5, 10, 20, 20]
+        
+        # Re-registering (a new publish) resets the backoff
+        register_publish_job("tiktok", 1, 0)
+        assert reschedule_publish_job("tiktok", 1, 5, 20, 2) == 5
+        
+        complete_publish_job("tiktok", 1)
+        reschedule_publish_job("tiktok", 1, 5, 20, 2)
+        assert get_due_publish_jobs(time.time() + 3600, 10) == [("instagram", 2)]
+    
+    @pytest.mark.asyncio
+    async def test_user_jobs_share_one_batched_fetch(self, test_user, db_session):
+        """Test a user's TikTok jobs are fetched in one batch and finished jobs leave the index"""
+        import time
+        from app.db.redis import register_publish_job, get_due_publish_jobs
+        from app.tasks import status_checker
+        
+        videos = []
+        for i in range(3):
+            video = create_test_video(
+                user_id=test_user.id,
+                filename=f"v{i}.mp4",
+                path=f"user_{test_user.id}/v{i}.mp4",
+                status="uploading",
+                custom_settings={"tiktok_publish_id": f"pub_{i}"}
+            )
+            db_session.add(video)
+            videos.append(video)
+        db_session.commit()
+        jobs = [("tiktok", video.id) for video in videos]
+        for platform, video_id in jobs:
+            register_publish_job(platform, video_id, 0)
+        
+        statuses = {"pub_0": {"status": "PROCESSING_UPLOAD"}, "pub_1": {"status": "PUBLISHED"}, "pub_2": None}
+        
+        async def publish(video, publish_id, status_data, all_settings, all_tokens, db):
+            if status_data["status"] == "PUBLISHED":
+                video.custom_settings = dict(video.custom_settings, tiktok_id="tt_1")
+                db.commit()
+        
+        with patch.object(status_checker, 'fetch_tiktok_publish_statuses', AsyncMock(return_value=statuses)) as mock_fetch, \
+                patch.object(status_checker, '_apply_tiktok_status', side_effect=publish) as mock_apply:
+            await status_checker._check_user_publish_jobs(test_user.id, jobs, db_session)
+        
+        mock_fetch.assert_awaited_once()
+        assert sorted(mock_fetch.await_args.args[1]) == ["pub_0", "pub_1", "pub_2"]
+        assert mock_apply.call_count == 2
+        # The published video is done; the others are polled again later
+        assert sorted(get_due_publish_jobs(time.time() + 3600, 10)) == [("tiktok", videos[0].id), ("tiktok", videos[2].id)]
+
+
+class TestUserKeyIndexes:
+    """Test per-user key indexes replacing KEYS scans"""
+    
+    def test_invalidate_settings_only_touches_user_keys(self, mock_redis):
+        """Test invalidating a user's settings cache deletes their indexed keys only"""
+        from app.db.redis import set_cached_settings, get_cached_settings, invalidate_settings_cache
+        
+        set_cached_settings(1, "global", {"a": 1})
+        set_cached_settings(1, "youtube", {"b": 2})
+        set_cached_settings(2, "global", {"c": 3})
+        
+        with patch.object(mock_redis, 'keys', side_effect=AssertionError("KEYS used")):
+            invalidate_settings_cache(1)
+        
+        assert get_cached_settings(1, "global") is None
+        assert get_cached_settings(1, "youtube") is None
+        assert get_cached_settings(2, "global") == {"c": 3}
+    
+    def test_delete_all_user_sessions_uses_session_index(self, mock_redis):
+        """Test backfilled sessions are deleted with their CSRF tokens, other users' kept"""
+        from app.db.redis import backfill_user_session_index, delete_all_user_sessions
+        
+        mock_redis.setex("session:s1", 3600, "1")
+        mock_redis.setex("csrf:s1", 3600, "token")
+        mock_redis.setex("session:s2", 3600, "1")
+        mock_redis.setex("session:s3", 3600, "2")
+        
+        # Another process is running the backfill
+        mock_redis.set("user_keys:sessions_backfill_running", "1")
+        assert backfill_user_session_index() == 0
+        mock_redis.delete("user_keys:sessions_backfill_running")
+        
+        with patch.object(mock_redis, 'pipeline', wraps=mock_redis.pipeline) as mock_pipeline:
+            assert backfill_user_session_index() == 3
+        # One read and one write round trip for the single SCAN batch
+        assert mock_pipeline.call_count == 2
+        assert backfill_user_session_index() == 0  # Runs once
+        
+        with patch.object(mock_redis, 'keys', side_effect=AssertionError("KEYS used")):
+            assert delete_all_user_sessions(1) == 2
+        
+        assert mock_redis.get("session:s1") is None
+        assert mock_redis.get("csrf:s1") is None
+        assert mock_redis.get("session:s3") == "2"
+    
+    def test_invalidate_all_user_caches_counts_deleted_keys(self):
+        """Test account cleanup deletes cache and progress keys through the indexes"""
+        from app.db.redis import (
+            set_cached_oauth_token, set_upload_progress, set_platform_upload_progress,
+            get_upload_progress, invalidate_all_user_caches
+        )
+        
+        set_cached_oauth_token(1, "youtube", {"token": "x"})
+        set_upload_progress(1, 10, 50)
+        set_platform_upload_progress(1, 10, "tiktok", 50)
+        set_upload_progress(2, 20, 50)
+        
+        assert invalidate_all_user_caches(1) == 3
+        assert get_upload_progress(1, 10) is None
+        assert get_upload_progress(2, 20) == 50
+    
+    def test_active_users_from_sorted_set(self, mock_redis):
+        """Test active users come from the activity set and stale entries are ignored"""
+        import time
+        from app.db.redis import (
+            ACTIVE_USERS_KEY, ACTIVITY_TTL, set_user_activity,
+            get_active_user_ids, get_active_users_with_timestamps
+        )
+        
+        set_user_activity(1)
+        set_user_activity(2)
+        mock_redis.zadd(ACTIVE_USERS_KEY, {"3": time.time() - ACTIVITY_TTL - 10})
+        
+        assert get_active_user_ids() == {1, 2}
+        assert set(get_active_users_with_timestamps()) == {1, 2}
+
+
+@pytest.fixture
+def encryption_key(monkeypatch):
+    """Fresh Fernet key in settings, so token encryption doesn't depend on the ENCRYPTION_KEY env var"""
+    from cryptography.fernet import Fernet
+    from app.core.config import settings
+    from app.utils import encryption
+    
+    monkeypatch.setattr(settings, "ENCRYPTION_KEY", Fernet.generate_key().decode())
+    # Drop the cipher built from any previous key
+    monkeypatch.setattr(encryption, "_cipher", None)
+    monkeypatch.setattr(encryption, "_ENCRYPTION_KEY", None)
+
+
+class TestLocalCache:
+    """Test the in-process cache over the Redis settings/OAuth caches"""
+    
+    def test_settings_served_from_l1_after_first_read(self, test_user, db_session):
+        """Test repeat reads skip Redis and writes invalidate both tiers"""
+        from app.db import local_cache
+        from app.db.helpers import get_user_settings, set_user_setting
+        
+        first = get_user_settings(test_user.id, "global", db=db_session)
+        
+        with patch.object(local_cache, 'get_cached_settings', side_effect=AssertionError("L2 read")):
+            again = get_user_settings(test_user.id, "global", db=db_session)
+        assert again == first
+        
+        # Returned values are copies - caller mutations do not reach the cache
+        again["title_template"] = "mutated"
+        assert get_user_settings(test_user.id, "global", db=db_session)["title_template"] == first["title_template"]
+        
+        set_user_setting(test_user.id, "global", "title_template", "{filename} new", db=db_session)
+        assert get_user_settings(test_user.id, "global", db=db_session)["title_template"] == "{filename} new"
+    
+    def test_oauth_token_cached_encrypted(self, test_user, db_session, mock_redis, encryption_key):
+        """Test get_oauth_token caches encrypted fields and rebuilds the token from cache"""
+        from app.db.helpers import get_oauth_token, save_oauth_token
+        from app.utils.encryption import decrypt
+        
+        save_oauth_token(test_user.id, "youtube", "access-1", refresh_token="refresh-1", db=db_session)
+        token = get_oauth_token(test_user.id, "youtube", db=db_session)
+        assert "access-1" not in mock_redis.get(f"cache:oauth:{test_user.id}:youtube")
+        
+        with patch.object(db_session, 'query', side_effect=AssertionError("DB read")):
+            cached = get_oauth_token(test_user.id, "youtube", db=db_session)
+        assert cached.id == token.id
+        assert decrypt(cached.access_token) == "access-1"
+        
+        save_oauth_token(test_user.id, "youtube", "access-2", db=db_session)
+        assert decrypt(get_oauth_token(test_user.id, "youtube", db=db_session).access_token) == "access-2"
+    
+    def test_invalidation_from_other_process_drops_l1(self):
+        """Test a published invalidation from another process drops the local entries"""
+        import json
+        from app.db import local_cache
+        
+        local_cache.store_settings(7, "global", {"a": 1})
+        local_cache.store_settings(7, "all", {"global": {"a": 1}})
+        local_cache.store_settings(8, "global", {"b": 2})
+        
+        local_cache._apply_invalidation_message(json.dumps({
+            "cache": "settings", "user_id": 7, "key": "global", "origin": "other"
+        }))
+        
+        assert local_cache._settings_cache.get((7, "global")) is local_cache._MISSING
+        assert local_cache._settings_cache.get((7, "all")) is local_cache._MISSING
+        assert local_cache._settings_cache.get((8, "global")) == {"b": 2}
+    
+    def test_get_all_oauth_tokens_skips_repeat_decryption(self, test_user, db_session, encryption_key):
+        """Test unchanged tokens are decrypted once and saving a token decrypts the new value"""
+        from app.db import helpers
+        from app.db.helpers import get_all_oauth_tokens, save_oauth_token
+        from app.utils.encryption import decrypt
+        
+        save_oauth_token(test_user.id, "tiktok", "access-1", refresh_token="refresh-1", db=db_session)
+        
+        with patch.object(helpers, 'decrypt', side_effect=decrypt) as mock_decrypt:
+            assert get_all_oauth_tokens(test_user.id, db=db_session)["tiktok"].access_token == "access-1"
+            assert get_all_oauth_tokens(test_user.id, db=db_session)["tiktok"].refresh_token == "refresh-1"
+            assert mock_decrypt.call_count == 2
+            
+            save_oauth_token(test_user.id, "tiktok", "access-2", db=db_session)
+            assert get_all_oauth_tokens(test_user.id, db=db_session)["tiktok"].access_token == "access-2"
+            assert mock_decrypt.call_count == 4
+    
+    @pytest.mark.asyncio
+    async def test_token_revoke_elsewhere_evicts_decrypted_token(self, test_user, db_session, mock_async_redis, encryption_key):
+        """Test a token revoke published by another process drops the decrypted token through the listener"""
+        import asyncio
+        import json
+        from app.db import local_cache
+        from app.db.helpers import get_all_oauth_tokens, save_oauth_token
+        
+        save_oauth_token(test_user.id, "tiktok", "access-1", refresh_token="refresh-1", db=db_session)
+        
+        generation = local_cache._global_generation
+        with patch.object(local_cache, 'get_async_redis_client', return_value=mock_async_redis):
+            listener = asyncio.create_task(local_cache._listen_for_invalidations())
+            try:
+                # Subscribed once the listener has started from a clean L1
+                for _ in range(100):
+                    if local_cache._global_generation != generation:
+                        break
+                    await asyncio.sleep(0.01)
+                
+                get_all_oauth_tokens(test_user.id, db=db_session)
+                assert local_cache._decrypted_token_cache.get((test_user.id, "tiktok")) is not local_cache._MISSING
+                
+                # What delete_oauth_token/save_oauth_token publish in the other process
+                await mock_async_redis.publish(local_cache.CACHE_INVALIDATION_CHANNEL, json.dumps({
+                    "cache": "oauth", "user_id": test_user.id, "key": "tiktok", "origin": "other-process"
+                }))
+                for _ in range(100):
+                    if local_cache._decrypted_token_cache.get((test_user.id, "tiktok")) is local_cache._MISSING:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                listener.cancel()
+                await asyncio.gather(listener, return_exceptions=True)
+        
+        assert local_cache._decrypted_token_cache.get((test_user.id, "tiktok")) is local_cache._MISSING
+
+
+class TestUploadContext:
+    """Test the per-run upload context reused across status updates"""
+    
+    @pytest.mark.asyncio
+    async def test_status_updates_reuse_context_until_invalidated(self, test_user, db_session):
+        """Test set_platform_status reuses the context's settings/tokens and reloads after an invalidation"""
+        from app.services.video import helpers
+        from app.db.helpers import set_user_setting
+        
+        video = create_test_video(test_user.id, "ctx.mp4", f"user_{test_user.id}/ctx.mp4", status="uploading")
+        db_session.add(video)
+        db_session.commit()
+        
+        context = helpers.build_upload_context(test_user.id, db_session)
+        
+        with patch.object(helpers, 'get_all_user_settings', wraps=helpers.get_all_user_settings) as mock_settings, \
+                patch.object(helpers, 'get_all_oauth_tokens', wraps=helpers.get_all_oauth_tokens) as mock_tokens, \
+                patch('app.services.event_service.publish_video_status_changed', new=AsyncMock()):
+            for status in ("uploading", "success"):
+                await helpers.set_platform_status(video.id, test_user.id, "youtube", status, db=db_session, context=context)
+            assert mock_settings.call_count == 0
+            assert mock_tokens.call_count == 0
+            
+            # A settings change invalidates the cache and makes the context reload once
+            set_user_setting(test_user.id, "destinations", "youtube_enabled", True, db=db_session)
+            await helpers.set_platform_status(video.id, test_user.id, "youtube", "success", db=db_session, context=context)
+            assert mock_settings.call_count == 1
+            assert mock_tokens.call_count == 1
+        
+        assert context.dest_settings.get("youtube_enabled") is True
+
+
+class TestEventCoalescer:
+    """Test per-user coalescing and debouncing of realtime events"""
+    
+    @staticmethod
+    def _fake_redis():
+        """Async Redis stand-in recording (channel, message) per PUBLISH and pipeline round trips"""
+        import json
+        published, round_trips = [], []
+        
+        class FakePipeline:
+            def __init__(self):
+                self.messages = []
+            
+            async def __aenter__(self):
+                return self
+            
+            async def __aexit__(self, *exc):
+                return False
+            
+            def publish(self, channel, message):
+                self.messages.append((channel, json.loads(message)))
+                return self
+            
+            async def execute(self):
+                round_trips.append(len(self.messages))
+                published.extend(self.messages)
+                return [1] * len(self.messages)
+        
+        async def publish(channel, message):
+            round_trips.append(1)
+            published.append((channel, json.loads(message)))
+            return 1
+        
+        client = MagicMock()
+        client.publish = AsyncMock(side_effect=publish)
+        client.pipeline = MagicMock(side_effect=lambda **kwargs: FakePipeline())
+        return client, published, round_trips
+    
+    @pytest.mark.asyncio
+    async def test_video_events_merge_within_window(self):
+        """Test events of one video within a window publish once, as a status change with the latest snapshot"""
+        import asyncio
+        from app.core.config import settings
+        from app.services import event_service
+        
+        client, published, round_trips = self._fake_redis()
+        with patch.object(settings, 'EVENT_COALESCE_WINDOW', 0.01), \
+                patch.object(event_service, 'get_async_redis_client', return_value=client):
+            await event_service.publish_video_status_changed(1, 7, "pending", "uploading", video_dict={"id": 7, "status": "uploading"})
+            await event_service.publish_video_updated(1, 7, video_dict={"id": 7, "status": "uploaded"})
+            await event_service.publish_upload_progress(1, 7, "youtube", 40)
+            await event_service.publish_upload_progress(1, 7, "youtube", 90)
+            assert published == []
+            await asyncio.sleep(0.05)
+        
+        assert round_trips == [2]
+        (videos_channel, status_event), (progress_channel, progress_event) = published
+        assert videos_channel == "user:1:videos"
+        assert status_event["type"] == "video_status_changed"
+        assert status_event["data"]["old_status"] == "pending"
+        assert status_event["data"]["new_status"] == "uploaded"
+        assert status_event["data"]["video"]["status"] == "uploaded"
+        assert progress_channel == "user:1:upload_progress"
+        assert progress_event["data"]["progress_percent"] == 90
+    
+    @pytest.mark.asyncio
+    async def test_other_events_flush_pending_first(self):
+        """Test a non-coalesced event is published immediately, after the user's pending events"""
+        from app.core.config import settings
+        from app.services import event_service
+        
+        client, published, _ = self._fake_redis()
+        with patch.object(settings, 'EVENT_COALESCE_WINDOW', 10), \
+                patch.object(event_service, 'get_async_redis_client', return_value=client):
+            await event_service.publish_video_updated(1, 7, video_dict={"id": 7, "status": "pending"})
+            await event_service.publish_video_deleted(1, 7)
+        
+        assert [event["type"] for _, event in published] == ["video_updated", "video_deleted"]
+    
+    @pytest.mark.asyncio
+    async def test_video_updates_are_full_snapshots(self):
+        """Test every published video_updated carries the full video, even if unchanged since the last one"""
+        from app.services import event_service
+        
+        client, published, _ = self._fake_redis()
+        video = {"id": 7, "status": "uploading", "title": "clip", "platform_statuses": {"youtube": "uploading"}}
+        updated = {**video, "platform_statuses": {"youtube": "success"}}
+        with patch.object(event_service, 'get_async_redis_client', return_value=client):
+            await event_service.publish_video_updated(1, 7, video_dict=video)
+            await event_service.publish_video_updated(1, 7, video_dict=updated)
+            # A client that missed the previous message still gets the whole state
+            await event_service.publish_video_updated(1, 7, video_dict=updated)
+        
+        assert [event["data"]["video"] for _, event in published] == [video, updated, updated]
+        assert all("changes" not in event["data"] for _, event in published)
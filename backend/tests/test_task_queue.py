@@ -0,0 +1,372 @@
+"""Redis task queue tests"""
+import asyncio
+import pytest
+from unittest.mock import patch
+import fakeredis
+import fakeredis.aioredis
+
+from app.core.config import settings
+from app.db import task_queue
+from app.tasks import upload_worker
+from app.db.task_queue import (
+    enqueue_task, dequeue_task, get_task_status,
+    mark_task_processing, mark_task_completed, mark_task_failed, retry_task,
+    cleanup_stale_tasks,
+    heartbeat_worker, requeue_expired_leases, promote_due_tasks,
+    async_enqueue_task, async_get_task_status, async_mark_task_processing,
+    async_mark_task_completed, async_mark_task_failed, async_defer_task,
+    async_promote_due_tasks, async_release_worker,
+    DEDUP_KEY_PREFIX, QUEUE_KEY_PREFIX, DELAYED_SET_KEY, PROCESSING_KEY, INFLIGHT_KEY_PREFIX, WORKER_LEASES_KEY, WORKER_ID
+)
+
+
+@pytest.fixture
+def queue_redis():
+    """Sync and async fakeredis clients sharing one server, patched into task_queue"""
+    server = fakeredis.FakeServer()
+    sync_client = fakeredis.FakeStrictRedis(server=server, decode_responses=True)
+    async_client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+    with patch.object(task_queue, 'get_redis_client', return_value=sync_client):
+        with patch.object(task_queue, 'get_async_redis_client', return_value=async_client):
+            yield sync_client
+
+
+@pytest.mark.high
+class TestTaskQueue:
+    """Test task queue state transitions"""
+
+    @pytest.mark.asyncio
+    async def test_enqueue_and_dequeue_round_trip(self, queue_redis):
+        """Test enqueued task comes back from dequeue with decoded metadata"""
+        task_id = enqueue_task("upload_videos", {"user_id": 7})
+
+        # Queue holds only the task ID; metadata lives in the hash
+        assert queue_redis.lrange(f"{QUEUE_KEY_PREFIX}upload_videos", 0, -1) == [task_id]
+
+        task = await dequeue_task("upload_videos", timeout=1)
+        assert task["task_id"] == task_id
+        assert task["payload"] == {"user_id": 7}
+        assert task["retry_count"] == 0
+        assert task["status"] == "pending"
+
+    def test_processing_and_completed(self, queue_redis):
+        """Test processing/completed transitions update metadata and processing set"""
+        task_id = enqueue_task("upload_videos", {"user_id": 7})
+
+        mark_task_processing(task_id)
+        assert task_id in queue_redis.zrange(PROCESSING_KEY, 0, -1)
+        assert get_task_status(task_id)["status"] == "processing"
+
+        mark_task_completed(task_id, {"videos_uploaded": 2})
+        status = get_task_status(task_id)
+        assert status["status"] == "completed"
+        assert "completed_at" in status
+        assert task_id not in queue_redis.zrange(PROCESSING_KEY, 0, -1)
+
+    def test_mark_failed_schedules_delayed_retry_atomically(self, queue_redis):
+        """Test a failed task with retries left creates its delayed retry task in one step"""
+        task_id = enqueue_task("upload_videos", {"user_id": 7})
+        queue_redis.delete(f"{QUEUE_KEY_PREFIX}upload_videos")
+        mark_task_processing(task_id)
+
+        new_task_id = mark_task_failed(task_id, "boom", retry=True)
+
+        assert new_task_id is not None
+        old = get_task_status(task_id)
+        assert old["status"] == "retrying"
+        assert old["error"] == "boom"
+        assert task_id not in queue_redis.zrange(PROCESSING_KEY, 0, -1)
+
+        new = get_task_status(new_task_id)
+        assert new["retry_count"] == 1
+        assert new["payload"] == {"user_id": 7}
+        assert new["status"] == "delayed"
+
+        # Retry waits in the delayed set, not on the ready queue
+        assert queue_redis.zscore(DELAYED_SET_KEY, new_task_id) == pytest.approx(new["due_at_ts"], abs=0.01)
+        assert queue_redis.llen(f"{QUEUE_KEY_PREFIX}upload_videos") == 0
+
+    def test_mark_failed_permanently_after_max_retries(self, queue_redis):
+        """Test a task that exhausted its retries is marked failed with no new task"""
+        task_id = enqueue_task("upload_videos", {"user_id": 7}, retry_count=3, max_retries=3)
+
+        assert mark_task_failed(task_id, "boom", retry=True) is None
+        assert get_task_status(task_id)["status"] == "failed"
+
+    def test_mark_failed_missing_task(self, queue_redis):
+        """Test failing an unknown task is a no-op"""
+        assert mark_task_failed("missing", "boom") is None
+
+    def test_retry_task_resets_retry_count(self, queue_redis):
+        """Test manual retry creates a fresh attempt"""
+        task_id = enqueue_task("upload_videos", {"user_id": 7}, retry_count=3)
+
+        new_task_id = retry_task(task_id)
+
+        assert get_task_status(new_task_id)["retry_count"] == 0
+        assert new_task_id in queue_redis.lrange(f"{QUEUE_KEY_PREFIX}upload_videos", 0, -1)
+        assert retry_task("missing") is None
+
+
+@pytest.mark.high
+class TestDelayedTasks:
+    """Test delayed-task scheduling and promotion"""
+
+    def test_delayed_enqueue_is_not_ready(self, queue_redis):
+        """Test a delayed task is parked until due"""
+        task_id = enqueue_task("upload_videos", {"user_id": 7}, delay_seconds=60)
+
+        assert get_task_status(task_id)["status"] == "delayed"
+        assert queue_redis.llen(f"{QUEUE_KEY_PREFIX}upload_videos") == 0
+        assert promote_due_tasks() == 0
+
+    def test_promote_due_tasks_in_batches(self, queue_redis):
+        """Test due tasks are moved to the ready queue across multiple batches"""
+        task_ids = [enqueue_task("upload_videos", {"user_id": i}, delay_seconds=60) for i in range(5)]
+        # Make every task due now
+        queue_redis.zadd(DELAYED_SET_KEY, {task_id: 0 for task_id in task_ids})
+
+        assert promote_due_tasks(batch_size=2) == 5
+        assert queue_redis.zcard(DELAYED_SET_KEY) == 0
+        assert set(queue_redis.lrange(f"{QUEUE_KEY_PREFIX}upload_videos", 0, -1)) == set(task_ids)
+        assert get_task_status(task_ids[0])["status"] == "pending"
+
+    def test_manual_retry_with_delay(self, queue_redis):
+        """Test retry_task can schedule the fresh attempt for later"""
+        task_id = enqueue_task("upload_videos", {"user_id": 7})
+        queue_redis.delete(f"{QUEUE_KEY_PREFIX}upload_videos")
+
+        new_task_id = retry_task(task_id, delay_seconds=30)
+
+        assert queue_redis.zscore(DELAYED_SET_KEY, new_task_id) is not None
+        assert queue_redis.llen(f"{QUEUE_KEY_PREFIX}upload_videos") == 0
+
+    def test_cleanup_stale_tasks_uses_start_time_index(self, queue_redis):
+        """Test only tasks started before the timeout are failed"""
+        stale_id = enqueue_task("upload_videos", {"user_id": 7})
+        fresh_id = enqueue_task("upload_videos", {"user_id": 8})
+        mark_task_processing(stale_id)
+        mark_task_processing(fresh_id)
+        # Backdate the stale task's start time by two hours
+        queue_redis.zadd(PROCESSING_KEY, {stale_id: queue_redis.zscore(PROCESSING_KEY, stale_id) - 7200})
+
+        assert cleanup_stale_tasks(timeout_seconds=3600) == 1
+
+        status = get_task_status(stale_id)
+        assert status["status"] == "failed"
+        assert status["error"].startswith("Task timeout after 72")
+        assert queue_redis.zrange(PROCESSING_KEY, 0, -1) == [fresh_id]
+
+
+@pytest.mark.high
+class TestTaskDeduplication:
+    """Test coalescing of duplicate enqueues per dedup key"""
+
+    def test_duplicate_enqueue_merges_into_queued_task(self, queue_redis):
+        """Test a second enqueue with the same key returns the queued task"""
+        first = enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7")
+        second = enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7")
+        other_user = enqueue_task("upload_videos", {"user_id": 8}, dedup_key="8")
+
+        assert second == first
+        assert other_user != first
+        assert queue_redis.lrange(f"{QUEUE_KEY_PREFIX}upload_videos", 0, -1) == [other_user, first]
+        assert queue_redis.hget(f"{task_queue.META_KEY_PREFIX}{first}", "coalesced") == "1"
+
+    def test_enqueue_after_processing_starts_creates_follow_up(self, queue_redis):
+        """Test the key is released once the task runs, so one follow-up task is queued"""
+        first = enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7")
+        mark_task_processing(first)
+        assert queue_redis.get(f"{DEDUP_KEY_PREFIX}upload_videos:7") is None
+
+        follow_up = enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7")
+        assert follow_up != first
+        assert enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7") == follow_up
+
+    def test_stale_key_is_replaced(self, queue_redis):
+        """Test a key pointing at a finished task does not swallow new enqueues"""
+        first = enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7")
+        mark_task_failed(first, "bad payload", retry=False)
+
+        second = enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7")
+        assert second != first
+        assert queue_redis.get(f"{DEDUP_KEY_PREFIX}upload_videos:7") == second
+
+    def test_retry_inherits_free_dedup_key(self, queue_redis):
+        """Test a delayed retry absorbs duplicate enqueues while it waits"""
+        first = enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7")
+        mark_task_processing(first)
+        retry_id = mark_task_failed(first, "boom", retry=True)
+
+        assert enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7") == retry_id
+
+    @pytest.mark.asyncio
+    async def test_async_enqueue_coalesces(self, queue_redis):
+        """Test the async API shares the same coalescing"""
+        first = await async_enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7")
+        assert await async_enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7") == first
+        assert enqueue_task("upload_videos", {"user_id": 7}, dedup_key="7") == first
+
+
+@pytest.mark.high
+class TestReliableDelivery:
+    """Test in-flight tracking and re-delivery of tasks from dead workers"""
+
+    @pytest.mark.asyncio
+    async def test_dequeue_moves_task_in_flight_until_acked(self, queue_redis):
+        """Test dequeued task sits in this worker's in-flight list until completed"""
+        inflight_key = f"{INFLIGHT_KEY_PREFIX}{WORKER_ID}"
+        task_id = enqueue_task("upload_videos", {"user_id": 7})
+
+        await dequeue_task("upload_videos", timeout=1)
+        assert queue_redis.lrange(inflight_key, 0, -1) == [task_id]
+
+        mark_task_processing(task_id)
+        mark_task_completed(task_id)
+        assert queue_redis.lrange(inflight_key, 0, -1) == []
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_requeues_in_flight_tasks(self, queue_redis):
+        """Test tasks held by a worker that stopped heartbeating are re-delivered"""
+        task_id = enqueue_task("upload_videos", {"user_id": 7})
+        await dequeue_task("upload_videos", timeout=1)
+        mark_task_processing(task_id)
+
+        # Simulate a crashed worker: its lease is already in the past
+        queue_redis.zadd(WORKER_LEASES_KEY, {WORKER_ID: 0})
+
+        assert requeue_expired_leases() == 1
+        assert queue_redis.lrange(f"{QUEUE_KEY_PREFIX}upload_videos", 0, -1) == [task_id]
+        assert task_id not in queue_redis.zrange(PROCESSING_KEY, 0, -1)
+
+        task = await dequeue_task("upload_videos", timeout=1)
+        assert task["task_id"] == task_id
+        assert task["status"] == "pending"
+        assert task["redeliveries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_live_lease_is_not_reaped(self, queue_redis):
+        """Test in-flight tasks of a heartbeating worker are left alone"""
+        enqueue_task("upload_videos", {"user_id": 7})
+        heartbeat_worker()
+        await dequeue_task("upload_videos", timeout=1)
+
+        assert requeue_expired_leases() == 0
+        assert queue_redis.llen(f"{INFLIGHT_KEY_PREFIX}{WORKER_ID}") == 1
+
+
+@pytest.mark.high
+class TestAsyncTaskQueue:
+    """Test the async API shares state and semantics with the sync one"""
+
+    @pytest.mark.asyncio
+    async def test_async_lifecycle(self, queue_redis):
+        """Test enqueue/processing/completed through the async client"""
+        task_id = await async_enqueue_task("upload_videos", {"user_id": 7})
+        task = await dequeue_task("upload_videos", timeout=1)
+        assert task["task_id"] == task_id
+
+        await async_mark_task_processing(task_id)
+        assert (await async_get_task_status(task_id))["status"] == "processing"
+        assert queue_redis.zscore(PROCESSING_KEY, task_id) is not None
+
+        await async_mark_task_completed(task_id, {"videos_uploaded": 1})
+        assert get_task_status(task_id)["status"] == "completed"
+        assert queue_redis.zcard(PROCESSING_KEY) == 0
+        assert queue_redis.llen(f"{INFLIGHT_KEY_PREFIX}{WORKER_ID}") == 0
+
+    @pytest.mark.asyncio
+    async def test_async_failure_defer_and_promote(self, queue_redis):
+        """Test failed retry, defer and promotion through the async client"""
+        task_id = await async_enqueue_task("upload_videos", {"user_id": 7})
+        await dequeue_task("upload_videos", timeout=1)
+
+        new_task_id = await async_mark_task_failed(task_id, "boom", retry=True)
+        assert (await async_get_task_status(new_task_id))["status"] == "delayed"
+        assert await async_mark_task_failed("missing", "boom") is None
+
+        deferred_id = await async_enqueue_task("upload_videos", {"user_id": 8})
+        await dequeue_task("upload_videos", timeout=1)
+        await async_defer_task(deferred_id, 60)
+        assert queue_redis.zcard(DELAYED_SET_KEY) == 2
+
+        queue_redis.zadd(DELAYED_SET_KEY, {new_task_id: 0, deferred_id: 0})
+        assert await async_promote_due_tasks() == 2
+        assert await async_release_worker() == 0
+
+
+@pytest.mark.high
+class TestUploadWorkerConcurrency:
+    """Test upload worker concurrency limits, backpressure and drain"""
+
+    @pytest.mark.asyncio
+    async def test_global_and_per_user_limits(self, queue_redis):
+        """Test worker stops dequeuing when saturated and defers tasks over the per-user limit"""
+        release = asyncio.Event()
+
+        async def fake_process(task_data):
+            await release.wait()
+            mark_task_completed(task_data["task_id"])
+
+        for user_id in (1, 1, 2, 3):
+            enqueue_task("upload_videos", {"user_id": user_id})
+
+        with patch.object(settings, 'UPLOAD_WORKER_MAX_CONCURRENCY', 2), \
+                patch.object(settings, 'UPLOAD_WORKER_MAX_PER_USER', 1), \
+                patch.object(upload_worker, 'process_upload_task', fake_process):
+            worker = asyncio.create_task(upload_worker.upload_worker_task())
+            await asyncio.sleep(0.2)
+
+            # Users 1 and 2 hold both slots; user 1's second task was deferred,
+            # user 3's task is still waiting on the ready queue
+            assert len(upload_worker._in_flight_tasks) == 2
+            assert queue_redis.zcard(DELAYED_SET_KEY) == 1
+            assert queue_redis.llen(f"{QUEUE_KEY_PREFIX}upload_videos") == 1
+
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+            release.set()
+            await upload_worker.drain_upload_worker(timeout=1)
+
+        assert not upload_worker._in_flight_tasks
+        assert not upload_worker._user_in_flight
+        assert queue_redis.llen(f"{INFLIGHT_KEY_PREFIX}{WORKER_ID}") == 0
+
+    @pytest.mark.asyncio
+    async def test_drain_requeues_unfinished_tasks(self, queue_redis):
+        """Test tasks still running at drain timeout are cancelled and re-queued"""
+        async def stuck_process(task_data):
+            mark_task_processing(task_data["task_id"])
+            await asyncio.sleep(60)
+
+        task_id = enqueue_task("upload_videos", {"user_id": 1})
+
+        with patch.object(upload_worker, 'process_upload_task', stuck_process):
+            worker = asyncio.create_task(upload_worker.upload_worker_task())
+            await asyncio.sleep(0.2)
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+            await upload_worker.drain_upload_worker(timeout=0.1)
+
+        assert queue_redis.lrange(f"{QUEUE_KEY_PREFIX}upload_videos", 0, -1) == [task_id]
+        assert get_task_status(task_id)["status"] == "pending"
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_job_is_deferred(self, queue_redis):
+        """Test a job waiting too long for a platform quota goes back to the delayed set instead of failing"""
+        from app.services.video.platforms.rate_limiter import PlatformRateLimitExceeded
+
+        task_id = enqueue_task("upload_videos", {"user_id": 1})
+        task_data = await dequeue_task("upload_videos", timeout=1)
+
+        rate_limited = PlatformRateLimitExceeded("YouTube rate limit exceeded", retry_after=300)
+        with patch.object(upload_worker, 'SessionLocal'), \
+                patch.object(upload_worker, 'upload_all_pending_videos', side_effect=rate_limited):
+            await upload_worker.process_upload_task(task_data)
+
+        status = get_task_status(task_id)
+        assert status["status"] == "delayed"
+        assert queue_redis.zscore(DELAYED_SET_KEY, task_id) is not None
+        # Not left in the processing index for the stale-task reaper
+        assert queue_redis.zscore(PROCESSING_KEY, task_id) is None
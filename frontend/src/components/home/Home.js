@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback, useMemo } from 'react';
+import React, { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import { useNavigate, useLocation } from 'react-router-dom';
 import axios from 'axios';
 import { getApiUrl } from '../../services/api';
@@ -135,6 +135,7 @@ export default function Home({ user, isAdmin, setUser, authLoading }) {
     handleDragStart,
     updateVideoProgress,
     updateVideoFromWebSocket,
+    applyVideoChangesFromWebSocket,
     setQueueTokenCount,
     handleDragEnd,
     handleDragOver,
@@ -283,7 +284,12 @@ export default function Home({ user, isAdmin, setUser, authLoading }) {
         break;
         
       case 'video_updated':
-        loadVideos();
+        // Full snapshot, or a partial update of the fields that changed
+        if (payload.video) {
+          updateVideoFromWebSocket(payload.video);
+        } else if (!(payload.changes && applyVideoChangesFromWebSocket(payload.video_id, payload.changes))) {
+          loadVideos();
+        }
         break;
         
       case 'video_deleted':
@@ -361,12 +367,22 @@ export default function Home({ user, isAdmin, setUser, authLoading }) {
       default:
         console.log('Unhandled WebSocket event type:', eventType, payload);
     }
-  }, [loadVideos, loadSubscription, loadDestinations, loadGlobalSettings, loadYoutubeSettings, loadTiktokSettings, loadInstagramSettings, setNotification, setQueueTokenCount, updateVideoFromWebSocket, cancellationListener]);
+  }, [loadVideos, loadSubscription, loadDestinations, loadGlobalSettings, loadYoutubeSettings, loadTiktokSettings, loadInstagramSettings, setNotification, setQueueTokenCount, updateVideoFromWebSocket, applyVideoChangesFromWebSocket, cancellationListener]);
+
+  // Events published while the socket was down are lost (Redis pub/sub) - reload after a reconnect
+  const wsConnectedBeforeRef = useRef(false);
+  const handleWebSocketOpen = useCallback(() => {
+    if (wsConnectedBeforeRef.current) {
+      loadVideos();
+    }
+    wsConnectedBeforeRef.current = true;
+  }, [loadVideos]);
 
   const { connected: wsConnected } = useWebSocket('/ws', handleWebSocketMessage, {
     reconnect: true,
     reconnectInterval: 3000,
     maxReconnectAttempts: 10,
+    onOpen: handleWebSocketOpen,
   });
 
   const handleLogout = useCallback(async () => {
@@ -1,4 +1,4 @@
-import { useState, useCallback, useMemo } from 'react';
+import { useState, useCallback, useMemo, useRef } from 'react';
 import * as videoService from '../services/videoService';
 import { isVideoInProgress } from '../utils/videoStatus';
 
@@ -36,6 +36,9 @@ export function useVideos(
   cancellationListener = null
 ) {
   const [videos, setVideos] = useState([]);
+  // Latest videos for callbacks that must not re-create on every change (WebSocket handlers)
+  const videosRef = useRef(videos);
+  videosRef.current = videos;
   const [editingVideo, setEditingVideo] = useState(null);
   const [draggedVideo, setDraggedVideo] = useState(null);
   const [overrideInputValues, setOverrideInputValues] = useState({});
@@ -173,6 +176,16 @@ export function useVideos(
     });
   }, []);
 
+  // Merge a delta (changed top-level fields) from a video_updated event.
+  // Returns false if the video is not loaded yet, so the caller can fall back to a full reload.
+  const applyVideoChangesFromWebSocket = useCallback((videoId, changes) => {
+    if (!videosRef.current.some(v => v.id === videoId)) {
+      return false;
+    }
+    setVideos(prev => prev.map(v => v.id === videoId ? { ...v, ...changes } : v));
+    return true;
+  }, []);
+
   const updateVideoProgress = useCallback((videoId, progress, platform = null) => {
     setVideos(prev => prev.map(v => {
       if (v.id !== videoId) return v;
@@ -877,6 +890,7 @@ export function useVideos(
     calculateQueueTokenCost,
     updateVideoProgress,
     updateVideoFromWebSocket,
+    applyVideoChangesFromWebSocket,
     formatFileSize,
     setQueueTokenCount,
   };
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Platform HTTP client benchmark - sends the same small JSON POSTs (the shape
+of a TikTok status poll) to a local HTTPS server, once through module-level
+httpx.post (a new client, TCP connection and TLS handshake per call, as the
+TikTok helpers used to do) and once through a pooled keep-alive client
+configured like the shared platform clients (http_clients._client_options).
+
+The server counts accepted connections, i.e. TLS handshakes, so the output
+shows requests/sec and how many handshakes the pool saved. A self-signed
+certificate is generated for the run. The server speaks HTTP/1.1 only, so
+this measures connection reuse, not HTTP/2 multiplexing.
+
+Usage (from backend/):
+    python ../scripts/benchmark_platform_http_pool.py --requests 500 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import json
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+# Allow running from repo root or backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.services.video.platforms import http_clients  # noqa: E402
+
+PAYLOAD = {"publish_id": "v_pub_benchmark"}
+RESPONSE = json.dumps({"data": {"status": "PROCESSING_UPLOAD"}, "error": {"code": "ok"}}).encode()
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    """Answers every POST like the TikTok status endpoint, keeping the connection open"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingTLSServer(ThreadingHTTPServer):
+    """HTTPS server that counts accepted connections (one TLS handshake each)"""
+
+    daemon_threads = True
+
+    def __init__(self, address, handler, context: ssl.SSLContext):
+        super().__init__(address, handler)
+        self.context = context
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def get_request(self):
+        sock, addr = self.socket.accept()
+        with self._lock:
+            self.connections += 1
+        return self.context.wrap_socket(sock, server_side=True), addr
+
+
+def write_self_signed_cert(directory: Path):
+    """Create a localhost certificate and key, returning their paths"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(hours=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = directory / "cert.pem", directory / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    return cert_path, key_path
+
+
+async def run(name: str, server: CountingTLSServer, send, requests: int, concurrency: int) -> None:
+    """Send `requests` POSTs, at most `concurrency` at a time, and report throughput and handshakes"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            response = await send()
+            response.raise_for_status()
+
+    connections_before = server.connections
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    handshakes = server.connections - connections_before
+    print(
+        f"{name:<10} {elapsed:>7.2f} s   {requests / elapsed:>8.1f} req/s   "
+        f"{handshakes:>5} TLS handshakes ({handshakes / requests:.2f} per request)"
+    )
+
+
+async def main_async(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_path, key_path = write_self_signed_cert(Path(tmp))
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert_path, key_path)
+        client_context = ssl.create_default_context(cafile=str(cert_path))
+
+        server = CountingTLSServer(("127.0.0.1", 0), StatusHandler, context)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"https://127.0.0.1:{server.server_address[1]}/v2/post/publish/status/fetch/"
+        print(f"Requests: {args.requests}, concurrency: {args.concurrency}\n")
+
+        try:
+            # Module-level httpx.post is blocking; the old helpers ran it from worker threads
+            await run(
+                "httpx.post", server,
+                lambda: asyncio.to_thread(httpx.post, url, json=PAYLOAD, verify=client_context),
+                args.requests, args.concurrency
+            )
+
+            async with httpx.AsyncClient(verify=client_context, **http_clients._client_options("tiktok")) as client:
+                await run("pooled", server, lambda: client.post(url, json=PAYLOAD), args.requests, args.concurrency)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-call httpx.post against a pooled platform client")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per run")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Task queue micro-benchmark - compares the old per-command Redis round-trips
+with the pipelined/Lua queue operations in app.db.task_queue.
+
+Runs against fakeredis by default, or a real Redis with --redis-url.
+fakeredis has no network, so use --rtt-ms to add a simulated round-trip
+latency per request sent and see the effect of fewer round-trips.
+
+Usage (from backend/):
+    python ../scripts/benchmark_task_queue.py --rtt-ms 0.5
+    python ../scripts/benchmark_task_queue.py --redis-url redis://localhost:6379/15 --iterations 5000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List
+from unittest.mock import patch
+
+# Allow running from repo root or backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.db import task_queue  # noqa: E402
+
+TASK_TYPE = "benchmark"
+# Processing index used before it became a start-time ZSET
+LEGACY_PROCESSING_SET_KEY = "task:processing"
+
+
+def legacy_lifecycle(client, fail: bool) -> None:
+    """Replicates the command sequence the queue issued before pipelining"""
+    task_id = str(uuid.uuid4())
+    meta_key = f"{task_queue.META_KEY_PREFIX}{task_id}"
+    payload = {"user_id": 1}
+    created_at = datetime.now(timezone.utc).isoformat()
+
+    # enqueue: HSET, EXPIRE, LPUSH
+    client.hset(meta_key, mapping={
+        "task_id": task_id, "task_type": TASK_TYPE, "payload": json.dumps(payload),
+        "retry_count": "0", "max_retries": "3", "created_at": created_at, "status": "pending"
+    })
+    client.expire(meta_key, task_queue.TASK_META_TTL)
+    client.lpush(f"{task_queue.QUEUE_KEY_PREFIX}{TASK_TYPE}", json.dumps({"task_id": task_id}))
+
+    # processing: HSET, HSET, SADD
+    client.hset(meta_key, "status", "processing")
+    client.hset(meta_key, "started_at", created_at)
+    client.sadd(LEGACY_PROCESSING_SET_KEY, task_id)
+
+    if not fail:
+        # completed: HSET, HSET, HSET, SREM
+        client.hset(meta_key, "status", "completed")
+        client.hset(meta_key, "completed_at", created_at)
+        client.hset(meta_key, "result", json.dumps({"ok": True}))
+        client.srem(LEGACY_PROCESSING_SET_KEY, task_id)
+        return
+
+    # failed with retry: HGETALL, 4x HSET, SREM, nested enqueue (HSET, EXPIRE, LPUSH), HSET
+    client.hgetall(meta_key)
+    client.hset(meta_key, "status", "retrying")
+    client.hset(meta_key, "error", "benchmark")
+    client.hset(meta_key, "retry_scheduled_at", created_at)
+    client.hset(meta_key, "retry_delay_seconds", "2")
+    client.srem(LEGACY_PROCESSING_SET_KEY, task_id)
+    new_task_id = str(uuid.uuid4())
+    new_meta_key = f"{task_queue.META_KEY_PREFIX}{new_task_id}"
+    client.hset(new_meta_key, mapping={
+        "task_id": new_task_id, "task_type": TASK_TYPE, "payload": json.dumps(payload),
+        "retry_count": "1", "max_retries": "3", "created_at": created_at, "status": "pending"
+    })
+    client.expire(new_meta_key, task_queue.TASK_META_TTL)
+    client.lpush(f"{task_queue.QUEUE_KEY_PREFIX}{TASK_TYPE}", json.dumps({"task_id": new_task_id}))
+    client.hset(new_meta_key, "retry_after", created_at)
+
+
+def current_lifecycle(client, fail: bool) -> None:
+    """Same lifecycle using the current task_queue functions"""
+    task_id = task_queue.enqueue_task(TASK_TYPE, {"user_id": 1})
+    task_queue.mark_task_processing(task_id)
+    if fail:
+        task_queue.mark_task_failed(task_id, "benchmark", retry=True)
+    else:
+        task_queue.mark_task_completed(task_id, {"ok": True})
+
+
+def add_simulated_rtt(client, rtt_ms: float) -> None:
+    """Delay every request written to the connection by rtt_ms"""
+    conn = client.connection_pool.get_connection("PING")
+    send = conn.send_packed_command
+
+    def delayed_send(*args, **kwargs):
+        time.sleep(rtt_ms / 1000)
+        return send(*args, **kwargs)
+
+    conn.send_packed_command = delayed_send
+    client.connection_pool.release(conn)
+
+
+def run(name: str, func: Callable[[], None], iterations: int) -> None:
+    """Time func over iterations and print throughput and latency percentiles"""
+    samples: List[float] = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"{name:<28} {iterations / elapsed:>10.0f} lifecycles/s   "
+        f"p50 {statistics.median(samples):7.3f} ms   p99 {p99:7.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Redis task queue round-trips")
+    parser.add_argument("--redis-url", help="Real Redis URL (default: in-process fakeredis)")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated round-trip latency per request")
+    args = parser.parse_args()
+
+    if args.redis_url:
+        import redis
+        client = redis.from_url(args.redis_url, decode_responses=True)
+        client.ping()
+    else:
+        import fakeredis
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+
+    if args.rtt_ms:
+        add_simulated_rtt(client, args.rtt_ms)
+
+    print(
+        f"Backend: {args.redis_url or 'fakeredis'}, iterations: {args.iterations}, "
+        f"simulated RTT: {args.rtt_ms} ms\n"
+    )
+
+    with patch.object(task_queue, "get_redis_client", return_value=client):
+        for fail in (False, True):
+            label = "retry" if fail else "complete"
+            run(f"legacy   ({label})", lambda: legacy_lifecycle(client, fail), args.iterations)
+            run(f"pipelined ({label})", lambda: current_lifecycle(client, fail), args.iterations)
+
+    # Clean up benchmark keys only (leave any real tasks alone)
+    for key in client.scan_iter(f"{task_queue.META_KEY_PREFIX}*"):
+        if client.hget(key, "task_type") == TASK_TYPE:
+            client.delete(key)
+            client.zrem(task_queue.DELAYED_SET_KEY, key[len(task_queue.META_KEY_PREFIX):])
+    client.delete(f"{task_queue.QUEUE_KEY_PREFIX}{TASK_TYPE}")
+
+
+if __name__ == "__main__":
+    main()
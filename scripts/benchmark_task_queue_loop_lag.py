@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Event loop lag benchmark - runs many concurrent task lifecycles
+(enqueue -> processing -> completed) from coroutines, once through the sync
+task_queue API and once through its async_* twin, while a probe coroutine
+measures how late the loop wakes it up.
+
+Sync calls block the whole loop for every Redis round-trip (websocket
+fan-out and every other request stall with it); async calls yield while
+waiting. Runs against fakeredis by default, or a real Redis with --redis-url.
+fakeredis has no network, so use --rtt-ms to add a simulated round-trip
+latency per request sent.
+
+Usage (from backend/):
+    python ../scripts/benchmark_task_queue_loop_lag.py --tasks 1000 --rtt-ms 0.5
+    python ../scripts/benchmark_task_queue_loop_lag.py --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+from unittest.mock import patch
+
+# Allow running from repo root or backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.db import task_queue  # noqa: E402
+
+TASK_TYPE = "benchmark"
+PROBE_INTERVAL = 0.01  # seconds between loop lag samples
+
+
+def add_simulated_rtt(rtt_ms: float) -> None:
+    """Delay every request written by sync and async connections by rtt_ms"""
+    from redis.asyncio.connection import AbstractConnection
+    from redis.connection import AbstractConnection as SyncAbstractConnection
+
+    sync_send = SyncAbstractConnection.send_packed_command
+    async_send = AbstractConnection.send_packed_command
+
+    def delayed_sync_send(self, *args, **kwargs):
+        time.sleep(rtt_ms / 1000)
+        return sync_send(self, *args, **kwargs)
+
+    async def delayed_async_send(self, *args, **kwargs):
+        await asyncio.sleep(rtt_ms / 1000)
+        return await async_send(self, *args, **kwargs)
+
+    SyncAbstractConnection.send_packed_command = delayed_sync_send
+    AbstractConnection.send_packed_command = delayed_async_send
+
+
+async def sync_lifecycle() -> None:
+    """Task lifecycle through the blocking API, as the worker used to run it"""
+    task_id = task_queue.enqueue_task(TASK_TYPE, {"user_id": 1})
+    task_queue.mark_task_processing(task_id)
+    await asyncio.sleep(0)
+    task_queue.mark_task_completed(task_id, {"ok": True})
+
+
+async def async_lifecycle() -> None:
+    """Same lifecycle through the async API"""
+    task_id = await task_queue.async_enqueue_task(TASK_TYPE, {"user_id": 1})
+    await task_queue.async_mark_task_processing(task_id)
+    await asyncio.sleep(0)
+    await task_queue.async_mark_task_completed(task_id, {"ok": True})
+
+
+async def probe_loop_lag(samples: List[float], stop: asyncio.Event) -> None:
+    """Record how late each PROBE_INTERVAL sleep wakes up"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def run(name: str, lifecycle, tasks: int, concurrency: int) -> None:
+    """Run `tasks` lifecycles with at most `concurrency` in flight and report loop lag"""
+    samples: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop_lag(samples, stop))
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with slots:
+            await lifecycle()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(tasks)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else 0.0
+    print(
+        f"{name:<8} {tasks / elapsed:>8.0f} lifecycles/s   loop lag "
+        f"p50 {statistics.median(samples) if samples else 0.0:8.2f} ms   "
+        f"p99 {p99:8.2f} ms   max {samples[-1] if samples else 0.0:8.2f} ms   "
+        f"({len(samples)} probes)"
+    )
+
+
+async def main_async(args) -> None:
+    if args.redis_url:
+        import redis
+        import redis.asyncio as aioredis
+        sync_client = redis.from_url(args.redis_url, decode_responses=True)
+        async_client = aioredis.from_url(args.redis_url, decode_responses=True)
+        sync_client.ping()
+    else:
+        import fakeredis
+        import fakeredis.aioredis
+        server = fakeredis.FakeServer()
+        sync_client = fakeredis.FakeStrictRedis(server=server, decode_responses=True)
+        async_client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+    if args.rtt_ms:
+        add_simulated_rtt(args.rtt_ms)
+
+    print(
+        f"Backend: {args.redis_url or 'fakeredis'}, tasks: {args.tasks}, "
+        f"concurrency: {args.concurrency}, simulated RTT: {args.rtt_ms} ms\n"
+    )
+
+    with patch.object(task_queue, "get_redis_client", return_value=sync_client), \
+            patch.object(task_queue, "get_async_redis_client", return_value=async_client):
+        await run("sync", sync_lifecycle, args.tasks, args.concurrency)
+        await run("async", async_lifecycle, args.tasks, args.concurrency)
+
+    # Clean up benchmark keys only (leave any real tasks alone)
+    for key in sync_client.scan_iter(f"{task_queue.META_KEY_PREFIX}*"):
+        if sync_client.hget(key, "task_type") == TASK_TYPE:
+            sync_client.delete(key)
+    sync_client.delete(f"{task_queue.QUEUE_KEY_PREFIX}{TASK_TYPE}")
+    await async_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event loop lag of sync vs async task queue calls")
+    parser.add_argument("--redis-url", help="Real Redis URL (default: in-process fakeredis)")
+    parser.add_argument("--tasks", type=int, default=1000, help="Number of task lifecycles")
+    parser.add_argument("--concurrency", type=int, default=1000, help="Lifecycles in flight at once")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated round-trip latency per request")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
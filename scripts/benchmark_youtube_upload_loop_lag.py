@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+YouTube upload loop lag benchmark - runs many concurrent simulated resumable
+uploads, once calling the blocking request.next_chunk() inline (as
+upload_video_to_youtube used to) and once through the chunk thread pool
+(youtube._next_chunk), while a probe coroutine measures how late the loop
+wakes it up.
+
+Each chunk transfer is simulated with a blocking sleep of --chunk-ms, the
+time httplib2 spends sending one chunk. Inline, every chunk of every upload
+freezes the loop (websocket broadcasts and other users' uploads with it);
+in the pool the loop stays free and uploads overlap up to
+YOUTUBE_UPLOAD_THREADS at a time.
+
+Usage (from backend/):
+    python ../scripts/benchmark_youtube_upload_loop_lag.py --uploads 20 --chunks 10 --chunk-ms 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# Allow running from repo root or backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.core.config import settings  # noqa: E402
+from app.services.video.platforms import youtube  # noqa: E402
+
+PROBE_INTERVAL = 0.01  # seconds between loop lag samples
+
+
+class SimulatedUploadRequest:
+    """Stands in for a googleapiclient resumable HttpRequest"""
+
+    def __init__(self, chunks: int, chunk_seconds: float):
+        self.remaining = chunks
+        self.chunk_seconds = chunk_seconds
+
+    def next_chunk(self):
+        time.sleep(self.chunk_seconds)
+        self.remaining -= 1
+        if self.remaining > 0:
+            return object(), None
+        return None, {"id": "benchmark"}
+
+
+async def inline_upload(request: SimulatedUploadRequest) -> None:
+    """Resumable loop calling next_chunk on the event loop thread"""
+    response = None
+    while response is None:
+        status, response = request.next_chunk()
+        await asyncio.sleep(0)
+
+
+async def executor_upload(request: SimulatedUploadRequest) -> None:
+    """Resumable loop as upload_video_to_youtube runs it now"""
+    response = None
+    while response is None:
+        status, response = await youtube._next_chunk(request)
+
+
+async def probe_loop_lag(samples: List[float], stop: asyncio.Event) -> None:
+    """Record how late each PROBE_INTERVAL sleep wakes up"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def run(name: str, upload, uploads: int, chunks: int, chunk_seconds: float) -> None:
+    """Run `uploads` simulated uploads at once and report loop lag"""
+    samples: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop_lag(samples, stop))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(upload(SimulatedUploadRequest(chunks, chunk_seconds)) for _ in range(uploads)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else 0.0
+    print(
+        f"{name:<9} {elapsed:>7.2f} s total   loop lag "
+        f"p50 {statistics.median(samples) if samples else 0.0:8.2f} ms   "
+        f"p99 {p99:8.2f} ms   max {samples[-1] if samples else 0.0:8.2f} ms   "
+        f"({len(samples)} probes)"
+    )
+
+
+async def main_async(args) -> None:
+    chunk_seconds = args.chunk_ms / 1000
+    print(
+        f"Uploads: {args.uploads}, chunks per upload: {args.chunks}, chunk transfer: {args.chunk_ms} ms, "
+        f"YOUTUBE_UPLOAD_THREADS: {settings.YOUTUBE_UPLOAD_THREADS}\n"
+    )
+    await run("inline", inline_upload, args.uploads, args.chunks, chunk_seconds)
+    await run("executor", executor_upload, args.uploads, args.chunks, chunk_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event loop lag of inline vs thread-pool YouTube chunk transfers")
+    parser.add_argument("--uploads", type=int, default=20, help="Concurrent uploads")
+    parser.add_argument("--chunks", type=int, default=10, help="Chunks per upload")
+    parser.add_argument("--chunk-ms", type=float, default=50.0, help="Simulated blocking time per chunk transfer")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()